@@ -9,8 +9,9 @@ import asyncio
 import json
 import logging
 import socket
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Awaitable, Callable, Optional, Dict, Any, List, Tuple
 from urllib.parse import urljoin
 import aiohttp
 from aiohttp import ClientSession, ClientTimeout, ClientError
@@ -21,14 +22,23 @@ from shared.models import (
     SyncOperation, Repository, RepositoryPackage, PackageState
 )
 from shared.interfaces import IAPIClient
+from shared.wire_format import (
+    JSON_CONTENT_TYPE, IDENTITY_ENCODING, encode_body, media_type, negotiate_format,
+    parse_header_list, repositories_to_columnar, state_to_columnar
+)
 from client.auth.token_manager import TokenManager
+from client.request_batcher import RequestBatcher, BatchOperationError
+from client.offline_journal import OfflineJournal
 
 logger = logging.getLogger(__name__)
 
 
 class APIClientError(Exception):
     """Base exception for API client errors."""
-    pass
+    
+    def __init__(self, message: str = "", status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class AuthenticationError(APIClientError):
@@ -46,6 +56,16 @@ class ServerError(APIClientError):
     pass
 
 
+class UnsupportedMediaTypeError(APIClientError):
+    """The server rejected the request body's content type or encoding."""
+    
+    def __init__(self, message: str, accepted_types: List[str], accepted_encodings: List[str],
+                 status_code: Optional[int] = None):
+        super().__init__(message, status_code)
+        self.accepted_types = accepted_types
+        self.accepted_encodings = accepted_encodings
+
+
 class RetryConfig:
     """Configuration for retry logic."""
     
@@ -70,18 +90,55 @@ class PacmanSyncAPIClient(IAPIClient):
     
     Provides authentication, endpoint management, status reporting, and sync operations
     with automatic retry logic and offline operation handling.
+    
+    State and repository submissions use the most compact wire format
+    available locally ("auto"), falling back to plain JSON when the server
+    does not accept it. Pass wire_format="json" to always send JSON.
+    
+    Other authenticated calls made within batch_window seconds of each
+    other are coalesced into one POST /api/batch round trip; pass
+    batch_requests=False to send every call on its own.
+    
+    Operations that cannot reach the server are queued in offline_journal
+    (in memory by default) and replayed once the connection is back.
     """
     
+    # Backoff between failed offline replays, in seconds
+    REPLAY_BACKOFF_BASE = 30.0
+    REPLAY_BACKOFF_MAX = 900.0
+    
+    # Server paths for sync operations
+    SYNC_OPERATION_PATHS = {
+        OperationType.SYNC: '/api/sync/{endpoint_id}/sync-to-latest',
+        OperationType.SET_LATEST: '/api/sync/{endpoint_id}/set-as-latest',
+        OperationType.REVERT: '/api/sync/{endpoint_id}/revert'
+    }
+    
     def __init__(
         self,
         server_url: str,
         timeout: float = 30.0,
-        retry_config: Optional[RetryConfig] = None
+        retry_config: Optional[RetryConfig] = None,
+        wire_format: str = "auto",
+        batch_requests: bool = True,
+        batch_window: float = 0.01,
+        offline_journal: Optional[OfflineJournal] = None
     ):
         self.server_url = server_url.rstrip('/')
         self.timeout = ClientTimeout(total=timeout)
         self.retry_config = retry_config or RetryConfig()
         
+        # Content type and encoding for large submissions
+        if wire_format == "json":
+            self._submission_format = (JSON_CONTENT_TYPE, IDENTITY_ENCODING)
+        else:
+            self._submission_format = negotiate_format()
+        
+        # Coalesces concurrent small requests into batch round trips
+        self._batcher: Optional[RequestBatcher] = None
+        if batch_requests:
+            self._batcher = RequestBatcher(self._send_unbatched, window=batch_window)
+        
         # Token manager for secure authentication
         self.token_manager = TokenManager(api_client=self)
         
@@ -90,8 +147,10 @@ class PacmanSyncAPIClient(IAPIClient):
         self._is_offline = False
         self._last_connection_attempt: Optional[datetime] = None
         
-        # Offline operation queue
-        self._offline_operations: List[Dict[str, Any]] = []
+        # Offline operation queue (in memory unless a persistent journal is given)
+        self._offline_journal = offline_journal or OfflineJournal()
+        self._replay_delay = 0.0
+        self._replay_not_before = 0.0
         
         logger.info(f"API client initialized for server: {server_url}")
     
@@ -143,7 +202,10 @@ class PacmanSyncAPIClient(IAPIClient):
         data: Optional[Dict[str, Any]] = None,
         params: Optional[Dict[str, Any]] = None,
         authenticated: bool = True,
-        retry: bool = True
+        retry: bool = True,
+        body: Optional[bytes] = None,
+        body_headers: Optional[Dict[str, str]] = None,
+        coalesce: bool = True
     ) -> Dict[str, Any]:
         """
         Make HTTP request with retry logic and error handling.
@@ -155,6 +217,10 @@ class PacmanSyncAPIClient(IAPIClient):
             params: Query parameters
             authenticated: Whether to include authentication headers
             retry: Whether to retry on failure
+            body: Pre-encoded request body, sent instead of data
+            body_headers: Content-Type/Content-Encoding headers for body
+            coalesce: Whether the call may be combined with concurrent calls
+                into a batch request
             
         Returns:
             Response data as dictionary
@@ -162,29 +228,40 @@ class PacmanSyncAPIClient(IAPIClient):
         Raises:
             APIClientError: On request failure
         """
+        if coalesce and self._is_batchable(authenticated, retry, body):
+            try:
+                return await self._batcher.submit(method, endpoint, data, params)
+            except BatchOperationError as e:
+                raise APIClientError(str(e), status_code=e.status_code) from e
+        
         await self._ensure_session()
         
         url = urljoin(self.server_url, endpoint.lstrip('/'))
         headers = self._get_auth_headers() if authenticated else {}
         
         # Add any additional headers
-        if data is not None:
+        if body is not None:
+            headers.update(body_headers or {})
+        elif data is not None:
             headers['Content-Type'] = 'application/json'
         
         attempt = 0
         last_exception = None
         
         while attempt <= (self.retry_config.max_retries if retry else 0):
+            status_code = None
             try:
                 logger.debug(f"Making {method} request to {url} (attempt {attempt + 1})")
                 
                 async with self._session.request(
                     method=method,
                     url=url,
-                    json=data,
+                    json=data if body is None else None,
+                    data=body,
                     params=params,
                     headers=headers
                 ) as response:
+                    status_code = response.status
                     
                     # Handle different response status codes
                     if response.status == 200:
@@ -248,6 +325,18 @@ class PacmanSyncAPIClient(IAPIClient):
                             user_message=error_info.get('user_message', 'The requested resource was not found')
                         )
                     
+                    elif body is not None and (
+                        response.status == 415 or
+                        (response.status == 422 and media_type(headers.get('Content-Type')) != JSON_CONTENT_TYPE)
+                    ):
+                        # Servers predating the compact formats answer 422
+                        raise UnsupportedMediaTypeError(
+                            f"Server rejected {headers.get('Content-Type')} body ({response.status})",
+                            parse_header_list(response.headers.get('Accept-Post')),
+                            parse_header_list(response.headers.get('Accept-Encoding')),
+                            status_code=response.status
+                        )
+                    
                     elif response.status >= 500:
                         error_data = await self._get_error_response(response)
                         error_info = self._extract_structured_error(error_data)
@@ -299,9 +388,12 @@ class PacmanSyncAPIClient(IAPIClient):
                 await asyncio.sleep(delay)
                 attempt += 1
             
+            except UnsupportedMediaTypeError:
+                raise
+            
             except Exception as e:
                 logger.error(f"Unexpected error in request: {e}")
-                raise APIClientError(f"Request failed: {str(e)}")
+                raise APIClientError(f"Request failed: {str(e)}", status_code=status_code)
         
         # All retries exhausted - create structured network error
         if last_exception:
@@ -339,6 +431,73 @@ class PacmanSyncAPIClient(IAPIClient):
                 user_message="An unexpected error occurred. Please try again."
             )
     
+    def _is_batchable(self, authenticated: bool, retry: bool, body: Optional[bytes]) -> bool:
+        """Check whether a request can go through the batcher."""
+        return (
+            self._batcher is not None and authenticated and retry and body is None
+            and self.token_manager.get_current_token() is not None
+        )
+    
+    async def _send_unbatched(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+        """Send a single request, bypassing the batcher."""
+        return await self._make_request(method=method, endpoint=endpoint, coalesce=False, **kwargs)
+    
+    def _enqueue_request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None,
+                         params: Optional[Dict[str, Any]] = None) -> Awaitable[Dict[str, Any]]:
+        """
+        Start a request immediately, preserving call order within a batch.
+        
+        Unlike awaiting _make_request, the call is queued synchronously, so
+        requests enqueued one after another are sent in that order.
+        """
+        if self._is_batchable(True, True, None):
+            return self._batcher.enqueue(method, endpoint, data, params)
+        return asyncio.ensure_future(
+            self._make_request(method=method, endpoint=endpoint, data=data, params=params)
+        )
+    
+    async def _post_submission(self, endpoint: str, data: Dict[str, Any],
+                               build_columnar: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        POST a large submission in the negotiated wire format.
+        
+        Tries the current compact format first. If the server rejects it,
+        the best format it advertises is tried, then plain JSON; whichever
+        succeeds is remembered for later submissions.
+        
+        Args:
+            endpoint: API endpoint path
+            data: Submission in the plain JSON layout
+            build_columnar: Builds the submission in the columnar layout
+        """
+        content_type, encoding = self._submission_format
+        attempts = []
+        if content_type != JSON_CONTENT_TYPE:
+            attempts.append((content_type, encoding))
+        
+        payload = None
+        while attempts:
+            content_type, encoding = attempts.pop(0)
+            if payload is None:
+                payload = build_columnar()
+            body, body_headers = encode_body(payload, content_type, encoding)
+            try:
+                response = await self._make_request(
+                    method='POST', endpoint=endpoint, body=body, body_headers=body_headers
+                )
+            except UnsupportedMediaTypeError as e:
+                logger.info(f"Server rejected {content_type} ({encoding}) submission, downgrading")
+                fallback = negotiate_format(e.accepted_types, e.accepted_encodings)
+                if fallback[0] != JSON_CONTENT_TYPE and fallback != (content_type, encoding):
+                    attempts.append(fallback)
+                continue
+            self._submission_format = (content_type, encoding)
+            return response
+        
+        response = await self._make_request(method='POST', endpoint=endpoint, data=data)
+        self._submission_format = (JSON_CONTENT_TYPE, IDENTITY_ENCODING)
+        return response
+    
     async def _get_error_response(self, response) -> Dict[str, Any]:
         """Extract error information from response."""
         try:
@@ -467,7 +626,7 @@ class PacmanSyncAPIClient(IAPIClient):
         try:
             if self.is_offline():
                 # Queue operation for later
-                self._offline_operations.append({
+                self._offline_journal.append({
                     'type': 'status_update',
                     'endpoint_id': endpoint_id,
                     'status': status.value,
@@ -490,7 +649,7 @@ class PacmanSyncAPIClient(IAPIClient):
             
             # Queue for retry if it's a network error
             if isinstance(e, NetworkError):
-                self._offline_operations.append({
+                self._offline_journal.append({
                     'type': 'status_update',
                     'endpoint_id': endpoint_id,
                     'status': status.value,
@@ -531,7 +690,7 @@ class PacmanSyncAPIClient(IAPIClient):
             
             if self.is_offline():
                 # Queue operation for later
-                self._offline_operations.append({
+                self._offline_journal.append({
                     'type': 'state_submission',
                     'endpoint_id': endpoint_id,
                     'state_data': state_data,
@@ -540,10 +699,8 @@ class PacmanSyncAPIClient(IAPIClient):
                 logger.info("Queued state submission for offline processing")
                 return f"offline_{datetime.now().timestamp()}"
             
-            response = await self._make_request(
-                method='POST',
-                endpoint=f'/api/states/{endpoint_id}',
-                data=state_data
+            response = await self._post_submission(
+                f'/api/states/{endpoint_id}', state_data, lambda: state_to_columnar(state)
             )
             
             state_id = response.get('state_id', '')
@@ -563,7 +720,7 @@ class PacmanSyncAPIClient(IAPIClient):
                     'architecture': state.architecture
                 }
                 
-                self._offline_operations.append({
+                self._offline_journal.append({
                     'type': 'state_submission',
                     'endpoint_id': endpoint_id,
                     'state_data': state_data,
@@ -595,31 +752,61 @@ class PacmanSyncAPIClient(IAPIClient):
             if not response or 'state' not in response:
                 return None
             
-            state_data = response['state']
-            
-            # Convert API response to SystemState
-            packages = []
-            for pkg_data in state_data.get('packages', []):
-                packages.append(PackageState(
-                    package_name=pkg_data['package_name'],
-                    version=pkg_data['version'],
-                    repository=pkg_data['repository'],
-                    installed_size=pkg_data['installed_size'],
-                    dependencies=pkg_data.get('dependencies', [])
-                ))
-            
-            return SystemState(
-                endpoint_id=state_data['endpoint_id'],
-                timestamp=datetime.fromisoformat(state_data['timestamp']),
-                packages=packages,
-                pacman_version=state_data['pacman_version'],
-                architecture=state_data['architecture']
-            )
+            return self._system_state_from_response(response['state'])
             
         except Exception as e:
             logger.error(f"Failed to get target state: {e}")
             return None
     
+    async def get_state(self, state_id: str) -> Optional[SystemState]:
+        """
+        Get a package state by ID.
+        
+        Args:
+            state_id: ID of the state, e.g. the target_state_id of a pool assignment
+            
+        Returns:
+            System state or None if not available
+        """
+        try:
+            if self.is_offline():
+                logger.warning("Cannot get state while offline")
+                return None
+            
+            response = await self._make_request(
+                method='GET',
+                endpoint=f'/api/states/{state_id}'
+            )
+            
+            if not response:
+                return None
+            
+            return self._system_state_from_response(response)
+            
+        except Exception as e:
+            logger.error(f"Failed to get state {state_id}: {e}")
+            return None
+    
+    def _system_state_from_response(self, state_data: Dict[str, Any]) -> SystemState:
+        """Convert a state from an API response to SystemState."""
+        packages = []
+        for pkg_data in state_data.get('packages', []):
+            packages.append(PackageState(
+                package_name=pkg_data['package_name'],
+                version=pkg_data['version'],
+                repository=pkg_data['repository'],
+                installed_size=pkg_data['installed_size'],
+                dependencies=pkg_data.get('dependencies', [])
+            ))
+        
+        return SystemState(
+            endpoint_id=state_data['endpoint_id'],
+            timestamp=datetime.fromisoformat(state_data['timestamp']),
+            packages=packages,
+            pacman_version=state_data['pacman_version'],
+            architecture=state_data['architecture']
+        )
+    
     async def trigger_sync(self, endpoint_id: str, operation: OperationType) -> str:
         """
         Trigger sync operation.
@@ -635,7 +822,7 @@ class PacmanSyncAPIClient(IAPIClient):
             if self.is_offline():
                 # Queue operation for later
                 operation_id = f"offline_{datetime.now().timestamp()}"
-                self._offline_operations.append({
+                self._offline_journal.append({
                     'type': 'sync_operation',
                     'endpoint_id': endpoint_id,
                     'operation': operation.value,
@@ -646,15 +833,10 @@ class PacmanSyncAPIClient(IAPIClient):
                 return operation_id
             
             # Map operation types to API endpoints
-            endpoint_map = {
-                OperationType.SYNC: f'/api/sync/{endpoint_id}/sync-to-latest',
-                OperationType.SET_LATEST: f'/api/sync/{endpoint_id}/set-as-latest',
-                OperationType.REVERT: f'/api/sync/{endpoint_id}/revert'
-            }
-            
-            api_endpoint = endpoint_map.get(operation)
+            api_endpoint = self.SYNC_OPERATION_PATHS.get(operation)
             if not api_endpoint:
                 raise APIClientError(f"Unknown operation type: {operation}")
+            api_endpoint = api_endpoint.format(endpoint_id=endpoint_id)
             
             response = await self._make_request(
                 method='POST',
@@ -704,7 +886,7 @@ class PacmanSyncAPIClient(IAPIClient):
             
             if self.is_offline():
                 # Queue operation for later
-                self._offline_operations.append({
+                self._offline_journal.append({
                     'type': 'repository_submission',
                     'endpoint_id': endpoint_id,
                     'repositories': repo_data,
@@ -713,10 +895,10 @@ class PacmanSyncAPIClient(IAPIClient):
                 logger.info("Queued repository info submission for offline processing")
                 return True
             
-            await self._make_request(
-                method='POST',
-                endpoint=f'/api/endpoints/{endpoint_id}/repositories',
-                data={'repositories': repo_data}
+            await self._post_submission(
+                f'/api/endpoints/{endpoint_id}/repositories',
+                {'repositories': repo_data},
+                lambda: repositories_to_columnar(repositories)
             )
             
             logger.info("Repository information submitted successfully")
@@ -737,7 +919,7 @@ class PacmanSyncAPIClient(IAPIClient):
                         'packages': packages_data
                     })
                 
-                self._offline_operations.append({
+                self._offline_journal.append({
                     'type': 'repository_submission',
                     'endpoint_id': endpoint_id,
                     'repositories': repo_data,
@@ -774,7 +956,7 @@ class PacmanSyncAPIClient(IAPIClient):
             
             # Queue for retry if it's a network error
             if isinstance(e, NetworkError):
-                self._offline_operations.append({
+                self._offline_journal.append({
                     'type': 'pool_assignment',
                     'endpoint_id': endpoint_id,
                     'pool_id': pool_id,
@@ -850,7 +1032,7 @@ class PacmanSyncAPIClient(IAPIClient):
             
             # Queue for retry if it's a network error
             if isinstance(e, NetworkError):
-                self._offline_operations.append({
+                self._offline_journal.append({
                     'type': 'repository_info_submission',
                     'endpoint_id': endpoint_id,
                     'repo_info': repo_info,
@@ -885,73 +1067,177 @@ class PacmanSyncAPIClient(IAPIClient):
             logger.error(f"Failed to get operation status: {e}")
             return None
     
+    @property
+    def _offline_operations(self) -> List[Dict[str, Any]]:
+        """Queued offline operations, oldest first."""
+        return [operation for _, operation in self._offline_journal.pending()]
+    
     async def process_offline_operations(self) -> int:
         """
         Process queued offline operations when connection is restored.
         
+        Operations are replayed in the order they were queued and sent
+        together, so a backlog costs one batch round trip rather than one
+        request per operation. After a failed replay further attempts back
+        off exponentially.
+        
         Returns:
             Number of operations processed successfully
         """
-        if self.is_offline() or not self._offline_operations:
+        if self.is_offline() or time.monotonic() < self._replay_not_before:
             return 0
         
-        processed = 0
-        failed_operations = []
+        entries = self._offline_journal.pending()
+        if not entries:
+            return 0
         
-        logger.info(f"Processing {len(self._offline_operations)} offline operations")
+        logger.info(f"Processing {len(entries)} offline operations")
         
-        for operation in self._offline_operations:
+        # Enqueue everything before awaiting so the replay keeps its order
+        replayed = []
+        dropped = []
+        for seq, operation in entries:
             try:
-                op_type = operation['type']
-                
-                if op_type == 'status_update':
-                    status = SyncStatus(operation['status'])
-                    success = await self.report_status(operation['endpoint_id'], status)
-                    if success:
-                        processed += 1
-                    else:
-                        failed_operations.append(operation)
-                
-                elif op_type == 'repository_submission':
-                    # Reconstruct Repository objects
-                    repositories = []
-                    for repo_data in operation['repositories']:
-                        packages = []
-                        for pkg_data in repo_data['packages']:
-                            packages.append(RepositoryPackage(**pkg_data))
-                        
-                        repositories.append(Repository(
-                            id="",  # Will be generated
-                            endpoint_id=operation['endpoint_id'],
-                            repo_name=repo_data['repo_name'],
-                            repo_url=repo_data['repo_url'],
-                            packages=packages
-                        ))
-                    
-                    success = await self.submit_repository_info(operation['endpoint_id'], repositories)
-                    if success:
-                        processed += 1
-                    else:
-                        failed_operations.append(operation)
-                
-                elif op_type == 'sync_operation':
-                    # Re-trigger sync operation
-                    operation_type = OperationType(operation['operation'])
-                    await self.trigger_sync(operation['endpoint_id'], operation_type)
-                    processed += 1
-                
-                # Add other operation types as needed
-                
+                request = self._offline_request(operation)
             except Exception as e:
-                logger.error(f"Failed to process offline operation: {e}")
-                failed_operations.append(operation)
+                logger.error(f"Dropping malformed offline operation: {e}")
+                request = None
+            else:
+                if request is None:
+                    logger.warning(f"Dropping unknown offline operation type: {operation.get('type')}")
+            if request is None:
+                dropped.append(seq)
+                continue
+            replayed.append((seq, operation, self._enqueue_request(*request)))
+        
+        results = await asyncio.gather(*(future for _, _, future in replayed), return_exceptions=True)
         
-        # Update offline operations list with failed operations
-        self._offline_operations = failed_operations
+        processed = 0
+        failed = 0
+        for (seq, operation, _), result in zip(replayed, results):
+            if not isinstance(result, Exception):
+                processed += 1
+                dropped.append(seq)
+            elif self._is_permanent_failure(result):
+                logger.warning(f"Dropping offline operation {operation['type']} rejected by server: {result}")
+                dropped.append(seq)
+            else:
+                logger.error(f"Failed to process offline operation {operation['type']}: {result}")
+                failed += 1
         
-        logger.info(f"Processed {processed} offline operations, {len(failed_operations)} failed")
+        # Failed operations stay in the journal for the next attempt
+        self._offline_journal.remove(dropped)
+        
+        if failed:
+            self._replay_delay = min(
+                self.REPLAY_BACKOFF_MAX, max(self.REPLAY_BACKOFF_BASE, self._replay_delay * 2)
+            )
+            self._replay_not_before = time.monotonic() + self._replay_delay
+        else:
+            self._replay_delay = 0.0
+            self._replay_not_before = 0.0
+        
+        logger.info(f"Processed {processed} offline operations, {failed} failed")
         return processed
     
+    @staticmethod
+    def _is_permanent_failure(error: Exception) -> bool:
+        """Check whether a replay failure will not go away by retrying."""
+        status_code = getattr(error, 'status_code', None)
+        return status_code is not None and 400 <= status_code < 500 and status_code not in (401, 408, 429)
+    
+    def _offline_request(self, operation: Dict[str, Any]) -> Optional[Tuple]:
+        """
+        Build the request replaying a queued offline operation.
+        
+        Returns:
+            Tuple of (method, endpoint, data, params), or None for unknown types
+        """
+        op_type = operation['type']
+        endpoint_id = operation['endpoint_id']
+        
+        if op_type == 'status_update':
+            status = SyncStatus(operation['status'])
+            return 'PUT', f'/api/endpoints/{endpoint_id}/status', {'status': status.value}, None
+        
+        if op_type == 'state_submission':
+            return 'POST', f'/api/states/{endpoint_id}', operation['state_data'], None
+        
+        if op_type == 'repository_submission':
+            return ('POST', f'/api/endpoints/{endpoint_id}/repositories',
+                    {'repositories': operation['repositories']}, None)
+        
+        if op_type == 'repository_info_submission':
+            repositories = {
+                repo_name: {
+                    "name": info["name"],
+                    "mirrors": info["mirrors"],
+                    "primary_url": info["primary_url"],
+                    "architecture": info["architecture"],
+                    "endpoint_id": info["endpoint_id"]
+                }
+                for repo_name, info in operation['repo_info'].items()
+            }
+            return ('POST', f'/api/endpoints/{endpoint_id}/repository-info',
+                    {'repositories': repositories}, None)
+        
+        if op_type == 'sync_operation':
+            path = self.SYNC_OPERATION_PATHS[OperationType(operation['operation'])]
+            return 'POST', path.format(endpoint_id=endpoint_id), {}, None
+        
+        if op_type == 'pool_assignment':
+            return 'PUT', f'/api/endpoints/{endpoint_id}/pool', None, {'pool_id': operation['pool_id']}
+        
+        return None
+    
+    async def watch_server_events(
+        self,
+        endpoint_id: str,
+        on_event: Callable[[Dict[str, Any]], None],
+        reconnect_delay: float = 5.0,
+        max_reconnect_delay: float = 300.0
+    ) -> None:
+        """
+        Receive server-side change notifications over the sync WebSocket.
+        
+        Runs until cancelled, reconnecting with exponential backoff when the
+        connection drops. Every event other than connection bookkeeping is
+        passed to on_event (e.g. status_changed, target_state_changed).
+        
+        Args:
+            endpoint_id: ID of the endpoint
+            on_event: Called with each decoded event
+            reconnect_delay: Initial delay before reconnecting, in seconds
+            max_reconnect_delay: Upper bound for the reconnect delay
+        """
+        url = self.server_url.replace('http://', 'ws://', 1).replace('https://', 'wss://', 1)
+        url = f"{url}/api/sync/{endpoint_id}/status"
+        delay = reconnect_delay
+        
+        while True:
+            try:
+                await self._ensure_session()
+                async with self._session.ws_connect(url, headers=self._get_auth_headers(),
+                                                    heartbeat=60.0) as websocket:
+                    logger.info("Connected to server event stream")
+                    delay = reconnect_delay
+                    async for message in websocket:
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        try:
+                            event = json.loads(message.data)
+                        except ValueError:
+                            logger.warning("Ignoring malformed server event")
+                            continue
+                        if event.get('type') not in ('connected', 'pong'):
+                            on_event(event)
+                logger.info("Server event stream closed")
+            except (ClientError, OSError, asyncio.TimeoutError) as e:
+                logger.debug(f"Server event stream unavailable: {e}")
+            
+            await asyncio.sleep(delay)
+            delay = min(max_reconnect_delay, delay * 2)
+    
     def get_endpoint_info(self) -> Optional[Dict[str, str]]:
         """Get current endpoint information."""
         endpoint_id = self.token_manager.get_current_endpoint_id()
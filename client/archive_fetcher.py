@@ -0,0 +1,259 @@
+"""
+Archive mirror fetcher for the Pacman Sync Utility Client.
+
+Downgrades and reverts need package versions that the regular repositories
+no longer carry. When such a version is not in the local pacman cache it
+can be fetched from a mirror laid out like the Arch Linux Archive:
+
+    {mirror}/packages/{first letter}/{name}/{name}-{version}-{arch}.pkg.tar.{zst,xz}
+
+with a detached signature next to each archive. The mirror may be an
+HTTP(S) URL, a file:// URL or a local/NFS path, so a fleet can revert from
+a nearby store. Archives are downloaded concurrently into the pacman cache
+with resume support and signature verification.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Compression suffixes tried for each archive, newest first
+ARCHIVE_EXTENSIONS = ('.pkg.tar.zst', '.pkg.tar.xz')
+
+# Copy buffer size
+CHUNK_SIZE = 1024 * 1024
+
+
+class ArchiveFetchError(Exception):
+    """Raised when an archive cannot be fetched or fails verification."""
+    pass
+
+
+class ArchiveFetcher(ABC):
+    """
+    Interface for sources of package versions missing from the cache.
+
+    Subclasses implement fetch(); PackageSynchronizer calls it with all
+    missing versions of a sync or revert at once.
+    """
+
+    @abstractmethod
+    def fetch(self, targets: Iterable[Tuple[str, str]], cache_dir: str) -> Dict[str, str]:
+        """
+        Fetch package versions into the cache directory.
+
+        Args:
+            targets: (package name, version) pairs
+            cache_dir: Pacman cache directory to store archives in
+
+        Returns:
+            Dictionary mapping package names to archive paths for the
+            versions that were fetched; missing names could not be fetched
+        """
+        pass
+
+
+class ArchiveMirrorFetcher(ArchiveFetcher):
+    """Fetch package versions from an Arch Linux Archive-style mirror."""
+
+    def __init__(self, mirror: str, architecture: str, max_workers: int = 4,
+                 timeout: float = 60.0, verify_signatures: bool = True):
+        """
+        Initialize the fetcher.
+
+        Args:
+            mirror: Mirror root (URL or local path) containing packages/
+            architecture: Machine architecture; "any" archives are also tried
+            max_workers: Maximum concurrent downloads
+            timeout: Socket timeout per request in seconds
+            verify_signatures: Require a valid detached signature, checked
+                with pacman-key, before an archive is placed in the cache
+        """
+        parsed = urllib.parse.urlparse(mirror)
+        if parsed.scheme in ('http', 'https'):
+            self.base_url: Optional[str] = mirror.rstrip('/')
+            self.base_path: Optional[str] = None
+        else:
+            self.base_url = None
+            self.base_path = urllib.request.url2pathname(parsed.path) if parsed.scheme == 'file' else mirror
+
+        self.mirror = mirror
+        self.architecture = architecture
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.verify_signatures = verify_signatures
+
+    def candidates(self, package_name: str, version: str) -> List[str]:
+        """Relative paths where an archive of the version may be stored."""
+        directory = f"packages/{package_name[0]}/{package_name}"
+        return [
+            f"{directory}/{package_name}-{version}-{arch}{extension}"
+            for arch in (self.architecture, 'any')
+            for extension in ARCHIVE_EXTENSIONS
+        ]
+
+    def fetch(self, targets: Iterable[Tuple[str, str]], cache_dir: str) -> Dict[str, str]:
+        targets = list(targets)
+        if not targets:
+            return {}
+
+        logger.info(f"Fetching {len(targets)} package versions from archive mirror {self.mirror}")
+        fetched = {}
+        workers = max(1, min(self.max_workers, len(targets)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda target: self._fetch_one(*target, cache_dir), targets)
+            for (package_name, version), path in zip(targets, results):
+                if path:
+                    fetched[package_name] = path
+
+        logger.info(f"Fetched {len(fetched)} of {len(targets)} package versions from archive mirror")
+        return fetched
+
+    def _fetch_one(self, package_name: str, version: str, cache_dir: str) -> Optional[str]:
+        """Fetch one version, trying each candidate location in turn."""
+        for relative in self.candidates(package_name, version):
+            dest = os.path.join(cache_dir, os.path.basename(relative))
+            try:
+                if self._fetch_archive(relative, dest):
+                    return dest
+            except Exception as e:
+                logger.warning(f"Failed to fetch {package_name}={version} from archive mirror: {e}")
+                return None
+
+        logger.warning(f"{package_name}={version} not found on archive mirror {self.mirror}")
+        return None
+
+    def _fetch_archive(self, relative: str, dest: str) -> bool:
+        """
+        Place a verified archive and its signature at dest.
+
+        Both are downloaded next to dest under temporary names and renamed
+        into the cache only once verified. An archive already in the cache
+        is verified as well, but never removed since the fetcher did not
+        put it there.
+
+        Returns:
+            True if dest holds a verified archive, False if the mirror does not have it
+
+        Raises:
+            ArchiveFetchError: On transfer or verification errors
+        """
+        signature = dest + '.sig'
+        partial = dest + '.part'
+        partial_signature = signature + '.part'
+        cached = os.path.exists(dest)
+
+        if not cached and not self._download(relative, partial):
+            return False
+
+        try:
+            signature_file = None
+            if self.verify_signatures:
+                if cached and os.path.exists(signature):
+                    signature_file = signature
+                elif self._download(relative + '.sig', partial_signature):
+                    signature_file = partial_signature
+                else:
+                    raise ArchiveFetchError("signature not found on mirror")
+
+            self._verify(dest if cached else partial, signature_file)
+
+            if signature_file == partial_signature:
+                os.replace(partial_signature, signature)
+            if not cached:
+                os.replace(partial, dest)
+            return True
+        except Exception:
+            # The download was complete, so there is nothing worth resuming
+            if not cached:
+                self._remove(partial)
+            raise
+        finally:
+            self._remove(partial_signature)
+
+    def _download(self, relative: str, target: str) -> bool:
+        """
+        Copy one file from the mirror to target, resuming a partial target.
+
+        Returns:
+            True if the file was stored, False if the mirror does not have it
+
+        Raises:
+            ArchiveFetchError: On transfer errors; a partial target is kept
+        """
+        if self.base_path is not None:
+            source = os.path.join(self.base_path, *relative.split('/'))
+            if not os.path.isfile(source):
+                return False
+            shutil.copyfile(source, target)
+            return True
+
+        # Resume an earlier interrupted download if there is one
+        offset = os.path.getsize(target) if os.path.exists(target) else 0
+        request = urllib.request.Request(f"{self.base_url}/{urllib.parse.quote(relative)}")
+        if offset:
+            request.add_header('Range', f'bytes={offset}-')
+
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return False
+            if e.code == 416 and offset:
+                # The partial file is already complete
+                return True
+            raise ArchiveFetchError(f"HTTP {e.code} for {relative}") from e
+        except urllib.error.URLError as e:
+            raise ArchiveFetchError(f"cannot reach archive mirror: {e.reason}") from e
+
+        with response:
+            resumed = offset and response.status == 206
+            expected = response.headers.get('Content-Length')
+            with open(target, 'ab' if resumed else 'wb') as output:
+                shutil.copyfileobj(response, output, CHUNK_SIZE)
+
+        if expected is not None:
+            size = os.path.getsize(target) - (offset if resumed else 0)
+            if size != int(expected):
+                # Keep the partial file; the next attempt resumes it
+                raise ArchiveFetchError(f"incomplete download of {relative} ({size} of {expected} bytes)")
+
+        return True
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _verify(self, archive: str, signature: Optional[str]):
+        """
+        Check an archive before it is used.
+
+        Archive mirrors publish no checksums; integrity and origin are
+        established by the detached signature, checked against the pacman
+        keyring.
+        """
+        if os.path.getsize(archive) == 0:
+            raise ArchiveFetchError(f"{os.path.basename(archive)} is empty")
+
+        if signature is None:
+            return
+
+        try:
+            subprocess.run(['pacman-key', '--verify', signature, archive],
+                           capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise ArchiveFetchError(
+                f"signature verification failed for {os.path.basename(archive)}: {e.stderr.strip()}"
+            ) from e
@@ -9,7 +9,6 @@ import logging
 import asyncio
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Callable, List
-from jose import jwt, JWTError
 
 from client.auth.token_storage import SecureTokenStorage, TokenStorageError
 
@@ -97,6 +96,9 @@ class TokenManager:
         Returns:
             Expiration datetime or None if not available
         """
+        # Imported here: python-jose is slow to import and rarely needed
+        from jose import jwt, JWTError
+        
         try:
             # Decode without verification to get expiration
             payload = jwt.get_unverified_claims(token)
@@ -12,9 +12,6 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 import base64
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 logger = logging.getLogger(__name__)
 
@@ -30,17 +27,32 @@ class SecureTokenStorage:
     
     Uses system keyring when available, falls back to encrypted file storage.
     Provides automatic token refresh and expiration handling.
+    
+    The keyring probe and the cryptography imports are deferred until a
+    token is actually stored or read, so constructing the storage is cheap.
     """
     
     def __init__(self, service_name: str = "pacman-sync-client"):
         self.service_name = service_name
-        self.keyring_available = self._check_keyring_availability()
+        self._keyring_available: Optional[bool] = None
         self.storage_path = self._get_storage_path()
         
         # Encryption key for file storage
         self._encryption_key: Optional[bytes] = None
         
-        logger.info(f"Token storage initialized (keyring: {self.keyring_available})")
+        logger.info("Token storage initialized")
+    
+    @property
+    def keyring_available(self) -> bool:
+        """Whether the system keyring works; probed on first use."""
+        if self._keyring_available is None:
+            self._keyring_available = self._check_keyring_availability()
+            logger.info(f"Token storage keyring available: {self._keyring_available}")
+        return self._keyring_available
+    
+    @keyring_available.setter
+    def keyring_available(self, available: bool) -> None:
+        self._keyring_available = available
     
     def _check_keyring_availability(self) -> bool:
         """Check if system keyring is available."""
@@ -84,6 +96,9 @@ class SecureTokenStorage:
             except Exception as e:
                 logger.warning(f"Failed to get encryption key from keyring: {e}")
         
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        
         # Generate new key
         password = os.urandom(32)  # Random password
         salt = os.urandom(16)
@@ -110,12 +125,16 @@ class SecureTokenStorage:
     
     def _encrypt_data(self, data: str) -> bytes:
         """Encrypt data for file storage."""
+        from cryptography.fernet import Fernet
+        
         key = self._get_encryption_key()
         fernet = Fernet(key)
         return fernet.encrypt(data.encode())
     
     def _decrypt_data(self, encrypted_data: bytes) -> str:
         """Decrypt data from file storage."""
+        from cryptography.fernet import Fernet
+        
         key = self._get_encryption_key()
         fernet = Fernet(key)
         return fernet.decrypt(encrypted_data).decode()
@@ -0,0 +1,197 @@
+"""
+Change Watching for Pacman Sync Utility Client.
+
+Lets the client wait for the things it reacts to instead of polling on a
+fixed interval: the pacman local database, the stamp file touched by the
+pacman PostTransaction hook, and the status file written by the client for
+WayBar. inotify is used where available, with a modification-time polling
+fallback elsewhere.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Local package database; entries are added, removed or renamed on every transaction
+PACMAN_LOCAL_DB = Path('/var/lib/pacman/local')
+
+# Touched by the pacman PostTransaction hook (aur/pacman-sync-client.hook)
+TRANSACTION_STAMP = Path('/run/pacman-sync/transaction')
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """Load the libc inotify functions, or None where unavailable."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class PathWatcher:
+    """
+    Waits for changes to a set of files and directories.
+
+    A watched directory reports changes to any of its entries; a watched
+    file reports writes and atomic replacement (the file's directory is
+    watched and events are filtered by name). Paths that do not exist yet
+    are picked up once their directory exists.
+    """
+
+    def __init__(self, paths: Iterable[Path], poll_interval: float = 1.0, use_inotify: bool = True):
+        """
+        Initialize the watcher.
+
+        Args:
+            paths: Files or directories to watch
+            poll_interval: Polling period when inotify is not available
+            use_inotify: Whether to try inotify before falling back to polling
+        """
+        self.paths = [Path(path) for path in paths]
+        self.poll_interval = poll_interval
+
+        self._fd: Optional[int] = None
+        self._libc = _load_inotify() if use_inotify else None
+        # wd -> (watched directory, names of interest or None for any entry)
+        self._watches: Dict[int, Tuple[Path, Optional[Set[str]]]] = {}
+        self._snapshot = self._stat_all()
+
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                self._add_watches()
+            else:
+                logger.debug(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling instead")
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Whether changes are delivered by inotify rather than polling."""
+        return self._fd is not None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a watched path changes.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if a change was seen, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self._fd is not None:
+                readable, _, _ = select.select([self._fd], [], [], remaining)
+                if readable and self._read_events():
+                    return True
+            else:
+                time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+                snapshot = self._stat_all()
+                if snapshot != self._snapshot:
+                    self._snapshot = snapshot
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self) -> None:
+        """Release the inotify descriptor."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._watches.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _add_watches(self) -> None:
+        """Watch every path (or its directory) that exists right now."""
+        wanted: Dict[Path, Optional[Set[str]]] = {}
+        for path in self.paths:
+            if path.is_dir():
+                wanted[path] = None
+            elif path.parent.is_dir():
+                names = wanted.setdefault(path.parent, set())
+                if names is not None:
+                    names.add(path.name)
+
+        watched = {directory: wd for wd, (directory, _) in self._watches.items()}
+        for directory, names in wanted.items():
+            wd = watched.get(directory)
+            if wd is None:
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    logger.debug(f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+                    continue
+            self._watches[wd] = (directory, names)
+
+    def _read_events(self) -> bool:
+        """Drain pending inotify events; True if any concerns a watched path."""
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        changed = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length]
+            offset += _EVENT_HEADER.size + length
+
+            watch = self._watches.get(wd)
+            if watch is None:
+                continue
+            names = watch[1]
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                # The directory itself went away; re-add watches on the next change
+                del self._watches[wd]
+                changed = True
+            elif names is None or os.fsdecode(name.rstrip(b'\0')) in names:
+                changed = True
+
+        # Pick up paths whose directories appeared since the last call
+        self._add_watches()
+        return changed
+
+    def _stat_all(self) -> Dict[Path, Optional[Tuple[int, int]]]:
+        """Modification time and size of every watched path."""
+        snapshot = {}
+        for path in self.paths:
+            try:
+                stat = path.stat()
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                snapshot[path] = None
+        return snapshot
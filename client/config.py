@@ -86,6 +86,10 @@ timeout = 30
 # Retry attempts for failed requests
 retry_attempts = 3
 
+# Wire format for state/repository submissions: auto (compact when
+# supported by the server) or json
+wire_format = auto
+
 [client]
 # Endpoint name (defaults to hostname if not specified)
 endpoint_name = {default_endpoint_name}
@@ -96,6 +100,9 @@ auto_sync = false
 # Status update interval in seconds
 update_interval = 300
 
+# Refresh interval in seconds while pacman database changes are watched
+safety_interval = 3600
+
 [ui]
 # Show desktop notifications
 show_notifications = true
@@ -197,14 +204,17 @@ log_level = INFO
                 'api_key': None,
                 'timeout': 30.0,
                 'retry_attempts': 3,
-                'retry_delay': 1.0
+                'retry_delay': 1.0,
+                'wire_format': 'auto'
             },
             'client': {
                 'endpoint_name': self._get_default_endpoint_name(),
                 'pool_id': None,
                 'auto_sync': False,
                 'update_interval': 300,  # 5 minutes
-                'offline_queue_size': 100
+                'safety_interval': 3600,  # 1 hour, when change notification works
+                'offline_queue_size': 100,
+                'offline_journal': None
             },
             'ui': {
                 'show_notifications': True,
@@ -220,7 +230,8 @@ log_level = INFO
             'pacman': {
                 'command': 'pacman',
                 'sudo_command': 'sudo',
-                'config_file': '/etc/pacman.conf'
+                'config_file': '/etc/pacman.conf',
+                'archive_mirror': None
             }
         }
         
@@ -417,6 +428,22 @@ log_level = INFO
         """Get server request timeout."""
         return self.get_config('server.timeout', 30.0)
     
+    def get_wire_format(self) -> str:
+        """Get the submission wire format ("auto" or "json")."""
+        return self.get_config('server.wire_format', 'auto')
+    
+    def get_safety_interval(self) -> int:
+        """Get the status refresh interval used while changes are watched."""
+        return self.get_config('client.safety_interval', 3600)
+    
+    def get_offline_queue_size(self) -> int:
+        """Get the maximum number of queued offline operations."""
+        return self.get_config('client.offline_queue_size', 100)
+    
+    def get_offline_journal_path(self) -> Optional[str]:
+        """Get the offline journal path (None for the XDG state directory)."""
+        return self.get_config('client.offline_journal')
+    
     def get_debug_mode(self) -> bool:
         """Get debug mode setting."""
         return self.get_config('advanced.debug_mode', False)
@@ -491,4 +518,8 @@ log_level = INFO
     
     def get_pacman_config_file(self) -> str:
         """Get pacman configuration file path."""
-        return self.get_config('pacman.config_file', '/etc/pacman.conf')
\ No newline at end of file
+        return self.get_config('pacman.config_file', '/etc/pacman.conf')
+    
+    def get_archive_mirror(self) -> Optional[str]:
+        """Get the local archive mirror for old package versions (the pool's mirror takes precedence)."""
+        return self.get_config('pacman.archive_mirror')
\ No newline at end of file
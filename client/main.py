@@ -135,6 +135,13 @@ def run_cli_mode(args):
         logger.info("Running in CLI mode")
     
     try:
+        # Ask a running client first; this avoids loading the status file here
+        if args.status:
+            from client.status_cli import print_daemon_status
+            result = print_daemon_status(args.json, args.verbose, args.quiet)
+            if result is not None:
+                return result
+        
         # Import status persistence first (doesn't require heavy dependencies)
         from client.status_persistence import StatusPersistenceManager
         
@@ -264,11 +271,17 @@ def run_cli_mode(args):
             result[0] = 3  # General error
             loop.quit()
         
+        def on_operation_progress(stage: str, completed: int, total: int):
+            """Report finished package operation stages."""
+            if args.verbose and total and completed == total:
+                print(f"  {stage}: {completed}/{total}")
+        
         # Connect signals
         sync_manager.operation_completed.connect(on_operation_completed)
         sync_manager.authentication_changed.connect(on_authentication_changed)
         sync_manager.status_changed.connect(on_status_changed)
         sync_manager.error_occurred.connect(on_error_occurred)
+        sync_manager.operation_progress.connect(on_operation_progress)
         
         # Set timeout for CLI operations
         timeout_timer = QTimer()
@@ -337,20 +350,6 @@ def handle_status_command(args, status_manager: 'StatusPersistenceManager') -> i
             print(json.dumps(status_json))
             return 0
         
-        # Import SyncStatus enum - define locally if import fails
-        try:
-            from client.qt.application import SyncStatus
-        except ImportError:
-            # Define SyncStatus locally if Qt is not available
-            from enum import Enum
-            class SyncStatus(Enum):
-                IN_SYNC = "in_sync"
-                AHEAD = "ahead"
-                BEHIND = "behind"
-                OFFLINE = "offline"
-                SYNCING = "syncing"
-                ERROR = "error"
-        
         # Load persisted status
         status_info = status_manager.load_status()
         
@@ -363,33 +362,11 @@ def handle_status_command(args, status_manager: 'StatusPersistenceManager') -> i
         is_fresh = status_manager.is_status_fresh(max_age_seconds=300)  # 5 minutes
         
         # Human-readable format
-        summary = status_manager.get_status_summary()
+        from client.status_cli import format_status_lines
         
-        if args.verbose:
-            # Detailed status output
-            print(f"Status: {summary['status'].upper()}")
-            print(f"Endpoint: {summary['endpoint_name']}")
-            print(f"Server: {summary['server_url']}")
-            print(f"Authenticated: {'Yes' if summary['is_authenticated'] else 'No'}")
-            print(f"Last Updated: {summary['last_updated']}")
-            
-            if summary['last_operation']:
-                print(f"Last Operation: {summary['last_operation']}")
-            if summary['operation_result']:
-                print(f"Result: {summary['operation_result']}")
-            if summary['packages_count']:
-                print(f"Packages: {summary['packages_count']}")
-            if summary['last_sync_time']:
-                print(f"Last Sync: {summary['last_sync_time']}")
-            
-            if not is_fresh:
-                print("⚠ Status information may be outdated")
-        else:
-            # Simple status output
-            status_text = summary['status'].upper()
-            if not is_fresh:
-                status_text += " (stale)"
-            print(f"Status: {status_text}")
+        summary = status_manager.get_status_summary()
+        for line in format_status_lines(summary, is_fresh, args.verbose):
+            print(line)
         
         return 0
         
@@ -410,10 +387,18 @@ def run_gui_mode(args):
         from client.config import ClientConfiguration
         from client.sync_manager import SyncManager
         from client.status_persistence import StatusPersistenceManager
+        from client.status_socket import StatusSocketServer, build_status_handlers
+        from client.waybar_integration import WayBarIntegration
         
         # Initialize status persistence
         status_manager = StatusPersistenceManager()
         
+        # Answer WayBar and --status queries from this process
+        status_server = StatusSocketServer(
+            build_status_handlers(status_manager, WayBarIntegration()),
+            status_file=status_manager.status_file
+        )
+        
         # Load configuration
         config = ClientConfiguration(args.config)
         
@@ -545,6 +530,7 @@ def run_gui_mode(args):
         
         # Start sync manager
         sync_manager.start()
+        status_server.start()
         
         logger.info("Qt application initialized successfully")
         if not args.quiet:
@@ -557,6 +543,7 @@ def run_gui_mode(args):
             result = app.exec()
         finally:
             # Cleanup sync manager
+            status_server.stop()
             sync_manager.stop()
         
         return result
@@ -0,0 +1,267 @@
+"""
+Offline Operation Journal for Pacman Sync Utility Client.
+
+Operations that could not reach the server are appended to a JSON-lines
+journal in the XDG state directory so they survive restarts. Entries that
+only matter in their latest form (status, state and repository snapshots,
+pool assignments) supersede earlier entries for the same endpoint, and the
+file is rewritten without dead records once they outnumber the live ones.
+"""
+
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILENAME = "offline-journal.jsonl"
+
+# Operation types where only the latest entry per endpoint is replayed
+COALESCED_TYPES = frozenset({
+    'status_update',
+    'state_submission',
+    'repository_submission',
+    'repository_info_submission',
+    'pool_assignment',
+})
+
+# Dead records tolerated before the file is compacted
+COMPACT_SLACK = 64
+
+
+def get_state_directory() -> Path:
+    """Get the client's XDG state directory."""
+    xdg_state = os.environ.get('XDG_STATE_HOME')
+    if xdg_state:
+        return Path(xdg_state) / 'pacman-sync'
+    return Path.home() / '.local' / 'state' / 'pacman-sync'
+
+
+def coalesce_key(operation: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+    """Key under which a newer operation supersedes an older one, if any."""
+    op_type = operation.get('type')
+    if op_type in COALESCED_TYPES:
+        return op_type, operation.get('endpoint_id')
+    return None
+
+
+class OfflineJournal:
+    """
+    Append-only journal of operations waiting to be sent to the server.
+
+    Records are {"seq": n, "op": {...}} for queued operations and
+    {"done": [n, ...]} for operations that were sent or dropped. The file is
+    the source of truth and is re-read incrementally before each access, so
+    the GUI and CLI can share one journal; writers serialise on a lock file.
+    Without a path the journal is kept in memory only.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = 100):
+        """
+        Initialize the journal.
+
+        Args:
+            path: Journal file, or None for an in-memory journal
+            max_entries: Maximum number of queued operations; the oldest are
+                dropped beyond this
+        """
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._keys: Dict[Tuple[str, Any], int] = {}
+        self._next_seq = 1
+        self._records = 0
+
+        # Position of the last read, to pick up records appended by others
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._terminate_partial = False
+
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._lock_path = self.path.with_suffix('.lock')
+            with self._locked():
+                self._refresh()
+            if self._entries:
+                logger.info(f"Loaded {len(self._entries)} queued offline operations from {self.path}")
+
+    @classmethod
+    def default(cls, max_entries: int = 100) -> 'OfflineJournal':
+        """Create the journal at its default location in the state directory."""
+        return cls(get_state_directory() / JOURNAL_FILENAME, max_entries=max_entries)
+
+    def __len__(self) -> int:
+        with self._locked():
+            self._refresh()
+            return len(self._entries)
+
+    def append(self, operation: Dict[str, Any]) -> int:
+        """
+        Queue an operation, superseding an older entry with the same key.
+
+        Returns:
+            Sequence number of the new entry
+        """
+        with self._locked():
+            self._refresh()
+            seq = self._next_seq
+            records = [{'seq': seq, 'op': operation}]
+            self._apply(records[0])
+
+            overflow = sorted(self._entries)[:max(0, len(self._entries) - self.max_entries)]
+            if overflow:
+                logger.warning(f"Offline journal full, dropping {len(overflow)} oldest operations")
+                records.append({'done': overflow})
+                self._apply(records[-1])
+
+            self._write(records)
+            return seq
+
+    def pending(self) -> List[Tuple[int, Dict[str, Any]]]:
+        """Get queued operations as (seq, operation) pairs, oldest first."""
+        with self._locked():
+            self._refresh()
+            return sorted(self._entries.items())
+
+    def remove(self, seqs: Iterable[int]) -> None:
+        """Mark operations as sent (or dropped)."""
+        with self._locked():
+            self._refresh()
+            seqs = [seq for seq in seqs if seq in self._entries]
+            if not seqs:
+                return
+            record = {'done': seqs}
+            self._apply(record)
+            self._write([record])
+
+    def clear(self) -> None:
+        """Drop all queued operations."""
+        self.remove([seq for seq, _ in self.pending()])
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        """Apply a record to the in-memory view."""
+        self._records += 1
+        if 'done' in record:
+            for seq in record['done']:
+                operation = self._entries.pop(seq, None)
+                key = coalesce_key(operation) if operation else None
+                if key and self._keys.get(key) == seq:
+                    del self._keys[key]
+            return
+
+        seq, operation = record['seq'], record['op']
+        key = coalesce_key(operation)
+        if key:
+            superseded = self._keys.get(key)
+            if superseded is not None:
+                self._entries.pop(superseded, None)
+            self._keys[key] = seq
+        self._entries[seq] = operation
+        self._next_seq = max(self._next_seq, seq + 1)
+
+    def _refresh(self) -> None:
+        """Read records written since the last access."""
+        if not self.path:
+            return
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._reset()
+            return
+
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # Compacted (or replaced) by another process; start over
+            self._reset()
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+
+        # Writers hold the lock, so a trailing partial line is left over from
+        # a crash; skip it and terminate it before the next append
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            logger.warning("Discarding truncated offline journal record")
+            self._terminate_partial = True
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Skipping corrupt offline journal record: {e}")
+        self._offset += len(data)
+
+    def _reset(self) -> None:
+        self._entries.clear()
+        self._keys.clear()
+        self._records = 0
+        self._offset = 0
+        self._inode = None
+        self._terminate_partial = False
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        """Persist records, compacting the file when mostly dead."""
+        if not self.path:
+            return
+        if self._records > 2 * len(self._entries) + COMPACT_SLACK:
+            self._compact()
+            return
+
+        data = b''.join(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+                        for record in records)
+        if self._terminate_partial:
+            data = b'\n' + data
+        try:
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                self._inode = os.fstat(f.fileno()).st_ino
+            self._offset += len(data)
+            self._terminate_partial = False
+        except OSError as e:
+            logger.error(f"Failed to write offline journal: {e}")
+
+    def _compact(self) -> None:
+        """Rewrite the journal with only the live entries."""
+        temp_path = self.path.with_suffix('.tmp')
+        records = [{'seq': seq, 'op': operation} for seq, operation in sorted(self._entries.items())]
+        data = b''.join(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+                        for record in records)
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to compact offline journal: {e}")
+            return
+
+        self._records = len(records)
+        self._offset = len(data)
+        self._terminate_partial = False
+        self._inode = self.path.stat().st_ino
+        logger.debug(f"Compacted offline journal to {len(records)} entries")
+
+    @contextmanager
+    def _locked(self):
+        """Hold the journal's inter-process lock."""
+        if not self.path:
+            yield
+            return
+        with open(self._lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
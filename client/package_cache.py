@@ -0,0 +1,136 @@
+"""
+Pacman package cache index for the Pacman Sync Utility Client.
+
+Parses the archive filenames in the pacman cache directory once into a
+name -> version -> path map so downgrade lookups are exact dictionary
+lookups instead of a glob over the whole cache. The index is rebuilt when
+the cache directory's modification time changes, which happens whenever
+an archive is added, removed or renamed.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_SUFFIX = '.pkg.tar'
+
+
+def parse_archive_filename(filename: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Split a package archive filename into (name, version, architecture).
+
+    Archives are named {name}-{pkgver}-{pkgrel}-{arch}.pkg.tar[.ext]; the
+    version includes the epoch and pkgrel (e.g. "1:1.3-1"), matching the
+    versions reported by pacman. Package names may contain hyphens, so the
+    filename is split from the right.
+
+    Returns:
+        Tuple of (name, version, architecture), or None for signatures,
+        partial downloads and other files
+    """
+    stem, suffix, compression = filename.partition(PACKAGE_SUFFIX)
+    if not suffix or compression.endswith(('.sig', '.part')) or (compression and not compression.startswith('.')):
+        return None
+
+    parts = stem.rsplit('-', 3)
+    if len(parts) != 4 or not all(parts):
+        return None
+
+    name, pkgver, pkgrel, arch = parts
+    return name, f"{pkgver}-{pkgrel}", arch
+
+
+class PackageCacheIndex:
+    """
+    Exact lookup of cached package archives by name and version.
+
+    The index is built lazily on first use and refreshed when the cache
+    directory changes; a lookup against an unchanged cache costs one stat.
+    """
+
+    def __init__(self, cache_dir: str, architecture: Optional[str] = None):
+        """
+        Initialize the index.
+
+        Args:
+            cache_dir: Pacman cache directory
+            architecture: Machine architecture; when a version is cached for
+                several architectures, this one (or "any") is preferred
+        """
+        self.cache_dir = cache_dir
+        self.architecture = architecture
+
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._packages: Dict[str, Dict[str, str]] = {}
+
+    def _refresh(self):
+        """Rebuild the index if the cache directory changed since the last build."""
+        try:
+            stat = os.stat(self.cache_dir)
+            signature = (stat.st_ino, stat.st_mtime_ns)
+        except OSError:
+            signature = None
+
+        if signature is not None and signature == self._signature:
+            return
+
+        packages: Dict[str, Dict[str, str]] = {}
+        preferred: Dict[Tuple[str, str], bool] = {}
+        if signature is not None:
+            try:
+                with os.scandir(self.cache_dir) as entries:
+                    for entry in entries:
+                        parsed = parse_archive_filename(entry.name)
+                        if parsed is None:
+                            continue
+                        name, version, arch = parsed
+                        native = arch in (self.architecture, 'any')
+
+                        # Keep the first archive found unless a native one turns up
+                        if (name, version) in preferred and (preferred[(name, version)] or not native):
+                            continue
+                        preferred[(name, version)] = native
+                        packages.setdefault(name, {})[version] = entry.path
+            except OSError as e:
+                logger.warning(f"Failed to index package cache {self.cache_dir}: {e}")
+
+        self._packages = packages
+        self._signature = signature
+        logger.debug(f"Indexed {len(preferred)} archives of {len(packages)} packages in {self.cache_dir}")
+
+    def find(self, package_name: str, version: str) -> Optional[str]:
+        """
+        Find the archive of an exact package version.
+
+        Args:
+            package_name: Package name
+            version: Full version including epoch and pkgrel
+
+        Returns:
+            Path to the archive, or None if it is not cached
+        """
+        with self._lock:
+            self._refresh()
+            return self._packages.get(package_name, {}).get(version)
+
+    def versions(self, package_name: str) -> Dict[str, str]:
+        """Get all cached versions of a package as {version: path}."""
+        with self._lock:
+            self._refresh()
+            return dict(self._packages.get(package_name, {}))
+
+    def availability(self, targets: Iterable[Tuple[str, str]]) -> Dict[str, Optional[str]]:
+        """
+        Look up several (name, version) targets at once.
+
+        Returns:
+            Dictionary mapping package names to archive paths, or None for
+            versions that are not cached
+        """
+        with self._lock:
+            self._refresh()
+            return {name: self._packages.get(name, {}).get(version) for name, version in targets}
@@ -11,27 +11,26 @@ Requirements: 6.2, 6.3, 6.4, 11.3, 11.4
 
 import subprocess
 import logging
-import json
-import tempfile
 import os
-from typing import List, Dict, Optional, Tuple, Set
+import shutil
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Optional, Tuple, Set
 from dataclasses import dataclass
 from datetime import datetime
 
 from shared.models import PackageState, SystemState, OperationType
+from client.archive_fetcher import ArchiveFetcher
+from client.package_cache import PackageCacheIndex
 from client.pacman_interface import PacmanInterface, PackageStateDetector
+from client.state_store import StateManager
+from shared.sync_planner import PackageOperation, SyncPlan, SyncPlanner, SyncTransaction, order_operations
 
 logger = logging.getLogger(__name__)
 
-
-@dataclass
-class PackageOperation:
-    """Represents a single package operation to be performed."""
-    operation_type: str  # 'install', 'remove', 'upgrade', 'downgrade'
-    package_name: str
-    current_version: Optional[str] = None
-    target_version: Optional[str] = None
-    repository: Optional[str] = None
+# Progress callback: (stage, completed, total)
+ProgressCallback = Callable[[str, int, int], None]
 
 
 @dataclass
@@ -58,18 +57,53 @@ class PackageSynchronizer:
     - Syncing to latest state
     - Setting current state as latest
     - Reverting to previous state
+    
+    Operations run as a pipeline: archives are resolved and prefetched
+    concurrently, verified, and then applied in as few pacman transactions
+    as possible. Progress is reported per stage.
     """
     
+    # Upper bound on concurrent archive downloads during prefetch
+    MAX_DOWNLOAD_WORKERS = 4
+    
+    # Socket timeout for a single archive download, in seconds
+    DOWNLOAD_TIMEOUT = 60
+    
     def __init__(self, pacman_interface: PacmanInterface):
         self.pacman = pacman_interface
         self.detector = PackageStateDetector(pacman_interface)
         self._dry_run = False
+        self._progress_callback: Optional[ProgressCallback] = None
+        self._cache_index: Optional[PackageCacheIndex] = None
+        self._archive_fetcher: Optional[ArchiveFetcher] = None
+        self._package_mirror: Optional[str] = None
+        self.planner = SyncPlanner(
+            lambda current, target: self.pacman.compare_package_states(current, target)
+        )
         
     def set_dry_run(self, dry_run: bool):
         """Enable/disable dry run mode for testing."""
         self._dry_run = dry_run
+    
+    def set_progress_callback(self, callback: Optional[ProgressCallback]):
+        """
+        Set a callback receiving (stage, completed, total) progress updates.
+        
+        Stages are 'resolve', 'archive' (fetching versions missing from the
+        cache), 'download', 'verify', 'remove', 'install' and 'downgrade'. The callback may be invoked from worker threads.
+        """
+        self._progress_callback = callback
+    
+    def _report_progress(self, stage: str, completed: int, total: int):
+        """Report stage progress to the callback, if any."""
+        if self._progress_callback is None:
+            return
+        try:
+            self._progress_callback(stage, completed, total)
+        except Exception as e:
+            logger.debug(f"Progress callback failed: {e}")
         
-    def sync_to_latest(self, target_state: SystemState) -> SyncResult:
+    def sync_to_latest(self, target_state: SystemState, target_state_id: Optional[str] = None) -> SyncResult:
         """
         Synchronize packages to match the target state.
         
@@ -81,6 +115,7 @@ class PackageSynchronizer:
         
         Args:
             target_state: The desired system state to sync to
+            target_state_id: Server id of the target state, used to cache the plan
             
         Returns:
             SyncResult with operation details and success status
@@ -96,7 +131,8 @@ class PackageSynchronizer:
             current_state = self.pacman.get_system_state("current")
             
             # Calculate required operations
-            operations = self._calculate_sync_operations(current_state, target_state)
+            plan = self.plan_sync(current_state, target_state, target_state_id)
+            operations = plan.operations
             
             if not operations:
                 logger.info("No package operations required - system already in sync")
@@ -109,10 +145,11 @@ class PackageSynchronizer:
                     duration_seconds=(datetime.now() - start_time).total_seconds()
                 )
             
-            logger.info(f"Calculated {len(operations)} package operations")
+            logger.info(f"Calculated {len(operations)} package operations in {len(plan.transactions)} transactions")
             
-            # Execute operations in proper order
-            result = self._execute_operations(operations)
+            # Execute operations in dependency order
+            result = self._execute_operations(operations, transactions=plan.transactions)
+            result.warnings = plan.warnings + result.warnings
             result.duration_seconds = (datetime.now() - start_time).total_seconds()
             
             logger.info(f"Sync operation completed: success={result.success}, "
@@ -207,7 +244,8 @@ class PackageSynchronizer:
             current_state = self.pacman.get_system_state("current")
             
             # Calculate required operations (same as sync, but to previous state)
-            operations = self._calculate_sync_operations(current_state, previous_state)
+            plan = self.plan_sync(current_state, previous_state)
+            operations = plan.operations
             
             if not operations:
                 logger.info("No package operations required - system already matches previous state")
@@ -222,8 +260,16 @@ class PackageSynchronizer:
             
             logger.info(f"Calculated {len(operations)} revert operations")
             
+            unavailable = [op for op in operations if op.operation_type == 'downgrade'
+                           and self._find_package_in_cache(op.package_name, op.target_version) is None]
+            if unavailable:
+                logger.warning(f"{len(unavailable)} revert target versions are not cached: "
+                               f"{', '.join(f'{op.package_name}={op.target_version}' for op in unavailable[:5])}"
+                               f"{'...' if len(unavailable) > 5 else ''}")
+            
             # Execute operations with extra caution for reverts
-            result = self._execute_operations(operations, is_revert=True)
+            result = self._execute_operations(operations, is_revert=True, transactions=plan.transactions)
+            result.warnings = plan.warnings + result.warnings
             result.duration_seconds = (datetime.now() - start_time).total_seconds()
             
             logger.info(f"Revert operation completed: success={result.success}, "
@@ -242,6 +288,25 @@ class PackageSynchronizer:
                 duration_seconds=(datetime.now() - start_time).total_seconds()
             )
     
+    def plan_sync(self, current_state: SystemState, target_state: SystemState,
+                  target_state_id: Optional[str] = None) -> SyncPlan:
+        """
+        Plan the transactions that take current_state to target_state.
+        
+        Operations are ordered by the package dependencies recorded in the
+        states. Plans are cached per (current state, target state), so
+        repeated dry runs against an unchanged system are not recomputed.
+        
+        Args:
+            current_state: Current system package state
+            target_state: Target system package state
+            target_state_id: Server id of the target state, if known
+            
+        Returns:
+            SyncPlan with operations and transactions in execution order
+        """
+        return self.planner.plan(current_state, target_state, target_state_id)
+    
     def _calculate_sync_operations(self, current_state: SystemState, target_state: SystemState) -> List[PackageOperation]:
         """
         Calculate the package operations needed to sync current state to target state.
@@ -253,76 +318,26 @@ class PackageSynchronizer:
         Returns:
             List of PackageOperation objects in execution order
         """
-        operations = []
-        
-        # Get package differences
-        differences = self.pacman.compare_package_states(current_state, target_state)
-        
-        current_packages = {pkg.package_name: pkg for pkg in current_state.packages}
-        target_packages = {pkg.package_name: pkg for pkg in target_state.packages}
-        
-        # Process each difference
-        for package_name, status in differences.items():
-            if status == 'missing':
-                # Package needs to be installed
-                target_pkg = target_packages[package_name]
-                operations.append(PackageOperation(
-                    operation_type='install',
-                    package_name=package_name,
-                    target_version=target_pkg.version,
-                    repository=target_pkg.repository
-                ))
-                
-            elif status == 'extra':
-                # Package needs to be removed
-                current_pkg = current_packages[package_name]
-                operations.append(PackageOperation(
-                    operation_type='remove',
-                    package_name=package_name,
-                    current_version=current_pkg.version
-                ))
-                
-            elif status == 'older':
-                # Package needs to be upgraded
-                current_pkg = current_packages[package_name]
-                target_pkg = target_packages[package_name]
-                operations.append(PackageOperation(
-                    operation_type='upgrade',
-                    package_name=package_name,
-                    current_version=current_pkg.version,
-                    target_version=target_pkg.version,
-                    repository=target_pkg.repository
-                ))
-                
-            elif status == 'newer':
-                # Package needs to be downgraded
-                current_pkg = current_packages[package_name]
-                target_pkg = target_packages[package_name]
-                operations.append(PackageOperation(
-                    operation_type='downgrade',
-                    package_name=package_name,
-                    current_version=current_pkg.version,
-                    target_version=target_pkg.version,
-                    repository=target_pkg.repository
-                ))
-        
-        # Sort operations by priority (removes first, then installs/upgrades)
-        operations.sort(key=lambda op: {
-            'remove': 0,
-            'downgrade': 1,
-            'upgrade': 2,
-            'install': 3
-        }.get(op.operation_type, 4))
-        
-        return operations
+        return self.plan_sync(current_state, target_state).operations
     
-    def _execute_operations(self, operations: List[PackageOperation], is_revert: bool = False) -> SyncResult:
+    def _execute_operations(self, operations: List[PackageOperation], is_revert: bool = False,
+                            transactions: Optional[List[SyncTransaction]] = None) -> SyncResult:
         """
-        Execute a list of package operations.
+        Execute a list of package operations as a staged pipeline.
+        
+        Stages (each reported through the progress callback):
+        1. resolve: find download URLs and cached downgrade archives; fetch
+           versions missing from the cache from the archive mirror ('archive')
+        2. download: fetch missing archives into the pacman cache concurrently
+        3. verify: check the archives before any transaction starts
+        4. remove / install / downgrade: apply the transactions in order,
+           one pacman command each (installs and upgrades share one)
         
         Args:
             operations: List of operations to execute
             is_revert: Whether this is a revert operation (affects error handling)
+            transactions: Transactions from a SyncPlan; by default operations
+                are grouped into one transaction per kind
             
         Returns:
             SyncResult with execution details
@@ -334,26 +349,49 @@ class PackageSynchronizer:
         
         # Group operations by type for batch execution
         operation_groups = self._group_operations(operations)
+        sync_operations = operation_groups['install'] + operation_groups['upgrade']
+        downgrade_operations = operation_groups['downgrade']
+        
+        # Fetch everything before touching the system
+        downgrade_archives, missing = self._prepare_archives(sync_operations, downgrade_operations, warnings)
+        if missing:
+            errors.extend(
+                f"Failed to downgrade {op.package_name} to {op.target_version}: package not found in cache"
+                for op in missing
+            )
+            if not is_revert:
+                return SyncResult(
+                    success=False,
+                    operations_performed=[],
+                    errors=errors,
+                    warnings=warnings,
+                    packages_changed=0,
+                    duration_seconds=0  # Will be set by caller
+                )
         
-        for group_type, group_operations in operation_groups.items():
+        if transactions is None:
+            transactions, _, _ = order_operations(operations)
+        executors = {
+            'remove': self._execute_remove_operations,
+            'install': self._execute_sync_operations,
+            'downgrade': lambda ops: self._execute_downgrade_operations(ops, downgrade_archives),
+        }
+        
+        for transaction in transactions:
+            group_type = transaction.kind
+            group_operations = [op for op in transaction.operations if op not in missing]
+            execute = executors[group_type]
             if not group_operations:
                 continue
-                
+            
+            self._report_progress(group_type, 0, len(group_operations))
             try:
-                if group_type == 'remove':
-                    success, group_errors = self._execute_remove_operations(group_operations)
-                elif group_type == 'install':
-                    success, group_errors = self._execute_install_operations(group_operations)
-                elif group_type == 'upgrade':
-                    success, group_errors = self._execute_upgrade_operations(group_operations)
-                elif group_type == 'downgrade':
-                    success, group_errors = self._execute_downgrade_operations(group_operations)
-                else:
-                    continue
+                success, group_errors = execute(group_operations)
                 
                 if success:
                     executed_operations.extend(group_operations)
                     packages_changed += len(group_operations)
+                    self._report_progress(group_type, len(group_operations), len(group_operations))
                 else:
                     errors.extend(group_errors)
                     
@@ -396,6 +434,204 @@ class PackageSynchronizer:
         
         return groups
     
+    def _prepare_archives(self, sync_operations: List[PackageOperation],
+                          downgrade_operations: List[PackageOperation],
+                          warnings: List[str]) -> Tuple[Dict[str, str], List[PackageOperation]]:
+        """
+        Resolve, download and verify the archives needed by the operations.
+        
+        Repository packages are only prefetched: anything that cannot be
+        downloaded here is left for `pacman -S`, which verifies checksums and
+        signatures of cached archives itself. Downgrades need a local archive.
+        
+        Args:
+            sync_operations: Install and upgrade operations
+            downgrade_operations: Downgrade operations
+            warnings: List that prefetch problems are appended to
+            
+        Returns:
+            Tuple of (package name -> downgrade archive path, downgrades without an archive)
+        """
+        total = len(sync_operations) + len(downgrade_operations)
+        self._report_progress('resolve', 0, total)
+        
+        if self._dry_run:
+            if total:
+                logger.info(f"DRY RUN: Would fetch archives for {total} packages")
+            self._report_progress('resolve', total, total)
+            return {}, []
+        
+        # Downgrades: look the requested versions up in the cache
+        downgrade_archives = {}
+        missing = []
+        for op in downgrade_operations:
+            path = self._find_package_in_cache(op.package_name, op.target_version)
+            if path:
+                downgrade_archives[op.package_name] = path
+            else:
+                missing.append(op)
+        
+        # Versions the cache lacks come from the archive mirror, if configured
+        if missing:
+            downgrade_archives.update(self._fetch_missing_versions(missing))
+            missing = [op for op in missing if op.package_name not in downgrade_archives]
+        
+        # Installs and upgrades: ask pacman where the archives live
+        urls = []
+        if sync_operations:
+            try:
+                urls = self._resolve_download_urls(self._package_specs(sync_operations))
+            except (subprocess.CalledProcessError, OSError) as e:
+                warning = f"Could not resolve package downloads, pacman will download them: {e}"
+                logger.warning(warning)
+                warnings.append(warning)
+        self._report_progress('resolve', total, total)
+        
+        downloaded = self._download_archives(urls, warnings)
+        
+        # Verify before any transaction starts
+        checked = 0
+        archives = downloaded + list(downgrade_archives.values())
+        self._report_progress('verify', 0, len(archives))
+        for path in downloaded:
+            if not self._is_valid_archive(path):
+                logger.warning(f"Discarding invalid download {path}")
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            checked += 1
+            self._report_progress('verify', checked, len(archives))
+        for op in downgrade_operations:
+            path = downgrade_archives.get(op.package_name)
+            if path is None:
+                continue
+            if not self._is_valid_archive(path):
+                del downgrade_archives[op.package_name]
+                missing.append(op)
+            checked += 1
+            self._report_progress('verify', checked, len(archives))
+        
+        return downgrade_archives, missing
+    
+    def _package_specs(self, operations: List[PackageOperation]) -> List[str]:
+        """Build pacman target specs (name or name=version) for operations."""
+        return [
+            f"{op.package_name}={op.target_version}" if op.target_version else op.package_name
+            for op in operations
+        ]
+    
+    def _resolve_download_urls(self, package_specs: List[str]) -> List[str]:
+        """
+        Resolve the archive URLs pacman would download for a set of targets.
+        
+        Uses `pacman -Sp`, which prints the targets (including missing
+        dependencies) without locking the database, so it can run while
+        another pacman process is active.
+        """
+        cmd = ['pacman', '-Sp', '--noconfirm', '--print-format', '%l'] + package_specs
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return [line.strip() for line in result.stdout.splitlines() if '://' in line]
+    
+    def _download_archives(self, urls: List[str], warnings: List[str]) -> List[str]:
+        """
+        Download archives that are not cached yet into the pacman cache.
+        
+        Downloads run concurrently with at most MAX_DOWNLOAD_WORKERS at a
+        time. Failures are recorded as warnings; pacman retries them from its
+        own mirror list during the transaction.
+        
+        Returns:
+            Paths of the archives downloaded by this call
+        """
+        cache_dir = self.pacman.config.cache_dir
+        pending = []
+        for url in urls:
+            if url.startswith('file://'):
+                continue  # local repositories are read in place
+            filename = os.path.basename(urllib.parse.urlparse(url).path)
+            if filename and not os.path.exists(os.path.join(cache_dir, filename)):
+                pending.append((url, os.path.join(cache_dir, filename)))
+        
+        self._report_progress('download', 0, len(pending))
+        if not pending:
+            return []
+        
+        logger.info(f"Prefetching {len(pending)} package archives")
+        downloaded = []
+        done = 0
+        workers = max(1, min(self.MAX_DOWNLOAD_WORKERS, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._fetch_archive, url, dest): url for url, dest in pending}
+            for future in as_completed(futures):
+                try:
+                    downloaded.append(future.result())
+                except Exception as e:
+                    warning = f"Prefetch of {futures[future]} failed: {e}"
+                    logger.warning(warning)
+                    warnings.append(warning)
+                done += 1
+                self._report_progress('download', done, len(pending))
+        
+        return downloaded
+    
+    def set_package_mirror(self, url: Optional[str]):
+        """
+        Set the server package cache to download archives from (None to disable).
+        
+        The URL is the base of a pacman-style mirror serving
+        {url}/{repo}/os/{arch}/{file}; downloads fall back to the repository's
+        own mirror if the cache cannot provide an archive.
+        """
+        self._package_mirror = url.rstrip('/') if url else None
+    
+    def _package_mirror_url(self, url: str) -> Optional[str]:
+        """Map an upstream archive URL to the package cache, if the repository is known."""
+        if not self._package_mirror:
+            return None
+        
+        directory, _, filename = url.rpartition('/')
+        for repo_config in self.pacman.config.repositories:
+            if repo_config.get("server", "").rstrip('/') == directory:
+                return f"{self._package_mirror}/{repo_config['name']}/os/{self.pacman.config.architecture}/{filename}"
+        return None
+    
+    def _fetch_archive(self, url: str, dest: str) -> str:
+        """Download one archive, preferring the package cache over the upstream mirror."""
+        cached_url = self._package_mirror_url(url)
+        if cached_url:
+            try:
+                return self._download_archive(cached_url, dest)
+            except Exception as e:
+                logger.debug(f"Package cache could not provide {cached_url}, using upstream: {e}")
+        return self._download_archive(url, dest)
+    
+    def _download_archive(self, url: str, dest: str) -> str:
+        """Download one archive to dest, replacing it atomically when complete."""
+        partial = dest + '.part'
+        try:
+            with urllib.request.urlopen(url, timeout=self.DOWNLOAD_TIMEOUT) as response, \
+                    open(partial, 'wb') as output:
+                shutil.copyfileobj(response, output, 1024 * 1024)
+                expected = response.headers.get('Content-Length')
+            if expected is not None and os.path.getsize(partial) != int(expected):
+                raise PackageOperationError(f"incomplete download ({os.path.getsize(partial)} of {expected} bytes)")
+            os.replace(partial, dest)
+            return dest
+        except BaseException:
+            try:
+                os.unlink(partial)
+            except OSError:
+                pass
+            raise
+    
+    def _is_valid_archive(self, path: str) -> bool:
+        """Check that an archive is a non-empty regular file."""
+        try:
+            return os.path.isfile(path) and os.path.getsize(path) > 0
+        except OSError:
+            return False
+    
     def _execute_remove_operations(self, operations: List[PackageOperation]) -> Tuple[bool, List[str]]:
         """Execute package removal operations."""
         if not operations:
@@ -421,30 +657,25 @@ class PackageSynchronizer:
             logger.error(error_msg)
             return False, [error_msg]
     
-    def _execute_install_operations(self, operations: List[PackageOperation]) -> Tuple[bool, List[str]]:
-        """Execute package installation operations."""
+    def _execute_sync_operations(self, operations: List[PackageOperation]) -> Tuple[bool, List[str]]:
+        """Execute package installs and upgrades in a single pacman transaction."""
         if not operations:
             return True, []
         
-        package_specs = []
-        for op in operations:
-            if op.target_version:
-                package_specs.append(f"{op.package_name}={op.target_version}")
-            else:
-                package_specs.append(op.package_name)
+        package_specs = self._package_specs(operations)
         
-        logger.info(f"Installing {len(package_specs)} packages: {', '.join(package_specs[:5])}{'...' if len(package_specs) > 5 else ''}")
+        logger.info(f"Installing/upgrading {len(package_specs)} packages: {', '.join(package_specs[:5])}{'...' if len(package_specs) > 5 else ''}")
         
         if self._dry_run:
-            logger.info("DRY RUN: Would install packages")
+            logger.info("DRY RUN: Would install/upgrade packages")
             return True, []
         
         try:
-            # Use pacman -S to install packages
+            # Use pacman -S; prefetched archives are taken from the cache
             cmd = ['pacman', '-S', '--noconfirm'] + package_specs
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
             
-            logger.info(f"Successfully installed {len(package_specs)} packages")
+            logger.info(f"Successfully installed/upgraded {len(package_specs)} packages")
             return True, []
             
         except subprocess.CalledProcessError as e:
@@ -452,308 +683,95 @@ class PackageSynchronizer:
             logger.error(error_msg)
             return False, [error_msg]
     
-    def _execute_upgrade_operations(self, operations: List[PackageOperation]) -> Tuple[bool, List[str]]:
-        """Execute package upgrade operations."""
+    def _execute_downgrade_operations(self, operations: List[PackageOperation],
+                                      archives: Dict[str, str]) -> Tuple[bool, List[str]]:
+        """
+        Execute package downgrades in a single `pacman -U` transaction.
+        
+        Args:
+            operations: Downgrade operations
+            archives: Package name -> archive path, as found by _prepare_archives
+        """
         if not operations:
             return True, []
         
-        package_specs = []
-        for op in operations:
-            if op.target_version:
-                package_specs.append(f"{op.package_name}={op.target_version}")
-            else:
-                package_specs.append(op.package_name)
-        
-        logger.info(f"Upgrading {len(package_specs)} packages: {', '.join(package_specs[:5])}{'...' if len(package_specs) > 5 else ''}")
+        logger.info(f"Downgrading {len(operations)} packages: "
+                    f"{', '.join(f'{op.package_name}={op.target_version}' for op in operations[:5])}"
+                    f"{'...' if len(operations) > 5 else ''}")
         
         if self._dry_run:
-            logger.info("DRY RUN: Would upgrade packages")
+            logger.info("DRY RUN: Would downgrade packages")
             return True, []
         
         try:
-            # Use pacman -S to upgrade packages (same as install)
-            cmd = ['pacman', '-S', '--noconfirm'] + package_specs
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            cmd = ['pacman', '-U', '--noconfirm'] + [archives[op.package_name] for op in operations]
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
             
-            logger.info(f"Successfully upgraded {len(package_specs)} packages")
+            logger.info(f"Successfully downgraded {len(operations)} packages")
             return True, []
             
         except subprocess.CalledProcessError as e:
-            error_msg = f"Failed to upgrade packages: {e.stderr}"
+            error_msg = f"Failed to downgrade packages: {e.stderr}"
             logger.error(error_msg)
             return False, [error_msg]
     
-    def _execute_downgrade_operations(self, operations: List[PackageOperation]) -> Tuple[bool, List[str]]:
-        """Execute package downgrade operations."""
-        if not operations:
-            return True, []
-        
-        errors = []
-        warnings = []
-        
-        # Downgrades are more complex and risky - handle individually
-        for op in operations:
-            try:
-                success = self._downgrade_single_package(op)
-                if not success:
-                    error_msg = f"Failed to downgrade {op.package_name} to {op.target_version}"
-                    errors.append(error_msg)
-            except Exception as e:
-                error_msg = f"Error downgrading {op.package_name}: {e}"
-                errors.append(error_msg)
-        
-        if errors:
-            logger.warning(f"Some downgrades failed: {len(errors)} errors")
-            return False, errors
-        else:
-            logger.info(f"Successfully downgraded {len(operations)} packages")
-            return True, []
-    
-    def _downgrade_single_package(self, operation: PackageOperation) -> bool:
-        """
-        Downgrade a single package to a specific version.
-        
-        This is complex because pacman doesn't directly support downgrades.
-        We need to check package cache or use alternative methods.
-        """
-        logger.info(f"Attempting to downgrade {operation.package_name} from {operation.current_version} to {operation.target_version}")
-        
-        if self._dry_run:
-            logger.info("DRY RUN: Would downgrade package")
-            return True
-        
-        try:
-            # First, try to find the package in cache
-            cache_path = self._find_package_in_cache(operation.package_name, operation.target_version)
-            
-            if cache_path:
-                # Install from cache
-                cmd = ['pacman', '-U', '--noconfirm', cache_path]
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                logger.info(f"Successfully downgraded {operation.package_name} using cached package")
-                return True
-            else:
-                # Try to download and install specific version
-                return self._download_and_install_version(operation)
-                
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to downgrade {operation.package_name}: {e.stderr}")
-            return False
-        except Exception as e:
-            logger.error(f"Unexpected error downgrading {operation.package_name}: {e}")
-            return False
-    
-    def _find_package_in_cache(self, package_name: str, version: str) -> Optional[str]:
-        """Find a specific package version in the pacman cache."""
-        cache_dir = self.pacman.config.cache_dir
-        
-        # Look for package files matching the name and version
-        import glob
-        pattern = os.path.join(cache_dir, f"{package_name}-{version}-*.pkg.tar.*")
-        matches = glob.glob(pattern)
-        
-        if matches:
-            # Return the first match (there should typically be only one)
-            return matches[0]
-        
-        return None
+    @property
+    def cache_index(self) -> PackageCacheIndex:
+        """Index of the pacman package cache, created on first use."""
+        if self._cache_index is None:
+            self._cache_index = PackageCacheIndex(self.pacman.config.cache_dir, self.pacman.config.architecture)
+        return self._cache_index
     
-    def _download_and_install_version(self, operation: PackageOperation) -> bool:
+    def get_downgrade_availability(self, target_state: SystemState) -> Dict[str, Optional[str]]:
         """
-        Download and install a specific package version.
+        Report which versions needed to reach a state are in the package cache.
         
-        This is a fallback when the package isn't in cache.
-        Note: This is complex and may not always work depending on repository availability.
-        """
-        logger.warning(f"Package {operation.package_name}={operation.target_version} not found in cache")
-        logger.warning("Downgrade may not be possible without cached package")
-        
-        # For now, we'll log this as a limitation
-        # In a production system, you might want to:
-        # 1. Check Arch Linux Archive (ALA) for older packages
-        # 2. Use a custom repository with older versions
-        # 3. Build from source with specific version
-        
-        return False
-
-
-class StateManager:
-    """
-    Manages system state snapshots and history for revert operations.
-    
-    This class handles:
-    - Storing system state snapshots
-    - Retrieving previous states for revert operations
-    - Managing state history and cleanup
-    """
-    
-    def __init__(self, storage_path: str = None):
-        if storage_path is None:
-            import tempfile
-            self.storage_path = os.path.join(tempfile.gettempdir(), "pacman_sync_states")
-        else:
-            self.storage_path = storage_path
-        
-        # Ensure storage directory exists
-        os.makedirs(self.storage_path, exist_ok=True)
-        
-    def save_state(self, state: SystemState, is_target: bool = False) -> str:
-        """
-        Save a system state snapshot.
+        Only downgrades need a cached archive; installs and upgrades are
+        fetched from the repositories. Use this before planning a revert.
         
         Args:
-            state: SystemState to save
-            is_target: Whether this is a target state (vs. backup state)
+            target_state: State to sync or revert to
             
         Returns:
-            State ID for later retrieval
+            Dictionary mapping packages that would be downgraded to their
+            cached archive path, or None if the target version is not cached
         """
-        state_id = f"{state.endpoint_id}_{int(state.timestamp.timestamp())}"
-        filename = f"state_{state_id}.json"
-        filepath = os.path.join(self.storage_path, filename)
-        
-        state_data = {
-            'id': state_id,
-            'endpoint_id': state.endpoint_id,
-            'timestamp': state.timestamp.isoformat(),
-            'pacman_version': state.pacman_version,
-            'architecture': state.architecture,
-            'is_target': is_target,
-            'packages': [
-                {
-                    'package_name': pkg.package_name,
-                    'version': pkg.version,
-                    'repository': pkg.repository,
-                    'installed_size': pkg.installed_size,
-                    'dependencies': pkg.dependencies
-                }
-                for pkg in state.packages
-            ]
-        }
-        
-        try:
-            with open(filepath, 'w') as f:
-                json.dump(state_data, f, indent=2)
-            
-            logger.info(f"Saved system state {state_id} with {len(state.packages)} packages")
-            return state_id
-            
-        except Exception as e:
-            logger.error(f"Failed to save state {state_id}: {e}")
-            raise
+        current_state = self.pacman.get_system_state("current")
+        operations = self._calculate_sync_operations(current_state, target_state)
+        return self.cache_index.availability(
+            (op.package_name, op.target_version) for op in operations if op.operation_type == 'downgrade'
+        )
+    
+    def _find_package_in_cache(self, package_name: str, version: str) -> Optional[str]:
+        """Find a specific package version in the pacman cache."""
+        return self.cache_index.find(package_name, version)
+    
+    def set_archive_fetcher(self, fetcher: Optional[ArchiveFetcher]):
+        """Set the source for package versions missing from the cache (None to disable)."""
+        self._archive_fetcher = fetcher
     
-    def load_state(self, state_id: str) -> Optional[SystemState]:
+    def _fetch_missing_versions(self, operations: List[PackageOperation]) -> Dict[str, str]:
         """
-        Load a system state snapshot.
+        Fetch package versions that are not in the cache from the archive fetcher.
         
-        Args:
-            state_id: ID of the state to load
-            
         Returns:
-            SystemState object or None if not found
+            Dictionary mapping package names to fetched archive paths
         """
-        filename = f"state_{state_id}.json"
-        filepath = os.path.join(self.storage_path, filename)
+        for op in operations:
+            logger.warning(f"Package {op.package_name}={op.target_version} not found in cache")
         
-        if not os.path.exists(filepath):
-            logger.warning(f"State file not found: {filepath}")
-            return None
+        if self._archive_fetcher is None:
+            logger.warning("Downgrade may not be possible without cached package; no archive mirror configured")
+            return {}
         
+        self._report_progress('archive', 0, len(operations))
         try:
-            with open(filepath, 'r') as f:
-                state_data = json.load(f)
-            
-            packages = [
-                PackageState(
-                    package_name=pkg['package_name'],
-                    version=pkg['version'],
-                    repository=pkg['repository'],
-                    installed_size=pkg['installed_size'],
-                    dependencies=pkg.get('dependencies', [])
-                )
-                for pkg in state_data['packages']
-            ]
-            
-            state = SystemState(
-                endpoint_id=state_data['endpoint_id'],
-                timestamp=datetime.fromisoformat(state_data['timestamp']),
-                packages=packages,
-                pacman_version=state_data['pacman_version'],
-                architecture=state_data['architecture']
+            fetched = self._archive_fetcher.fetch(
+                [(op.package_name, op.target_version) for op in operations],
+                self.pacman.config.cache_dir
             )
-            
-            logger.info(f"Loaded system state {state_id} with {len(packages)} packages")
-            return state
-            
-        except Exception as e:
-            logger.error(f"Failed to load state {state_id}: {e}")
-            return None
-    
-    def get_previous_state(self, endpoint_id: str) -> Optional[SystemState]:
-        """
-        Get the most recent previous state for an endpoint.
-        
-        Args:
-            endpoint_id: ID of the endpoint
-            
-        Returns:
-            Most recent SystemState or None if no previous state exists
-        """
-        try:
-            # List all state files for this endpoint
-            state_files = []
-            for filename in os.listdir(self.storage_path):
-                if filename.startswith(f"state_{endpoint_id}_") and filename.endswith('.json'):
-                    state_files.append(filename)
-            
-            if not state_files:
-                logger.info(f"No previous states found for endpoint {endpoint_id}")
-                return None
-            
-            # Sort by timestamp (newest first)
-            state_files.sort(reverse=True)
-            
-            # Load the most recent state
-            most_recent = state_files[0]
-            state_id = most_recent.replace('state_', '').replace('.json', '')
-            
-            return self.load_state(state_id)
-            
-        except Exception as e:
-            logger.error(f"Failed to get previous state for {endpoint_id}: {e}")
-            return None
-    
-    def cleanup_old_states(self, endpoint_id: str, keep_count: int = 10):
-        """
-        Clean up old state files, keeping only the most recent ones.
-        
-        Args:
-            endpoint_id: ID of the endpoint
-            keep_count: Number of recent states to keep
-        """
-        try:
-            # List all state files for this endpoint
-            state_files = []
-            for filename in os.listdir(self.storage_path):
-                if filename.startswith(f"state_{endpoint_id}_") and filename.endswith('.json'):
-                    filepath = os.path.join(self.storage_path, filename)
-                    mtime = os.path.getmtime(filepath)
-                    state_files.append((filename, mtime))
-            
-            if len(state_files) <= keep_count:
-                return  # Nothing to clean up
-            
-            # Sort by modification time (newest first)
-            state_files.sort(key=lambda x: x[1], reverse=True)
-            
-            # Remove old files
-            files_to_remove = state_files[keep_count:]
-            for filename, _ in files_to_remove:
-                filepath = os.path.join(self.storage_path, filename)
-                os.remove(filepath)
-                logger.info(f"Removed old state file: {filename}")
-            
-            logger.info(f"Cleaned up {len(files_to_remove)} old state files for {endpoint_id}")
-            
         except Exception as e:
-            logger.error(f"Failed to cleanup old states for {endpoint_id}: {e}")
\ No newline at end of file
+            logger.error(f"Archive mirror fetch failed: {e}")
+            fetched = {}
+        self._report_progress('archive', len(operations), len(operations))
+        return fetched
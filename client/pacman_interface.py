@@ -8,12 +8,13 @@ detect package states, and extract repository information.
 import subprocess
 import re
 import json
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 import logging
 
-from shared.models import PackageState, SystemState, RepositoryPackage, Repository
+from shared.models import PackageState, PackageSet, SystemState, RepositoryPackage, Repository
 
 logger = logging.getLogger(__name__)
 
@@ -28,9 +29,46 @@ class PacmanConfig:
     log_file: str
 
 
+def parse_sync_listing(output: str, repositories: Optional[Iterable[str]] = None,
+                       architecture: str = "") -> Dict[str, PackageSet]:
+    """
+    Parse `pacman -Sl` output into one columnar PackageSet per repository.
+    
+    Args:
+        output: Raw output of `pacman -Sl` (one "repo name version [installed]" per line)
+        repositories: Optional repository names to keep; others are skipped
+        architecture: Architecture recorded on the resulting sets
+        
+    Returns:
+        Dictionary mapping repository names to package sets
+    """
+    wanted = set(repositories) if repositories is not None else None
+    listings: Dict[str, PackageSet] = {}
+    
+    for line in output.splitlines():
+        parts = line.split(None, 3)
+        if len(parts) < 3:
+            continue
+        
+        repo = parts[0]
+        listing = listings.get(repo)
+        if listing is None:
+            if wanted is not None and repo not in wanted:
+                continue
+            listing = listings[repo] = PackageSet(PackageSet.REPOSITORY, architecture)
+        
+        # Check if package is installed (marked with [installed])
+        listing.add(parts[1], parts[2], repo, description=parts[3].strip() if len(parts) > 3 else "")
+    
+    return listings
+
+
 class PacmanInterface:
     """Interface for interacting with pacman package manager."""
     
+    # Upper bound on concurrent `pacman -Sl <repo>` processes in fallback mode
+    MAX_LISTING_WORKERS = 8
+    
     def __init__(self):
         self.config = self._parse_pacman_config()
         self.pacman_version = self._get_pacman_version()
@@ -115,31 +153,8 @@ class PacmanInterface:
         """
         try:
             # Get packages from specific repository
-            cmd = ["pacman", "-Sl", repo_name]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            packages = []
-            for line in result.stdout.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                
-                parts = line.split()
-                if len(parts) >= 3:
-                    repo = parts[0]
-                    name = parts[1]
-                    version = parts[2]
-                    
-                    # Check if package is installed (marked with [installed])
-                    description = ' '.join(parts[3:]) if len(parts) > 3 else ""
-                    
-                    packages.append(RepositoryPackage(
-                        name=name,
-                        version=version,
-                        repository=repo,
-                        architecture=self.config.architecture,
-                        description=description
-                    ))
+            listing = self._run_sync_listing([repo_name]).get(repo_name)
+            packages = listing.to_list() if listing else []
             
             logger.info(f"Retrieved {len(packages)} packages from repository {repo_name}")
             return packages
@@ -148,6 +163,56 @@ class PacmanInterface:
             logger.error(f"Failed to get packages from repository {repo_name}: {e}")
             raise
     
+    def list_sync_repositories(self, repo_names: List[str]) -> Dict[str, PackageSet]:
+        """
+        List packages of several sync repositories at once.
+        
+        Runs a single `pacman -Sl` and splits its output by repository. If
+        that fails (for example because one sync database is missing), the
+        repositories are listed individually with a bounded number of
+        concurrent pacman processes. Repositories that cannot be listed
+        (pacman failing or missing, unreadable output) are logged and absent
+        from the result.
+        
+        Args:
+            repo_names: Names of the repositories to list
+            
+        Returns:
+            Dictionary mapping repository names to package sets
+        """
+        try:
+            return self._run_sync_listing(None, repo_names)
+        except Exception as e:
+            logger.warning(f"Combined repository listing failed, listing repositories individually: {e}")
+        
+        listings: Dict[str, PackageSet] = {}
+        workers = max(1, min(self.MAX_LISTING_WORKERS, len(repo_names)))
+        
+        def list_one(repo_name: str) -> Tuple[str, Optional[PackageSet]]:
+            try:
+                listing = self._run_sync_listing([repo_name]).get(
+                    repo_name, PackageSet(PackageSet.REPOSITORY, self.config.architecture)
+                )
+                return repo_name, listing
+            except Exception as e:
+                logger.warning(f"Failed to get packages for repository {repo_name}: {e}")
+                return repo_name, None
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for repo_name, listing in executor.map(list_one, repo_names):
+                if listing is not None:
+                    listings[repo_name] = listing
+        
+        return listings
+    
+    def _run_sync_listing(self, cmd_repos: Optional[List[str]],
+                          keep: Optional[Iterable[str]] = None) -> Dict[str, PackageSet]:
+        """Run `pacman -Sl [repo...]` and parse the output."""
+        cmd = ["pacman", "-Sl"] + (cmd_repos or [])
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return parse_sync_listing(result.stdout, keep if keep is not None else cmd_repos,
+                                  self.config.architecture)
+    
     def get_all_repositories(self, endpoint_id: str) -> List[Repository]:
         """
         Get information about all configured repositories.
@@ -168,40 +233,24 @@ class PacmanInterface:
                 repo_groups[repo_name] = []
             repo_groups[repo_name].append(repo_config["server"])
         
+        listings = self.list_sync_repositories(list(repo_groups))
+        
         for repo_name, servers in repo_groups.items():
-            try:
-                packages = self.get_repository_packages(repo_name)
-                
-                # Use the first server URL as primary, but include all mirrors in metadata
-                primary_url = servers[0] if servers else ""
-                
-                repository = Repository(
-                    id="",  # Will be set by server
-                    endpoint_id=endpoint_id,
-                    repo_name=repo_name,
-                    repo_url=primary_url,
-                    packages=packages,
-                    last_updated=datetime.now()
-                )
-                
-                # Add all mirror information including the primary URL
-                repository.mirrors = servers  # Store all mirrors including primary
-                
-                repositories.append(repository)
-                
-            except Exception as e:
-                logger.warning(f"Failed to get packages for repository {repo_name}: {e}")
-                # Create repository entry without packages
-                repository = Repository(
-                    id="",
-                    endpoint_id=endpoint_id,
-                    repo_name=repo_name,
-                    repo_url=servers[0] if servers else "",
-                    mirrors=servers,  # Include all mirrors
-                    packages=[],
-                    last_updated=datetime.now()
-                )
-                repositories.append(repository)
+            listing = listings.get(repo_name)
+            if listing is None:
+                logger.warning(f"No packages listed for repository {repo_name}")
+            
+            # Use the first server URL as primary, but include all mirrors in metadata
+            repository = Repository(
+                id="",  # Will be set by server
+                endpoint_id=endpoint_id,
+                repo_name=repo_name,
+                repo_url=servers[0] if servers else "",
+                packages=listing.to_list() if listing else [],
+                last_updated=datetime.now(),
+                mirrors=servers  # Store all mirrors including primary
+            )
+            repositories.append(repository)
         
         logger.info(f"Retrieved information for {len(repositories)} repositories")
         return repositories
@@ -271,30 +320,29 @@ class PacmanInterface:
             - 'extra': package exists in current but not in target
             - 'same': versions are identical
         """
-        current_packages = {pkg.package_name: pkg for pkg in current_state.packages}
-        target_packages = {pkg.package_name: pkg for pkg in target_state.packages}
+        current_packages = PackageSet.coerce(current_state.packages)
+        target_packages = PackageSet.coerce(target_state.packages)
         
-        differences = {}
+        differences = dict.fromkeys(current_packages.names, 'same')
+        package_diff = current_packages.diff(target_packages)
         
-        # Check packages in current state
-        for name, current_pkg in current_packages.items():
-            if name in target_packages:
-                target_pkg = target_packages[name]
-                version_comparison = self._compare_versions(current_pkg.version, target_pkg.version)
-                
-                if version_comparison > 0:
-                    differences[name] = 'newer'
-                elif version_comparison < 0:
-                    differences[name] = 'older'
-                else:
-                    differences[name] = 'same'
-            else:
-                differences[name] = 'extra'
+        # Only packages whose version strings differ need a vercmp call
+        for name in package_diff.version_changed:
+            version_comparison = self._compare_versions(
+                current_packages.version_of(name), target_packages.version_of(name)
+            )
+            
+            if version_comparison > 0:
+                differences[name] = 'newer'
+            elif version_comparison < 0:
+                differences[name] = 'older'
+        
+        for name in package_diff.only_self:
+            differences[name] = 'extra'
         
         # Check packages only in target state
-        for name in target_packages:
-            if name not in current_packages:
-                differences[name] = 'missing'
+        for name in package_diff.only_other:
+            differences[name] = 'missing'
         
         return differences
     
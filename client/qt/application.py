@@ -7,7 +7,6 @@ supporting AppIndicator and KStatusNotifierItem protocols for cross-desktop comp
 
 import sys
 import logging
-from enum import Enum
 from typing import Optional, Callable
 from PyQt6.QtWidgets import (
     QApplication, QSystemTrayIcon, QMenu, QMessageBox, 
@@ -16,17 +15,9 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import QTimer, pyqtSignal, QObject, QThread
 from PyQt6.QtGui import QIcon, QPixmap, QAction, QColor
 
-logger = logging.getLogger(__name__)
-
+from client.sync_status import SyncStatus
 
-class SyncStatus(Enum):
-    """Enumeration of possible sync states."""
-    IN_SYNC = "in_sync"
-    AHEAD = "ahead"
-    BEHIND = "behind"
-    OFFLINE = "offline"
-    SYNCING = "syncing"
-    ERROR = "error"
+logger = logging.getLogger(__name__)
 
 
 class SyncStatusIndicator(QObject):
@@ -0,0 +1,199 @@
+"""
+Request coalescing for the Pacman Sync Utility client.
+
+Small API calls issued close together (for example the status report and
+offline replay of one update cycle) are collected for a short window and
+sent to the server as a single POST /api/batch. A lone call goes out as a
+normal request, and servers without the batch endpoint keep getting
+individual requests.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from shared.exceptions import NetworkError as StructuredNetworkError
+from shared.wire_format import JSON_CONTENT_TYPE, GZIP_ENCODING, encode_body
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH = "/api/batch"
+
+# Must not exceed the server's limit (server.api.batch.MAX_BATCH_OPERATIONS)
+MAX_BATCH_OPERATIONS = 50
+
+# Statuses of a batch request meaning the server has no batch endpoint
+UNSUPPORTED_STATUS_CODES = (404, 405)
+
+# How long to send individual requests after the server reported that
+UNSUPPORTED_RETRY_INTERVAL = 3600.0
+
+
+class BatchOperationError(Exception):
+    """A sub-operation of a batch failed on the server."""
+
+    def __init__(self, message: str, status_code: int, body: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class _PendingRequest:
+    """A queued call waiting for the next flush."""
+
+    __slots__ = ("method", "endpoint", "data", "params", "future")
+
+    def __init__(self, method: str, endpoint: str, data: Optional[Dict[str, Any]],
+                 params: Optional[Dict[str, Any]], future: asyncio.Future):
+        self.method = method
+        self.endpoint = endpoint
+        self.data = data
+        self.params = params
+        self.future = future
+
+
+class RequestBatcher:
+    """
+    Coalesces concurrent API calls into batch requests.
+
+    The send callable must perform a single request without batching; it is
+    called as send(method, endpoint, data=..., params=...) for individual
+    requests and with body/body_headers for the batch itself.
+    """
+
+    def __init__(
+        self,
+        send: Callable[..., Awaitable[Dict[str, Any]]],
+        window: float = 0.01,
+        max_operations: int = MAX_BATCH_OPERATIONS
+    ):
+        self._send = send
+        self.window = window
+        self.max_operations = max_operations
+        self._pending: List[_PendingRequest] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._unsupported_until = 0.0
+
+    @property
+    def batching_available(self) -> bool:
+        """Whether the server is currently assumed to support batching."""
+        return time.monotonic() >= self._unsupported_until
+
+    @property
+    def pending_count(self) -> int:
+        """Number of calls waiting for the next flush."""
+        return len(self._pending)
+
+    def enqueue(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None,
+                params: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+        """
+        Queue a call and return a future for its response.
+
+        Calls are sent in the order they were queued.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_PendingRequest(method, endpoint, data, params, future))
+        if self._flush_task is None:
+            self._flush_task = loop.create_task(self._flush_after_window())
+        return future
+
+    async def submit(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None,
+                     params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue a call and wait for its response."""
+        return await self.enqueue(method, endpoint, data, params)
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window)
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+
+        for start in range(0, len(pending), self.max_operations):
+            await self._flush(pending[start:start + self.max_operations])
+
+    async def _flush(self, requests: List[_PendingRequest]) -> None:
+        requests = [request for request in requests if not request.future.done()]
+        if len(requests) <= 1 or not self.batching_available:
+            await self._send_individually(requests)
+            return
+
+        payload = {'operations': [
+            {
+                'id': str(index),
+                'method': request.method,
+                'path': request.endpoint,
+                'params': request.params,
+                'body': request.data
+            }
+            for index, request in enumerate(requests)
+        ]}
+        body, body_headers = encode_body(payload, JSON_CONTENT_TYPE, GZIP_ENCODING)
+
+        try:
+            response = await self._send('POST', BATCH_PATH, body=body, body_headers=body_headers)
+        except StructuredNetworkError as e:
+            # Individual requests would fail the same way
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        except Exception as e:
+            # Only a missing endpoint disables batching; other failures such
+            # as 429 or a transient 5xx only affect this batch
+            if getattr(e, 'status_code', None) in UNSUPPORTED_STATUS_CODES:
+                logger.info(f"Server does not support batch requests ({e}); sending requests individually")
+                self._unsupported_until = time.monotonic() + UNSUPPORTED_RETRY_INTERVAL
+            else:
+                logger.warning(f"Batch request failed ({e}); sending its requests individually")
+            await self._send_individually(requests)
+            return
+
+        results = response.get('results') or []
+        retry = []
+        for index, request in enumerate(requests):
+            if request.future.done():
+                continue
+            if index >= len(results):
+                request.future.set_exception(BatchOperationError("Missing batch result", 500))
+                continue
+
+            status = results[index].get('status', 500)
+            result_body = results[index].get('body')
+            if 200 <= status < 300:
+                request.future.set_result(result_body if isinstance(result_body, dict) else {})
+            elif status == 401:
+                # Resend on its own so token refresh applies
+                retry.append(request)
+            else:
+                request.future.set_exception(BatchOperationError(
+                    f"Request failed ({status}): {_error_message(result_body)}", status, result_body
+                ))
+
+        await self._send_individually(retry)
+        logger.debug(f"Sent {len(requests)} requests in one batch")
+
+    async def _send_individually(self, requests: List[_PendingRequest]) -> None:
+        for request in requests:
+            if request.future.done():
+                continue
+            try:
+                result = await self._send(request.method, request.endpoint,
+                                          data=request.data, params=request.params)
+            except Exception as e:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            else:
+                if not request.future.done():
+                    request.future.set_result(result)
+
+
+def _error_message(body: Any) -> str:
+    """Extract a readable message from a sub-operation error body."""
+    if isinstance(body, dict):
+        error = body.get('error')
+        if isinstance(error, dict) and error.get('message'):
+            return error['message']
+        if body.get('detail'):
+            return str(body['detail'])
+    return str(body)
@@ -0,0 +1,402 @@
+"""
+Local system state snapshot store for the Pacman Sync Utility Client.
+
+Snapshots taken before sync, set-as-latest and revert operations are kept
+in a SQLite database in the XDG state directory. Each endpoint's history is
+a series of keyframes (complete package lists) followed by deltas against
+the latest keyframe, compressed with zstd when available and zlib
+otherwise. Lookups and retention go through an index on
+(endpoint_id, expired, id), so neither depends on how many snapshots exist.
+The latest keyframe is kept decoded between saves as a PackageSet.
+
+Requirements: 6.4, 11.3, 11.4
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from shared.models import PackageSet, PackageState, SystemState
+from client.offline_journal import get_state_directory
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DB_FILENAME = "snapshots.db"
+
+# Deltas stored against one keyframe before a new keyframe is written
+KEYFRAME_INTERVAL = 16
+
+# Snapshots kept per endpoint when saving; older ones are pruned
+DEFAULT_RETENTION = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    state_id TEXT UNIQUE,
+    endpoint_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    is_target INTEGER NOT NULL,
+    pacman_version TEXT NOT NULL,
+    architecture TEXT NOT NULL,
+    package_count INTEGER NOT NULL,
+    base_id INTEGER,
+    encoding TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    expired INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_endpoint ON snapshots (endpoint_id, expired, id);
+CREATE INDEX IF NOT EXISTS idx_snapshots_base ON snapshots (base_id);
+"""
+
+# Package rows are stored as [name, version, repository, installed_size, dependencies]
+PackageRow = List[Any]
+
+
+def _package_row(record: Tuple[str, str, str, int, Tuple[str, ...]]) -> PackageRow:
+    name, version, repository, installed_size, dependencies = record
+    return [name, version, repository, installed_size, list(dependencies)]
+
+
+def _package_set(rows: Iterable[PackageRow]) -> PackageSet:
+    packages = PackageSet()
+    for name, version, repository, installed_size, dependencies in rows:
+        packages.add(name, version, repository, installed_size, dependencies=dependencies)
+    return packages
+
+
+def compress_payload(data: Dict[str, Any]) -> Tuple[str, bytes]:
+    """Serialize and compress a snapshot payload, returning (encoding, blob)."""
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    if ZSTD_AVAILABLE:
+        return 'zstd', zstandard.ZstdCompressor(level=3).compress(raw)
+    return 'zlib', zlib.compress(raw, 6)
+
+
+def decompress_payload(encoding: str, blob: bytes) -> Dict[str, Any]:
+    """Decompress and parse a snapshot payload."""
+    if encoding == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise ValueError("snapshot is zstd-compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(blob)
+    elif encoding == 'zlib':
+        raw = zlib.decompress(blob)
+    else:
+        raise ValueError(f"unknown snapshot encoding: {encoding}")
+    return json.loads(raw)
+
+
+class StateManager:
+    """
+    Manages system state snapshots and history for revert operations.
+    
+    This class handles:
+    - Storing system state snapshots
+    - Retrieving previous states for revert operations
+    - Managing state history and cleanup
+    
+    The database may be shared by the GUI and CLI clients; SQLite
+    serialises their writes.
+    """
+    
+    def __init__(self, storage_path: str = None, retention: Optional[int] = DEFAULT_RETENTION):
+        """
+        Initialize the snapshot store.
+        
+        Args:
+            storage_path: Directory holding the snapshot database; defaults
+                to the client's XDG state directory
+            retention: Snapshots kept per endpoint after each save, or None
+                to keep all of them
+        """
+        if storage_path is None:
+            self.storage_path = str(get_state_directory())
+        else:
+            self.storage_path = storage_path
+        self.retention = retention
+        
+        # Ensure storage directory exists
+        Path(self.storage_path).mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(self.storage_path) / SNAPSHOT_DB_FILENAME
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=10.0,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        
+        # Last keyframe decoded while saving: (row id, packages)
+        self._keyframe: Optional[Tuple[int, PackageSet]] = None
+    
+    @contextmanager
+    def _transaction(self):
+        """Run statements in one write transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    def save_state(self, state: SystemState, is_target: bool = False) -> str:
+        """
+        Save a system state snapshot.
+        
+        Args:
+            state: SystemState to save
+            is_target: Whether this is a target state (vs. backup state)
+        
+        Returns:
+            State ID for later retrieval
+        """
+        packages = PackageSet.coerce(state.packages)
+        
+        try:
+            with self._transaction() as conn:
+                base_id, payload = self._encode_snapshot(conn, state.endpoint_id, packages)
+                encoding, blob = compress_payload(payload)
+                cursor = conn.execute(
+                    "INSERT INTO snapshots (endpoint_id, timestamp, is_target, pacman_version, "
+                    "architecture, package_count, base_id, encoding, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (state.endpoint_id, state.timestamp.isoformat(), int(is_target),
+                     state.pacman_version, state.architecture, len(packages), base_id, encoding, blob)
+                )
+                row_id = cursor.lastrowid
+                state_id = f"{state.endpoint_id}_{int(state.timestamp.timestamp())}_{row_id}"
+                conn.execute("UPDATE snapshots SET state_id = ? WHERE id = ?", (state_id, row_id))
+                
+                if self.retention is not None:
+                    self._prune(conn, state.endpoint_id, self.retention)
+            
+            if base_id is None:
+                self._keyframe = (row_id, packages)
+            
+            logger.info(f"Saved system state {state_id} with {len(state.packages)} packages "
+                        f"({'keyframe' if base_id is None else 'delta'}, {len(blob)} bytes)")
+            return state_id
+        
+        except Exception as e:
+            logger.error(f"Failed to save state for {state.endpoint_id}: {e}")
+            raise
+    
+    def _encode_snapshot(self, conn: sqlite3.Connection, endpoint_id: str,
+                         packages: PackageSet) -> Tuple[Optional[int], Dict[str, Any]]:
+        """
+        Encode a snapshot as a delta against the latest keyframe if worthwhile.
+        
+        Returns:
+            Tuple of (keyframe id or None for a new keyframe, payload)
+        """
+        keyframe = conn.execute(
+            "SELECT id, encoding, payload FROM snapshots "
+            "WHERE endpoint_id = ? AND base_id IS NULL ORDER BY id DESC LIMIT 1",
+            (endpoint_id,)
+        ).fetchone()
+        
+        if keyframe is not None:
+            keyframe_id = keyframe[0]
+            delta_count = conn.execute(
+                "SELECT COUNT(*) FROM snapshots WHERE base_id = ?", (keyframe_id,)
+            ).fetchone()[0]
+            
+            if delta_count < KEYFRAME_INTERVAL:
+                if self._keyframe is None or self._keyframe[0] != keyframe_id:
+                    rows = decompress_payload(keyframe[1], keyframe[2])['packages']
+                    self._keyframe = (keyframe_id, _package_set(rows))
+                base = self._keyframe[1]
+                
+                upsert = [_package_row(record) for record in packages.records() if base.record(record[0]) != record]
+                remove = [name for name in base.names if name not in packages]
+                
+                # A delta larger than half a keyframe is not worth keeping
+                if len(upsert) + len(remove) <= len(packages) // 2:
+                    return keyframe_id, {'upsert': upsert, 'remove': remove}
+        
+        return None, {'packages': [_package_row(record) for record in packages.records()]}
+    
+    def load_state(self, state_id: str) -> Optional[SystemState]:
+        """
+        Load a system state snapshot.
+        
+        Args:
+            state_id: ID of the state to load
+        
+        Returns:
+            SystemState object or None if not found
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT endpoint_id, timestamp, pacman_version, architecture, base_id, encoding, payload "
+                    "FROM snapshots WHERE state_id = ?",
+                    (state_id,)
+                ).fetchone()
+                if row is None:
+                    logger.warning(f"State not found: {state_id}")
+                    return None
+                
+                endpoint_id, timestamp, pacman_version, architecture, base_id, encoding, blob = row
+                payload = decompress_payload(encoding, blob)
+                
+                if base_id is None:
+                    package_rows = payload['packages']
+                else:
+                    keyframe = self._conn.execute(
+                        "SELECT encoding, payload FROM snapshots WHERE id = ?", (base_id,)
+                    ).fetchone()
+                    merged = {row[0]: row for row in decompress_payload(*keyframe)['packages']}
+                    for name in payload['remove']:
+                        merged.pop(name, None)
+                    for package_row in payload['upsert']:
+                        merged[package_row[0]] = package_row
+                    package_rows = list(merged.values())
+            
+            packages = [
+                PackageState(
+                    package_name=name,
+                    version=version,
+                    repository=repository,
+                    installed_size=installed_size,
+                    dependencies=dependencies
+                )
+                for name, version, repository, installed_size, dependencies in package_rows
+            ]
+            
+            state = SystemState(
+                endpoint_id=endpoint_id,
+                timestamp=datetime.fromisoformat(timestamp),
+                packages=packages,
+                pacman_version=pacman_version,
+                architecture=architecture
+            )
+            
+            logger.info(f"Loaded system state {state_id} with {len(packages)} packages")
+            return state
+        
+        except Exception as e:
+            logger.error(f"Failed to load state {state_id}: {e}")
+            return None
+    
+    def list_states(self, endpoint_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        List the most recent snapshots of an endpoint without loading them.
+        
+        Args:
+            endpoint_id: ID of the endpoint
+            limit: Maximum number of snapshots to return
+        
+        Returns:
+            Snapshot metadata, newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state_id, timestamp, is_target, package_count FROM snapshots "
+                "WHERE endpoint_id = ? AND expired = 0 ORDER BY id DESC LIMIT ?",
+                (endpoint_id, limit)
+            ).fetchall()
+        
+        return [
+            {
+                'state_id': state_id,
+                'timestamp': datetime.fromisoformat(timestamp),
+                'is_target': bool(is_target),
+                'package_count': package_count
+            }
+            for state_id, timestamp, is_target, package_count in rows
+        ]
+    
+    def get_previous_state(self, endpoint_id: str) -> Optional[SystemState]:
+        """
+        Get the most recent previous state for an endpoint.
+        
+        Args:
+            endpoint_id: ID of the endpoint
+        
+        Returns:
+            Most recent SystemState or None if no previous state exists
+        """
+        try:
+            recent = self.list_states(endpoint_id, limit=1)
+            if not recent:
+                logger.info(f"No previous states found for endpoint {endpoint_id}")
+                return None
+            
+            return self.load_state(recent[0]['state_id'])
+        
+        except Exception as e:
+            logger.error(f"Failed to get previous state for {endpoint_id}: {e}")
+            return None
+    
+    def cleanup_old_states(self, endpoint_id: str, keep_count: int = 10):
+        """
+        Clean up old states, keeping only the most recent ones.
+        
+        Args:
+            endpoint_id: ID of the endpoint
+            keep_count: Number of recent states to keep
+        """
+        try:
+            with self._transaction() as conn:
+                removed = self._prune(conn, endpoint_id, keep_count)
+            
+            if removed:
+                logger.info(f"Cleaned up {removed} old states for {endpoint_id}")
+        
+        except Exception as e:
+            logger.error(f"Failed to cleanup old states for {endpoint_id}: {e}")
+    
+    def _prune(self, conn: sqlite3.Connection, endpoint_id: str, keep_count: int) -> int:
+        """
+        Expire all but the newest keep_count snapshots of an endpoint.
+        
+        Expired snapshots are deleted unless a kept delta still needs them as
+        its keyframe; those stay, hidden from listings, until no longer
+        referenced.
+        
+        Returns:
+            Number of snapshots expired
+        """
+        if keep_count > 0:
+            cutoff = conn.execute(
+                "SELECT id FROM snapshots WHERE endpoint_id = ? AND expired = 0 "
+                "ORDER BY id DESC LIMIT 1 OFFSET ?",
+                (endpoint_id, keep_count - 1)
+            ).fetchone()
+            if cutoff is None:
+                return 0
+            cutoff_id = cutoff[0]
+        else:
+            cutoff_id = None
+        
+        condition = "endpoint_id = ?" + (" AND id < ?" if cutoff_id is not None else "")
+        params = (endpoint_id,) + ((cutoff_id,) if cutoff_id is not None else ())
+        
+        expired = conn.execute(
+            f"UPDATE snapshots SET expired = 1 WHERE {condition} AND expired = 0", params
+        ).rowcount
+        conn.execute(
+            f"DELETE FROM snapshots WHERE {condition} AND expired = 1 "
+            f"AND id NOT IN (SELECT base_id FROM snapshots WHERE endpoint_id = ? "
+            f"AND expired = 0 AND base_id IS NOT NULL)",
+            params + (endpoint_id,)
+        )
+        return expired
@@ -0,0 +1,114 @@
+"""
+Fast status shim for the Pacman Sync Utility Client.
+
+Answers `--status` and WayBar status lookups from the running client over
+the local status socket. Only the standard library is imported on this
+path; the full client (client.main) is loaded only when no client is
+running.
+
+Usage:
+    python client/status_cli.py [--json] [--verbose] [--quiet]
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from client.status_socket import query_status
+
+# Exit code when no status information is available (matches client.main)
+EXIT_NO_STATUS = 8
+
+
+def format_status_lines(summary: Dict[str, Any], is_fresh: bool, verbose: bool) -> List[str]:
+    """
+    Format a status summary for the terminal.
+    
+    Args:
+        summary: Summary as returned by StatusPersistenceManager.get_status_summary()
+        is_fresh: Whether the status was updated recently
+        verbose: Whether to include details
+    
+    Returns:
+        Output lines
+    """
+    if not verbose:
+        status_text = summary['status'].upper()
+        if not is_fresh:
+            status_text += " (stale)"
+        return [f"Status: {status_text}"]
+    
+    lines = [
+        f"Status: {summary['status'].upper()}",
+        f"Endpoint: {summary['endpoint_name']}",
+        f"Server: {summary['server_url']}",
+        f"Authenticated: {'Yes' if summary['is_authenticated'] else 'No'}",
+        f"Last Updated: {summary['last_updated']}",
+    ]
+    if summary.get('last_operation'):
+        lines.append(f"Last Operation: {summary['last_operation']}")
+    if summary.get('operation_result'):
+        lines.append(f"Result: {summary['operation_result']}")
+    if summary.get('packages_count'):
+        lines.append(f"Packages: {summary['packages_count']}")
+    if summary.get('last_sync_time'):
+        lines.append(f"Last Sync: {summary['last_sync_time']}")
+    if not is_fresh:
+        lines.append("⚠ Status information may be outdated")
+    return lines
+
+
+def print_daemon_status(json_output: bool = False, verbose: bool = False,
+                        quiet: bool = False) -> Optional[int]:
+    """
+    Print status obtained from the running client.
+    
+    Returns:
+        Exit code, or None if no client answered and the caller should fall
+        back to reading the status file itself
+    """
+    if json_output:
+        response = query_status('waybar-verbose' if verbose else 'waybar')
+        if response is None or 'error' in response:
+            return None
+        print(json.dumps(response))
+        return 0
+    
+    response = query_status('status')
+    if response is None or 'error' in response:
+        return None
+    if not response.get('available'):
+        if not quiet:
+            print("Status: Unknown (no status information available)")
+        return EXIT_NO_STATUS
+    
+    for line in format_status_lines(response, response.get('is_fresh', True), verbose):
+        print(line)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point: answer from the daemon or defer to client.main --status."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    known = {'--json', '--verbose', '-v', '--quiet', '-q'}
+    
+    if set(argv) <= known:
+        result = print_daemon_status(
+            json_output='--json' in argv,
+            verbose='--verbose' in argv or '-v' in argv,
+            quiet='--quiet' in argv or '-q' in argv
+        )
+        if result is not None:
+            return result
+    
+    from client.main import main as client_main
+    sys.argv = [sys.argv[0], '--status'] + argv
+    return client_main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
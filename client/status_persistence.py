@@ -3,33 +3,46 @@ Status Persistence for Pacman Sync Utility Client.
 
 This module handles persistent storage of sync status and state information
 to maintain consistency between GUI and CLI modes.
+
+Writers serialize on an flock(2) lock and replace the status file
+atomically, so readers never lock: they either see the old or the new file.
+A small fixed-layout record (status.rec) is additionally kept up to date in
+place and can be read through mmap by status bar helpers without parsing
+JSON.
 """
 
+import dataclasses
+import fcntl
 import json
 import logging
+import mmap
 import os
+import struct
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 
-# Import SyncStatus with fallback
-try:
-    from client.qt.application import SyncStatus
-except ImportError:
-    # Define SyncStatus locally if Qt is not available
-    from enum import Enum
-    class SyncStatus(Enum):
-        IN_SYNC = "in_sync"
-        AHEAD = "ahead"
-        BEHIND = "behind"
-        OFFLINE = "offline"
-        SYNCING = "syncing"
-        ERROR = "error"
+from client.sync_status import SyncStatus
 
 logger = logging.getLogger(__name__)
 
+# Fixed layout of status.rec: magic, sequence, last_updated (epoch seconds),
+# status code, authenticated flag, packages count (-1 when unknown).
+# The sequence is odd while a write is in progress (seqlock).
+STATUS_RECORD = struct.Struct('<4sQdb?xxi')
+STATUS_RECORD_MAGIC = b'PSR1'
+_RECORD_SEQ = struct.Struct('<Q')
+_RECORD_SEQ_OFFSET = 4
+_RECORD_BODY = struct.Struct('<db?xxi')
+_RECORD_BODY_OFFSET = _RECORD_SEQ_OFFSET + _RECORD_SEQ.size
+
+# Status codes stored in the record; append only, never reorder
+STATUS_RECORD_CODES = ('in_sync', 'ahead', 'behind', 'offline', 'syncing', 'error')
+
 
 @dataclass
 class PersistedStatus:
@@ -47,6 +60,15 @@ class PersistedStatus:
     is_authenticated: bool = False
 
 
+@dataclass
+class StatusRecord:
+    """Subset of the persisted status readable from the mmap record."""
+    status: SyncStatus
+    last_updated: datetime
+    is_authenticated: bool
+    packages_count: Optional[int] = None
+
+
 class StatusPersistenceManager:
     """
     Manages persistent storage of sync status and related information.
@@ -55,22 +77,38 @@ class StatusPersistenceManager:
     by storing status information in a local file.
     """
     
-    def __init__(self, config_dir: Optional[str] = None):
+    def __init__(self, config_dir: Optional[str] = None, use_status_record: bool = True):
         """
         Initialize the status persistence manager.
         
         Args:
             config_dir: Optional custom configuration directory
+            use_status_record: Whether to maintain the mmap status record
         """
         self._config_dir = self._get_config_directory(config_dir)
         self._status_file = self._config_dir / "status.json"
         self._lock_file = self._config_dir / "status.lock"
+        self._record_file = self._config_dir / "status.rec"
+        self._use_status_record = use_status_record
+        
+        # Writer lock: thread lock within the process, flock across processes
+        self._thread_lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        
+        # Last status read or written, keyed on the file identity it came from
+        self._cache: Tuple[Optional[Tuple[int, int, int]], Optional[PersistedStatus]] = (None, None)
+        self._record_map: Optional[mmap.mmap] = None
         
         # Ensure config directory exists
         self._config_dir.mkdir(parents=True, exist_ok=True)
         
         logger.info(f"Status persistence initialized: {self._status_file}")
     
+    @property
+    def status_file(self) -> Path:
+        """Path of the persisted status file."""
+        return self._status_file
+    
     def _get_config_directory(self, custom_dir: Optional[str] = None) -> Path:
         """Get the configuration directory path."""
         if custom_dir:
@@ -85,7 +123,10 @@ class StatusPersistenceManager:
     
     def _acquire_lock(self, timeout: float = 5.0) -> bool:
         """
-        Acquire a file lock to prevent concurrent access.
+        Acquire the exclusive writer lock.
+        
+        Uses flock(2), so a lock held by a process that died is released by
+        the kernel. Only writers lock; readers rely on atomic replacement.
         
         Args:
             timeout: Maximum time to wait for lock acquisition
@@ -93,49 +134,49 @@ class StatusPersistenceManager:
         Returns:
             True if lock was acquired, False otherwise
         """
-        import time
-        start_time = time.time()
+        if not self._thread_lock.acquire(timeout=timeout):
+            logger.warning(f"Failed to acquire lock within {timeout} seconds")
+            return False
+        
+        try:
+            fd = os.open(self._lock_file, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o600)
+        except OSError as e:
+            self._thread_lock.release()
+            logger.warning(f"Failed to acquire lock: {e}")
+            return False
         
-        while time.time() - start_time < timeout:
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while True:
             try:
-                # Try to create lock file exclusively
-                with open(self._lock_file, 'x') as f:
-                    f.write(str(os.getpid()))
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._lock_fd = fd
                 return True
-            except FileExistsError:
-                # Lock file exists, check if process is still running
-                try:
-                    with open(self._lock_file, 'r') as f:
-                        pid = int(f.read().strip())
-                    
-                    # Check if process is still running (Unix-specific)
-                    try:
-                        os.kill(pid, 0)  # Signal 0 just checks if process exists
-                        # Process is running, wait a bit
-                        time.sleep(0.1)
-                        continue
-                    except (OSError, ProcessLookupError):
-                        # Process is not running, remove stale lock
-                        self._lock_file.unlink(missing_ok=True)
-                        continue
-                        
-                except (ValueError, FileNotFoundError):
-                    # Invalid lock file, remove it
-                    self._lock_file.unlink(missing_ok=True)
-                    continue
-            except Exception as e:
-                logger.warning(f"Failed to acquire lock: {e}")
-                return False
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    break
+                # Writers hold the lock for a single small write
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
         
+        os.close(fd)
+        self._thread_lock.release()
         logger.warning(f"Failed to acquire lock within {timeout} seconds")
         return False
     
     def _release_lock(self) -> None:
-        """Release the file lock."""
+        """Release the writer lock."""
+        if self._lock_fd is None:
+            return
+        
         try:
-            self._lock_file.unlink(missing_ok=True)
-        except Exception as e:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+        except OSError as e:
             logger.warning(f"Failed to release lock: {e}")
+        finally:
+            self._lock_fd = None
+            self._thread_lock.release()
     
     def save_status(self, status: PersistedStatus) -> bool:
         """
@@ -151,6 +192,13 @@ class StatusPersistenceManager:
             logger.error("Failed to acquire lock for status save")
             return False
         
+        try:
+            return self._write_status(status)
+        finally:
+            self._release_lock()
+    
+    def _write_status(self, status: PersistedStatus) -> bool:
+        """Replace the status file atomically; the caller holds the lock."""
         try:
             # Convert to dictionary for JSON serialization
             status_dict = asdict(status)
@@ -167,9 +215,14 @@ class StatusPersistenceManager:
             
             with open(temp_file, 'w') as f:
                 json.dump(status_dict, f, indent=2)
+                signature = self._signature(os.fstat(f.fileno()))
             
             # Atomic rename
             temp_file.replace(self._status_file)
+            self._cache = (signature, dataclasses.replace(status))
+            
+            if self._use_status_record:
+                self._write_status_record(status)
             
             logger.debug(f"Status saved: {status.status.value}")
             return True
@@ -177,28 +230,37 @@ class StatusPersistenceManager:
         except Exception as e:
             logger.error(f"Failed to save status: {e}")
             return False
-        finally:
-            self._release_lock()
+    
+    @staticmethod
+    def _signature(stat: os.stat_result) -> Tuple[int, int, int]:
+        """Identity of a status file version; changes on every replacement."""
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
     
     def load_status(self) -> Optional[PersistedStatus]:
         """
         Load status information from persistent storage.
         
+        Does not lock: the file is only ever replaced atomically. An
+        unchanged file is served from memory without parsing.
+        
         Returns:
             Loaded status information or None if not available
         """
-        if not self._status_file.exists():
+        try:
+            with open(self._status_file, 'r') as f:
+                signature = self._signature(os.fstat(f.fileno()))
+                cached_signature, cached_status = self._cache
+                if signature == cached_signature and cached_status is not None:
+                    return dataclasses.replace(cached_status)
+                status_dict = json.load(f)
+        except FileNotFoundError:
             logger.debug("Status file does not exist")
             return None
-        
-        if not self._acquire_lock():
-            logger.error("Failed to acquire lock for status load")
+        except Exception as e:
+            logger.error(f"Failed to load status: {e}")
             return None
         
         try:
-            with open(self._status_file, 'r') as f:
-                status_dict = json.load(f)
-            
             # Convert string values back to appropriate types
             if 'status' in status_dict:
                 status_dict['status'] = SyncStatus(status_dict['status'])
@@ -209,6 +271,7 @@ class StatusPersistenceManager:
             
             # Create PersistedStatus object
             status = PersistedStatus(**status_dict)
+            self._cache = (signature, dataclasses.replace(status))
             
             logger.debug(f"Status loaded: {status.status.value}")
             return status
@@ -216,8 +279,67 @@ class StatusPersistenceManager:
         except Exception as e:
             logger.error(f"Failed to load status: {e}")
             return None
-        finally:
-            self._release_lock()
+    
+    def _write_status_record(self, status: Optional[PersistedStatus]) -> None:
+        """Update the mmap status record in place; the caller holds the lock."""
+        try:
+            with open(self._record_file, 'a+b') as f:
+                if os.fstat(f.fileno()).st_size < STATUS_RECORD.size:
+                    f.truncate(STATUS_RECORD.size)
+                with mmap.mmap(f.fileno(), STATUS_RECORD.size) as record:
+                    seq = _RECORD_SEQ.unpack_from(record, _RECORD_SEQ_OFFSET)[0]
+                    seq += seq & 1  # recover from a writer that died mid-update
+                    
+                    _RECORD_SEQ.pack_into(record, _RECORD_SEQ_OFFSET, seq + 1)
+                    record[:len(STATUS_RECORD_MAGIC)] = STATUS_RECORD_MAGIC
+                    if status is None:
+                        _RECORD_BODY.pack_into(record, _RECORD_BODY_OFFSET, 0.0, -1, False, -1)
+                    else:
+                        packages = status.packages_count if status.packages_count is not None else -1
+                        _RECORD_BODY.pack_into(
+                            record, _RECORD_BODY_OFFSET,
+                            status.last_updated.timestamp(),
+                            STATUS_RECORD_CODES.index(status.status.value),
+                            status.is_authenticated,
+                            packages
+                        )
+                    _RECORD_SEQ.pack_into(record, _RECORD_SEQ_OFFSET, seq + 2)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Failed to update status record: {e}")
+    
+    def load_status_record(self) -> Optional[StatusRecord]:
+        """
+        Read the status from the mmap record without locking or parsing JSON.
+        
+        Returns:
+            Status record, or None if no record has been written
+        """
+        if self._record_map is None:
+            try:
+                with open(self._record_file, 'rb') as f:
+                    self._record_map = mmap.mmap(f.fileno(), STATUS_RECORD.size, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None
+        
+        record = self._record_map
+        for _ in range(100):
+            data = record[:STATUS_RECORD.size]
+            magic, seq, timestamp, code, authenticated, packages = STATUS_RECORD.unpack(data)
+            if seq & 1 or _RECORD_SEQ.unpack_from(record, _RECORD_SEQ_OFFSET)[0] != seq:
+                # Writer in progress; retry
+                time.sleep(0)
+                continue
+            if magic != STATUS_RECORD_MAGIC or not 0 <= code < len(STATUS_RECORD_CODES):
+                return None
+            return StatusRecord(
+                status=SyncStatus(STATUS_RECORD_CODES[code]),
+                last_updated=datetime.fromtimestamp(timestamp),
+                is_authenticated=authenticated,
+                packages_count=packages if packages >= 0 else None
+            )
+        
+        logger.debug("Status record kept changing while reading")
+        return None
     
     def update_status(self, status: SyncStatus, **kwargs) -> bool:
         """
@@ -230,23 +352,30 @@ class StatusPersistenceManager:
         Returns:
             True if successful, False otherwise
         """
-        # Load existing status or create new one
-        current = self.load_status()
-        if current is None:
-            current = PersistedStatus(
-                status=status,
-                last_updated=datetime.now()
-            )
-        else:
-            current.status = status
-            current.last_updated = datetime.now()
-        
-        # Update additional fields
-        for key, value in kwargs.items():
-            if hasattr(current, key):
-                setattr(current, key, value)
+        if not self._acquire_lock():
+            logger.error("Failed to acquire lock for status save")
+            return False
         
-        return self.save_status(current)
+        try:
+            # Load existing status or create new one
+            current = self.load_status()
+            if current is None:
+                current = PersistedStatus(
+                    status=status,
+                    last_updated=datetime.now()
+                )
+            else:
+                current.status = status
+                current.last_updated = datetime.now()
+            
+            # Update additional fields
+            for key, value in kwargs.items():
+                if hasattr(current, key):
+                    setattr(current, key, value)
+            
+            return self._write_status(current)
+        finally:
+            self._release_lock()
     
     def update_operation_result(self, operation: str, success: bool, message: str) -> bool:
         """
@@ -260,21 +389,28 @@ class StatusPersistenceManager:
         Returns:
             True if successful, False otherwise
         """
-        current = self.load_status()
-        if current is None:
-            current = PersistedStatus(
-                status=SyncStatus.OFFLINE,
-                last_updated=datetime.now()
-            )
-        
-        current.last_operation = operation
-        current.operation_result = f"{'SUCCESS' if success else 'FAILED'}: {message}"
-        current.last_updated = datetime.now()
-        
-        if operation in ['sync', 'set_latest', 'revert']:
-            current.last_sync_time = datetime.now()
+        if not self._acquire_lock():
+            logger.error("Failed to acquire lock for status save")
+            return False
         
-        return self.save_status(current)
+        try:
+            current = self.load_status()
+            if current is None:
+                current = PersistedStatus(
+                    status=SyncStatus.OFFLINE,
+                    last_updated=datetime.now()
+                )
+            
+            current.last_operation = operation
+            current.operation_result = f"{'SUCCESS' if success else 'FAILED'}: {message}"
+            current.last_updated = datetime.now()
+            
+            if operation in ['sync', 'set_latest', 'revert']:
+                current.last_sync_time = datetime.now()
+            
+            return self._write_status(current)
+        finally:
+            self._release_lock()
     
     def update_authentication(self, is_authenticated: bool, endpoint_id: Optional[str] = None,
                             endpoint_name: Optional[str] = None, server_url: Optional[str] = None) -> bool:
@@ -290,26 +426,33 @@ class StatusPersistenceManager:
         Returns:
             True if successful, False otherwise
         """
-        current = self.load_status()
-        if current is None:
-            current = PersistedStatus(
-                status=SyncStatus.OFFLINE if not is_authenticated else SyncStatus.IN_SYNC,
-                last_updated=datetime.now()
-            )
-        
-        current.is_authenticated = is_authenticated
-        current.endpoint_id = endpoint_id
-        current.endpoint_name = endpoint_name
-        current.server_url = server_url
-        current.last_updated = datetime.now()
-        
-        # Update status based on authentication
-        if not is_authenticated:
-            current.status = SyncStatus.OFFLINE
-        elif current.status == SyncStatus.OFFLINE:
-            current.status = SyncStatus.IN_SYNC  # Default to in_sync when connected
+        if not self._acquire_lock():
+            logger.error("Failed to acquire lock for status save")
+            return False
         
-        return self.save_status(current)
+        try:
+            current = self.load_status()
+            if current is None:
+                current = PersistedStatus(
+                    status=SyncStatus.OFFLINE if not is_authenticated else SyncStatus.IN_SYNC,
+                    last_updated=datetime.now()
+                )
+            
+            current.is_authenticated = is_authenticated
+            current.endpoint_id = endpoint_id
+            current.endpoint_name = endpoint_name
+            current.server_url = server_url
+            current.last_updated = datetime.now()
+            
+            # Update status based on authentication
+            if not is_authenticated:
+                current.status = SyncStatus.OFFLINE
+            elif current.status == SyncStatus.OFFLINE:
+                current.status = SyncStatus.IN_SYNC  # Default to in_sync when connected
+            
+            return self._write_status(current)
+        finally:
+            self._release_lock()
     
     def is_status_fresh(self, max_age_seconds: int = 300) -> bool:
         """
@@ -341,6 +484,9 @@ class StatusPersistenceManager:
         
         try:
             self._status_file.unlink(missing_ok=True)
+            self._cache = (None, None)
+            if self._use_status_record:
+                self._write_status_record(None)
             logger.info("Status file cleared")
             return True
         except Exception as e:
@@ -0,0 +1,268 @@
+"""
+Local Status Socket for Pacman Sync Utility Client.
+
+The running client answers status queries over a Unix domain socket so that
+WayBar refreshes and `--status` calls do not have to load the client stack,
+take the status file lock and parse the status file in a new process.
+
+Protocol: the caller sends one command per connection as a single line
+(e.g. "waybar\n") and receives one JSON object terminated by a newline.
+Unknown commands are answered with {"error": ...}.
+
+The query side only uses the standard library; keep it that way so the CLI
+shim (client/status_cli.py) stays fast to start.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOCKET_NAME = 'status.sock'
+
+# Largest response accepted from the daemon
+MAX_RESPONSE_SIZE = 64 * 1024
+
+
+def get_socket_path() -> Optional[Path]:
+    """
+    Get the status socket path.
+    
+    Uses $XDG_RUNTIME_DIR/pacman-sync/status.sock. Without a runtime
+    directory there is no socket: a shared location such as /tmp could be
+    taken over by another user to intercept or spoof status responses.
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / 'pacman-sync' / SOCKET_NAME
+    return None
+
+
+def check_private_directory(path: Path) -> None:
+    """
+    Make sure only the current user can reach sockets in a directory.
+    
+    Raises:
+        PermissionError: If the directory is a symlink, belongs to another
+            user or is accessible to other users
+    """
+    info = os.lstat(path)
+    if stat.S_ISLNK(info.st_mode) or not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by uid {info.st_uid}")
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        raise PermissionError(f"{path} has mode {stat.S_IMODE(info.st_mode):o}, expected 700")
+
+
+def query_status(command: str = 'status', path: Optional[Path] = None,
+                 timeout: float = 0.5) -> Optional[Dict[str, Any]]:
+    """
+    Ask the running client for status information.
+    
+    Args:
+        command: Query command (status, waybar, waybar-verbose, ping)
+        path: Socket path (defaults to get_socket_path())
+        timeout: Seconds to wait for the daemon
+    
+    Returns:
+        Decoded response, or None if no client is answering
+    """
+    path = path or get_socket_path()
+    if path is None:
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(os.fspath(path))
+            sock.sendall(command.encode() + b'\n')
+            
+            data = b''
+            while not data.endswith(b'\n') and len(data) < MAX_RESPONSE_SIZE:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+        
+        response = json.loads(data)
+        return response if isinstance(response, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+class _StatusRequestHandler(socketserver.StreamRequestHandler):
+    """Answers a single status query."""
+    
+    def handle(self):
+        command = self.rfile.readline(256).decode(errors='replace').strip()
+        response = self.server.status_server.respond(command)
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class StatusSocketServer:
+    """
+    Serves status queries for the running client.
+    
+    Responses are cached per command until the status file is replaced or
+    max_age seconds pass, so repeated bar refreshes cost a stat() call.
+    """
+    
+    def __init__(self, handlers: Dict[str, Callable[[], Dict[str, Any]]],
+                 path: Optional[Path] = None, status_file: Optional[Path] = None,
+                 max_age: float = 5.0):
+        """
+        Initialize the status socket server.
+        
+        Args:
+            handlers: Command name to response builder
+            path: Socket path (defaults to get_socket_path())
+            status_file: File whose replacement invalidates cached responses
+            max_age: Maximum seconds a cached response is reused
+        """
+        self.path = Path(path) if path else get_socket_path()
+        self.status_file = status_file
+        self.max_age = max_age
+        self._handlers = dict(handlers)
+        self._handlers.setdefault('ping', lambda: {'pong': True})
+        
+        self._cache: Dict[str, Tuple[Any, float, Dict[str, Any]]] = {}
+        self._cache_lock = threading.Lock()
+        self._server: Optional[_ThreadingUnixServer] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> bool:
+        """
+        Start answering queries in a background thread.
+        
+        Returns:
+            True if serving, False if another client already owns the socket,
+            there is no runtime directory, the socket directory is not
+            private to this user or the socket could not be created
+        """
+        if self.path is None:
+            logger.info("XDG_RUNTIME_DIR is not set; not serving status queries")
+            return False
+        
+        try:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            check_private_directory(self.path.parent)
+            if self.path.exists() or self.path.is_symlink():
+                if query_status('ping', self.path) is not None:
+                    logger.warning(f"Status socket already served by another client: {self.path}")
+                    return False
+                # Left behind by a client that did not shut down cleanly
+                self.path.unlink()
+            
+            self._server = _ThreadingUnixServer(os.fspath(self.path), _StatusRequestHandler)
+            self._server.status_server = self
+            os.chmod(self.path, 0o600)
+        except OSError as e:
+            logger.warning(f"Cannot serve status socket {self.path}: {e}")
+            self._server = None
+            return False
+        
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='status-socket', daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Serving status queries on {self.path}")
+        return True
+    
+    def stop(self) -> None:
+        """Stop serving and remove the socket."""
+        if self._server is None:
+            return
+        
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+    
+    def invalidate(self) -> None:
+        """Drop cached responses, e.g. after an in-process status change."""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def respond(self, command: str) -> Dict[str, Any]:
+        """Build (or reuse) the response for a command."""
+        handler = self._handlers.get(command)
+        if handler is None:
+            return {'error': f'unknown command: {command}'}
+        
+        signature = self._status_signature()
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(command)
+            if cached and cached[0] == signature and now - cached[1] < self.max_age:
+                return cached[2]
+        
+        try:
+            response = handler()
+        except Exception as e:
+            logger.error(f"Status query '{command}' failed: {e}")
+            return {'error': str(e)}
+        
+        with self._cache_lock:
+            self._cache[command] = (signature, now, response)
+        return response
+    
+    def _status_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the current status file; changes on every atomic replace."""
+        if self.status_file is None:
+            return None
+        try:
+            stat = os.stat(self.status_file)
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def build_status_handlers(status_manager, waybar) -> Dict[str, Callable[[], Dict[str, Any]]]:
+    """
+    Query handlers backed by the client's status persistence.
+    
+    Args:
+        status_manager: StatusPersistenceManager of the running client
+        waybar: WayBarIntegration used to format bar output
+    
+    Returns:
+        Handlers for the status, waybar and waybar-verbose commands
+    """
+    def status() -> Dict[str, Any]:
+        summary = status_manager.get_status_summary()
+        if summary.get('last_updated') is None:
+            return {'available': False}
+        summary['available'] = True
+        summary['is_fresh'] = status_manager.is_status_fresh(max_age_seconds=300)
+        return summary
+    
+    return {
+        'status': status,
+        'waybar': lambda: waybar.get_waybar_status(include_detailed_tooltip=False),
+        'waybar-verbose': lambda: waybar.get_waybar_status(include_detailed_tooltip=True),
+    }
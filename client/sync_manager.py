@@ -9,14 +9,18 @@ import asyncio
 import logging
 import socket
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Optional, Callable, Dict, Any
-from PyQt6.QtCore import QObject, QTimer, pyqtSignal, QThread, pyqtSlot
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, QThread, pyqtSlot, QFileSystemWatcher
 
 from client.api_client import PacmanSyncAPIClient, APIClientError, AuthenticationError, NetworkError, RetryConfig
+from client.change_watcher import PACMAN_LOCAL_DB, TRANSACTION_STAMP
 from client.config import ClientConfiguration
-from client.qt.application import SyncStatus
+from client.offline_journal import OfflineJournal
+from client.sync_status import SyncStatus
 from client.package_operations import PackageSynchronizer, StateManager, PackageOperationError
-from client.pacman_interface import PacmanInterface
+from client.archive_fetcher import ArchiveMirrorFetcher
+from client.pacman_interface import PacmanInterface, PackageStateDetector
 from client.status_persistence import StatusPersistenceManager
 from client.error_handling import ClientErrorHandler, ErrorDisplayMode, setup_client_error_handling
 from shared.models import OperationType, SystemState, Repository
@@ -36,12 +40,15 @@ class AsyncWorker(QThread):
     operation_completed = pyqtSignal(str, bool, str)  # operation_type, success, message
     status_updated = pyqtSignal(object)  # SyncStatus
     error_occurred = pyqtSignal(str, str)  # error_type, message
+    server_event = pyqtSignal(dict)  # change notification pushed by the server
+    operation_progress = pyqtSignal(str, int, int)  # stage, completed, total
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self._operations_queue = None
         self._running = False
         self._loop = None
+        self._watch_task: Optional[asyncio.Task] = None
     
     def run(self):
         """Run the async event loop in the worker thread."""
@@ -78,6 +85,8 @@ class AsyncWorker(QThread):
                 continue
             except Exception as e:
                 logger.error(f"Error processing operation: {e}")
+        
+        await self._stop_watching_server()
     
     async def _execute_operation(self, operation: Dict[str, Any]):
         """Execute a single operation."""
@@ -94,6 +103,12 @@ class AsyncWorker(QThread):
                 await self._handle_submit_repository_info(operation)
             elif op_type == 'process_offline_operations':
                 await self._handle_process_offline_operations(operation)
+            elif op_type == 'periodic_update':
+                await self._handle_periodic_update(operation)
+            elif op_type == 'detect_status':
+                await self._handle_detect_status(operation)
+            elif op_type == 'watch_server':
+                await self._handle_watch_server(operation)
             elif op_type == 'execute_sync_to_latest':
                 await self._handle_execute_sync_to_latest(operation)
             elif op_type == 'execute_set_as_latest':
@@ -165,12 +180,124 @@ class AsyncWorker(QThread):
         except Exception as e:
             self.operation_completed.emit('process_offline_operations', False, str(e))
     
+    async def _handle_periodic_update(self, operation: Dict[str, Any]):
+        """
+        Handle the periodic offline replay and status report.
+        
+        Both run concurrently so the API client can send them in one batch;
+        the replay is started first so queued updates stay ahead of the
+        current status.
+        """
+        steps = []
+        if operation['process_offline']:
+            steps.append(self._handle_process_offline_operations(operation))
+        if operation.get('endpoint_id'):
+            steps.append(self._handle_report_status(operation))
+        await asyncio.gather(*steps)
+    
+    async def _handle_detect_status(self, operation: Dict[str, Any]):
+        """
+        Handle sync status detection after a local or server-side change.
+        
+        Compares the installed packages with the target state in the pool
+        assignment and reports the result; nothing is reported while no
+        target is set. During a staged rollout that is the pool's previous
+        target until this endpoint is promoted.
+        """
+        api_client = operation['api_client']
+        pacman_interface = operation['pacman_interface']
+        endpoint_id = operation['endpoint_id']
+        
+        try:
+            assignment = await api_client.get_pool_assignment(endpoint_id) or {}
+            pool_id = assignment.get('pool_id')
+            if 'target_state_id' in assignment:
+                target_state_id = assignment['target_state_id']
+                target_state = await api_client.get_state(target_state_id) if target_state_id else None
+            else:
+                # Servers without staged rollouts only know the pool's target
+                target_state = await api_client.get_target_state(pool_id) if pool_id else None
+            if target_state is None:
+                self.operation_completed.emit('detect_status', True, 'No target state to compare against')
+                return
+            
+            loop = asyncio.get_running_loop()
+            current_state = await loop.run_in_executor(None, pacman_interface.get_system_state, endpoint_id)
+            detected = PackageStateDetector(pacman_interface).detect_sync_status(current_state, target_state)
+            if detected == 'unknown':
+                self.operation_completed.emit('detect_status', True, 'Sync status unknown')
+                return
+            
+            status = SyncStatus(detected)
+            self.status_updated.emit(status)
+            await api_client.report_status(endpoint_id, status)
+            self.operation_completed.emit('detect_status', True, f'Status: {status.value}')
+        except Exception as e:
+            self.operation_completed.emit('detect_status', False, str(e))
+    
+    async def _handle_watch_server(self, operation: Dict[str, Any]):
+        """Handle starting the server change notification stream."""
+        api_client = operation['api_client']
+        endpoint_id = operation['endpoint_id']
+        
+        await self._stop_watching_server()
+        self._watch_task = asyncio.create_task(
+            api_client.watch_server_events(endpoint_id, self.server_event.emit)
+        )
+        self.operation_completed.emit('watch_server', True, 'Watching server changes')
+    
+    async def _stop_watching_server(self):
+        """Cancel the server change notification stream, if running."""
+        if self._watch_task is None:
+            return
+        
+        self._watch_task.cancel()
+        try:
+            await self._watch_task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.debug(f"Server watch ended with error: {e}")
+        self._watch_task = None
+    
+    async def _configure_mirrors(self, operation: Dict[str, Any]):
+        """
+        Point the synchronizer at the mirrors the server advertises.
+        
+        The server's package cache is used for downloads when enabled. The
+        pool's archive mirror (for versions missing from the cache) takes
+        precedence over the local pacman.archive_mirror setting.
+        """
+        synchronizer = operation['synchronizer']
+        mirror = operation.get('archive_mirror')
+        api_client = operation.get('api_client')
+        package_mirror = None
+        
+        if api_client is not None and operation.get('endpoint_id'):
+            try:
+                assignment = await api_client.get_pool_assignment(operation['endpoint_id']) or {}
+                mirror = assignment.get('archive_mirror') or mirror
+                package_mirror = assignment.get('package_mirror')
+            except Exception as e:
+                logger.debug(f"Could not get pool mirrors, using local settings: {e}")
+        
+        synchronizer.set_package_mirror(package_mirror)
+        
+        if mirror:
+            synchronizer.set_archive_fetcher(
+                ArchiveMirrorFetcher(mirror, synchronizer.pacman.config.architecture)
+            )
+        else:
+            synchronizer.set_archive_fetcher(None)
+    
     async def _handle_execute_sync_to_latest(self, operation: Dict[str, Any]):
         """Handle sync to latest package operation."""
         synchronizer = operation['synchronizer']
         target_state = operation['target_state']
         
         try:
+            await self._configure_mirrors(operation)
+            
             # Execute sync operation in thread pool to avoid blocking
             import concurrent.futures
             with concurrent.futures.ThreadPoolExecutor() as executor:
@@ -234,6 +361,8 @@ class AsyncWorker(QThread):
                 self.operation_completed.emit('execute_revert_to_previous', False, 'No previous state found')
                 return
             
+            await self._configure_mirrors(operation)
+            
             # Execute revert operation in thread pool
             import concurrent.futures
             with concurrent.futures.ThreadPoolExecutor() as executor:
@@ -273,14 +402,21 @@ class SyncManager(QObject):
     Manages synchronization operations and API communication.
     
     This class integrates the API client with the Qt application, handling
-    authentication, periodic status updates, and sync operations.
+    authentication, status updates, and sync operations. Status is refreshed
+    when pacman changes the local package database or the server pushes a
+    change; the periodic timer only acts as a safety net while those
+    notifications are available.
     """
     
+    # Wait for the package database to settle before re-detecting status
+    LOCAL_CHANGE_SETTLE_MS = 5000
+    
     # Signals for Qt integration
     status_changed = pyqtSignal(object)  # SyncStatus
     authentication_changed = pyqtSignal(bool)  # is_authenticated
     operation_completed = pyqtSignal(str, bool, str)  # operation, success, message
     error_occurred = pyqtSignal(str)  # error_message
+    operation_progress = pyqtSignal(str, int, int)  # package operation stage, completed, total
     
     def __init__(self, config: ClientConfiguration, parent=None):
         super().__init__(parent)
@@ -311,10 +447,19 @@ class SyncManager(QObject):
             max_delay=60.0
         )
         
+        # Offline operations survive restarts in the journal
+        journal_path = config.get_offline_journal_path()
+        if journal_path:
+            offline_journal = OfflineJournal(Path(journal_path).expanduser(), max_entries=config.get_offline_queue_size())
+        else:
+            offline_journal = OfflineJournal.default(max_entries=config.get_offline_queue_size())
+        
         self._api_client = PacmanSyncAPIClient(
             server_url=config.get_server_url(),
             timeout=config.get_server_timeout(),
-            retry_config=retry_config
+            retry_config=retry_config,
+            wire_format=config.get_wire_format(),
+            offline_journal=offline_journal
         )
         
         # Initialize package operations
@@ -327,12 +472,24 @@ class SyncManager(QObject):
         self._worker.operation_completed.connect(self._on_operation_completed)
         self._worker.status_updated.connect(self._on_status_updated)
         self._worker.error_occurred.connect(self._on_error_occurred)
+        self._worker.server_event.connect(self._on_server_event)
+        self._worker.operation_progress.connect(self.operation_progress)
+        self._package_synchronizer.set_progress_callback(self._worker.operation_progress.emit)
         self._worker.start()
         
+        # Watch for pacman transactions instead of polling
+        self._local_change_timer = QTimer(self)
+        self._local_change_timer.setSingleShot(True)
+        self._local_change_timer.timeout.connect(self._on_local_changes_settled)
+        self._fs_watcher = QFileSystemWatcher(self)
+        self._fs_watcher.directoryChanged.connect(self._on_watched_path_changed)
+        self._fs_watcher.fileChanged.connect(self._on_watched_path_changed)
+        self._watching_local_changes = self._watch_local_changes()
+        
         # Set up periodic status updates
         self._status_timer = QTimer(self)
         self._status_timer.timeout.connect(self._periodic_status_update)
-        self._status_timer.start(config.get_update_interval() * 1000)  # Convert to milliseconds
+        self._status_timer.start(self._status_interval(config) * 1000)  # Convert to milliseconds
         
         # Set up connection retry timer
         self._retry_timer = QTimer(self)
@@ -436,6 +593,7 @@ class SyncManager(QObject):
         
         self._status_timer.stop()
         self._retry_timer.stop()
+        self._local_change_timer.stop()
         
         if self._worker.isRunning():
             self._worker.stop()
@@ -458,6 +616,77 @@ class SyncManager(QObject):
             'hostname': hostname
         })
     
+    def _status_interval(self, config: ClientConfiguration) -> int:
+        """Seconds between timer-driven status updates."""
+        if self._watching_local_changes:
+            return max(config.get_update_interval(), config.get_safety_interval())
+        return config.get_update_interval()
+    
+    def _watch_local_changes(self) -> bool:
+        """
+        Add the pacman database and transaction stamp to the file watcher.
+        
+        The stamp's directory is watched until the hook first creates the
+        stamp. Returns whether the local package database is being watched.
+        """
+        watched = set(self._fs_watcher.files()) | set(self._fs_watcher.directories())
+        candidates = [PACMAN_LOCAL_DB]
+        if TRANSACTION_STAMP.exists():
+            candidates.append(TRANSACTION_STAMP)
+        elif TRANSACTION_STAMP.parent.is_dir():
+            candidates.append(TRANSACTION_STAMP.parent)
+        
+        for path in candidates:
+            if str(path) not in watched and path.exists():
+                if self._fs_watcher.addPath(str(path)):
+                    watched.add(str(path))
+        
+        return str(PACMAN_LOCAL_DB) in watched
+    
+    @pyqtSlot(str)
+    def _on_watched_path_changed(self, path: str):
+        """Schedule status detection after a local package change."""
+        if Path(path) in (TRANSACTION_STAMP, TRANSACTION_STAMP.parent):
+            # The PostTransaction hook ran; the database is already consistent
+            self._local_change_timer.start(0)
+        else:
+            # Restart the settle delay on every database change in a transaction
+            self._local_change_timer.start(self.LOCAL_CHANGE_SETTLE_MS)
+        
+        # Replaced files drop out of the watcher; the stamp may have just appeared
+        self._watch_local_changes()
+    
+    def _on_local_changes_settled(self):
+        """Re-detect status once the local package database is quiet."""
+        logger.debug("Local package changes detected")
+        self._queue_status_detection()
+    
+    def _queue_status_detection(self):
+        """Queue a comparison of the local packages with the target state."""
+        if not self._is_authenticated or not self._endpoint_id:
+            return
+        
+        self._worker.queue_operation({
+            'type': 'detect_status',
+            'api_client': self._api_client,
+            'pacman_interface': self._pacman_interface,
+            'endpoint_id': self._endpoint_id
+        })
+    
+    @pyqtSlot(dict)
+    def _on_server_event(self, event: Dict[str, Any]):
+        """Handle change notifications pushed by the server."""
+        event_type = event.get('type')
+        
+        if event_type == 'status_changed':
+            try:
+                self._update_status(SyncStatus(event.get('status')))
+            except ValueError:
+                logger.debug(f"Ignoring unknown status from server: {event.get('status')}")
+        elif event_type in ('target_state_changed', 'pool_assignment_changed'):
+            logger.info(f"Server reported {event_type}, re-detecting status")
+            self._queue_status_detection()
+    
     def _retry_connection(self):
         """Retry connection after failure."""
         logger.info("Retrying connection...")
@@ -470,21 +699,18 @@ class SyncManager(QObject):
             self._authenticate()
             return
         
-        # Check if we need to process offline operations
-        if not self._api_client.is_offline():
-            self._worker.queue_operation({
-                'type': 'process_offline_operations',
-                'api_client': self._api_client
-            })
+        # Replay offline operations (when connected) and report current status
+        self._worker.queue_operation({
+            'type': 'periodic_update',
+            'api_client': self._api_client,
+            'process_offline': not self._api_client.is_offline(),
+            'endpoint_id': self._endpoint_id,
+            'status': self._current_status
+        })
         
-        # Report current status
-        if self._endpoint_id:
-            self._worker.queue_operation({
-                'type': 'report_status',
-                'api_client': self._api_client,
-                'endpoint_id': self._endpoint_id,
-                'status': self._current_status
-            })
+        if self._watching_local_changes:
+            # Safety net for any notification that was missed
+            self._queue_status_detection()
     
     @pyqtSlot(str, bool, str)
     def _on_operation_completed(self, operation_type: str, success: bool, message: str):
@@ -503,6 +729,15 @@ class SyncManager(QObject):
                 
                 self.authentication_changed.emit(True)
                 logger.info(f"Authentication successful. Endpoint ID: {self._endpoint_id}")
+                
+                if self._endpoint_id:
+                    # Follow server-side changes and detect the real status
+                    self._worker.queue_operation({
+                        'type': 'watch_server',
+                        'api_client': self._api_client,
+                        'endpoint_id': self._endpoint_id
+                    })
+                    self._queue_status_detection()
             else:
                 self._is_authenticated = False
                 self._endpoint_id = None
@@ -610,7 +845,10 @@ class SyncManager(QObject):
             self._worker.queue_operation({
                 'type': 'execute_sync_to_latest',
                 'synchronizer': self._package_synchronizer,
-                'target_state': target_state
+                'target_state': target_state,
+                'api_client': self._api_client,
+                'endpoint_id': self._endpoint_id,
+                'archive_mirror': self.config.get_archive_mirror()
             })
         else:
             # First trigger server sync operation to get target state
@@ -663,7 +901,9 @@ class SyncManager(QObject):
             'type': 'execute_revert_to_previous',
             'synchronizer': self._package_synchronizer,
             'state_manager': self._state_manager,
-            'endpoint_id': self._endpoint_id
+            'endpoint_id': self._endpoint_id,
+            'api_client': self._api_client,
+            'archive_mirror': self.config.get_archive_mirror()
         })
     
     def submit_repository_info(self, repositories: list):
@@ -736,8 +976,8 @@ class SyncManager(QObject):
                 self._api_client.retry_config = retry_config
             
             # Update status update interval
-            old_interval = old_config.get_update_interval()
-            new_interval = new_config.get_update_interval()
+            old_interval = self._status_interval(old_config)
+            new_interval = self._status_interval(new_config)
             if old_interval != new_interval:
                 logger.info(f"Status update interval changed from {old_interval} to {new_interval} seconds")
                 self._status_timer.setInterval(new_interval * 1000)  # Convert to milliseconds
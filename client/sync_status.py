@@ -0,0 +1,18 @@
+"""
+Sync Status for Pacman Sync Utility Client.
+
+Kept free of Qt and network dependencies so that status-only code paths
+(CLI status, WayBar, status persistence) can use it without loading them.
+"""
+
+from enum import Enum
+
+
+class SyncStatus(Enum):
+    """Enumeration of possible sync states."""
+    IN_SYNC = "in_sync"
+    AHEAD = "ahead"
+    BEHIND = "behind"
+    OFFLINE = "offline"
+    SYNCING = "syncing"
+    ERROR = "error"
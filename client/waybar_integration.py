@@ -10,24 +10,11 @@ import logging
 import sys
 import os
 import signal
-import time
 from typing import Dict, Any, Optional, Callable
 from pathlib import Path
 from datetime import datetime, timedelta
 
-# Import with fallback for SyncStatus
-try:
-    from client.qt.application import SyncStatus
-except ImportError:
-    from enum import Enum
-    class SyncStatus(Enum):
-        IN_SYNC = "in_sync"
-        AHEAD = "ahead"
-        BEHIND = "behind"
-        OFFLINE = "offline"
-        SYNCING = "syncing"
-        ERROR = "error"
-
+from client.sync_status import SyncStatus
 from client.status_persistence import StatusPersistenceManager
 
 logger = logging.getLogger(__name__)
@@ -108,8 +95,12 @@ class WayBarIntegration:
             Dictionary containing WayBar-compatible status information
         """
         try:
-            # Load current status
-            status_info = self.status_manager.load_status()
+            # The mmap status record is enough for the short tooltip
+            status_info = None
+            if not include_detailed_tooltip:
+                status_info = self.status_manager.load_status_record()
+            if status_info is None:
+                status_info = self.status_manager.load_status()
             
             if status_info is None:
                 return self._get_unknown_status()
@@ -132,7 +123,8 @@ class WayBarIntegration:
                 waybar_output["tooltip"] = status_config["tooltip"]
             
             # Check if status is stale and add indicator
-            if not self.status_manager.is_status_fresh(max_age_seconds=300):
+            age = datetime.now() - status_info.last_updated
+            if age.total_seconds() > 300:
                 waybar_output["class"].append("stale")
                 waybar_output["tooltip"] += " (status may be outdated)"
             
@@ -398,14 +390,24 @@ class WayBarIntegration:
         except Exception as e:
             return {"success": False, "message": f"Refresh failed: {e}"}
     
-    def start_waybar_daemon(self, update_interval: int = 5) -> None:
+    def start_waybar_daemon(self, update_interval: int = 5, safety_interval: int = 60) -> None:
         """
         Start a daemon process for continuous WayBar status updates.
         
+        Status is re-emitted when the client's status file changes. Where
+        file change notification is unavailable the file is polled every
+        update_interval seconds; either way the status is refreshed at least
+        every safety_interval seconds so staleness shows up in the tooltip.
+        
         Args:
-            update_interval: Update interval in seconds
+            update_interval: Polling interval in seconds without inotify
+            safety_interval: Maximum seconds between two status outputs
         """
-        logger.info(f"Starting WayBar daemon with {update_interval}s interval")
+        from client.change_watcher import PathWatcher
+        
+        watcher = PathWatcher([self.status_manager.status_file], poll_interval=update_interval)
+        mode = "on status changes" if watcher.uses_inotify else f"polling every {update_interval}s"
+        logger.info(f"Starting WayBar daemon, updating {mode}")
         
         def signal_handler(signum, frame):
             logger.info("WayBar daemon shutting down")
@@ -421,14 +423,16 @@ class WayBarIntegration:
                 status = self.get_waybar_status()
                 print(json.dumps(status), flush=True)
                 
-                # Wait for next update
-                time.sleep(update_interval)
+                # Wait for the status to change (or the safety interval)
+                watcher.wait(max(update_interval, safety_interval))
                 
         except KeyboardInterrupt:
             logger.info("WayBar daemon interrupted")
         except Exception as e:
             logger.error(f"WayBar daemon error: {e}")
             sys.exit(1)
+        finally:
+            watcher.close()
     
     def get_waybar_config_template(self) -> Dict[str, Any]:
         """
@@ -483,7 +487,9 @@ def main_waybar_daemon():
     
     parser = argparse.ArgumentParser(description="WayBar daemon for Pacman Sync Utility")
     parser.add_argument("--interval", type=int, default=5,
-                       help="Update interval in seconds (default: 5)")
+                       help="Polling interval in seconds when inotify is unavailable (default: 5)")
+    parser.add_argument("--safety-interval", type=int, default=60,
+                       help="Maximum seconds between status updates (default: 60)")
     parser.add_argument("--config-dir", type=str,
                        help="Custom configuration directory")
     
@@ -500,7 +506,7 @@ def main_waybar_daemon():
     )
     
     waybar = WayBarIntegration(args.config_dir)
-    waybar.start_waybar_daemon(args.interval)
+    waybar.start_waybar_daemon(args.interval, args.safety_interval)
 
 
 if __name__ == "__main__":
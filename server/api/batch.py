@@ -0,0 +1,215 @@
+"""
+Batch API endpoint for the Pacman Sync Utility.
+
+POST /api/batch carries several API calls in one request. Only the small
+JSON calls clients coalesce can be batched. Each sub-operation is
+dispatched in order with the batch request's credentials through the
+application's router, wrapped in the same rate limiting and operation
+tracking as individual requests, so it gets exactly the limits, audit
+trail, validation, authentication and error handling of the individual
+endpoint. Results are returned in the same order with their own status
+codes.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from server.api.submissions import read_submission, submission_openapi
+from shared.wire_format import JSON_CONTENT_TYPE
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+BATCH_PATH = "/api/batch"
+
+# Upper bound on sub-operations per batch request
+MAX_BATCH_OPERATIONS = 50
+
+# Request headers forwarded from the batch request to each sub-operation
+FORWARDED_HEADERS = (b"authorization", b"user-agent", b"x-forwarded-for", b"x-real-ip")
+
+# Routes that may be batched: authenticated endpoint calls with JSON
+# responses. Streaming and file routes (the dashboard event stream,
+# package archives) and unauthenticated registration are left out.
+BATCHABLE_ROUTES = (
+    ("PUT", "/api/endpoints/{endpoint_id}/status"),
+    ("GET", "/api/endpoints/{endpoint_id}/pool"),
+    ("PUT", "/api/endpoints/{endpoint_id}/pool"),
+    ("DELETE", "/api/endpoints/{endpoint_id}/pool"),
+    ("GET", "/api/endpoints/{endpoint_id}/repositories"),
+    ("POST", "/api/endpoints/{endpoint_id}/repositories"),
+    ("POST", "/api/endpoints/{endpoint_id}/repository-info"),
+    ("POST", "/api/states/{endpoint_id}"),
+    ("POST", "/api/sync/{endpoint_id}/sync-to-latest"),
+    ("POST", "/api/sync/{endpoint_id}/set-as-latest"),
+    ("POST", "/api/sync/{endpoint_id}/revert"),
+    ("GET", "/api/sync/{endpoint_id}/operations"),
+    ("GET", "/api/sync/operations/{operation_id}"),
+    ("POST", "/api/sync/operations/{operation_id}/cancel"),
+    ("GET", "/api/package-sync/endpoints/{endpoint_id}/sync-status"),
+    ("GET", "/api/package-sync/endpoints/{endpoint_id}/plan"),
+)
+
+_BATCHABLE_PATTERNS = [
+    (method, re.compile(re.sub(r"\{\w+\}", "[^/?#]+", template) + "$"))
+    for method, template in BATCHABLE_ROUTES
+]
+
+
+class BatchOperation(BaseModel):
+    """A single API call inside a batch."""
+    id: Optional[str] = Field(None, description="Client reference echoed in the result")
+    method: Literal["GET", "POST", "PUT", "DELETE"]
+    path: str = Field(..., description="API path, e.g. /api/endpoints/{id}/status")
+    params: Optional[Dict[str, Any]] = None
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    """Request model for batch execution."""
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=MAX_BATCH_OPERATIONS)
+
+
+class BatchResult(BaseModel):
+    """Outcome of a single sub-operation."""
+    id: Optional[str]
+    status: int
+    body: Any
+
+
+class BatchResponse(BaseModel):
+    """Response model for batch execution."""
+    results: List[BatchResult]
+
+
+def _validate_operation(method: str, path: str) -> Optional[str]:
+    """Return an error message if a sub-operation is not allowed."""
+    if path.rstrip("/") == BATCH_PATH:
+        return "Batches cannot be nested"
+    if not any(method == allowed and pattern.match(path) for allowed, pattern in _BATCHABLE_PATTERNS):
+        return f"{method} {path} cannot be part of a batch"
+    return None
+
+
+def _dispatch_app(request: Request):
+    """
+    The ASGI application sub-operations are sent to.
+
+    The batch request has already been through the middleware stack, so
+    sub-operations go to the router wrapped in the middleware that must
+    see every API call (see create_app); bare applications without that
+    wrapper dispatch straight to the router.
+    """
+    return getattr(request.app.state, "batch_dispatch_app", None) or request.app.router
+
+
+async def dispatch_operation(request: Request, operation: BatchOperation) -> Tuple[int, Any]:
+    """
+    Run one sub-operation through the application's router.
+
+    Returns:
+        Tuple of (status code, decoded response body)
+    """
+    error = _validate_operation(operation.method, operation.path)
+    if error:
+        return 400, {"detail": error}
+
+    parent = request.scope
+    headers = [(name, value) for name, value in parent["headers"] if name in FORWARDED_HEADERS]
+    body = b""
+    if operation.body is not None:
+        body = json.dumps(operation.body).encode("utf-8")
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+    scope = {
+        "type": "http",
+        "asgi": parent["asgi"],
+        "http_version": parent.get("http_version", "1.1"),
+        "method": operation.method,
+        "scheme": parent.get("scheme", "http"),
+        "server": parent.get("server"),
+        "client": parent.get("client"),
+        "root_path": parent.get("root_path", ""),
+        "path": operation.path,
+        "raw_path": operation.path.encode("utf-8"),
+        "query_string": urlencode(operation.params or {}, doseq=True).encode("ascii"),
+        "headers": headers,
+        "app": parent["app"],
+        # Sub-operations start from the batch's request state; operation
+        # tracking gives each its own operation ID
+        "state": dict(parent.get("state") or {}),
+    }
+    # Route-level exception handling (HTTPException, PacmanSyncError) is
+    # looked up from the scope, so sub-operations inherit the app's handlers
+    for key in ("starlette.exception_handlers", "fastapi_middleware_astack"):
+        if key in parent:
+            scope[key] = parent[key]
+
+    status = 500
+    chunks: List[bytes] = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await _dispatch_app(request)(scope, receive, send)
+    except StarletteHTTPException as e:
+        # Raised by the router itself for unknown paths and methods
+        return e.status_code, {"detail": e.detail}
+    except Exception as e:
+        logger.error(f"Batch sub-operation {operation.method} {operation.path} failed: {e}")
+        return 500, {"detail": "Internal server error"}
+
+    raw = b"".join(chunks)
+    if not raw:
+        return status, None
+    try:
+        return status, json.loads(raw)
+    except ValueError:
+        return status, raw.decode("utf-8", errors="replace")
+
+
+@router.post(BATCH_PATH, response_model=BatchResponse,
+             openapi_extra=submission_openapi(BatchRequest, columnar=False))
+async def execute_batch(request: Request) -> BatchResponse:
+    """
+    Execute several API calls in one round trip.
+
+    Sub-operations run sequentially in the order given; a failing
+    operation does not stop the ones after it. The body may be compressed
+    with any encoding accepted by the submission endpoints.
+    """
+    submission = await read_submission(request, BatchRequest)
+    if submission.columnar:
+        raise HTTPException(
+            status_code=415, detail="Batch requests must be JSON",
+            headers={'Accept-Post': JSON_CONTENT_TYPE}
+        )
+
+    results = []
+    for operation in submission.data.operations:
+        status, body = await dispatch_operation(request, operation)
+        results.append(BatchResult(id=operation.id, status=status, body=body))
+
+    logger.debug(f"Executed batch of {len(results)} operations")
+    return BatchResponse(results=results)
@@ -2,18 +2,25 @@
 Dashboard API endpoints for Pacman Sync Utility.
 
 This module provides endpoints for dashboard metrics including server uptime,
-endpoint counts, repository counts, package counts, and system statistics.
+endpoint counts, repository counts, package counts, and system statistics,
+plus a server-sent events stream that pushes incremental metric updates.
 """
 
+import asyncio
+import json
 import logging
 import time
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from shared.models import SyncStatus
 from server.core.pool_manager import PackagePoolManager
 from server.core.sync_coordinator import SyncCoordinator
+from server.core.dashboard_aggregator import DashboardAggregator
 from server.database.orm import EndpointRepository, RepositoryRepository, PackageStateRepository
 from server.database.connection import get_database_manager, DatabaseManager
 
@@ -24,6 +31,9 @@ router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 # Store server start time
 SERVER_START_TIME = datetime.now()
 
+# Interval between keep-alive comments on idle event streams
+STREAM_KEEPALIVE_SECONDS = 15.0
+
 
 class DashboardMetrics(BaseModel):
     """Dashboard metrics response model."""
@@ -69,11 +79,20 @@ async def get_db_manager(request: Request) -> DatabaseManager:
     return request.app.state.db_manager
 
 
+async def get_dashboard_aggregator(request: Request) -> Optional[DashboardAggregator]:
+    """Get the in-memory dashboard aggregator from app state, if running."""
+    aggregator = getattr(request.app.state, 'dashboard_aggregator', None)
+    if aggregator is not None and aggregator.is_loaded:
+        return aggregator
+    return None
+
+
 @router.get("/metrics")
 async def get_dashboard_metrics(
     pool_manager: PackagePoolManager = Depends(get_pool_manager),
     sync_coordinator: SyncCoordinator = Depends(get_sync_coordinator),
-    db_manager: DatabaseManager = Depends(get_db_manager)
+    db_manager: DatabaseManager = Depends(get_db_manager),
+    aggregator: Optional[DashboardAggregator] = Depends(get_dashboard_aggregator)
 ) -> DashboardMetrics:
     """
     Get comprehensive dashboard metrics.
@@ -82,15 +101,36 @@ async def get_dashboard_metrics(
     package counts, and sync status information.
     """
     try:
-        logger.info("Getting dashboard metrics")
+        logger.debug("Getting dashboard metrics")
         
         # Calculate server uptime
         uptime_delta = datetime.now() - SERVER_START_TIME
         uptime_seconds = int(uptime_delta.total_seconds())
         uptime_human = format_uptime(uptime_delta)
         
-        # Get all pools and their statuses
-        pools = await pool_manager.list_pools()
+        # Serve from the in-memory aggregates when available
+        if aggregator is not None:
+            metrics = aggregator.get_metrics()
+            return DashboardMetrics(
+                server_uptime_seconds=uptime_seconds,
+                server_uptime_human=uptime_human,
+                total_endpoints=metrics['total_endpoints'],
+                endpoints_online=metrics['endpoints_online'],
+                endpoints_offline=metrics['endpoints_offline'],
+                endpoints_unassigned=metrics['endpoints_unassigned'],
+                total_pools=metrics['total_pools'],
+                pools_healthy=metrics['pools_healthy'],
+                pools_with_issues=metrics['pools_with_issues'],
+                total_repositories=metrics['total_repositories'],
+                total_packages_available=metrics['total_packages_available'],
+                total_packages_in_target_states=metrics['total_packages_in_target_states'],
+                average_sync_percentage=metrics['average_sync_percentage'],
+                last_updated=datetime.now().isoformat()
+            )
+        
+        # Get all pools and their endpoint counts per status
+        pools = await pool_manager.pool_repo.list_all()
+        status_counts = await pool_manager.endpoint_repo.count_by_pool_and_status()
         total_pools = len(pools)
         
         # Get pool status information
@@ -100,11 +140,11 @@ async def get_dashboard_metrics(
         
         for pool in pools:
             try:
-                endpoints = await pool_manager.endpoint_repo.list_by_pool(pool.id)
+                counts = status_counts.get(pool.id, {})
                 
                 # Calculate sync stats for this pool
-                in_sync_count = len([e for e in endpoints if e.sync_status.value == 'in_sync'])
-                total_endpoints_in_pool = len(endpoints)
+                in_sync_count = counts.get(SyncStatus.IN_SYNC, 0)
+                total_endpoints_in_pool = sum(counts.values())
                 
                 if total_endpoints_in_pool > 0:
                     sync_percentage = (in_sync_count / total_endpoints_in_pool) * 100.0
@@ -119,7 +159,7 @@ async def get_dashboard_metrics(
                 
                 pool_statuses.append({
                     'pool': pool,
-                    'endpoints': endpoints,
+                    'endpoint_count': total_endpoints_in_pool,
                     'sync_percentage': sync_percentage
                 })
                 
@@ -128,21 +168,23 @@ async def get_dashboard_metrics(
                 # Count as unhealthy pool
                 pool_statuses.append({
                     'pool': pool,
-                    'endpoints': [],
+                    'endpoint_count': 0,
                     'sync_percentage': 0.0
                 })
         
         # Calculate average sync percentage
         average_sync_percentage = total_sync_percentage / total_pools if total_pools > 0 else 0.0
         
-        # Get all endpoints
-        all_endpoints = await pool_manager.endpoint_repo.list_by_pool(None)
-        total_endpoints = len(all_endpoints)
-        
-        # Count endpoint statuses
-        endpoints_online = len([e for e in all_endpoints if e.sync_status.value in ['in_sync', 'ahead', 'behind']])
-        endpoints_offline = len([e for e in all_endpoints if e.sync_status.value == 'offline'])
-        endpoints_unassigned = len([e for e in all_endpoints if e.pool_id is None])
+        # Count endpoint statuses across the fleet
+        fleet_counts = Counter()
+        for counts in status_counts.values():
+            fleet_counts.update(counts)
+        total_endpoints = sum(fleet_counts.values())
+        endpoints_online = sum(
+            fleet_counts[status] for status in (SyncStatus.IN_SYNC, SyncStatus.AHEAD, SyncStatus.BEHIND)
+        )
+        endpoints_offline = fleet_counts[SyncStatus.OFFLINE]
+        endpoints_unassigned = sum(status_counts.get(None, {}).values())
         
         # Get repository statistics
         total_repositories = await get_total_repositories(db_manager)
@@ -173,7 +215,8 @@ async def get_dashboard_metrics(
 
 @router.get("/pool-statuses")
 async def get_pool_statuses(
-    pool_manager: PackagePoolManager = Depends(get_pool_manager)
+    pool_manager: PackagePoolManager = Depends(get_pool_manager),
+    aggregator: Optional[DashboardAggregator] = Depends(get_dashboard_aggregator)
 ) -> List[Dict[str, Any]]:
     """
     Get status information for all pools.
@@ -181,21 +224,25 @@ async def get_pool_statuses(
     This is a working replacement for the problematic /pools/status endpoint.
     """
     try:
-        logger.info("Getting pool statuses for dashboard")
+        logger.debug("Getting pool statuses for dashboard")
+        
+        if aggregator is not None:
+            return aggregator.get_pool_statuses()
         
-        pools = await pool_manager.list_pools()
+        pools = await pool_manager.pool_repo.list_all()
+        status_counts = await pool_manager.endpoint_repo.count_by_pool_and_status()
         statuses = []
         
         for pool in pools:
             try:
-                endpoints = await pool_manager.endpoint_repo.list_by_pool(pool.id)
+                counts = status_counts.get(pool.id, {})
                 
                 # Calculate status counts
-                in_sync_count = len([e for e in endpoints if e.sync_status.value == 'in_sync'])
-                ahead_count = len([e for e in endpoints if e.sync_status.value == 'ahead'])
-                behind_count = len([e for e in endpoints if e.sync_status.value == 'behind'])
-                offline_count = len([e for e in endpoints if e.sync_status.value == 'offline'])
-                total_endpoints = len(endpoints)
+                in_sync_count = counts.get(SyncStatus.IN_SYNC, 0)
+                ahead_count = counts.get(SyncStatus.AHEAD, 0)
+                behind_count = counts.get(SyncStatus.BEHIND, 0)
+                offline_count = counts.get(SyncStatus.OFFLINE, 0)
+                total_endpoints = sum(counts.values())
                 
                 # Calculate sync percentage
                 if total_endpoints > 0:
@@ -259,7 +306,8 @@ async def get_pool_statuses(
 async def get_system_stats(
     pool_manager: PackagePoolManager = Depends(get_pool_manager),
     sync_coordinator: SyncCoordinator = Depends(get_sync_coordinator),
-    db_manager: DatabaseManager = Depends(get_db_manager)
+    db_manager: DatabaseManager = Depends(get_db_manager),
+    aggregator: Optional[DashboardAggregator] = Depends(get_dashboard_aggregator)
 ) -> SystemStats:
     """
     Get system statistics for dashboard.
@@ -273,12 +321,15 @@ async def get_system_stats(
         database_type = db_manager.database_type
         
         # Get sync operation statistics (simplified for now)
-        total_sync_operations = await get_total_sync_operations(db_manager)
+        if aggregator is not None:
+            total_sync_operations = aggregator.get_metrics()['total_sync_operations']
+        else:
+            total_sync_operations = await get_total_sync_operations(db_manager)
         successful_syncs_24h = 0  # TODO: Implement when we have operation history
         failed_syncs_24h = 0     # TODO: Implement when we have operation history
         
         # Get most active pool and endpoint (simplified)
-        pools = await pool_manager.list_pools()
+        pools = await pool_manager.pool_repo.list_all()
         most_active_pool = pools[0].name if pools else "None"
         
         all_endpoints = await pool_manager.endpoint_repo.list_by_pool(None)
@@ -298,7 +349,75 @@ async def get_system_stats(
         raise HTTPException(status_code=500, detail=f"Failed to get system stats: {str(e)}")
 
 
+@router.get("/stream")
+async def dashboard_stream(
+    request: Request,
+    aggregator: Optional[DashboardAggregator] = Depends(get_dashboard_aggregator)
+):
+    """
+    Server-sent events stream of dashboard updates.
+    
+    The first event is a ``snapshot`` with full metrics and pool statuses.
+    It is followed by ``delta`` events carrying only the pools whose counts
+    changed plus refreshed fleet metrics, ``metrics`` events when slow-moving
+    counters are refreshed, and ``operation`` events for sync operation state
+    changes. Idle streams receive a keep-alive comment periodically.
+    """
+    if aggregator is None:
+        raise HTTPException(status_code=503, detail="Dashboard stream is not available")
+    
+    queue = aggregator.subscribe()
+    
+    async def event_generator():
+        try:
+            yield format_sse_event('snapshot', with_uptime(aggregator.snapshot()))
+            while True:
+                try:
+                    event_id, event_type, data = await asyncio.wait_for(
+                        queue.get(), timeout=STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse_event(event_type, with_uptime(data), event_id)
+        finally:
+            aggregator.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 # Helper functions
+def format_sse_event(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Encode a single server-sent event."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def with_uptime(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach current server uptime to an event's metrics block."""
+    if 'metrics' not in data:
+        return data
+    uptime_delta = datetime.now() - SERVER_START_TIME
+    metrics = dict(data['metrics'])
+    metrics['server_uptime_seconds'] = int(uptime_delta.total_seconds())
+    metrics['server_uptime_human'] = format_uptime(uptime_delta)
+    metrics['last_updated'] = datetime.now().isoformat()
+    return {**data, 'metrics': metrics}
+
+
 def format_uptime(uptime_delta: timedelta) -> str:
     """Format uptime delta into human readable string."""
     days = uptime_delta.days
@@ -377,6 +496,16 @@ async def get_total_sync_operations(db_manager: DatabaseManager) -> int:
         return 0
 
 
+async def load_repository_stats(db_manager: DatabaseManager) -> Dict[str, int]:
+    """Load the slow-changing counters used by the dashboard aggregator."""
+    return {
+        'total_repositories': await get_total_repositories(db_manager),
+        'total_packages_available': await get_total_packages_available(db_manager),
+        'total_packages_in_target_states': await get_total_packages_in_target_states(db_manager),
+        'total_sync_operations': await get_total_sync_operations(db_manager)
+    }
+
+
 # Health check endpoint
 @router.get("/health")
 async def dashboard_health_check():
@@ -14,10 +14,15 @@ from pydantic import BaseModel, Field, validator
 
 from shared.models import Endpoint, Repository, RepositoryPackage, SyncStatus
 from server.core.endpoint_manager import EndpointManager, EndpointAuthenticationError
+from server.core.pool_manager import PackagePoolManager
 from server.middleware.validation import (
     validate_endpoint_name, validate_hostname, validate_package_name,
-    validate_version, validate_repository_name, validate_url
+    validate_version, validate_repository_name, validate_url,
+    validate_package_columns
 )
+from server.api.packages import package_mirror_url
+from server.api.submissions import read_submission, submission_openapi
+from shared.wire_format import WireFormatError, repositories_from_columnar
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -149,6 +154,12 @@ async def get_endpoint_manager(request: Request) -> EndpointManager:
     return request.app.state.endpoint_manager
 
 
+# Dependency to get pool manager
+async def get_pool_manager(request: Request) -> PackagePoolManager:
+    """Get pool manager from app state."""
+    return request.app.state.pool_manager
+
+
 # Get authentication dependency from app state
 async def get_authenticate_endpoint(
     request: Request,
@@ -302,42 +313,55 @@ async def remove_endpoint(
         raise HTTPException(status_code=500, detail=f"Failed to remove endpoint: {str(e)}")
 
 
-@router.post("/endpoints/{endpoint_id}/repositories")
+@router.post(
+    "/endpoints/{endpoint_id}/repositories",
+    openapi_extra=submission_openapi(RepositorySubmissionRequest)
+)
 async def submit_repository_info(
     endpoint_id: str,
-    repo_request: RepositorySubmissionRequest,
     request: Request,
     endpoint_manager: EndpointManager = Depends(get_endpoint_manager),
     current_endpoint: Endpoint = Depends(get_authenticate_endpoint)
 ):
-    """Submit repository information for an endpoint."""
+    """
+    Submit repository information for an endpoint.
+    
+    Accepts the plain JSON RepositorySubmissionRequest or the columnar
+    layout from shared.wire_format, which is validated column by column
+    instead of through a pydantic model per package.
+    """
     
     # Verify endpoint can only submit its own repository info
     if current_endpoint.id != endpoint_id:
         raise HTTPException(status_code=403, detail="Can only submit own repository information")
     
+    submission = await read_submission(request, RepositorySubmissionRequest)
+    if submission.columnar:
+        repositories = decode_columnar_repositories(submission.data, endpoint_id)
+    
     try:
-        # Convert request data to Repository objects
-        repositories = []
-        for repo_data in repo_request.repositories:
-            packages = []
-            for pkg_data in repo_data.packages:
-                packages.append(RepositoryPackage(
-                    name=pkg_data.name,
-                    version=pkg_data.version,
-                    repository=pkg_data.repository,
-                    architecture=pkg_data.architecture,
-                    description=pkg_data.description
+        if not submission.columnar:
+            # Convert request data to Repository objects
+            repositories = []
+            for repo_data in submission.data.repositories:
+                packages = []
+                for pkg_data in repo_data.packages:
+                    packages.append(RepositoryPackage(
+                        name=pkg_data.name,
+                        version=pkg_data.version,
+                        repository=pkg_data.repository,
+                        architecture=pkg_data.architecture,
+                        description=pkg_data.description
+                    ))
+                
+                repositories.append(Repository(
+                    id="",  # Will be generated
+                    endpoint_id=endpoint_id,
+                    repo_name=repo_data.repo_name,
+                    repo_url=repo_data.repo_url,
+                    mirrors=repo_data.mirrors,
+                    packages=packages
                 ))
-            
-            repositories.append(Repository(
-                id="",  # Will be generated
-                endpoint_id=endpoint_id,
-                repo_name=repo_data.repo_name,
-                repo_url=repo_data.repo_url,
-                mirrors=repo_data.mirrors,
-                packages=packages
-            ))
         
         success = await endpoint_manager.update_repository_info(endpoint_id, repositories)
         if not success:
@@ -352,13 +376,44 @@ async def submit_repository_info(
         raise HTTPException(status_code=500, detail=f"Failed to submit repository info: {str(e)}")
 
 
+def decode_columnar_repositories(payload: Dict[str, Any], endpoint_id: str) -> List[Repository]:
+    """Build and validate repositories from a columnar submission."""
+    try:
+        decoded = repositories_from_columnar(payload, endpoint_id)
+    except WireFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    repositories = []
+    for repository, packages in decoded:
+        # Same checks as RepositoryData and RepositoryPackageData
+        validate_repository_name(repository.repo_name)
+        if repository.repo_url is not None:
+            validate_url(repository.repo_url)
+        for mirror_url in repository.mirrors:
+            validate_url(mirror_url)
+        validate_package_columns(packages.names, packages.versions, packages.repositories)
+        repositories.append(repository)
+    return repositories
+
+
 @router.get("/endpoints/{endpoint_id}/pool")
 async def get_endpoint_pool_assignment(
     endpoint_id: str,
+    request: Request,
     endpoint_manager: EndpointManager = Depends(get_endpoint_manager),
+    pool_manager: PackagePoolManager = Depends(get_pool_manager),
     current_endpoint: Endpoint = Depends(get_authenticate_endpoint)
 ):
-    """Get the current pool assignment for an endpoint."""
+    """
+    Get the current pool assignment for an endpoint.
+    
+    Includes the target state the endpoint should be compared against,
+    which during a staged rollout stays the pool's previous target until
+    the endpoint is promoted, the pool's archive mirror, used by the client
+    to fetch package versions that are missing from its cache, and the
+    server's package cache when enabled, which the client prefers for
+    downloads.
+    """
     
     # Verify endpoint can only query its own pool assignment
     if current_endpoint.id != endpoint_id:
@@ -369,11 +424,20 @@ async def get_endpoint_pool_assignment(
         if not endpoint:
             raise HTTPException(status_code=404, detail="Endpoint not found")
         
+        pool = await pool_manager.get_pool(endpoint.pool_id) if endpoint.pool_id else None
+        target_state_id = pool.target_state_id if pool else None
+        rollout_scheduler = getattr(request.app.state, 'rollout_scheduler', None)
+        if pool and rollout_scheduler is not None:
+            target_state_id = rollout_scheduler.target_for(endpoint_id, pool)
+        
         return {
             "endpoint_id": endpoint_id,
             "pool_id": endpoint.pool_id,
             "pool_assigned": endpoint.pool_id is not None,
             "sync_status": endpoint.sync_status.value,
+            "target_state_id": target_state_id,
+            "archive_mirror": pool.sync_policy.archive_mirror if pool else None,
+            "package_mirror": package_mirror_url(request),
             "last_updated": endpoint.updated_at.isoformat()
         }
         
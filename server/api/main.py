@@ -8,7 +8,7 @@ middleware, error handling, and configuration.
 import logging
 import os
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import datetime, timedelta
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -17,20 +17,24 @@ import uvicorn
 
 from server.database.connection import DatabaseManager
 from server.database.schema import create_tables, verify_schema
+from server.database.events import get_change_notifier
 from server.core.pool_manager import PackagePoolManager
 from server.core.sync_coordinator import SyncCoordinator
-from server.middleware.auth import create_auth_dependencies, add_security_headers
-from server.middleware.rate_limiting import create_rate_limit_middleware
-from server.middleware.validation import validation_middleware
+from server.core.rollout_scheduler import RolloutScheduler
+from server.core.dashboard_aggregator import DashboardAggregator
+from server.middleware.auth import create_auth_dependencies, SecurityHeadersMiddleware
+from server.middleware.rate_limiting import create_rate_limit_middleware, DatabaseRateLimitBackend
 from server.middleware.operation_tracking import create_operation_tracking_middleware
 from server.api.pools import router as pools_router
 from server.api.endpoints import router as endpoints_router
-from server.api.sync import router as sync_router
+from server.api.sync import router as sync_router, connection_manager as sync_connection_manager
 from server.api.repositories import router as repositories_router
 from server.api.states import router as states_router
 from server.api.package_sync import router as package_sync_router
-from server.api.dashboard import router as dashboard_router
+from server.api.dashboard import router as dashboard_router, load_repository_stats
 from server.api.health import router as health_router
+from server.api.batch import router as batch_router
+from server.api.packages import router as packages_router
 
 # Import enhanced error handling
 from shared.exceptions import (
@@ -62,31 +66,114 @@ async def lifespan(app: FastAPI):
     db_manager = DatabaseManager(config.database.type, config.database.url)
     await db_manager.initialize()
     
-    # Register database cleanup
-    shutdown_handler.register_cleanup_task(db_manager.close)
-    
     # Create tables if they don't exist
     if not await verify_schema(db_manager):
         logger.info("Creating database schema...")
         await create_tables(db_manager)
     
     # Initialize core services
-    pool_manager = PackagePoolManager(db_manager)
-    sync_coordinator = SyncCoordinator(db_manager)
+    rollout_scheduler = RolloutScheduler(db_manager)
+    pool_manager = PackagePoolManager(db_manager, rollout_scheduler=rollout_scheduler)
+    sync_coordinator = SyncCoordinator(db_manager, rollout_scheduler=rollout_scheduler)
     
     # Import and initialize endpoint manager
     from server.core.endpoint_manager import EndpointManager
     endpoint_manager = EndpointManager(
         db_manager, 
         jwt_secret=config.security.jwt_secret_key,
-        jwt_expiration_hours=config.security.jwt_expiration_hours
+        jwt_expiration_hours=config.security.jwt_expiration_hours,
+        heartbeat_flush_interval=config.monitoring.heartbeat_flush_interval,
+        auth_cache_ttl=config.security.auth_cache_ttl
+    )
+    
+    # Keep cached endpoint authentications consistent with ORM writes
+    change_notifier = get_change_notifier()
+    change_notifier.subscribe(endpoint_manager.auth_cache.handle_change)
+    shutdown_handler.register_cleanup_task(
+        lambda: change_notifier.unsubscribe(endpoint_manager.auth_cache.handle_change)
+    )
+    
+    # Push server-side changes to clients connected over WebSocket
+    change_notifier.subscribe(sync_connection_manager.handle_change)
+    shutdown_handler.register_cleanup_task(
+        lambda: change_notifier.unsubscribe(sync_connection_manager.handle_change)
+    )
+    
+    # Advance staged rollouts as endpoints finish syncing
+    change_notifier.subscribe(rollout_scheduler.handle_change)
+    shutdown_handler.register_cleanup_task(
+        lambda: change_notifier.unsubscribe(rollout_scheduler.handle_change)
     )
+    shutdown_handler.register_cleanup_task(rollout_scheduler.stop)
+    
+    # Rollouts tell each endpoint about the new target when it is promoted
+    sync_connection_manager.rollout_scheduler = rollout_scheduler
+    rollout_scheduler.add_promotion_listener(sync_connection_manager.endpoint_promoted)
+    
+    # Coalesce last_seen heartbeats and write them in bulk
+    await endpoint_manager.heartbeats.start()
+    shutdown_handler.register_cleanup_task(endpoint_manager.heartbeats.stop)
+    
+    # Mark endpoints offline when their (possibly unflushed) heartbeats go stale
+    if config.monitoring.endpoint_offline_timeout > 0:
+        await endpoint_manager.start_offline_detection(
+            timedelta(seconds=config.monitoring.endpoint_offline_timeout),
+            interval=config.monitoring.health_check_interval
+        )
+        shutdown_handler.register_cleanup_task(endpoint_manager.stop_offline_detection)
+    
+    # Maintain dashboard aggregates in memory and stream updates to the web UI
+    dashboard_aggregator = DashboardAggregator(db_manager, stats_loader=load_repository_stats)
+    try:
+        await dashboard_aggregator.start()
+        shutdown_handler.register_cleanup_task(dashboard_aggregator.stop)
+    except Exception as e:
+        logger.warning(f"Dashboard aggregator unavailable, falling back to per-request queries: {e}")
+        dashboard_aggregator = None
+    
+    # Proxy and cache package archives for endpoints, prefetching new pool targets
+    package_cache = None
+    if config.features.package_cache_enabled:
+        from server.core.package_cache import PackageArtifactCache
+        package_cache = PackageArtifactCache(
+            db_manager,
+            config.features.package_cache_dir,
+            max_size=config.features.package_cache_max_size,
+            upstreams=config.features.package_cache_upstreams
+        )
+        try:
+            await package_cache.start()
+            change_notifier.subscribe(package_cache.handle_change)
+            shutdown_handler.register_cleanup_task(
+                lambda: change_notifier.unsubscribe(package_cache.handle_change)
+            )
+            shutdown_handler.register_cleanup_task(package_cache.stop)
+        except Exception as e:
+            logger.warning(f"Package cache unavailable: {e}")
+            package_cache = None
+    
+    # Share rate limit counters between replicas when requested
+    rate_limit_middleware = getattr(app.state, 'rate_limit_middleware', None)
+    if rate_limit_middleware and config.security.rate_limit_backend == "database":
+        if db_manager.database_type == "postgresql":
+            rate_limit_backend = DatabaseRateLimitBackend(db_manager)
+            await rate_limit_backend.initialize()
+            rate_limit_middleware.set_backend(rate_limit_backend)
+            logger.info("Rate limits are shared through the database")
+        else:
+            logger.warning("RATE_LIMIT_BACKEND=database requires PostgreSQL, using per-process rate limits")
+    
+    # Register database cleanup last so services can flush pending writes first
+    shutdown_handler.register_cleanup_task(db_manager.close)
     
     # Store in app state for access in routes
     app.state.db_manager = db_manager
     app.state.pool_manager = pool_manager
     app.state.sync_coordinator = sync_coordinator
+    app.state.rollout_scheduler = rollout_scheduler
     app.state.endpoint_manager = endpoint_manager
+    app.state.dashboard_aggregator = dashboard_aggregator
+    app.state.package_cache = package_cache
     app.state.shutdown_handler = shutdown_handler
     
     # Mark service as ready
@@ -125,16 +212,26 @@ def create_app() -> FastAPI:
     
     # Add operation tracking middleware
     operation_tracking_middleware = create_operation_tracking_middleware(
-        enable_performance_logging=config.server.environment != "production"
+        enable_performance_logging=config.server.environment != "production",
+        sample_rate=config.monitoring.operation_log_sample_rate
     )
     app.add_middleware(operation_tracking_middleware)
     
     # Add rate limiting middleware
+    rate_limit_middleware = None
     if config.security.enable_rate_limiting:
         rate_limit_middleware = create_rate_limit_middleware(
             default_limit=config.security.api_rate_limit
         )
-        app.middleware("http")(rate_limit_middleware)
+        app.add_middleware(rate_limit_middleware.bind)
+        app.state.rate_limit_middleware = rate_limit_middleware
+    
+    # Batch sub-operations are dispatched straight to the router, so give
+    # them the same per-route rate limits and operation tracking/audit logs
+    batch_dispatch_app = operation_tracking_middleware(app.router)
+    if rate_limit_middleware:
+        batch_dispatch_app = rate_limit_middleware.wrap(batch_dispatch_app)
+    app.state.batch_dispatch_app = batch_dispatch_app
     
     # Create authentication dependencies
     authenticate_endpoint, authenticate_admin = create_auth_dependencies(
@@ -147,10 +244,7 @@ def create_app() -> FastAPI:
     app.state.authenticate_admin = authenticate_admin
     
     # Add security headers middleware
-    @app.middleware("http")
-    async def security_headers_middleware(request: Request, call_next):
-        response = await call_next(request)
-        return add_security_headers(response, request)
+    app.add_middleware(SecurityHeadersMiddleware)
     
     # Set up audit and operation loggers
     audit_logger = AuditLogger("server_audit")
@@ -245,6 +339,7 @@ def create_app() -> FastAPI:
             status_code=exc.status_code,
             content=error_response,
             headers={
+                **(exc.headers or {}),
                 'X-Error-Code': structured_error.error_code.value,
                 'X-Request-ID': operation_id or f"req_{datetime.now().timestamp()}"
             }
@@ -325,6 +420,8 @@ def create_app() -> FastAPI:
     app.include_router(states_router, prefix="/api", tags=["states"])
     app.include_router(package_sync_router, tags=["package-sync"])
     app.include_router(dashboard_router, tags=["dashboard"])
+    app.include_router(batch_router, tags=["batch"])
+    app.include_router(packages_router, prefix="/api", tags=["packages"])
     
     # Serve static files for web UI
     web_dist_path = os.path.join(os.path.dirname(__file__), "..", "web", "dist")
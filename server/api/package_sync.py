@@ -12,6 +12,7 @@ from pydantic import BaseModel
 
 from server.core.sync_coordinator import SyncCoordinator
 from server.core.pool_manager import PackagePoolManager
+from server.database.orm import ValidationError, NotFoundError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from shared.models import Endpoint, PackageState, SyncStatus
 
@@ -72,6 +73,27 @@ async def get_authenticate_endpoint(
     return await auth_func(request, credentials)
 
 
+async def get_plan_caller(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> Optional[Endpoint]:
+    """
+    Authenticate a sync plan preview.
+    
+    Admin tokens may preview any endpoint or pool; endpoint tokens are
+    checked by the route against the endpoint being planned.
+    
+    Returns:
+        The authenticated endpoint, or None for an admin
+    """
+    try:
+        await request.app.state.authenticate_admin(credentials)
+        return None
+    except HTTPException:
+        pass
+    return await request.app.state.authenticate_endpoint(request, credentials)
+
+
 @router.get("/pools/{pool_id}/package-count")
 async def get_pool_package_count(
     pool_id: str,
@@ -308,6 +330,73 @@ async def sync_endpoint_packages(
         raise HTTPException(status_code=500, detail=f"Failed to sync packages: {str(e)}")
 
 
+@router.get("/endpoints/{endpoint_id}/plan")
+async def get_endpoint_sync_plan(
+    endpoint_id: str,
+    sync_coordinator: SyncCoordinator = Depends(get_sync_coordinator),
+    current_endpoint: Optional[Endpoint] = Depends(get_plan_caller)
+) -> Dict[str, Any]:
+    """
+    Preview the full sync plan of an endpoint.
+    
+    The plan is computed on the server from the endpoint's last reported
+    state and its pool's target state: the install, upgrade, downgrade and
+    remove operations, the transactions they run in, and an estimated
+    download size. The endpoint is not contacted.
+    
+    Admins may preview any endpoint, endpoints only themselves.
+    """
+    try:
+        # Verify endpoint can only plan its own sync
+        if current_endpoint is not None and current_endpoint.id != endpoint_id:
+            raise HTTPException(status_code=403, detail="Can only plan own sync")
+        
+        logger.info(f"Planning sync for endpoint: {endpoint_id}")
+        return await sync_coordinator.plan_endpoint_sync(endpoint_id)
+    
+    except HTTPException:
+        raise
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to plan sync for endpoint {endpoint_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to plan sync: {str(e)}")
+
+
+@router.get("/pools/{pool_id}/plan")
+async def get_pool_sync_plan(
+    pool_id: str,
+    include_operations: bool = Query(False, description="Include each endpoint's transactions"),
+    sync_coordinator: SyncCoordinator = Depends(get_sync_coordinator),
+    current_endpoint: Optional[Endpoint] = Depends(get_plan_caller)
+) -> Dict[str, Any]:
+    """
+    Preview a pool-wide rollout in one call.
+    
+    Returns the sync plan of every endpoint in the pool against the pool's
+    target state, with pool totals. Requires admin authentication, since
+    the plans cover other endpoints.
+    """
+    try:
+        if current_endpoint is not None:
+            raise HTTPException(status_code=403, detail="Pool sync plans require admin authentication")
+        
+        logger.info(f"Planning sync for pool: {pool_id}")
+        return await sync_coordinator.plan_pool_sync(pool_id, include_operations)
+    
+    except HTTPException:
+        raise
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to plan sync for pool {pool_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to plan sync: {str(e)}")
+
+
 @router.get("/pools/{pool_id}/endpoints/sync-summary")
 async def get_pool_sync_summary(
     pool_id: str,
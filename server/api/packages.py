@@ -0,0 +1,76 @@
+"""
+Package proxy API endpoints for the Pacman Sync Utility.
+
+Serves package archives from the server's package artifact cache using the
+pacman mirror layout, so endpoints can download the archives of a pool's
+target state from the server instead of from upstream mirrors. Repository
+databases and other files that are not cached are redirected to an upstream
+mirror.
+
+Upstream mirrors are configured by the administrator, so the files served
+are the public contents of trusted mirrors. These endpoints therefore do
+not require authentication, which keeps them usable as a pacman Server URL.
+"""
+
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse
+
+from server.core.package_cache import PackageArtifactCache, is_package_file, is_safe_name
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+PACKAGES_PATH = "/api/packages"
+
+
+def get_package_cache(request: Request) -> Optional[PackageArtifactCache]:
+    """Get the package cache from app state, or None when it is disabled."""
+    return getattr(request.app.state, 'package_cache', None)
+
+
+def package_mirror_url(request: Request) -> Optional[str]:
+    """
+    Base URL endpoints should download packages from.
+
+    Uses PACKAGE_CACHE_URL when set (e.g. behind a reverse proxy), otherwise
+    the URL the request reached the server on.
+    """
+    if get_package_cache(request) is None:
+        return None
+
+    from server.config import get_config
+    configured = get_config().features.package_cache_url
+    if configured:
+        return configured.rstrip('/')
+    return str(request.base_url).rstrip('/') + PACKAGES_PATH
+
+
+@router.get("/packages/{repo}/os/{arch}/{filename}")
+async def get_package_file(repo: str, arch: str, filename: str, request: Request):
+    """
+    Download a file from a repository through the server.
+
+    Package archives and signatures are served from the cache, fetching
+    them from an upstream mirror first if needed.
+    """
+    cache = get_package_cache(request)
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Package cache is disabled")
+
+    if not all(is_safe_name(part) for part in (repo, arch, filename)):
+        raise HTTPException(status_code=400, detail="Invalid package path")
+
+    if not is_package_file(filename):
+        urls = cache.upstream_urls(repo, arch, filename)
+        if not urls:
+            raise HTTPException(status_code=404, detail=f"No mirror known for repository {repo}")
+        return RedirectResponse(urls[0], status_code=307)
+
+    path = await cache.fetch(repo, arch, filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"{filename} not found on any mirror of {repo}")
+
+    return FileResponse(path, media_type="application/octet-stream")
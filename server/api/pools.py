@@ -12,8 +12,9 @@ from datetime import datetime
 from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel, Field, validator
 
-from shared.models import PackagePool, SyncPolicy, ConflictResolution
+from shared.models import PackagePool, SyncPolicy, RolloutPolicy, ConflictResolution
 from server.core.pool_manager import PackagePoolManager, PoolStatusInfo
+from server.core.rollout_scheduler import RolloutScheduler
 from server.database.orm import ValidationError, NotFoundError
 
 logger = logging.getLogger(__name__)
@@ -22,18 +23,51 @@ router = APIRouter()
 
 
 # Request/Response Models
+class RolloutPolicyRequest(BaseModel):
+    """Request model for staged rollout configuration."""
+    canary_size: int = Field(default=1, ge=0)
+    canary_endpoints: List[str] = Field(default_factory=list)
+    wave_size: int = Field(default=10, ge=0)
+    max_concurrent: int = Field(default=0, ge=0)
+    max_failures: int = Field(default=0, ge=0)
+    wave_delay: int = Field(default=0, ge=0, le=86400)
+    sync_timeout: int = Field(default=3600, ge=0, le=604800)
+    
+    def to_policy(self) -> RolloutPolicy:
+        return RolloutPolicy(
+            canary_size=self.canary_size,
+            canary_endpoints=[endpoint_id.strip() for endpoint_id in self.canary_endpoints if endpoint_id.strip()],
+            wave_size=self.wave_size,
+            max_concurrent=self.max_concurrent,
+            max_failures=self.max_failures,
+            wave_delay=self.wave_delay,
+            sync_timeout=self.sync_timeout
+        )
+
+
 class SyncPolicyRequest(BaseModel):
     """Request model for sync policy configuration."""
     auto_sync: bool = False
     exclude_packages: List[str] = Field(default_factory=list)
     include_aur: bool = False
     conflict_resolution: str = Field(default="manual", pattern="^(manual|newest|oldest)$")
+    archive_mirror: Optional[str] = Field(default=None, max_length=2048)
+    rollout: Optional[RolloutPolicyRequest] = None
     
     @validator('exclude_packages')
     def validate_exclude_packages(cls, v):
         if not isinstance(v, list):
             raise ValueError('exclude_packages must be a list')
         return [pkg.strip() for pkg in v if pkg.strip()]
+    
+    @validator('archive_mirror')
+    def validate_archive_mirror(cls, v):
+        if v is None or not v.strip():
+            return None
+        v = v.strip()
+        if not v.startswith(('http://', 'https://', 'file://', '/')):
+            raise ValueError('archive_mirror must be an http(s):// or file:// URL or an absolute path')
+        return v
 
 
 class CreatePoolRequest(BaseModel):
@@ -127,6 +161,18 @@ class AssignEndpointRequest(BaseModel):
         return v.strip()
 
 
+class AssignEndpointsRequest(BaseModel):
+    """Request model for assigning several endpoints to a pool."""
+    endpoint_ids: List[str] = Field(..., min_length=1)
+    
+    @validator('endpoint_ids')
+    def validate_endpoint_ids(cls, v):
+        endpoint_ids = [endpoint_id.strip() for endpoint_id in v]
+        if not all(endpoint_ids):
+            raise ValueError('Endpoint IDs cannot be empty')
+        return endpoint_ids
+
+
 class ErrorResponse(BaseModel):
     """Standard error response model."""
     error: dict
@@ -138,6 +184,11 @@ async def get_pool_manager(request: Request) -> PackagePoolManager:
     return request.app.state.pool_manager
 
 
+async def get_rollout_scheduler(request: Request) -> RolloutScheduler:
+    """Get rollout scheduler from app state."""
+    return request.app.state.rollout_scheduler
+
+
 # Pool CRUD Endpoints
 @router.post("/pools", response_model=PoolResponse, status_code=201)
 async def create_pool(
@@ -160,7 +211,9 @@ async def create_pool(
                 auto_sync=pool_request.sync_policy.auto_sync,
                 exclude_packages=pool_request.sync_policy.exclude_packages,
                 include_aur=pool_request.sync_policy.include_aur,
-                conflict_resolution=ConflictResolution(pool_request.sync_policy.conflict_resolution)
+                conflict_resolution=ConflictResolution(pool_request.sync_policy.conflict_resolution),
+                archive_mirror=pool_request.sync_policy.archive_mirror,
+                rollout=pool_request.sync_policy.rollout.to_policy() if pool_request.sync_policy.rollout else None
             )
         
         # Create the pool
@@ -258,7 +311,9 @@ async def update_pool(
                 auto_sync=pool_request.sync_policy.auto_sync,
                 exclude_packages=pool_request.sync_policy.exclude_packages,
                 include_aur=pool_request.sync_policy.include_aur,
-                conflict_resolution=ConflictResolution(pool_request.sync_policy.conflict_resolution)
+                conflict_resolution=ConflictResolution(pool_request.sync_policy.conflict_resolution),
+                archive_mirror=pool_request.sync_policy.archive_mirror,
+                rollout=pool_request.sync_policy.rollout.to_policy() if pool_request.sync_policy.rollout else None
             )
         
         if pool_request.target_state_id is not None:
@@ -307,6 +362,95 @@ async def delete_pool(
         raise HTTPException(status_code=500, detail="Failed to delete pool")
 
 
+# Rollout Endpoints
+@router.get("/pools/{pool_id}/rollout")
+async def get_pool_rollout(
+    pool_id: str,
+    rollout_scheduler: RolloutScheduler = Depends(get_rollout_scheduler)
+):
+    """
+    Get the progress of a pool's staged rollout.
+    
+    Shows the current wave, the endpoints syncing, queued and failed, and
+    whether the rollout is running, waiting between waves, halted by a
+    health gate, completed or cancelled.
+    """
+    rollout = rollout_scheduler.get_rollout(pool_id)
+    if rollout is None:
+        raise HTTPException(status_code=404, detail=f"No rollout for pool {pool_id}")
+    return rollout.to_dict()
+
+
+@router.post("/pools/{pool_id}/rollout/resume")
+async def resume_pool_rollout(
+    pool_id: str,
+    rollout_scheduler: RolloutScheduler = Depends(get_rollout_scheduler)
+):
+    """
+    Resume a halted or waiting rollout.
+    
+    Continues with the next wave after a wave failed its health gate, or
+    starts it right away instead of waiting for the wave delay.
+    """
+    logger.info(f"Resuming rollout for pool: {pool_id}")
+    
+    try:
+        rollout = await rollout_scheduler.resume(pool_id)
+        if rollout is None:
+            raise HTTPException(status_code=404, detail=f"No rollout for pool {pool_id}")
+        return rollout.to_dict()
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error resuming rollout for pool {pool_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to resume rollout")
+
+
+@router.post("/pools/{pool_id}/rollout/skip")
+async def skip_pool_rollout(
+    pool_id: str,
+    rollout_scheduler: RolloutScheduler = Depends(get_rollout_scheduler)
+):
+    """
+    Skip the stalled endpoints of a rollout's current wave.
+    
+    Endpoints still syncing are recorded as failed without halting the
+    rollout, which carries on with the rest of the wave.
+    """
+    logger.info(f"Skipping stalled rollout endpoints for pool: {pool_id}")
+    
+    try:
+        rollout = await rollout_scheduler.skip(pool_id)
+        if rollout is None:
+            raise HTTPException(status_code=404, detail=f"No rollout for pool {pool_id}")
+        return rollout.to_dict()
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error skipping rollout endpoints for pool {pool_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to skip rollout endpoints")
+
+
+@router.post("/pools/{pool_id}/rollout/cancel")
+async def cancel_pool_rollout(
+    pool_id: str,
+    rollout_scheduler: RolloutScheduler = Depends(get_rollout_scheduler)
+):
+    """
+    Cancel a rollout.
+    
+    Endpoints that were not promoted yet are left at their current state.
+    """
+    logger.info(f"Cancelling rollout for pool: {pool_id}")
+    
+    rollout = await rollout_scheduler.cancel(pool_id)
+    if rollout is None:
+        raise HTTPException(status_code=404, detail=f"No rollout for pool {pool_id}")
+    return rollout.to_dict()
+
+
 # Pool Status Endpoints
 @router.get("/pools/{pool_id}/status", response_model=PoolStatusResponse)
 async def get_pool_status(
@@ -388,6 +532,31 @@ async def assign_endpoint_to_pool(
         raise HTTPException(status_code=500, detail="Failed to assign endpoint to pool")
 
 
+@router.post("/pools/{pool_id}/endpoints/batch")
+async def assign_endpoints_to_pool(
+    pool_id: str,
+    assignment_request: AssignEndpointsRequest,
+    pool_manager: PackagePoolManager = Depends(get_pool_manager)
+):
+    """
+    Assign several endpoints to a pool.
+    
+    Endpoints already assigned to other pools are moved. All endpoints are
+    reassigned in a single update; unknown endpoint IDs are skipped.
+    """
+    logger.info(f"Assigning {len(assignment_request.endpoint_ids)} endpoints to pool {pool_id}")
+    
+    try:
+        assigned = await pool_manager.assign_endpoints(pool_id, assignment_request.endpoint_ids)
+        return {"pool_id": pool_id, "assigned": assigned}
+        
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail=f"Pool {pool_id} not found")
+    except Exception as e:
+        logger.error(f"Error assigning endpoints to pool: {e}")
+        raise HTTPException(status_code=500, detail="Failed to assign endpoints to pool")
+
+
 @router.delete("/pools/{pool_id}/endpoints/{endpoint_id}", status_code=204)
 async def remove_endpoint_from_pool(
     pool_id: str,
@@ -13,6 +13,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 
 from shared.models import SystemState, PackageState, Endpoint
+from shared.wire_format import WireFormatError, state_from_columnar
+from server.api.submissions import read_submission, submission_openapi
 from server.core.sync_coordinator import SyncCoordinator
 from server.database.orm import ValidationError, NotFoundError
 
@@ -91,10 +93,9 @@ def system_state_to_response(state: SystemState, state_id: str = None, pool_id:
     )
 
 
-@router.post("/states/{endpoint_id}")
+@router.post("/states/{endpoint_id}", openapi_extra=submission_openapi(StateSubmissionRequest))
 async def submit_state(
     endpoint_id: str,
-    state_request: StateSubmissionRequest,
     request: Request,
     sync_coordinator: SyncCoordinator = Depends(get_sync_coordinator),
     current_endpoint: Endpoint = Depends(get_authenticate_endpoint)
@@ -104,32 +105,42 @@ async def submit_state(
     
     This endpoint allows clients to submit their current package state
     to be stored and potentially used as a synchronization target.
+    
+    Accepts the plain JSON StateSubmissionRequest or, for large states,
+    the columnar layout from shared.wire_format (optionally compressed).
     """
     # Verify endpoint can only submit its own state
     if current_endpoint.id != endpoint_id:
         raise HTTPException(status_code=403, detail="Can only submit own endpoint state")
     
+    submission = await read_submission(request, StateSubmissionRequest)
+    
     try:
         logger.info(f"Submitting state for endpoint: {endpoint_id}")
         
-        # Convert request to SystemState
-        packages = []
-        for pkg_data in state_request.packages:
-            packages.append(PackageState(
-                package_name=pkg_data['package_name'],
-                version=pkg_data['version'],
-                repository=pkg_data['repository'],
-                installed_size=pkg_data.get('installed_size', 0),
-                dependencies=pkg_data.get('dependencies', [])
-            ))
-        
-        system_state = SystemState(
-            endpoint_id=state_request.endpoint_id,
-            timestamp=datetime.fromisoformat(state_request.timestamp),
-            packages=packages,
-            pacman_version=state_request.pacman_version,
-            architecture=state_request.architecture
-        )
+        if submission.columnar:
+            # Fast path: columns go straight into a PackageSet
+            system_state, _ = state_from_columnar(submission.data)
+        else:
+            # Convert request to SystemState
+            state_request = submission.data
+            packages = []
+            for pkg_data in state_request.packages:
+                packages.append(PackageState(
+                    package_name=pkg_data['package_name'],
+                    version=pkg_data['version'],
+                    repository=pkg_data['repository'],
+                    installed_size=pkg_data.get('installed_size', 0),
+                    dependencies=pkg_data.get('dependencies', [])
+                ))
+            
+            system_state = SystemState(
+                endpoint_id=state_request.endpoint_id,
+                timestamp=datetime.fromisoformat(state_request.timestamp),
+                packages=packages,
+                pacman_version=state_request.pacman_version,
+                architecture=state_request.architecture
+            )
         
         # Save the state using sync coordinator's state manager
         state_id = await sync_coordinator.state_manager.save_state(endpoint_id, system_state)
@@ -141,7 +152,7 @@ async def submit_state(
             "endpoint_id": endpoint_id
         }
         
-    except ValidationError as e:
+    except (ValidationError, WireFormatError) as e:
         logger.warning(f"Validation error in state submission: {e}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
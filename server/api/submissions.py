@@ -0,0 +1,107 @@
+"""
+Request body handling for manually decoded submissions (package states,
+repositories and batches).
+
+Decodes the wire formats from shared.wire_format: plain JSON is validated
+with the endpoint's pydantic model as before, while columnar bodies are
+returned as plain data for the endpoint's fast path so no per-package
+models are built.
+"""
+
+import logging
+from typing import Any, Dict, NamedTuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError as PydanticValidationError
+
+from shared.wire_format import (
+    JSON_CONTENT_TYPE, COLUMNAR_JSON_CONTENT_TYPE, COLUMNAR_MSGPACK_CONTENT_TYPE,
+    UnsupportedWireFormat, WireFormatError, decode_body, decompress, is_columnar,
+    media_type, supported_content_types, supported_encodings
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Submission(NamedTuple):
+    """A decoded submission body."""
+    columnar: bool
+    data: Any  # pydantic model instance for JSON, decoded dict for columnar
+
+
+def accepted_format_headers() -> Dict[str, str]:
+    """Headers advertising the accepted formats (RFC 7694 style)."""
+    return {
+        'Accept-Post': ", ".join(supported_content_types()),
+        'Accept-Encoding': ", ".join(supported_encodings())
+    }
+
+
+async def read_submission(request: Request, model: Type[BaseModel]) -> Submission:
+    """
+    Read and decode a submission body.
+
+    Args:
+        request: Incoming request
+        model: Pydantic model for the plain JSON layout
+
+    Returns:
+        Submission with either the validated model or the columnar payload
+
+    Raises:
+        HTTPException: 415 for unsupported formats (with Accept-Post and
+            Accept-Encoding headers), 400 for malformed or oversized bodies
+        RequestValidationError: If a JSON body does not match the model
+    """
+    content_type = media_type(request.headers.get('content-type'))
+    content_encoding = request.headers.get('content-encoding')
+    body = await request.body()
+
+    try:
+        if is_columnar(content_type):
+            payload = decode_body(body, content_type, content_encoding)
+            if not isinstance(payload, dict):
+                raise WireFormatError("Columnar payload must be an object")
+            return Submission(True, payload)
+
+        if content_type != JSON_CONTENT_TYPE:
+            raise UnsupportedWireFormat(f"Unsupported content type: {content_type}")
+        raw = decompress(body, content_encoding)
+    except UnsupportedWireFormat as e:
+        raise HTTPException(status_code=415, detail=str(e), headers=accepted_format_headers())
+    except WireFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        return Submission(False, model.model_validate_json(raw))
+    except PydanticValidationError as e:
+        errors = [{**error, 'loc': ('body', *error['loc'])} for error in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=raw)
+
+
+def submission_openapi(model: Type[BaseModel], columnar: bool = True) -> Dict[str, Any]:
+    """OpenAPI request body for endpoints that read submissions manually."""
+    content = {JSON_CONTENT_TYPE: {'schema': _inline_refs(model.model_json_schema())}}
+    if columnar:
+        layout = {'schema': {'type': 'object', 'description': 'Columnar layout, see shared.wire_format'}}
+        content[COLUMNAR_JSON_CONTENT_TYPE] = layout
+        content[COLUMNAR_MSGPACK_CONTENT_TYPE] = layout
+    return {'requestBody': {'required': True, 'content': content}}
+
+
+def _inline_refs(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace local $defs references so the schema stands alone in OpenAPI."""
+    definitions = schema.pop('$defs', {})
+
+    def resolve(node):
+        if isinstance(node, dict):
+            ref = node.get('$ref')
+            if ref and ref.startswith('#/$defs/'):
+                return resolve(definitions[ref[len('#/$defs/'):]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(item) for item in node]
+        return node
+
+    return resolve(schema)
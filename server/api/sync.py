@@ -5,16 +5,19 @@ This module implements FastAPI endpoints for sync, set-latest, and revert
 operations with real-time status updates and comprehensive error handling.
 """
 
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 
 from shared.models import SyncOperation, OperationType, OperationStatus, Endpoint
+from server.core.rollout_scheduler import PoolRollout, RolloutScheduler
 from server.core.sync_coordinator import SyncCoordinator
 from server.database.orm import ValidationError, NotFoundError
+from server.database.events import ChangeEvent
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -68,17 +71,29 @@ class OperationListResponse(BaseModel):
 
 # WebSocket connection manager for real-time updates
 class ConnectionManager:
-    """Manages WebSocket connections for real-time operation updates."""
+    """
+    Manages WebSocket connections for real-time updates.
+    
+    Besides operation progress, connected clients are told about server-side
+    changes that affect them (their status, pool assignment or the pool's
+    target state), so they do not have to poll for them. Pools rolled out in
+    stages by the rollout scheduler learn about a new target one endpoint at
+    a time, as each is promoted, instead of all at once.
+    """
     
     def __init__(self):
         self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.endpoint_pools: Dict[str, Optional[str]] = {}
+        self.rollout_scheduler: Optional[RolloutScheduler] = None
+        self._pending_sends: set = set()
     
-    async def connect(self, websocket: WebSocket, endpoint_id: str):
+    async def connect(self, websocket: WebSocket, endpoint_id: str, pool_id: Optional[str] = None):
         """Accept a WebSocket connection for an endpoint."""
         await websocket.accept()
         if endpoint_id not in self.active_connections:
             self.active_connections[endpoint_id] = []
         self.active_connections[endpoint_id].append(websocket)
+        self.endpoint_pools[endpoint_id] = pool_id
         logger.info(f"WebSocket connected for endpoint: {endpoint_id}")
     
     def disconnect(self, websocket: WebSocket, endpoint_id: str):
@@ -88,8 +103,98 @@ class ConnectionManager:
                 self.active_connections[endpoint_id].remove(websocket)
             if not self.active_connections[endpoint_id]:
                 del self.active_connections[endpoint_id]
+                self.endpoint_pools.pop(endpoint_id, None)
         logger.info(f"WebSocket disconnected for endpoint: {endpoint_id}")
     
+    def handle_change(self, event: ChangeEvent, payload: Dict[str, Any]) -> None:
+        """ChangeNotifier listener forwarding relevant changes to connected endpoints."""
+        if not self.active_connections:
+            return
+        
+        endpoint_id = payload.get('endpoint_id')
+        pool_id = payload.get('pool_id')
+        timestamp = datetime.now().isoformat()
+        
+        if event == ChangeEvent.ENDPOINT_STATUS_CHANGED:
+            self._notify([endpoint_id], {
+                "type": "status_changed",
+                "endpoint_id": endpoint_id,
+                "status": payload['status'].value,
+                "timestamp": timestamp
+            })
+        elif event == ChangeEvent.ENDPOINT_POOL_CHANGED:
+            if endpoint_id in self.endpoint_pools:
+                self.endpoint_pools[endpoint_id] = pool_id
+            self._notify([endpoint_id], {
+                "type": "pool_assignment_changed",
+                "endpoint_id": endpoint_id,
+                "pool_id": pool_id,
+                "timestamp": timestamp
+            })
+        elif event == ChangeEvent.POOL_UPDATED and payload.get('target_state_id'):
+            message = {
+                "type": "target_state_changed",
+                "pool_id": pool_id,
+                "target_state_id": payload['target_state_id'],
+                "timestamp": timestamp
+            }
+            if self.rollout_scheduler is None:
+                self._notify(self._pool_members(pool_id), message)
+            elif self._pool_members(pool_id):
+                self._schedule(self._notify_pool_target(pool_id, message))
+        elif event == ChangeEvent.POOL_DELETED:
+            members = self._pool_members(pool_id)
+            for member in members:
+                self.endpoint_pools[member] = None
+            self._notify(members, {
+                "type": "pool_assignment_changed",
+                "pool_id": None,
+                "timestamp": timestamp
+            })
+    
+    def endpoint_promoted(self, endpoint_id: str, rollout: PoolRollout) -> None:
+        """Rollout scheduler listener telling a promoted endpoint about its new target."""
+        self._notify([endpoint_id], {
+            "type": "target_state_changed",
+            "pool_id": rollout.pool_id,
+            "target_state_id": rollout.target_state_id,
+            "timestamp": datetime.now().isoformat()
+        })
+    
+    async def _notify_pool_target(self, pool_id: str, message: Dict[str, Any]) -> None:
+        """Send a new target to the whole pool unless a rollout promotes its endpoints."""
+        try:
+            if await self.rollout_scheduler.manages(pool_id):
+                return
+        except Exception as e:
+            logger.warning(f"Failed to look up rollout policy of pool {pool_id}: {e}")
+        for endpoint_id in self._pool_members(pool_id):
+            await self.send_operation_update(endpoint_id, message)
+    
+    def _pool_members(self, pool_id: Optional[str]) -> List[str]:
+        """Connected endpoints assigned to a pool."""
+        return [endpoint_id for endpoint_id, member_pool in self.endpoint_pools.items()
+                if pool_id and member_pool == pool_id]
+    
+    def _notify(self, endpoint_ids: List[str], message: Dict[str, Any]) -> None:
+        """Schedule a message to connected endpoints from a synchronous listener."""
+        endpoint_ids = [endpoint_id for endpoint_id in endpoint_ids if endpoint_id in self.active_connections]
+        if not endpoint_ids:
+            return
+        for endpoint_id in endpoint_ids:
+            self._schedule(self.send_operation_update(endpoint_id, message))
+    
+    def _schedule(self, coroutine) -> None:
+        """Run a coroutine in the background, if there is an event loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            coroutine.close()
+            return
+        task = loop.create_task(coroutine)
+        self._pending_sends.add(task)
+        task.add_done_callback(self._pending_sends.discard)
+    
     async def send_operation_update(self, endpoint_id: str, operation_data: Dict[str, Any]):
         """Send operation update to all connections for an endpoint."""
         if endpoint_id in self.active_connections:
@@ -392,16 +497,41 @@ async def get_pool_operations(
         raise HTTPException(status_code=500, detail=f"Failed to get pool operations: {str(e)}")
 
 
+async def authenticate_websocket(websocket: WebSocket) -> Optional[Endpoint]:
+    """Authenticate a WebSocket handshake by its Bearer token."""
+    scheme, _, token = websocket.headers.get('authorization', '').partition(' ')
+    endpoint_manager = getattr(websocket.app.state, 'endpoint_manager', None)
+    if scheme.lower() != 'bearer' or not token.strip() or endpoint_manager is None:
+        return None
+    try:
+        return await endpoint_manager.authenticate_endpoint(token.strip())
+    except Exception as e:
+        logger.debug(f"WebSocket authentication failed: {e}")
+        return None
+
+
 @router.websocket("/sync/{endpoint_id}/status")
 async def websocket_operation_status(websocket: WebSocket, endpoint_id: str):
     """
     WebSocket endpoint for real-time operation status updates.
     
     This endpoint provides real-time updates about synchronization operations
-    for a specific endpoint, including progress updates and completion notifications.
+    for a specific endpoint, including progress updates and completion notifications,
+    as well as status_changed, pool_assignment_changed and target_state_changed
+    events when the server changes something affecting the endpoint.
+    
+    The handshake must carry the endpoint's own Bearer token; other
+    connections are closed with code 1008 (policy violation).
     """
+    endpoint = await authenticate_websocket(websocket)
+    if endpoint is None or endpoint.id != endpoint_id:
+        logger.warning(f"Rejected unauthenticated WebSocket for endpoint: {endpoint_id}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
     try:
-        await connection_manager.connect(websocket, endpoint_id)
+        # Pool membership decides which target state changes are forwarded
+        await connection_manager.connect(websocket, endpoint_id, endpoint.pool_id)
         
         # Send initial connection confirmation
         await websocket.send_json({
@@ -35,6 +35,7 @@ class ServerConfig:
     request_timeout: int
     cors_origins: List[str]
     structured_logging: bool
+    async_logging: bool
 
 
 @dataclass
@@ -47,6 +48,8 @@ class SecurityConfig:
     admin_tokens: List[str]
     enable_rate_limiting: bool
     max_request_size: int
+    auth_cache_ttl: int
+    rate_limit_backend: str
 
 
 @dataclass
@@ -55,6 +58,11 @@ class FeatureConfig:
     enable_repository_analysis: bool
     auto_cleanup_old_states: bool
     max_state_snapshots: int
+    package_cache_enabled: bool
+    package_cache_dir: str
+    package_cache_max_size: int
+    package_cache_url: Optional[str]
+    package_cache_upstreams: List[str]
 
 
 @dataclass
@@ -63,6 +71,9 @@ class MonitoringConfig:
     health_check_interval: int
     log_max_size: str
     log_backup_count: int
+    heartbeat_flush_interval: int
+    endpoint_offline_timeout: int
+    operation_log_sample_rate: float
 
 
 @dataclass
@@ -89,6 +100,14 @@ def get_env_int(key: str, default: int) -> int:
         return default
 
 
+def get_env_float(key: str, default: float) -> float:
+    """Get float value from environment variable."""
+    try:
+        return float(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
 def get_env_list(key: str, default: List[str] = None, separator: str = ',') -> List[str]:
     """Get list value from environment variable."""
     if default is None:
@@ -139,7 +158,8 @@ def load_config() -> AppConfig:
         log_level=os.getenv("LOG_LEVEL", "INFO"),
         request_timeout=get_env_int("REQUEST_TIMEOUT", 60),
         cors_origins=get_env_list("CORS_ORIGINS", ["*"]),
-        structured_logging=get_env_bool("STRUCTURED_LOGGING", False)
+        structured_logging=get_env_bool("STRUCTURED_LOGGING", False),
+        async_logging=get_env_bool("ASYNC_LOGGING", True)
     )
     
     # Security configuration
@@ -150,21 +170,31 @@ def load_config() -> AppConfig:
         api_rate_limit=get_env_int("API_RATE_LIMIT", 100),
         admin_tokens=get_env_list("ADMIN_TOKENS", []),
         enable_rate_limiting=get_env_bool("ENABLE_RATE_LIMITING", True),
-        max_request_size=get_env_int("MAX_REQUEST_SIZE", 10485760)  # 10MB
+        max_request_size=get_env_int("MAX_REQUEST_SIZE", 10485760),  # 10MB
+        auth_cache_ttl=get_env_int("AUTH_CACHE_TTL", 300),
+        rate_limit_backend=os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
     )
     
     # Feature configuration
     features_config = FeatureConfig(
         enable_repository_analysis=get_env_bool("ENABLE_REPOSITORY_ANALYSIS", True),
         auto_cleanup_old_states=get_env_bool("AUTO_CLEANUP_OLD_STATES", True),
-        max_state_snapshots=get_env_int("MAX_STATE_SNAPSHOTS", 10)
+        max_state_snapshots=get_env_int("MAX_STATE_SNAPSHOTS", 10),
+        package_cache_enabled=get_env_bool("ENABLE_PACKAGE_CACHE", False),
+        package_cache_dir=os.getenv("PACKAGE_CACHE_DIR", "data/package-cache"),
+        package_cache_max_size=get_env_int("PACKAGE_CACHE_MAX_SIZE", 20 * 1024 ** 3),  # 20GB
+        package_cache_url=os.getenv("PACKAGE_CACHE_URL") or None,
+        package_cache_upstreams=get_env_list("PACKAGE_CACHE_UPSTREAMS", [])
     )
     
     # Monitoring configuration
     monitoring_config = MonitoringConfig(
         health_check_interval=get_env_int("HEALTH_CHECK_INTERVAL", 30),
         log_max_size=os.getenv("LOG_MAX_SIZE", "10MB"),
-        log_backup_count=get_env_int("LOG_BACKUP_COUNT", 5)
+        log_backup_count=get_env_int("LOG_BACKUP_COUNT", 5),
+        heartbeat_flush_interval=get_env_int("HEARTBEAT_FLUSH_INTERVAL", 5),
+        endpoint_offline_timeout=get_env_int("ENDPOINT_OFFLINE_TIMEOUT", 7200),
+        operation_log_sample_rate=get_env_float("OPERATION_LOG_SAMPLE_RATE", 1.0)
     )
     
     return AppConfig(
@@ -204,7 +234,8 @@ def setup_logging(config: AppConfig) -> Dict[str, logging.Logger]:
         backup_count=config.monitoring.log_backup_count,
         enable_console=True,
         enable_audit=True,
-        audit_file=audit_file
+        audit_file=audit_file,
+        async_logging=config.server.async_logging
     )
     
     # Set specific logger levels for server components
@@ -0,0 +1,161 @@
+"""
+Authenticated endpoint cache for the Pacman Sync Utility.
+
+Endpoint requests carry a long-lived JWT. Verifying it and loading the
+endpoint row on every request costs an HMAC check plus a database round
+trip, so verified tokens are cached together with the endpoint they resolve
+to. Entries expire after a short TTL and are dropped as soon as the endpoint
+is removed, moved between pools or changes status. Removed endpoint IDs are
+remembered in a negative cache so revoked tokens are rejected without a
+lookup.
+"""
+
+import copy
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from shared.models import Endpoint
+from server.database.events import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+
+class AuthCache:
+    """
+    Bounded TTL cache of verified token -> Endpoint records.
+
+    The cache is local to the process; with several server replicas the TTL
+    bounds how long another replica's changes can go unnoticed.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000,
+                 negative_ttl: float = 3600.0, max_negative_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.max_negative_entries = max_negative_entries
+
+        # token -> (cache expiry, token expiry, endpoint)
+        self._entries: "OrderedDict[str, Tuple[float, float, Endpoint]]" = OrderedDict()
+        self._tokens_by_endpoint: Dict[str, Set[str]] = {}
+        # endpoint_id -> negative cache expiry
+        self._revoked: "OrderedDict[str, float]" = OrderedDict()
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether caching is enabled (a TTL of 0 disables it)."""
+        return self.ttl > 0
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped on every invalidation, used to discard racing fills."""
+        return self._generation
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[Endpoint]:
+        """Return a copy of the cached endpoint for a token, if still valid."""
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+
+        cache_expiry, token_expiry, endpoint = entry
+        if cache_expiry < time.monotonic() or token_expiry < time.time():
+            self._discard(token)
+            return None
+
+        self._entries.move_to_end(token)
+        return copy.copy(endpoint)
+
+    def put(self, token: str, endpoint: Endpoint, token_expires_at: float,
+            generation: Optional[int] = None) -> None:
+        """
+        Cache a verified token.
+
+        If generation is given and an invalidation happened since it was
+        read, the (possibly stale) endpoint is not cached.
+        """
+        if not self.enabled:
+            return
+        if generation is not None and generation != self._generation:
+            return
+
+        self._discard(token)
+        self._entries[token] = (time.monotonic() + self.ttl, token_expires_at, copy.copy(endpoint))
+        self._tokens_by_endpoint.setdefault(endpoint.id, set()).add(token)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+
+    def is_revoked(self, endpoint_id: str) -> bool:
+        """Check the negative cache for a removed endpoint ID."""
+        expiry = self._revoked.get(endpoint_id)
+        if expiry is None:
+            return False
+        if expiry < time.monotonic():
+            del self._revoked[endpoint_id]
+            return False
+        return True
+
+    def revoke(self, endpoint_id: str) -> None:
+        """Invalidate an endpoint and remember its ID as revoked."""
+        self.invalidate_endpoint(endpoint_id)
+        if not self.enabled:
+            return
+
+        self._revoked.pop(endpoint_id, None)
+        self._revoked[endpoint_id] = time.monotonic() + self.negative_ttl
+        while len(self._revoked) > self.max_negative_entries:
+            self._revoked.popitem(last=False)
+
+    def invalidate_endpoint(self, endpoint_id: str) -> None:
+        """Drop every cached token that resolves to an endpoint."""
+        self._generation += 1
+        for token in list(self._tokens_by_endpoint.get(endpoint_id, ())):
+            self._discard(token)
+
+    def invalidate_pool(self, pool_id: str) -> None:
+        """Drop cached tokens for every endpoint assigned to a pool."""
+        self._generation += 1
+        for token, (_, _, endpoint) in list(self._entries.items()):
+            if endpoint.pool_id == pool_id:
+                self._discard(token)
+
+    def clear(self) -> None:
+        """Drop all positive and negative entries."""
+        self._generation += 1
+        self._entries.clear()
+        self._tokens_by_endpoint.clear()
+        self._revoked.clear()
+
+    def handle_change(self, event: ChangeEvent, payload: Dict[str, Any]) -> None:
+        """ChangeNotifier listener keeping the cache consistent with ORM writes."""
+        endpoint_id = payload.get('endpoint_id')
+
+        if event == ChangeEvent.ENDPOINT_DELETED:
+            self.revoke(endpoint_id)
+        elif event == ChangeEvent.ENDPOINT_CREATED:
+            self._revoked.pop(endpoint_id, None)
+        elif event in (ChangeEvent.ENDPOINT_STATUS_CHANGED, ChangeEvent.ENDPOINT_POOL_CHANGED):
+            self.invalidate_endpoint(endpoint_id)
+        elif event == ChangeEvent.POOL_DELETED:
+            # Endpoints are unassigned by ON DELETE SET NULL
+            self.invalidate_pool(payload.get('pool_id'))
+
+    def _discard(self, token: str) -> None:
+        """Remove a single token entry and its index reference."""
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+
+        endpoint_id = entry[2].id
+        tokens = self._tokens_by_endpoint.get(endpoint_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_endpoint[endpoint_id]
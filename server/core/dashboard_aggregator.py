@@ -0,0 +1,402 @@
+"""
+In-memory dashboard aggregates for the Pacman Sync Utility.
+
+This module implements the DashboardAggregator class that keeps per-pool
+endpoint status counts, fleet totals and operation counters in memory. The
+aggregates are loaded from the database once and then updated incrementally
+from ORM change events, so dashboard reads and the server-sent events feed
+cost the same regardless of how many pools and endpoints exist.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from shared.models import OperationStatus, SyncStatus
+from server.database.connection import DatabaseManager
+from server.database.events import ChangeEvent, ChangeNotifier, get_change_notifier
+from server.database.orm import EndpointRepository, PoolRepository
+
+logger = logging.getLogger(__name__)
+
+# Statuses that count an endpoint as reachable on the dashboard
+ONLINE_STATUSES = (SyncStatus.IN_SYNC.value, SyncStatus.AHEAD.value, SyncStatus.BEHIND.value)
+
+StatsLoader = Callable[[DatabaseManager], Awaitable[Dict[str, int]]]
+
+
+class DashboardAggregator:
+    """
+    Maintains dashboard metrics in memory and fans out incremental updates.
+
+    Subscribers (one per open server-sent events stream) receive events on a
+    bounded asyncio queue. A subscriber that falls behind is not allowed to
+    grow memory; its queue is cleared and it is sent a fresh snapshot instead.
+    """
+
+    def __init__(self, db_manager: DatabaseManager,
+                 stats_loader: Optional[StatsLoader] = None,
+                 notifier: Optional[ChangeNotifier] = None,
+                 stats_refresh_interval: float = 60.0,
+                 resync_interval: float = 300.0,
+                 subscriber_queue_size: int = 100):
+        self.db_manager = db_manager
+        self.pool_repo = PoolRepository(db_manager)
+        self.endpoint_repo = EndpointRepository(db_manager)
+        self.stats_loader = stats_loader
+        self.notifier = notifier or get_change_notifier()
+        self.stats_refresh_interval = stats_refresh_interval
+        self.resync_interval = resync_interval
+        self.subscriber_queue_size = subscriber_queue_size
+
+        # pool_id -> {"name", "has_target_state", "auto_sync"}
+        self._pools: Dict[str, Dict[str, Any]] = {}
+        # endpoint_id -> (pool_id, sync status value)
+        self._endpoints: Dict[str, Tuple[Optional[str], str]] = {}
+        # pool_id (None for unassigned) -> Counter of sync status values
+        self._status_counts: Dict[Optional[str], Counter] = {}
+
+        self._repository_stats: Dict[str, int] = {
+            'total_repositories': 0,
+            'total_packages_available': 0,
+            'total_packages_in_target_states': 0,
+            'total_sync_operations': 0
+        }
+        self._active_operations: Set[str] = set()
+        self._stats_loaded_at: Optional[datetime] = None
+        self._loaded_at: Optional[datetime] = None
+
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._sequence = 0
+
+        logger.info("DashboardAggregator initialized")
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Load initial aggregates, subscribe to changes and start refreshing."""
+        await self.load()
+        self.notifier.subscribe(self.handle_change)
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        logger.info("DashboardAggregator started")
+
+    async def stop(self) -> None:
+        """Stop background refresh and detach from change notifications."""
+        self.notifier.unsubscribe(self.handle_change)
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        logger.info("DashboardAggregator stopped")
+
+    async def load(self) -> None:
+        """
+        (Re)build the aggregates from the database.
+
+        This costs two queries regardless of fleet size and is used at startup
+        and as a periodic safety net for writes made by other server replicas.
+        """
+        pools = await self.pool_repo.list_all()
+        endpoints = await self.endpoint_repo.list_by_pool(None)
+
+        self._pools = {pool.id: self._pool_info(pool) for pool in pools}
+        self._endpoints = {
+            endpoint.id: (endpoint.pool_id, endpoint.sync_status.value)
+            for endpoint in endpoints
+        }
+        self._status_counts = {}
+        for pool_id, status in self._endpoints.values():
+            self._status_counts.setdefault(pool_id, Counter())[status] += 1
+
+        await self.refresh_stats()
+        self._loaded_at = datetime.now()
+        logger.debug(f"Dashboard aggregates loaded: {len(self._pools)} pools, {len(self._endpoints)} endpoints")
+        self._broadcast('snapshot', self.snapshot())
+
+    async def refresh_stats(self) -> None:
+        """Refresh repository and package counters from the database."""
+        if not self.stats_loader:
+            return
+        try:
+            stats = await self.stats_loader(self.db_manager)
+            self._repository_stats.update(stats)
+            self._stats_loaded_at = datetime.now()
+        except Exception as e:
+            logger.warning(f"Failed to refresh dashboard repository stats: {e}")
+
+    async def _refresh_loop(self) -> None:
+        """Periodically refresh slow-changing counters and resync aggregates."""
+        last_resync = asyncio.get_event_loop().time()
+        while True:
+            await asyncio.sleep(self.stats_refresh_interval)
+            try:
+                now = asyncio.get_event_loop().time()
+                if now - last_resync >= self.resync_interval:
+                    await self.load()
+                    last_resync = now
+                else:
+                    await self.refresh_stats()
+                    self._broadcast('metrics', {'metrics': self.get_metrics()})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Dashboard aggregate refresh failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Change handling
+    # ------------------------------------------------------------------
+
+    def handle_change(self, event: ChangeEvent, payload: Dict[str, Any]) -> None:
+        """Apply an ORM change event to the aggregates and publish a delta."""
+        changed_pools: Set[Optional[str]] = set()
+
+        if event == ChangeEvent.ENDPOINT_CREATED:
+            endpoint = payload['endpoint']
+            self._set_endpoint(endpoint.id, endpoint.pool_id, endpoint.sync_status.value, changed_pools)
+
+        elif event == ChangeEvent.ENDPOINT_STATUS_CHANGED:
+            endpoint_id = payload['endpoint_id']
+            pool_id = self._endpoints.get(endpoint_id, (payload.get('pool_id'), None))[0]
+            self._set_endpoint(endpoint_id, pool_id, payload['status'].value, changed_pools)
+
+        elif event == ChangeEvent.ENDPOINT_POOL_CHANGED:
+            endpoint_id = payload['endpoint_id']
+            status = self._endpoints.get(endpoint_id, (None, SyncStatus.OFFLINE.value))[1]
+            self._set_endpoint(endpoint_id, payload['pool_id'], status, changed_pools)
+
+        elif event == ChangeEvent.ENDPOINT_DELETED:
+            self._remove_endpoint(payload['endpoint_id'], changed_pools)
+
+        elif event in (ChangeEvent.POOL_CREATED, ChangeEvent.POOL_UPDATED):
+            pool_id = payload['pool_id']
+            if payload.get('pool') is not None:
+                self._pools[pool_id] = self._pool_info(payload['pool'])
+            elif pool_id in self._pools and 'target_state_id' in payload:
+                self._pools[pool_id]['has_target_state'] = payload['target_state_id'] is not None
+            changed_pools.add(pool_id)
+
+        elif event == ChangeEvent.POOL_DELETED:
+            pool_id = payload['pool_id']
+            self._pools.pop(pool_id, None)
+            self._publish_pool_removed(pool_id)
+            return
+
+        elif event == ChangeEvent.OPERATION_CREATED:
+            self._repository_stats['total_sync_operations'] += 1
+            self._active_operations.add(payload['operation_id'])
+            self._broadcast('operation', {
+                'operation_id': payload['operation_id'],
+                'status': payload['operation'].status.value,
+                'metrics': self.get_metrics()
+            })
+            return
+
+        elif event == ChangeEvent.OPERATION_STATUS_CHANGED:
+            status = payload['status']
+            if status in (OperationStatus.COMPLETED, OperationStatus.FAILED):
+                self._active_operations.discard(payload['operation_id'])
+            self._broadcast('operation', {
+                'operation_id': payload['operation_id'],
+                'endpoint_id': payload.get('endpoint_id'),
+                'pool_id': payload.get('pool_id'),
+                'status': status.value
+            })
+            return
+
+        if changed_pools:
+            self._publish_pool_deltas(changed_pools)
+
+    def _set_endpoint(self, endpoint_id: str, pool_id: Optional[str], status: str,
+                      changed_pools: Set[Optional[str]]) -> None:
+        """Move an endpoint to a (pool, status) bucket, updating counters."""
+        previous = self._endpoints.get(endpoint_id)
+        if previous == (pool_id, status):
+            return
+        if previous is not None:
+            self._decrement(previous[0], previous[1])
+            changed_pools.add(previous[0])
+        self._endpoints[endpoint_id] = (pool_id, status)
+        self._status_counts.setdefault(pool_id, Counter())[status] += 1
+        changed_pools.add(pool_id)
+
+    def _remove_endpoint(self, endpoint_id: str, changed_pools: Set[Optional[str]]) -> None:
+        """Drop an endpoint from the aggregates."""
+        previous = self._endpoints.pop(endpoint_id, None)
+        if previous is not None:
+            self._decrement(previous[0], previous[1])
+            changed_pools.add(previous[0])
+
+    def _decrement(self, pool_id: Optional[str], status: str) -> None:
+        counts = self._status_counts.get(pool_id)
+        if counts is None:
+            return
+        counts[status] -= 1
+        if counts[status] <= 0:
+            del counts[status]
+
+    @staticmethod
+    def _pool_info(pool) -> Dict[str, Any]:
+        return {
+            'name': pool.name,
+            'has_target_state': pool.target_state_id is not None,
+            'auto_sync': pool.sync_policy.auto_sync if pool.sync_policy else False
+        }
+
+    # ------------------------------------------------------------------
+    # Read API
+    # ------------------------------------------------------------------
+
+    def get_pool_status(self, pool_id: str) -> Optional[Dict[str, Any]]:
+        """Get the dashboard status dictionary for a single pool."""
+        info = self._pools.get(pool_id)
+        if info is None:
+            return None
+
+        counts = self._status_counts.get(pool_id, Counter())
+        total_endpoints = sum(counts.values())
+        in_sync_count = counts[SyncStatus.IN_SYNC.value]
+        offline_count = counts[SyncStatus.OFFLINE.value]
+
+        if total_endpoints > 0:
+            sync_percentage = (in_sync_count / total_endpoints) * 100.0
+        else:
+            sync_percentage = 100.0
+
+        if total_endpoints == 0:
+            overall_status = "empty"
+        elif in_sync_count == total_endpoints:
+            overall_status = "healthy"
+        elif offline_count == total_endpoints:
+            overall_status = "critical"
+        elif sync_percentage >= 80:
+            overall_status = "healthy"
+        elif sync_percentage >= 50:
+            overall_status = "warning"
+        else:
+            overall_status = "critical"
+
+        return {
+            "pool_id": pool_id,
+            "pool_name": info['name'],
+            "total_endpoints": total_endpoints,
+            "in_sync_count": in_sync_count,
+            "ahead_count": counts[SyncStatus.AHEAD.value],
+            "behind_count": counts[SyncStatus.BEHIND.value],
+            "offline_count": offline_count,
+            "sync_percentage": round(sync_percentage, 1),
+            "overall_status": overall_status,
+            "has_target_state": info['has_target_state'],
+            "auto_sync_enabled": info['auto_sync']
+        }
+
+    def get_pool_statuses(self) -> List[Dict[str, Any]]:
+        """Get dashboard status dictionaries for all pools."""
+        return [self.get_pool_status(pool_id) for pool_id in self._pools]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get fleet-wide metrics.
+
+        Uptime and timestamps are added by the API layer; everything returned
+        here is derived from the in-memory counters.
+        """
+        total_pools = len(self._pools)
+        pools_healthy = 0
+        total_sync_percentage = 0.0
+
+        for pool_id in self._pools:
+            counts = self._status_counts.get(pool_id)
+            total = sum(counts.values()) if counts else 0
+            if total == 0:
+                sync_percentage = 100.0
+            else:
+                sync_percentage = (counts[SyncStatus.IN_SYNC.value] / total) * 100.0
+            total_sync_percentage += sync_percentage
+            if sync_percentage >= 80.0 or total == 0:
+                pools_healthy += 1
+
+        fleet_counts = Counter()
+        for counts in self._status_counts.values():
+            fleet_counts.update(counts)
+        unassigned = self._status_counts.get(None)
+
+        return {
+            'total_endpoints': len(self._endpoints),
+            'endpoints_online': sum(fleet_counts[status] for status in ONLINE_STATUSES),
+            'endpoints_offline': fleet_counts[SyncStatus.OFFLINE.value],
+            'endpoints_unassigned': sum(unassigned.values()) if unassigned else 0,
+            'total_pools': total_pools,
+            'pools_healthy': pools_healthy,
+            'pools_with_issues': total_pools - pools_healthy,
+            'total_repositories': self._repository_stats['total_repositories'],
+            'total_packages_available': self._repository_stats['total_packages_available'],
+            'total_packages_in_target_states': self._repository_stats['total_packages_in_target_states'],
+            'total_sync_operations': self._repository_stats['total_sync_operations'],
+            'active_operations': len(self._active_operations),
+            'average_sync_percentage': round(total_sync_percentage / total_pools, 1) if total_pools > 0 else 0.0
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the complete dashboard state used to (re)initialize a stream."""
+        return {
+            'metrics': self.get_metrics(),
+            'pool_statuses': self.get_pool_statuses()
+        }
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the aggregates have been loaded from the database."""
+        return self._loaded_at is not None
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a new stream subscriber and return its event queue."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self._subscribers.add(queue)
+        logger.debug(f"Dashboard stream subscribed ({len(self._subscribers)} active)")
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Remove a stream subscriber."""
+        self._subscribers.discard(queue)
+        logger.debug(f"Dashboard stream unsubscribed ({len(self._subscribers)} active)")
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of connected stream subscribers."""
+        return len(self._subscribers)
+
+    def _publish_pool_deltas(self, pool_ids: Set[Optional[str]]) -> None:
+        pools = [self.get_pool_status(pool_id) for pool_id in pool_ids if pool_id in self._pools]
+        self._broadcast('delta', {'pools': pools, 'metrics': self.get_metrics()})
+
+    def _publish_pool_removed(self, pool_id: str) -> None:
+        self._broadcast('delta', {'removed_pools': [pool_id], 'metrics': self.get_metrics()})
+
+    def _broadcast(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Queue an event for every subscriber without ever blocking."""
+        if not self._subscribers:
+            return
+
+        self._sequence += 1
+        message = (self._sequence, event_type, data)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and let it resynchronize
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((self._sequence, 'snapshot', self.snapshot()))
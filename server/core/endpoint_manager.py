@@ -5,8 +5,9 @@ This module provides endpoint management functionality including registration,
 status updates, authentication, and repository information processing.
 """
 
+import asyncio
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from jose import jwt, JWTError
 import secrets
@@ -16,6 +17,8 @@ from shared.models import Endpoint, Repository, SyncStatus
 from shared.interfaces import IEndpointManager
 from server.database.connection import DatabaseManager
 from server.database.orm import ORMManager
+from server.core.heartbeat_buffer import HeartbeatBuffer
+from server.core.auth_cache import AuthCache
 
 logger = logging.getLogger(__name__)
 
@@ -28,11 +31,15 @@ class EndpointAuthenticationError(Exception):
 class EndpointManager(IEndpointManager):
     """Manages endpoint registration, authentication, and status updates."""
     
-    def __init__(self, db_manager: DatabaseManager, jwt_secret: str = None, jwt_expiration_hours: int = 24 * 30):
+    def __init__(self, db_manager: DatabaseManager, jwt_secret: str = None, jwt_expiration_hours: int = 24 * 30,
+                 heartbeat_flush_interval: float = 5.0, auth_cache_ttl: float = 300.0):
         self.db = db_manager
         self.orm = ORMManager(db_manager)
         self.jwt_secret = jwt_secret or secrets.token_urlsafe(32)
         self.jwt_expiration_hours = jwt_expiration_hours
+        self.heartbeats = HeartbeatBuffer(self.orm.endpoints, flush_interval=heartbeat_flush_interval)
+        self.auth_cache = AuthCache(ttl=auth_cache_ttl)
+        self._offline_task: Optional[asyncio.Task] = None
         
     async def register_endpoint(self, name: str, hostname: str) -> Endpoint:
         """Register a new endpoint."""
@@ -59,24 +66,82 @@ class EndpointManager(IEndpointManager):
     
     async def get_endpoint(self, endpoint_id: str) -> Optional[Endpoint]:
         """Get an endpoint by ID."""
-        return await self.orm.endpoints.get_by_id(endpoint_id)
+        endpoint = await self.orm.endpoints.get_by_id(endpoint_id)
+        return self.heartbeats.apply(endpoint)
     
     async def list_endpoints(self, pool_id: Optional[str] = None) -> List[Endpoint]:
         """List endpoints, optionally filtered by pool."""
-        return await self.orm.endpoints.list_by_pool(pool_id)
+        endpoints = await self.orm.endpoints.list_by_pool(pool_id)
+        return [self.heartbeats.apply(endpoint) for endpoint in endpoints]
     
     async def update_endpoint_status(self, endpoint_id: str, status: SyncStatus) -> bool:
         """Update endpoint sync status."""
         logger.info(f"Updating endpoint {endpoint_id} status to {status.value}")
         success = await self.orm.endpoints.update_status(endpoint_id, status)
         if success:
+            self.auth_cache.invalidate_endpoint(endpoint_id)
             await self.update_last_seen(endpoint_id, datetime.now())
         return success
     
     async def update_last_seen(self, endpoint_id: str, timestamp: datetime) -> bool:
-        """Update endpoint last seen timestamp."""
+        """
+        Update endpoint last seen timestamp.
+        
+        While the heartbeat buffer is running the timestamp is coalesced in
+        memory and written with the next bulk flush; otherwise it is written
+        immediately.
+        """
+        if self.heartbeats.is_running:
+            self.heartbeats.record(endpoint_id, timestamp)
+            return True
         return await self.orm.endpoints.update_last_seen(endpoint_id, timestamp)
     
+    async def find_offline_endpoints(self, max_age: timedelta, pool_id: Optional[str] = None) -> List[Endpoint]:
+        """Find endpoints that have not been seen within max_age, including unflushed heartbeats."""
+        endpoints = await self.orm.endpoints.list_by_pool(pool_id)
+        return self.heartbeats.stale_endpoints(endpoints, max_age)
+    
+    async def mark_offline_endpoints(self, max_age: timedelta) -> List[str]:
+        """Mark endpoints that have not been seen within max_age as offline."""
+        stale = [
+            endpoint.id for endpoint in await self.find_offline_endpoints(max_age)
+            if endpoint.sync_status != SyncStatus.OFFLINE
+        ]
+        if not stale:
+            return []
+        
+        offline = await self.orm.endpoints.update_status_many(stale, SyncStatus.OFFLINE)
+        for endpoint_id in offline:
+            self.auth_cache.invalidate_endpoint(endpoint_id)
+        
+        if offline:
+            logger.info(f"Marked {len(offline)} endpoints offline after {max_age} without a heartbeat")
+        return offline
+    
+    async def start_offline_detection(self, max_age: timedelta, interval: float) -> None:
+        """Periodically mark endpoints without recent heartbeats as offline."""
+        if self._offline_task is None or self._offline_task.done():
+            self._offline_task = asyncio.create_task(self._offline_detection_loop(max_age, interval))
+    
+    async def stop_offline_detection(self) -> None:
+        """Stop the offline detection loop."""
+        if self._offline_task and not self._offline_task.done():
+            self._offline_task.cancel()
+            try:
+                await self._offline_task
+            except asyncio.CancelledError:
+                pass
+        self._offline_task = None
+    
+    async def _offline_detection_loop(self, max_age: timedelta, interval: float) -> None:
+        """Check for stale endpoints every interval seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.mark_offline_endpoints(max_age)
+            except Exception as e:
+                logger.error(f"Offline endpoint detection failed: {e}")
+    
     async def remove_endpoint(self, endpoint_id: str) -> bool:
         """Remove an endpoint."""
         logger.info(f"Removing endpoint: {endpoint_id}")
@@ -87,18 +152,24 @@ class EndpointManager(IEndpointManager):
         # Remove endpoint
         success = await self.orm.endpoints.delete(endpoint_id)
         if success:
+            self.heartbeats.forget(endpoint_id)
+            self.auth_cache.revoke(endpoint_id)
             logger.info(f"Successfully removed endpoint: {endpoint_id}")
         return success
     
     async def assign_to_pool(self, endpoint_id: str, pool_id: str) -> bool:
         """Assign endpoint to a pool."""
         logger.info(f"Assigning endpoint {endpoint_id} to pool {pool_id}")
-        return await self.orm.endpoints.assign_to_pool(endpoint_id, pool_id)
+        success = await self.orm.endpoints.assign_to_pool(endpoint_id, pool_id)
+        self.auth_cache.invalidate_endpoint(endpoint_id)
+        return success
     
     async def remove_from_pool(self, endpoint_id: str) -> bool:
         """Remove endpoint from its pool."""
         logger.info(f"Removing endpoint {endpoint_id} from pool")
-        return await self.orm.endpoints.remove_from_pool(endpoint_id)
+        success = await self.orm.endpoints.remove_from_pool(endpoint_id)
+        self.auth_cache.invalidate_endpoint(endpoint_id)
+        return success
     
     async def update_repository_info(self, endpoint_id: str, repositories: List[Repository]) -> bool:
         """Update repository information for an endpoint."""
@@ -161,16 +232,26 @@ class EndpointManager(IEndpointManager):
     async def authenticate_endpoint(self, token: str) -> Optional[Endpoint]:
         """Authenticate endpoint using JWT token."""
         try:
+            cached = self.auth_cache.get(token)
+            if cached:
+                return cached
+            
             payload = self.verify_auth_token(token)
             endpoint_id = payload.get('endpoint_id')
             
             if not endpoint_id:
                 raise EndpointAuthenticationError("Token missing endpoint_id")
             
+            if self.auth_cache.is_revoked(endpoint_id):
+                raise EndpointAuthenticationError("Endpoint not found")
+            
+            generation = self.auth_cache.generation
             endpoint = await self.get_endpoint(endpoint_id)
             if not endpoint:
+                self.auth_cache.revoke(endpoint_id)
                 raise EndpointAuthenticationError("Endpoint not found")
             
+            self.auth_cache.put(token, endpoint, payload.get('expires_at', 0), generation)
             return endpoint
             
         except EndpointAuthenticationError:
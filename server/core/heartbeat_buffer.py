@@ -0,0 +1,151 @@
+"""
+Heartbeat buffer for the Pacman Sync Utility.
+
+Every authenticated endpoint request refreshes the endpoint's last_seen
+timestamp. Writing each of those straight to the database turns read-only
+traffic into a stream of single-row UPDATEs, so this module coalesces them
+in memory (one pending timestamp per endpoint) and writes them periodically
+in a single bulk statement.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from shared.models import Endpoint
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatBuffer:
+    """
+    Coalesces endpoint last_seen updates and flushes them in bulk.
+
+    The buffer keeps the most recent timestamp seen for each endpoint so
+    readers (offline detection, API responses) see heartbeats that have not
+    been flushed yet.
+    """
+
+    def __init__(self, endpoint_repo, flush_interval: float = 5.0, max_pending: int = 1000):
+        self.endpoint_repo = endpoint_repo
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: Dict[str, datetime] = {}
+        self._latest: Dict[str, datetime] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the periodic flush loop is active."""
+        return self._flush_task is not None and not self._flush_task.done()
+
+    @property
+    def pending_count(self) -> int:
+        """Number of endpoints with an unflushed heartbeat."""
+        return len(self._pending)
+
+    def record(self, endpoint_id: str, timestamp: datetime) -> None:
+        """Record a heartbeat, keeping only the newest timestamp per endpoint."""
+        current = self._pending.get(endpoint_id)
+        if current is None or timestamp > current:
+            self._pending[endpoint_id] = timestamp
+
+        latest = self._latest.get(endpoint_id)
+        if latest is None or timestamp > latest:
+            self._latest[endpoint_id] = timestamp
+
+        if len(self._pending) >= self.max_pending and self.is_running:
+            if self._early_flush is None or self._early_flush.done():
+                self._early_flush = asyncio.create_task(self.flush())
+
+    def get_last_seen(self, endpoint_id: str) -> Optional[datetime]:
+        """Get the newest heartbeat recorded for an endpoint, if any."""
+        return self._latest.get(endpoint_id)
+
+    def forget(self, endpoint_id: str) -> None:
+        """Drop buffered state for a removed endpoint."""
+        self._pending.pop(endpoint_id, None)
+        self._latest.pop(endpoint_id, None)
+
+    def apply(self, endpoint: Optional[Endpoint]) -> Optional[Endpoint]:
+        """Overlay a buffered heartbeat onto an endpoint loaded from the database."""
+        if endpoint is None:
+            return None
+
+        # Heartbeats recorded by this process are never older than what it
+        # has written, so a buffered value always wins
+        buffered = self._latest.get(endpoint.id)
+        if buffered is not None:
+            endpoint.last_seen = buffered
+        return endpoint
+
+    def stale_endpoints(self, endpoints: List[Endpoint], max_age: timedelta,
+                        now: Optional[datetime] = None) -> List[Endpoint]:
+        """Return endpoints whose newest heartbeat is older than max_age."""
+        now = now or datetime.now()
+        stale = []
+        for endpoint in endpoints:
+            last_seen = self.apply(endpoint).last_seen
+            if last_seen is not None and last_seen.tzinfo is not None:
+                last_seen = last_seen.astimezone().replace(tzinfo=None)
+            if last_seen is None or now - last_seen > max_age:
+                stale.append(endpoint)
+        return stale
+
+    async def flush(self) -> int:
+        """Write all pending heartbeats to the database in one bulk update."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch = self._pending
+            self._pending = {}
+
+            try:
+                await self.endpoint_repo.update_last_seen_bulk(batch)
+            except asyncio.CancelledError:
+                self._requeue(batch)
+                raise
+            except Exception as e:
+                self._requeue(batch)
+                logger.error(f"Failed to flush {len(batch)} endpoint heartbeats: {e}")
+                return 0
+
+            logger.debug(f"Flushed {len(batch)} endpoint heartbeats")
+            return len(batch)
+
+    def _requeue(self, batch: Dict[str, datetime]) -> None:
+        """Put an unwritten batch back without overwriting newer heartbeats."""
+        for endpoint_id, timestamp in batch.items():
+            current = self._pending.get(endpoint_id)
+            if current is None or timestamp > current:
+                self._pending[endpoint_id] = timestamp
+
+    async def start(self) -> None:
+        """Start the periodic flush loop."""
+        if not self.is_running:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write any remaining heartbeats."""
+        for task in (self._flush_task, self._early_flush):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._flush_task = None
+        self._early_flush = None
+
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        """Flush pending heartbeats every flush_interval seconds."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
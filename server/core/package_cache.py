@@ -0,0 +1,396 @@
+"""
+Package artifact cache for the Pacman Sync Utility Server.
+
+Every endpoint in a pool installs the same target packages, so the server
+acts as a caching proxy for the repositories they use. An archive is
+fetched from an upstream mirror once, stored on disk and then served to
+every endpoint from there. A request for an archive that is already being
+downloaded waits for that download instead of starting another one. The
+archives of a pool's target state are prefetched as soon as the target is
+set, so a rollout finds them cached.
+
+The proxy serves the pacman mirror layout {base}/{repo}/os/{arch}/{file}.
+Upstream mirrors come only from the administrator (PACKAGE_CACHE_UPSTREAMS),
+never from what endpoints report, and requests to hosts that are not
+publicly routable are refused, including redirects.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import os
+import re
+import time
+import urllib.parse
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import httpx
+
+from server.database.connection import DatabaseManager
+from server.database.events import ChangeEvent
+from server.database.orm import PackageStateRepository, RepositoryRepository
+
+logger = logging.getLogger(__name__)
+
+# Compression suffixes tried when prefetching an archive, newest first
+ARCHIVE_EXTENSIONS = ('.pkg.tar.zst', '.pkg.tar.xz')
+
+# Repository names and filenames accepted by the proxy
+SAFE_NAME = re.compile(r'^[A-Za-z0-9@_+:.-]+$')
+
+# Download chunk size
+CHUNK_SIZE = 256 * 1024
+
+
+def is_package_file(filename: str) -> bool:
+    """Whether a file is a package archive or signature that can be cached."""
+    return '.pkg.tar' in filename and not filename.endswith('.part')
+
+
+def is_safe_name(name: str) -> bool:
+    """Whether a path component is safe to use inside the cache directory."""
+    return bool(SAFE_NAME.match(name)) and not name.startswith('.')
+
+
+def parse_upstreams(entries: Iterable[str]) -> Dict[Optional[str], List[str]]:
+    """
+    Parse configured upstream mirrors.
+
+    Each entry is a pacman Server URL such as
+    https://geo.mirror.pkgbuild.com/$repo/os/$arch, optionally prefixed with
+    "repo=" to use it for that repository only. Entries that are not plain
+    http(s) URLs (with credentials, a query string or a fragment) are
+    skipped.
+
+    Returns:
+        Dictionary mapping repository names, or None for mirrors of every
+        repository, to mirror URLs in configured order
+    """
+    upstreams: Dict[Optional[str], List[str]] = {}
+    for entry in entries:
+        repo, url = None, entry.strip()
+        prefix, separator, rest = url.partition('=')
+        if separator and '://' not in prefix:
+            repo, url = prefix.strip(), rest.strip()
+            if not is_safe_name(repo):
+                logger.warning(f"Ignoring package cache upstream for invalid repository {repo!r}")
+                continue
+
+        parsed = urllib.parse.urlsplit(url)
+        if (parsed.scheme not in ('http', 'https') or not parsed.hostname or '@' in parsed.netloc
+                or parsed.query or parsed.fragment or '?' in url or '#' in url):
+            logger.warning(f"Ignoring package cache upstream {url!r}: not a plain http(s) URL")
+            continue
+        upstreams.setdefault(repo, []).append(url.rstrip('/'))
+    return upstreams
+
+
+async def is_public_host(host: str) -> bool:
+    """Whether every address a host name resolves to is publicly routable."""
+    try:
+        addresses = [ipaddress.ip_address(host.strip('[]'))]
+    except ValueError:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+        except OSError:
+            return False
+        # Scoped IPv6 addresses carry an interface suffix (fe80::1%eth0)
+        addresses = [ipaddress.ip_address(info[4][0].split('%')[0]) for info in infos]
+    return bool(addresses) and all(address.is_global for address in addresses)
+
+
+class PackageArtifactCache:
+    """
+    Disk cache and upstream fetcher for package archives.
+
+    Subscribe handle_change() to the ORM change notifier to prefetch the
+    target state of a pool whenever it changes.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, cache_dir: str, max_size: int = 0,
+                 max_concurrent: int = 4, timeout: float = 60.0, repository_ttl: float = 300.0,
+                 upstreams: Iterable[str] = ()):
+        """
+        Initialize the cache.
+
+        Args:
+            db_manager: Database manager used to read states and repositories
+            cache_dir: Directory archives are stored in, one subdirectory per repository
+            max_size: Maximum total size in bytes; least recently used
+                archives are removed beyond it (0 disables the limit)
+            max_concurrent: Maximum concurrent upstream downloads when prefetching
+            timeout: Upstream request timeout in seconds
+            repository_ttl: Seconds the names of the repositories endpoints
+                use are cached before reloading
+            upstreams: Administrator-approved upstream mirrors, see parse_upstreams()
+        """
+        self.state_repo = PackageStateRepository(db_manager)
+        self.repository_repo = RepositoryRepository(db_manager)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.repository_ttl = repository_ttl
+        self.upstreams = parse_upstreams(upstreams)
+
+        # Counters for monitoring
+        self.hits = 0
+        self.upstream_fetches = 0
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._repositories: Set[str] = set()
+        self._repositories_loaded_at = 0.0
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._prefetched: Dict[str, str] = {}  # pool_id -> state_id
+        self._prefetch_tasks: Set[asyncio.Task] = set()
+        self._size = 0
+
+    async def start(self) -> None:
+        """Create the cache directory and the upstream HTTP client."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = await asyncio.to_thread(self._disk_usage)
+        if self._client is None:
+            self._client = self._new_client()
+        if not self.upstreams:
+            logger.warning("No PACKAGE_CACHE_UPSTREAMS configured; only cached archives can be served")
+        logger.info(f"Package cache at {self.cache_dir} ({self._size // (1024 * 1024)} MiB cached)")
+
+    async def stop(self) -> None:
+        """Cancel running prefetches and close the HTTP client."""
+        for task in list(self._prefetch_tasks):
+            task.cancel()
+        if self._prefetch_tasks:
+            await asyncio.gather(*self._prefetch_tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _new_client(self, **kwargs) -> httpx.AsyncClient:
+        """HTTP client for upstream requests that refuses non-public hosts."""
+        return httpx.AsyncClient(
+            timeout=self.timeout, follow_redirects=True,
+            event_hooks={'request': [self._check_upstream_request]}, **kwargs
+        )
+
+    async def _check_upstream_request(self, request: httpx.Request) -> None:
+        """Refuse requests, including redirects, to private, loopback or link-local hosts."""
+        if not await is_public_host(request.url.host):
+            raise httpx.RequestError(f"Upstream host {request.url.host} is not a public address",
+                                     request=request)
+
+    def upstream_mirrors(self, repo: str) -> List[str]:
+        """Get the configured upstream mirror URLs of a repository."""
+        return self.upstreams.get(repo, []) + self.upstreams.get(None, [])
+
+    def upstream_urls(self, repo: str, arch: str, filename: str) -> List[str]:
+        """Upstream URLs of a file, in mirror order."""
+        return [
+            mirror.replace('$repo', repo).replace('$arch', arch) + '/' + filename
+            for mirror in self.upstream_mirrors(repo)
+        ]
+
+    async def known_repositories(self) -> Set[str]:
+        """Names of the repositories endpoints report using."""
+        if time.monotonic() - self._repositories_loaded_at > self.repository_ttl:
+            try:
+                self._repositories = set(await self.repository_repo.list_repo_names())
+                self._repositories_loaded_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Failed to load repositories: {e}")
+        return self._repositories
+
+    def cached_path(self, repo: str, filename: str) -> str:
+        """Location of a file in the cache."""
+        return os.path.join(self.cache_dir, repo, filename)
+
+    async def fetch(self, repo: str, arch: str, filename: str) -> Optional[str]:
+        """
+        Get a package file, downloading it from upstream if it is not cached.
+
+        Concurrent calls for the same file share a single download.
+
+        Returns:
+            Path of the cached file, or None if no upstream mirror has it
+        """
+        path = self.cached_path(repo, filename)
+        if os.path.exists(path):
+            self.hits += 1
+            try:
+                os.utime(path)  # keep recently used archives when pruning
+            except OSError:
+                pass
+            return path
+
+        key = (repo, filename)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._download(repo, arch, filename))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # A disconnecting client must not cancel a download others wait for
+        return await asyncio.shield(task)
+
+    async def _download(self, repo: str, arch: str, filename: str) -> Optional[str]:
+        """Download a file from the first upstream mirror that has it."""
+        if self._client is None:
+            await self.start()
+
+        path = self.cached_path(repo, filename)
+        partial = path + '.part'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        for url in self.upstream_urls(repo, arch, filename):
+            try:
+                async with self._client.stream('GET', url) as response:
+                    if response.status_code == 404:
+                        continue
+                    response.raise_for_status()
+                    # Content-Length counts encoded bytes; archives are sent unencoded
+                    expected = (response.headers.get('Content-Length')
+                                if 'Content-Encoding' not in response.headers else None)
+                    size = 0
+                    with open(partial, 'wb') as output:
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            output.write(chunk)
+                            size += len(chunk)
+                if expected is not None and size != int(expected):
+                    raise IOError(f"incomplete download ({size} of {expected} bytes)")
+                os.replace(partial, path)
+            except Exception as e:
+                logger.warning(f"Failed to fetch {url}: {e}")
+                try:
+                    os.unlink(partial)
+                except OSError:
+                    pass
+                continue
+
+            self.upstream_fetches += 1
+            self._size += size
+            logger.debug(f"Cached {repo}/{filename} from {url}")
+            if self.max_size and self._size > self.max_size:
+                await asyncio.to_thread(self.prune)
+            return path
+
+        return None
+
+    def handle_change(self, event: ChangeEvent, payload: Dict[str, Any]) -> None:
+        """ChangeNotifier listener that prefetches new pool target states."""
+        if event != ChangeEvent.POOL_UPDATED:
+            return
+
+        pool_id = payload.get('pool_id')
+        state_id = payload.get('target_state_id') or getattr(payload.get('pool'), 'target_state_id', None)
+        if not pool_id or not state_id or self._prefetched.get(pool_id) == state_id:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._prefetched[pool_id] = state_id
+        task = loop.create_task(self.prefetch_state(state_id))
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+
+    async def prefetch_state(self, state_id: str) -> int:
+        """
+        Download the archives of every repository package in a state.
+
+        Packages from repositories no endpoint uses (local builds, AUR
+        packages) or without an upstream mirror are skipped.
+
+        Returns:
+            Number of archives available in the cache afterwards
+        """
+        state = await self.state_repo.get_state(state_id)
+        if state is None:
+            logger.warning(f"Cannot prefetch unknown state {state_id}")
+            return 0
+
+        # The reporting endpoint's repository listing knows each package's
+        # architecture; without it both the machine architecture and "any"
+        # are tried
+        architectures: Dict[str, str] = {}
+        try:
+            for repository in await self.repository_repo.list_by_endpoint(state.endpoint_id):
+                for package in repository.packages:
+                    architectures[package.name] = package.architecture
+        except Exception as e:
+            logger.debug(f"No repository listing for endpoint {state.endpoint_id}: {e}")
+
+        repositories = await self.known_repositories()
+        targets = []
+        for package in state.packages:
+            if package.repository not in repositories or not self.upstream_mirrors(package.repository):
+                continue
+            known = architectures.get(package.package_name)
+            candidates = [
+                f"{package.package_name}-{package.version}-{arch}{extension}"
+                for arch in ([known] if known else [state.architecture, 'any'])
+                for extension in ARCHIVE_EXTENSIONS
+            ]
+            targets.append((package.repository, candidates))
+
+        logger.info(f"Prefetching {len(targets)} archives of state {state_id}")
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def prefetch(repo: str, candidates: List[str]) -> bool:
+            async with semaphore:
+                for filename in candidates:
+                    if await self.fetch(repo, state.architecture, filename):
+                        return True
+                logger.warning(f"No upstream mirror has {candidates[0]}")
+                return False
+
+        results = await asyncio.gather(*(prefetch(repo, candidates) for repo, candidates in targets))
+        cached = sum(results)
+        logger.info(f"Prefetched state {state_id}: {cached} of {len(targets)} archives cached")
+        return cached
+
+    def prune(self) -> int:
+        """
+        Remove least recently used files until the cache fits in max_size.
+
+        Returns:
+            Number of files removed
+        """
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        if self.max_size:
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_size:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+
+        self._size = total
+        if removed:
+            logger.info(f"Pruned {removed} files from the package cache")
+        return removed
+
+    def _disk_usage(self) -> int:
+        """Total size of the files in the cache directory."""
+        total = 0
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
@@ -6,6 +6,7 @@ modification, deletion, endpoint assignment, and synchronization coordination.
 """
 
 import logging
+from collections import Counter
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from uuid import uuid4
@@ -16,6 +17,7 @@ from shared.models import (
 from shared.interfaces import IPackagePoolManager
 from server.database.orm import PoolRepository, EndpointRepository, ValidationError, NotFoundError
 from server.database.connection import DatabaseManager
+from server.core.rollout_scheduler import RolloutScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -26,11 +28,26 @@ class PoolStatusInfo:
     def __init__(self, pool: PackagePool, endpoints: List[Endpoint]):
         self.pool = pool
         self.endpoints = endpoints
-        self.total_endpoints = len(endpoints)
-        self.in_sync_count = len([e for e in endpoints if e.sync_status == SyncStatus.IN_SYNC])
-        self.ahead_count = len([e for e in endpoints if e.sync_status == SyncStatus.AHEAD])
-        self.behind_count = len([e for e in endpoints if e.sync_status == SyncStatus.BEHIND])
-        self.offline_count = len([e for e in endpoints if e.sync_status == SyncStatus.OFFLINE])
+        self._set_counts(Counter(endpoint.sync_status for endpoint in endpoints))
+    
+    @classmethod
+    def from_counts(cls, pool: PackagePool, status_counts: Dict[SyncStatus, int]) -> "PoolStatusInfo":
+        """
+        Create status information from endpoint counts per sync status.
+        
+        Used with EndpointRepository.count_by_pool_and_status so that the
+        endpoints themselves are never loaded; endpoints is left empty.
+        """
+        status_info = cls(pool, [])
+        status_info._set_counts(status_counts)
+        return status_info
+    
+    def _set_counts(self, status_counts: Dict[SyncStatus, int]) -> None:
+        self.total_endpoints = sum(status_counts.values())
+        self.in_sync_count = status_counts.get(SyncStatus.IN_SYNC, 0)
+        self.ahead_count = status_counts.get(SyncStatus.AHEAD, 0)
+        self.behind_count = status_counts.get(SyncStatus.BEHIND, 0)
+        self.offline_count = status_counts.get(SyncStatus.OFFLINE, 0)
     
     @property
     def sync_percentage(self) -> float:
@@ -76,8 +93,9 @@ class PackagePoolManager(IPackagePoolManager):
     endpoint assignment, and synchronization coordination.
     """
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, rollout_scheduler: Optional[RolloutScheduler] = None):
         self.db_manager = db_manager
+        self.rollout_scheduler = rollout_scheduler
         self.pool_repo = PoolRepository(db_manager)
         self.endpoint_repo = EndpointRepository(db_manager)
         logger.info("PackagePoolManager initialized")
@@ -248,10 +266,8 @@ class PackagePoolManager(IPackagePoolManager):
         
         try:
             # First, remove all endpoints from the pool
-            endpoints = await self.endpoint_repo.list_by_pool(pool_id)
-            for endpoint in endpoints:
-                await self.endpoint_repo.remove_from_pool(endpoint.id)
-                logger.debug(f"Removed endpoint {endpoint.id} from pool {pool_id}")
+            removed = await self.endpoint_repo.remove_from_pool_bulk(pool_id)
+            logger.debug(f"Removed {removed} endpoints from pool {pool_id}")
             
             # Delete the pool
             success = await self.pool_repo.delete(pool_id)
@@ -388,14 +404,11 @@ class PackagePoolManager(IPackagePoolManager):
             List of PoolStatusInfo objects
         """
         try:
-            pools = await self.list_pools()
-            statuses = []
-            
-            for pool in pools:
-                endpoints = await self.endpoint_repo.list_by_pool(pool.id)
-                statuses.append(PoolStatusInfo(pool, endpoints))
+            # Two queries regardless of the number of pools and endpoints
+            pools = await self.pool_repo.list_all()
+            status_counts = await self.endpoint_repo.count_by_pool_and_status()
             
-            return statuses
+            return [PoolStatusInfo.from_counts(pool, status_counts.get(pool.id, {})) for pool in pools]
         except Exception as e:
             logger.error(f"Error listing pool statuses: {e}")
             return []
@@ -431,16 +444,49 @@ class PackagePoolManager(IPackagePoolManager):
         logger.info(f"Moving endpoint {endpoint_id} from pool {from_pool_id} to pool {to_pool_id}")
         
         try:
-            # Remove from source pool
-            if not await self.remove_endpoint(from_pool_id, endpoint_id):
+            endpoint = await self.endpoint_repo.get_by_id(endpoint_id)
+            if not endpoint or endpoint.pool_id != from_pool_id:
+                logger.warning(f"Endpoint {endpoint_id} is not in pool {from_pool_id}")
                 return False
             
-            # Assign to destination pool
-            return await self.assign_endpoint(to_pool_id, endpoint_id)
+            if not await self.pool_repo.get_by_id(to_pool_id):
+                logger.error(f"Pool not found: {to_pool_id}")
+                return False
+            
+            # Reassign and mark behind the new pool's target in one update
+            moved = await self.endpoint_repo.assign_to_pool_bulk([endpoint_id], to_pool_id, status=SyncStatus.BEHIND)
+            return moved == 1
         except Exception as e:
             logger.error(f"Error moving endpoint {endpoint_id}: {e}")
             return False
     
+    async def assign_endpoints(self, pool_id: str, endpoint_ids: List[str]) -> int:
+        """
+        Assign several endpoints to a pool at once.
+        
+        Endpoints are moved out of their current pools and marked behind the
+        pool's target in a single update.
+        
+        Args:
+            pool_id: Pool identifier
+            endpoint_ids: Endpoint identifiers; unknown endpoints are skipped
+        
+        Returns:
+            Number of endpoints assigned
+        
+        Raises:
+            NotFoundError: If the pool does not exist
+        """
+        logger.info(f"Assigning {len(endpoint_ids)} endpoints to pool {pool_id}")
+        
+        pool = await self.pool_repo.get_by_id(pool_id)
+        if not pool:
+            raise NotFoundError(f"Pool not found: {pool_id}")
+        
+        assigned = await self.endpoint_repo.assign_to_pool_bulk(endpoint_ids, pool_id, status=SyncStatus.BEHIND)
+        logger.info(f"Assigned {assigned} endpoints to pool {pool_id}")
+        return assigned
+    
     async def update_sync_policy(self, pool_id: str, sync_policy: SyncPolicy) -> bool:
         """
         Update synchronization policy for a pool.
@@ -476,13 +522,19 @@ class PackagePoolManager(IPackagePoolManager):
         logger.info(f"Setting target state {state_id} for pool {pool_id}")
         
         try:
+            previous = await self.pool_repo.get_by_id(pool_id)
             await self.update_pool(pool_id, target_state_id=state_id)
             
-            # Update all endpoints in the pool to "behind" status since they now have a new target
-            endpoints = await self.endpoint_repo.list_by_pool(pool_id)
-            for endpoint in endpoints:
-                if endpoint.sync_status != SyncStatus.OFFLINE:
-                    await self.endpoint_repo.update_status(endpoint.id, SyncStatus.BEHIND)
+            # Pools with a rollout policy promote the new target in stages
+            rollout = None
+            if self.rollout_scheduler is not None:
+                rollout = await self.rollout_scheduler.start(
+                    pool_id, state_id, previous_target_state_id=previous.target_state_id if previous else None
+                )
+            
+            # Otherwise update all endpoints in the pool to "behind" status since they now have a new target
+            if rollout is None:
+                await self.endpoint_repo.update_status_bulk(pool_id, SyncStatus.BEHIND)
             
             logger.info(f"Successfully set target state {state_id} for pool {pool_id}")
             return True
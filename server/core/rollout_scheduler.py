@@ -0,0 +1,417 @@
+"""
+Staged rollout of pool target states for the Pacman Sync Utility Server.
+
+When a pool gets a new target state, its endpoints are marked BEHIND so they
+sync to it. Marking the whole pool at once lets every auto-syncing endpoint
+download and install the new target at the same time. Pools whose sync
+policy has a RolloutPolicy are promoted in stages instead:
+
+1. a canary group (canary_endpoints first, then up to canary_size endpoints)
+2. waves of wave_size endpoints
+
+An endpoint is promoted by marking it BEHIND. It has finished once it
+reports IN_SYNC, or failed once one of its sync operations fails, it goes
+OFFLINE or it is not in sync within sync_timeout seconds. A wave is settled
+when all its endpoints have finished or failed. The next wave starts only
+if the settled wave had no more than max_failures failures (the health
+gate), optionally after wave_delay seconds. Otherwise the rollout halts
+until an operator resumes or cancels it. Within a wave at most
+max_concurrent endpoints of the pool are promoted but unfinished at a time.
+
+Operators can also move a rollout on early: resume() starts the next wave
+of a halted or waiting rollout, skip() stops waiting for the endpoints of
+the current wave that are still syncing.
+
+Until an endpoint is promoted, target_for() keeps giving it the target it
+had before the rollout, so that the client does not compare itself against
+the new target early. Status reports count towards a rollout only if they
+arrive after the endpoint's promotion.
+
+Progress is driven by the ORM change notifier: subscribe handle_change().
+Promotion listeners are called with each endpoint as it is promoted, so
+that clients can be told about their new target one by one.
+Rollouts are kept in memory; after a restart, endpoints that were never
+promoted keep their status until the pool's target is set again.
+"""
+
+import asyncio
+import itertools
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from shared.models import OperationStatus, PackagePool, RolloutPolicy, SyncStatus
+from server.database.connection import DatabaseManager
+from server.database.events import ChangeEvent
+from server.database.orm import EndpointRepository, PoolRepository
+
+logger = logging.getLogger(__name__)
+
+# Rollout states
+RUNNING = "running"
+WAITING = "waiting"  # between waves, for wave_delay
+HALTED = "halted"  # a wave failed its health gate
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+
+
+@dataclass
+class PoolRollout:
+    """Progress of one pool's rollout to a target state."""
+    pool_id: str
+    target_state_id: str
+    policy: RolloutPolicy
+    waves: List[List[str]]  # endpoint ids; the first wave is the canary group
+    wave_index: int = -1
+    queue: Deque[str] = field(default_factory=deque)  # current wave, not yet promoted
+    earlier_targets: Dict[str, Optional[str]] = field(default_factory=dict)  # wave members' targets before
+    promoted: Dict[str, int] = field(default_factory=dict)  # endpoint id -> sequence number of its promotion
+    syncing: Set[str] = field(default_factory=set)  # promoted, not yet finished
+    deadlines: Dict[str, datetime] = field(default_factory=dict)  # syncing endpoints' sync_timeout
+    finished: Set[str] = field(default_factory=set)
+    failed: Set[str] = field(default_factory=set)
+    wave_failures: int = 0
+    status: str = RUNNING
+    started_at: datetime = field(default_factory=datetime.now)
+    next_wave_at: Optional[datetime] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (RUNNING, WAITING, HALTED)
+
+    def target_for(self, endpoint_id: str) -> Optional[str]:
+        """The target an endpoint syncs to: the one it had before until it is promoted."""
+        if endpoint_id in self.earlier_targets and endpoint_id not in self.promoted:
+            return self.earlier_targets[endpoint_id]
+        return self.target_state_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pool_id": self.pool_id,
+            "target_state_id": self.target_state_id,
+            "status": self.status,
+            "wave": self.wave_index,
+            "total_waves": len(self.waves),
+            "canary_endpoints": self.waves[0] if self.waves else [],
+            "syncing_endpoints": sorted(self.syncing),
+            "sync_deadlines": {endpoint_id: deadline.isoformat()
+                               for endpoint_id, deadline in sorted(self.deadlines.items())},
+            "queued_endpoints": list(self.queue),
+            "pending_endpoints": sum(len(wave) for wave in self.waves[self.wave_index + 1:]),
+            "finished_endpoints": len(self.finished),
+            "failed_endpoints": sorted(self.failed),
+            "wave_failures": self.wave_failures,
+            "policy": self.policy.to_dict(),
+            "started_at": self.started_at.isoformat(),
+            "next_wave_at": self.next_wave_at.isoformat() if self.next_wave_at else None
+        }
+
+
+PromotionListener = Callable[[str, PoolRollout], None]
+
+
+class RolloutScheduler:
+    """Promotes new pool targets to endpoints in canary and wave stages."""
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.pool_repo = PoolRepository(db_manager)
+        self.endpoint_repo = EndpointRepository(db_manager)
+        self._rollouts: Dict[str, PoolRollout] = {}
+        self._lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._timers: Set[asyncio.Task] = set()  # sync deadlines of promoted endpoints
+        self._promotion_listeners: List[PromotionListener] = []
+        self._sequence = itertools.count()  # orders status reports against promotions
+
+    async def start(self, pool_id: str, target_state_id: str, exclude: Iterable[str] = (),
+                    previous_target_state_id: Optional[str] = None) -> Optional[PoolRollout]:
+        """
+        Start rolling a new target out to a pool.
+
+        A rollout already running for the pool is replaced; its endpoints
+        that were not promoted yet are scheduled again for the new target.
+
+        Args:
+            pool_id: Pool identifier
+            target_state_id: New target state of the pool
+            exclude: Endpoints already at the target (e.g. the one it was taken from)
+            previous_target_state_id: Target of the pool before this one
+
+        Returns:
+            The rollout, or None if the pool has no rollout policy; the
+            caller then promotes all endpoints itself
+        """
+        pool = await self.pool_repo.get_by_id(pool_id)
+        policy = pool.sync_policy.rollout if pool else None
+        if policy is None:
+            return None
+
+        excluded = set(exclude)
+        endpoints = await self.endpoint_repo.list_by_pool(pool_id)
+        candidates = [
+            endpoint.id for endpoint in endpoints
+            if endpoint.id not in excluded and endpoint.sync_status != SyncStatus.OFFLINE
+        ]
+
+        canaries = [endpoint_id for endpoint_id in policy.canary_endpoints if endpoint_id in candidates]
+        for endpoint_id in candidates:
+            if len(canaries) >= max(policy.canary_size, len(policy.canary_endpoints)):
+                break
+            if endpoint_id not in canaries:
+                canaries.append(endpoint_id)
+        rest = [endpoint_id for endpoint_id in candidates if endpoint_id not in canaries]
+        wave_size = policy.wave_size or len(rest) or 1
+        waves = [canaries] + [rest[i:i + wave_size] for i in range(0, len(rest), wave_size)]
+
+        rollout = PoolRollout(pool_id, target_state_id, policy, [wave for wave in waves if wave])
+        async with self._lock:
+            previous = self._rollouts.get(pool_id)
+            # Endpoints not promoted by an earlier rollout of the previous target still have theirs
+            earlier = None
+            if previous is not None and previous.target_state_id == previous_target_state_id:
+                earlier = previous
+            rollout.earlier_targets = {
+                endpoint_id: earlier.target_for(endpoint_id) if earlier else previous_target_state_id
+                for wave in rollout.waves for endpoint_id in wave
+            }
+            if previous is not None and previous.active:
+                logger.info(f"Rollout of {previous.target_state_id} to pool {pool_id} superseded")
+                previous.status = CANCELLED
+            self._rollouts[pool_id] = rollout
+            logger.info(f"Rolling out {target_state_id} to pool {pool_id}: "
+                        f"{len(canaries)} canaries, {len(rollout.waves)} waves")
+            await self._advance(rollout)
+        return rollout
+
+    def add_promotion_listener(self, listener: PromotionListener) -> None:
+        """Register a callable invoked with each endpoint the scheduler promotes."""
+        if listener not in self._promotion_listeners:
+            self._promotion_listeners.append(listener)
+
+    def target_for(self, endpoint_id: str, pool: PackagePool) -> Optional[str]:
+        """
+        The target state an endpoint of a pool should be compared against.
+
+        While the pool's target is being rolled out, endpoints that were not
+        promoted yet keep the target they had before.
+        """
+        rollout = self._rollouts.get(pool.id)
+        if rollout is None or rollout.target_state_id != pool.target_state_id:
+            return pool.target_state_id
+        return rollout.target_for(endpoint_id)
+
+    async def manages(self, pool_id: str) -> bool:
+        """Whether new targets of a pool are promoted by the scheduler rather than all at once."""
+        pool = await self.pool_repo.get_by_id(pool_id)
+        return bool(pool and pool.sync_policy.rollout)
+
+    def get_rollout(self, pool_id: str) -> Optional[PoolRollout]:
+        """Get the most recent rollout of a pool."""
+        return self._rollouts.get(pool_id)
+
+    async def resume(self, pool_id: str) -> Optional[PoolRollout]:
+        """Continue a halted rollout, or one waiting for wave_delay, with its next wave."""
+        async with self._lock:
+            rollout = self._rollouts.get(pool_id)
+            if rollout is None or rollout.status not in (HALTED, WAITING):
+                return rollout
+            logger.info(f"Resuming rollout to pool {pool_id}")
+            rollout.status = RUNNING
+            rollout.wave_failures = 0
+            if rollout.wave_index + 1 < len(rollout.waves):
+                self._next_wave(rollout)
+            await self._advance(rollout)
+            return rollout
+
+    async def skip(self, pool_id: str) -> Optional[PoolRollout]:
+        """
+        Stop waiting for the endpoints of the current wave that are still syncing.
+
+        They are recorded as failed without counting against the wave's
+        health gate, and the rollout carries on with the rest of the wave.
+        A halted or waiting rollout is resumed instead.
+        """
+        rollout = self._rollouts.get(pool_id)
+        if rollout is not None and rollout.status in (HALTED, WAITING):
+            return await self.resume(pool_id)
+        async with self._lock:
+            rollout = self._rollouts.get(pool_id)
+            if rollout is None or rollout.status != RUNNING:
+                return rollout
+            logger.info(f"Skipping {len(rollout.syncing)} syncing endpoints of the rollout to pool {pool_id}")
+            rollout.failed.update(rollout.syncing)
+            rollout.syncing.clear()
+            rollout.deadlines.clear()
+            await self._advance(rollout)
+            return rollout
+
+    async def cancel(self, pool_id: str) -> Optional[PoolRollout]:
+        """Stop a rollout; endpoints not promoted yet keep their current state."""
+        async with self._lock:
+            rollout = self._rollouts.get(pool_id)
+            if rollout is not None and rollout.active:
+                logger.info(f"Cancelled rollout to pool {pool_id}")
+                rollout.status = CANCELLED
+                rollout.queue.clear()
+                rollout.deadlines.clear()
+                rollout.next_wave_at = None
+            return rollout
+
+    async def stop(self) -> None:
+        """Cancel pending wave timers, sync deadlines and progress updates."""
+        tasks = self._tasks | self._timers
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def handle_change(self, event: ChangeEvent, payload: Dict[str, Any]) -> None:
+        """ChangeNotifier listener tracking the endpoints being promoted."""
+        endpoint_id = payload.get('endpoint_id')
+        if event == ChangeEvent.POOL_DELETED:
+            rollout = self._rollouts.pop(payload.get('pool_id'), None)
+            if rollout is not None:
+                rollout.status = CANCELLED
+            return
+
+        dequeue = False  # also drop the endpoint if it was not promoted yet
+        if event == ChangeEvent.ENDPOINT_STATUS_CHANGED and payload.get('status') == SyncStatus.IN_SYNC:
+            success = True
+        elif event == ChangeEvent.ENDPOINT_STATUS_CHANGED and payload.get('status') == SyncStatus.OFFLINE:
+            success, dequeue = False, True
+        elif event == ChangeEvent.OPERATION_STATUS_CHANGED and payload.get('status') == OperationStatus.FAILED:
+            success = False
+        elif event in (ChangeEvent.ENDPOINT_POOL_CHANGED, ChangeEvent.ENDPOINT_DELETED):
+            success, dequeue = None, True  # left the pool
+        else:
+            return
+
+        rollout = self._rollout_of(endpoint_id)
+        if rollout is None:
+            return
+        self._spawn(self._endpoint_done(rollout, endpoint_id, success, dequeue, next(self._sequence)))
+
+    def _rollout_of(self, endpoint_id: Optional[str]) -> Optional[PoolRollout]:
+        """The active rollout an endpoint takes part in."""
+        for rollout in self._rollouts.values():
+            if rollout.active and (endpoint_id in rollout.syncing or endpoint_id in rollout.queue):
+                return rollout
+        return None
+
+    def _spawn(self, coroutine, tasks: Optional[Set[asyncio.Task]] = None) -> None:
+        tasks = self._tasks if tasks is None else tasks
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            coroutine.close()
+            return
+        task = loop.create_task(coroutine)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def _endpoint_done(self, rollout: PoolRollout, endpoint_id: str, success: Optional[bool],
+                             dequeue: bool = False, reported: Optional[int] = None) -> None:
+        """
+        Record an endpoint finishing, failing or leaving, then continue.
+
+        reported is the sequence number of the change event; events from
+        before the endpoint was promoted are ignored.
+        """
+        async with self._lock:
+            if self._rollouts.get(rollout.pool_id) is not rollout:
+                return
+            if endpoint_id in rollout.queue:
+                if dequeue:
+                    rollout.queue.remove(endpoint_id)
+                return
+            if endpoint_id not in rollout.syncing:
+                return
+            if reported is not None and reported < rollout.promoted.get(endpoint_id, reported):
+                return
+
+            rollout.syncing.discard(endpoint_id)
+            rollout.deadlines.pop(endpoint_id, None)
+            if success:
+                rollout.finished.add(endpoint_id)
+            elif success is False:
+                rollout.failed.add(endpoint_id)
+                rollout.wave_failures += 1
+                logger.warning(f"Endpoint {endpoint_id} failed to sync to {rollout.target_state_id} "
+                               f"during wave {rollout.wave_index} of pool {rollout.pool_id}")
+            await self._advance(rollout)
+
+    async def _advance(self, rollout: PoolRollout) -> None:
+        """Promote endpoints and move through waves as far as possible. Call with the lock held."""
+        policy = rollout.policy
+        while rollout.status == RUNNING:
+            while rollout.queue and (not policy.max_concurrent or len(rollout.syncing) < policy.max_concurrent):
+                endpoint_id = rollout.queue.popleft()
+                rollout.syncing.add(endpoint_id)
+                # Recorded first so that clients asking meanwhile already get the new target
+                rollout.promoted[endpoint_id] = next(self._sequence)
+                try:
+                    await self.endpoint_repo.update_status(endpoint_id, SyncStatus.BEHIND)
+                except Exception as e:
+                    logger.error(f"Failed to promote endpoint {endpoint_id}: {e}")
+                    rollout.syncing.discard(endpoint_id)
+                    rollout.promoted.pop(endpoint_id, None)
+                    rollout.failed.add(endpoint_id)
+                    rollout.wave_failures += 1
+                    continue
+                for listener in list(self._promotion_listeners):
+                    try:
+                        listener(endpoint_id, rollout)
+                    except Exception as e:
+                        logger.error(f"Promotion listener failed for endpoint {endpoint_id}: {e}")
+                if policy.sync_timeout:
+                    deadline = datetime.now() + timedelta(seconds=policy.sync_timeout)
+                    rollout.deadlines[endpoint_id] = deadline
+                    self._spawn(self._sync_deadline(rollout, endpoint_id, deadline), self._timers)
+
+            if rollout.queue or rollout.syncing:
+                return
+
+            # The current wave has settled: apply the health gate
+            if rollout.wave_failures > policy.max_failures:
+                rollout.status = HALTED
+                logger.warning(f"Rollout to pool {rollout.pool_id} halted after wave {rollout.wave_index}: "
+                               f"{rollout.wave_failures} failed endpoints")
+                return
+            if rollout.wave_index + 1 >= len(rollout.waves):
+                rollout.status = COMPLETED
+                logger.info(f"Rollout of {rollout.target_state_id} to pool {rollout.pool_id} completed")
+                return
+            if policy.wave_delay and rollout.wave_index >= 0:
+                rollout.status = WAITING
+                rollout.next_wave_at = datetime.now() + timedelta(seconds=policy.wave_delay)
+                self._spawn(self._next_wave_after_delay(rollout))
+                return
+            self._next_wave(rollout)
+
+    def _next_wave(self, rollout: PoolRollout) -> None:
+        rollout.wave_index += 1
+        rollout.wave_failures = 0
+        rollout.next_wave_at = None
+        rollout.queue = deque(rollout.waves[rollout.wave_index])
+        logger.info(f"Rollout to pool {rollout.pool_id}: starting wave {rollout.wave_index} "
+                    f"({len(rollout.queue)} endpoints)")
+
+    async def _sync_deadline(self, rollout: PoolRollout, endpoint_id: str, deadline: datetime) -> None:
+        """Fail a promoted endpoint that is not in sync by its deadline."""
+        await asyncio.sleep(rollout.policy.sync_timeout)
+        if rollout.deadlines.get(endpoint_id) != deadline:
+            return
+        logger.warning(f"Endpoint {endpoint_id} did not sync to {rollout.target_state_id} "
+                       f"within {rollout.policy.sync_timeout}s")
+        await self._endpoint_done(rollout, endpoint_id, False)
+
+    async def _next_wave_after_delay(self, rollout: PoolRollout) -> None:
+        await asyncio.sleep(rollout.policy.wave_delay)
+        async with self._lock:
+            if self._rollouts.get(rollout.pool_id) is not rollout or rollout.status != WAITING:
+                return
+            rollout.status = RUNNING
+            self._next_wave(rollout)
+            await self._advance(rollout)
@@ -8,6 +8,8 @@ historical tracking, and provides conflict resolution and rollback capabilities.
 
 import logging
 import asyncio
+from collections import OrderedDict
+from dataclasses import asdict
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Set
 from uuid import uuid4
@@ -18,11 +20,14 @@ from shared.models import (
     OperationType, OperationStatus, SyncStatus, ConflictResolution
 )
 from shared.interfaces import ISyncCoordinator, IStateManager
+from shared.sync_planner import SyncPlan, SyncPlanner, state_hash
+from shared.versions import compare_states
 from server.database.orm import (
     SyncOperationRepository, PackageStateRepository, EndpointRepository, 
     PoolRepository, ValidationError, NotFoundError
 )
 from server.database.connection import DatabaseManager
+from server.core.rollout_scheduler import RolloutScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -84,12 +89,20 @@ class StateSnapshot:
 
 
 class StateManager(IStateManager):
-    """Manages package state snapshots and historical tracking."""
+    """
+    Manages package state snapshots and historical tracking.
+    
+    Saved states never change, so decoded states are kept in a small LRU
+    cache; planning a rollout decodes the same target state for every
+    endpoint of a pool.
+    """
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, max_cached_states: int = 256):
         self.db_manager = db_manager
         self.state_repo = PackageStateRepository(db_manager)
         self.pool_repo = PoolRepository(db_manager)
+        self.max_cached_states = max_cached_states
+        self._decoded_states: "OrderedDict[str, SystemState]" = OrderedDict()
         logger.info("StateManager initialized")
     
     async def save_state(self, endpoint_id: str, state: SystemState) -> str:
@@ -123,12 +136,31 @@ class StateManager(IStateManager):
             raise
     
     async def get_state(self, state_id: str) -> Optional[SystemState]:
-        """Get a system state by ID."""
+        """Get a system state by ID (shared with other callers; do not modify)."""
+        state = self._decoded_states.get(state_id)
+        if state is not None:
+            self._decoded_states.move_to_end(state_id)
+            return state
+        
         try:
-            return await self.state_repo.get_state(state_id)
+            state = await self.state_repo.get_state(state_id)
         except Exception as e:
             logger.error(f"Error getting state {state_id}: {e}")
             return None
+        
+        if state is not None and self.max_cached_states > 0:
+            self._decoded_states[state_id] = state
+            while len(self._decoded_states) > self.max_cached_states:
+                self._decoded_states.popitem(last=False)
+        return state
+    
+    async def get_latest_state_ids(self, endpoint_ids: List[str]) -> Dict[str, str]:
+        """Get the id of the most recent state of each endpoint."""
+        try:
+            return await self.state_repo.get_latest_state_ids(endpoint_ids)
+        except Exception as e:
+            logger.error(f"Error getting latest state ids: {e}")
+            return {}
     
     async def get_latest_state(self, pool_id: str) -> Optional[SystemState]:
         """Get the latest target state for a pool."""
@@ -177,12 +209,14 @@ class SyncCoordinator(ISyncCoordinator):
     conflict resolution, and rollback capabilities.
     """
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, rollout_scheduler: Optional[RolloutScheduler] = None):
         self.db_manager = db_manager
+        self.rollout_scheduler = rollout_scheduler
         self.operation_repo = SyncOperationRepository(db_manager)
         self.endpoint_repo = EndpointRepository(db_manager)
         self.pool_repo = PoolRepository(db_manager)
         self.state_manager = StateManager(db_manager)
+        self.planner = SyncPlanner(compare_states)
         
         # Track active operations to prevent conflicts
         self._active_operations: Dict[str, str] = {}  # endpoint_id -> operation_id
@@ -449,6 +483,142 @@ class SyncCoordinator(ISyncCoordinator):
             logger.error(f"Error getting operations for pool {pool_id}: {e}")
             return []
     
+    async def plan_endpoint_sync(self, endpoint_id: str) -> Dict[str, Any]:
+        """
+        Compute the sync plan of an endpoint without contacting it.
+        
+        The plan takes the endpoint's last reported state to its pool's
+        target state, ordered into transactions as the client would run them.
+        
+        Args:
+            endpoint_id: Endpoint identifier
+        
+        Returns:
+            Plan description (see _describe_plan)
+        """
+        endpoint = await self.endpoint_repo.get_by_id(endpoint_id)
+        if not endpoint:
+            raise NotFoundError(f"Endpoint {endpoint_id} not found")
+        if not endpoint.pool_id:
+            raise ValidationError(f"Endpoint {endpoint_id} is not assigned to a pool")
+        
+        pool, target_state = await self._get_pool_target(endpoint.pool_id)
+        state_ids = await self.state_manager.get_latest_state_ids([endpoint_id])
+        return await self._plan_endpoint(endpoint, state_ids.get(endpoint_id), pool.target_state_id,
+                                         target_state, include_operations=True)
+    
+    async def plan_pool_sync(self, pool_id: str, include_operations: bool = False) -> Dict[str, Any]:
+        """
+        Compute the sync plans of every endpoint in a pool.
+        
+        The target state is decoded once and endpoints reporting the same
+        packages share one plan, so previewing a large pool costs about as
+        much as its number of distinct endpoint states.
+        
+        Args:
+            pool_id: Pool identifier
+            include_operations: Include each endpoint's transactions, not only counts
+        
+        Returns:
+            Pool totals and one plan description per endpoint
+        """
+        pool, target_state = await self._get_pool_target(pool_id)
+        endpoints = await self.endpoint_repo.list_by_pool(pool_id)
+        state_ids = await self.state_manager.get_latest_state_ids([endpoint.id for endpoint in endpoints])
+        
+        plans = []
+        for endpoint in endpoints:
+            plans.append(await self._plan_endpoint(endpoint, state_ids.get(endpoint.id), pool.target_state_id,
+                                                   target_state, include_operations))
+        
+        planned = [plan for plan in plans if plan['status'] != 'no_state']
+        return {
+            "pool_id": pool_id,
+            "target_state_id": pool.target_state_id,
+            "total_endpoints": len(endpoints),
+            "endpoints_in_sync": sum(1 for plan in planned if plan['status'] == 'in_sync'),
+            "endpoints_with_changes": sum(1 for plan in planned if plan['status'] == 'changes'),
+            "endpoints_without_state": len(plans) - len(planned),
+            "distinct_plans": len({plan['plan_id'] for plan in planned}),
+            "total_download_size": sum(plan['download_size'] for plan in planned),
+            "endpoints": plans
+        }
+    
+    async def _get_pool_target(self, pool_id: str):
+        """Get a pool and its decoded target state."""
+        pool = await self.pool_repo.get_by_id(pool_id)
+        if not pool:
+            raise NotFoundError(f"Pool {pool_id} not found")
+        if not pool.target_state_id:
+            raise ValidationError(f"No target state set for pool {pool_id}")
+        
+        target_state = await self.state_manager.get_state(pool.target_state_id)
+        if not target_state:
+            raise NotFoundError(f"Target state {pool.target_state_id} not found")
+        return pool, target_state
+    
+    async def _plan_endpoint(self, endpoint: Endpoint, state_id: Optional[str], target_state_id: str,
+                             target_state: SystemState, include_operations: bool) -> Dict[str, Any]:
+        """Plan one endpoint against a decoded target state."""
+        current_state = await self.state_manager.get_state(state_id) if state_id else None
+        if current_state is None:
+            return {
+                "endpoint_id": endpoint.id,
+                "endpoint_name": endpoint.name,
+                "current_state_id": None,
+                "target_state_id": target_state_id,
+                "status": "no_state"
+            }
+        
+        # Plans are cached per (current packages, target); the comparison and
+        # ordering only run for package sets not planned before
+        plan = self.planner.plan(current_state, target_state, target_state_id)
+        description = self._describe_plan(plan, target_state, include_operations)
+        description.update({
+            "endpoint_id": endpoint.id,
+            "endpoint_name": endpoint.name,
+            "current_state_id": state_id,
+            "target_state_id": target_state_id,
+            # Endpoints with the same packages get the same plan
+            "plan_id": state_hash(current_state)[:16],
+        })
+        return description
+    
+    def _describe_plan(self, plan: SyncPlan, target_state: SystemState,
+                       include_operations: bool) -> Dict[str, Any]:
+        """
+        Describe a plan for API responses.
+        
+        The download size is estimated from the installed size of each
+        target package that has to be fetched; compressed archives are
+        smaller, so it is an upper bound.
+        """
+        counts = {"install": 0, "upgrade": 0, "downgrade": 0, "remove": 0}
+        for op in plan.operations:
+            counts[op.operation_type] += 1
+        
+        sizes = {package.package_name: package.installed_size for package in target_state.packages}
+        download_size = sum(sizes.get(op.package_name, 0) for op in plan.operations
+                            if op.operation_type != 'remove')
+        
+        description = {
+            "status": "changes" if plan.operations else "in_sync",
+            "operation_counts": counts,
+            "download_size": download_size,
+            "transaction_count": len(plan.transactions),
+            "cycles": plan.cycles,
+            "warnings": plan.warnings
+        }
+        if include_operations:
+            description["transactions"] = [
+                {
+                    "kind": transaction.kind,
+                    "operations": [asdict(op) for op in transaction.operations]
+                }
+                for transaction in plan.transactions
+            ]
+        return description
+    
     async def _process_sync_operation(self, operation: SyncOperation, target_state: SystemState):
         """Process a sync operation asynchronously."""
         logger.info(f"Processing sync operation: {operation.id}")
@@ -537,6 +707,7 @@ class SyncCoordinator(ISyncCoordinator):
             state_id = await self.state_manager.save_state(operation.endpoint_id, current_state)
             
             # Set this state as the target for the pool
+            pool = await self.pool_repo.get_by_id(operation.pool_id)
             await self.state_manager.set_target_state(operation.pool_id, state_id)
             
             # Update operation details
@@ -552,11 +723,19 @@ class SyncCoordinator(ISyncCoordinator):
             # Update endpoint status to in_sync (it's now the reference)
             await self.endpoint_repo.update_status(operation.endpoint_id, SyncStatus.IN_SYNC)
             
-            # Update other endpoints in the pool to "behind" status
-            endpoints = await self.endpoint_repo.list_by_pool(operation.pool_id)
-            for endpoint in endpoints:
-                if endpoint.id != operation.endpoint_id and endpoint.sync_status != SyncStatus.OFFLINE:
-                    await self.endpoint_repo.update_status(endpoint.id, SyncStatus.BEHIND)
+            # Pools with a rollout policy promote the new target in stages
+            rollout = None
+            if self.rollout_scheduler is not None:
+                rollout = await self.rollout_scheduler.start(
+                    operation.pool_id, state_id, exclude=[operation.endpoint_id],
+                    previous_target_state_id=pool.target_state_id if pool else None
+                )
+            
+            # Otherwise update other endpoints in the pool to "behind" status
+            if rollout is None:
+                await self.endpoint_repo.update_status_bulk(
+                    operation.pool_id, SyncStatus.BEHIND, exclude=[operation.endpoint_id]
+                )
             
             logger.info(f"Completed set-latest operation: {operation.id}")
             
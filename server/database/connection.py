@@ -120,6 +120,29 @@ class DatabaseManager:
         else:
             raise ValueError(f"Unsupported database type: {self.database_type}")
     
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Get a connection whose statements run in one transaction.
+        
+        The transaction commits when the block exits normally and rolls back
+        on an exception. SQLite transactions take the write lock up front
+        (BEGIN IMMEDIATE), so rows read in the block cannot change before
+        they are written.
+        """
+        async with self.get_connection() as conn:
+            if self.database_type == "postgresql":
+                async with conn.transaction():
+                    yield conn
+            else:  # SQLite
+                await conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                except BaseException:
+                    await conn.rollback()
+                    raise
+                await conn.commit()
+    
     async def execute(self, query: str, *args) -> Any:
         """Execute a query and return the result."""
         async with self.get_connection() as conn:
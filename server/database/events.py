@@ -0,0 +1,78 @@
+"""
+Change notifications for the Pacman Sync Utility ORM layer.
+
+This module provides a small in-process publish/subscribe hub that the ORM
+repositories use to announce writes (endpoint status changes, pool
+assignments, operation updates). In-memory views such as the dashboard
+aggregator subscribe to it instead of re-reading the database.
+"""
+
+import logging
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeEvent(Enum):
+    """Types of data changes announced by the ORM layer."""
+    ENDPOINT_CREATED = "endpoint_created"
+    ENDPOINT_DELETED = "endpoint_deleted"
+    ENDPOINT_STATUS_CHANGED = "endpoint_status_changed"
+    ENDPOINT_POOL_CHANGED = "endpoint_pool_changed"
+    POOL_CREATED = "pool_created"
+    POOL_UPDATED = "pool_updated"
+    POOL_DELETED = "pool_deleted"
+    OPERATION_CREATED = "operation_created"
+    OPERATION_STATUS_CHANGED = "operation_status_changed"
+
+
+ChangeListener = Callable[[ChangeEvent, Dict[str, Any]], None]
+
+
+class ChangeNotifier:
+    """
+    Synchronous in-process change notification hub.
+
+    Listeners are plain callables invoked on the publishing task right after
+    the database write, so they must be cheap and must not block. A failing
+    listener is logged and never affects the write that triggered it.
+    """
+
+    def __init__(self):
+        self._listeners: List[ChangeListener] = []
+
+    def subscribe(self, listener: ChangeListener) -> None:
+        """Register a listener for all change events."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ChangeListener) -> None:
+        """Remove a previously registered listener."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def publish(self, event: ChangeEvent, **payload: Any) -> None:
+        """Deliver a change event to every registered listener."""
+        for listener in list(self._listeners):
+            try:
+                listener(event, payload)
+            except Exception as e:
+                logger.error(f"Change listener failed for {event.value}: {e}")
+
+    @property
+    def listener_count(self) -> int:
+        """Number of registered listeners."""
+        return len(self._listeners)
+
+
+# Global change notifier instance
+_change_notifier: Optional[ChangeNotifier] = None
+
+
+def get_change_notifier() -> ChangeNotifier:
+    """Get the global change notifier instance."""
+    global _change_notifier
+    if _change_notifier is None:
+        _change_notifier = ChangeNotifier()
+    return _change_notifier
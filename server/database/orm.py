@@ -8,15 +8,16 @@ with validation logic for data integrity and business rules.
 import json
 import logging
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Iterable
 from uuid import uuid4
 
 from shared.models import (
     PackagePool, Endpoint, SystemState, PackageState, SyncOperation,
     Repository, RepositoryPackage, SyncStatus, OperationType, OperationStatus,
-    SyncPolicy, ConflictResolution
+    SyncPolicy
 )
 from .connection import DatabaseManager
+from .events import ChangeEvent, get_change_notifier
 
 logger = logging.getLogger(__name__)
 
@@ -72,7 +73,9 @@ class PoolRepository:
             )
             row = await self.db.fetchrow("SELECT * FROM pools WHERE id = ?", pool.id)
         
-        return self._row_to_pool(row)
+        created_pool = self._row_to_pool(row)
+        get_change_notifier().publish(ChangeEvent.POOL_CREATED, pool_id=created_pool.id, pool=created_pool)
+        return created_pool
     
     async def get_by_id(self, pool_id: str) -> Optional[PackagePool]:
         """Get a pool by ID."""
@@ -121,14 +124,7 @@ class PoolRepository:
         
         if 'sync_policy' in kwargs:
             if isinstance(kwargs['sync_policy'], dict):
-                pool.sync_policy = SyncPolicy(
-                    auto_sync=kwargs['sync_policy'].get('auto_sync', False),
-                    exclude_packages=kwargs['sync_policy'].get('exclude_packages', []),
-                    include_aur=kwargs['sync_policy'].get('include_aur', False),
-                    conflict_resolution=ConflictResolution(
-                        kwargs['sync_policy'].get('conflict_resolution', 'manual')
-                    )
-                )
+                pool.sync_policy = SyncPolicy.from_dict(kwargs['sync_policy'])
             else:
                 pool.sync_policy = kwargs['sync_policy']
         
@@ -165,7 +161,9 @@ class PoolRepository:
             )
             row = await self.db.fetchrow("SELECT * FROM pools WHERE id = ?", pool_id)
         
-        return self._row_to_pool(row)
+        updated_pool = self._row_to_pool(row)
+        get_change_notifier().publish(ChangeEvent.POOL_UPDATED, pool_id=pool_id, pool=updated_pool)
+        return updated_pool
     
     async def delete(self, pool_id: str) -> bool:
         """Delete a pool."""
@@ -179,6 +177,7 @@ class PoolRepository:
             query = "DELETE FROM pools WHERE id = ?"
         
         await self.db.execute(query, pool_id)
+        get_change_notifier().publish(ChangeEvent.POOL_DELETED, pool_id=pool_id)
         return True
     
     async def get_endpoints(self, pool_id: str) -> List[str]:
@@ -203,14 +202,7 @@ class PoolRepository:
         
         # Parse sync policy
         sync_policy_data = json.loads(row['sync_policy']) if row['sync_policy'] else {}
-        sync_policy = SyncPolicy(
-            auto_sync=sync_policy_data.get('auto_sync', False),
-            exclude_packages=sync_policy_data.get('exclude_packages', []),
-            include_aur=sync_policy_data.get('include_aur', False),
-            conflict_resolution=ConflictResolution(
-                sync_policy_data.get('conflict_resolution', 'manual')
-            )
-        )
+        sync_policy = SyncPolicy.from_dict(sync_policy_data)
         
         # Parse timestamps
         created_at = row['created_at']
@@ -234,6 +226,9 @@ class PoolRepository:
 class EndpointRepository:
     """Repository for Endpoint operations."""
     
+    # Endpoint IDs per bulk statement, well below SQLite's bound variable limit
+    BULK_CHUNK_SIZE = 400
+    
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
     
@@ -274,7 +269,11 @@ class EndpointRepository:
             )
             row = await self.db.fetchrow("SELECT * FROM endpoints WHERE id = ?", endpoint.id)
         
-        return self._row_to_endpoint(row)
+        created_endpoint = self._row_to_endpoint(row)
+        get_change_notifier().publish(
+            ChangeEvent.ENDPOINT_CREATED, endpoint_id=created_endpoint.id, endpoint=created_endpoint
+        )
+        return created_endpoint
     
     async def get_by_id(self, endpoint_id: str) -> Optional[Endpoint]:
         """Get an endpoint by ID."""
@@ -310,6 +309,30 @@ class EndpointRepository:
         
         return [self._row_to_endpoint(row) for row in rows]
     
+    async def count_by_pool_and_status(self) -> Dict[Optional[str], Dict[SyncStatus, int]]:
+        """
+        Count endpoints per pool and sync status with one grouped query.
+        
+        Returns:
+            Pool id (None for unassigned endpoints) -> sync status -> count
+        """
+        if self.db.database_type == "postgresql":
+            query = """
+                SELECT pool_id::text, sync_status, COUNT(*) FROM endpoints
+                GROUP BY pool_id, sync_status
+            """
+        else:
+            query = """
+                SELECT pool_id, sync_status, COUNT(*) FROM endpoints
+                GROUP BY pool_id, sync_status
+            """
+        rows = await self.db.fetch(query)
+        
+        counts: Dict[Optional[str], Dict[SyncStatus, int]] = {}
+        for pool_id, status, count in rows:
+            counts.setdefault(pool_id, {})[SyncStatus(status)] = count
+        return counts
+    
     async def update_status(self, endpoint_id: str, status: SyncStatus) -> bool:
         """Update endpoint sync status."""
         endpoint = await self.get_by_id(endpoint_id)
@@ -323,6 +346,11 @@ class EndpointRepository:
             query = "UPDATE endpoints SET sync_status = ?, updated_at = ? WHERE id = ?"
             now = datetime.now()
             await self.db.execute(query, status.value, now.isoformat(), endpoint_id)
+        
+        get_change_notifier().publish(
+            ChangeEvent.ENDPOINT_STATUS_CHANGED, endpoint_id=endpoint_id, pool_id=endpoint.pool_id,
+            status=status, previous_status=endpoint.sync_status
+        )
         return True
     
     async def update_last_seen(self, endpoint_id: str, timestamp: datetime) -> bool:
@@ -339,7 +367,47 @@ class EndpointRepository:
             now = datetime.now()
             await self.db.execute(query, timestamp.isoformat(), now.isoformat(), endpoint_id)
         return True
-    
+
+    async def update_last_seen_bulk(self, timestamps: Dict[str, datetime], chunk_size: int = 400) -> int:
+        """
+        Write many last_seen timestamps with one UPDATE ... FROM (VALUES ...) per chunk.
+
+        Unknown endpoint IDs are silently ignored. Returns the number of
+        timestamps submitted.
+        """
+        items = list(timestamps.items())
+        now = datetime.now()
+
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+
+            if self.db.database_type == "postgresql":
+                rows = ", ".join(
+                    f"(${2 * i + 2}::uuid, ${2 * i + 3}::timestamptz)" for i in range(len(chunk))
+                )
+                query = f"""
+                    UPDATE endpoints AS e SET last_seen = v.last_seen, updated_at = $1
+                    FROM (VALUES {rows}) AS v(id, last_seen)
+                    WHERE e.id = v.id
+                """
+                params = [now]
+                for endpoint_id, timestamp in chunk:
+                    params.extend((endpoint_id, timestamp))
+            else:
+                rows = ", ".join("(?, ?)" for _ in chunk)
+                query = f"""
+                    UPDATE endpoints SET last_seen = v.column2, updated_at = ?
+                    FROM (VALUES {rows}) AS v
+                    WHERE endpoints.id = v.column1
+                """
+                params = [now.isoformat()]
+                for endpoint_id, timestamp in chunk:
+                    params.extend((endpoint_id, timestamp.isoformat()))
+
+            await self.db.execute(query, *params)
+
+        return len(items)
+
     async def assign_to_pool(self, endpoint_id: str, pool_id: str) -> bool:
         """Assign endpoint to a pool."""
         endpoint = await self.get_by_id(endpoint_id)
@@ -353,6 +421,11 @@ class EndpointRepository:
             query = "UPDATE endpoints SET pool_id = ?, updated_at = ? WHERE id = ?"
             now = datetime.now()
             await self.db.execute(query, pool_id, now.isoformat(), endpoint_id)
+        
+        get_change_notifier().publish(
+            ChangeEvent.ENDPOINT_POOL_CHANGED, endpoint_id=endpoint_id,
+            pool_id=pool_id, previous_pool_id=endpoint.pool_id
+        )
         return True
     
     async def remove_from_pool(self, endpoint_id: str) -> bool:
@@ -368,8 +441,150 @@ class EndpointRepository:
             query = "UPDATE endpoints SET pool_id = NULL, updated_at = ? WHERE id = ?"
             now = datetime.now()
             await self.db.execute(query, now.isoformat(), endpoint_id)
+        
+        get_change_notifier().publish(
+            ChangeEvent.ENDPOINT_POOL_CHANGED, endpoint_id=endpoint_id,
+            pool_id=None, previous_pool_id=endpoint.pool_id
+        )
         return True
     
+    async def update_status_bulk(self, pool_id: str, status: SyncStatus, exclude: Iterable[str] = (),
+                                 skip_statuses: Iterable[SyncStatus] = (SyncStatus.OFFLINE,)) -> int:
+        """
+        Set the sync status of the endpoints in a pool with set-based UPDATEs.
+        
+        Endpoints listed in exclude, endpoints in one of skip_statuses and
+        endpoints that already have the status are left unchanged.
+        
+        Returns:
+            Number of endpoints whose status changed
+        """
+        excluded = set(exclude)
+        skipped = set(skip_statuses) | {status}
+        
+        def needs_update(endpoint: Endpoint) -> bool:
+            return (endpoint.pool_id == pool_id and endpoint.id not in excluded
+                    and endpoint.sync_status not in skipped)
+        
+        endpoint_ids = [endpoint.id for endpoint in await self.list_by_pool(pool_id) if needs_update(endpoint)]
+        endpoints = await self._update_many(endpoint_ids, needs_update, sync_status=status.value)
+        
+        notifier = get_change_notifier()
+        for endpoint in endpoints:
+            notifier.publish(
+                ChangeEvent.ENDPOINT_STATUS_CHANGED, endpoint_id=endpoint.id, pool_id=pool_id,
+                status=status, previous_status=endpoint.sync_status
+            )
+        return len(endpoints)
+    
+    async def update_status_many(self, endpoint_ids: Iterable[str], status: SyncStatus) -> List[str]:
+        """
+        Set the sync status of several endpoints with set-based UPDATEs.
+        
+        Unknown endpoints and endpoints that already have the status are skipped.
+        
+        Returns:
+            IDs of the endpoints whose status changed
+        """
+        endpoints = await self._update_many(
+            list(dict.fromkeys(endpoint_ids)), lambda endpoint: endpoint.sync_status != status,
+            sync_status=status.value
+        )
+        
+        notifier = get_change_notifier()
+        for endpoint in endpoints:
+            notifier.publish(
+                ChangeEvent.ENDPOINT_STATUS_CHANGED, endpoint_id=endpoint.id, pool_id=endpoint.pool_id,
+                status=status, previous_status=endpoint.sync_status
+            )
+        return [endpoint.id for endpoint in endpoints]
+    
+    async def assign_to_pool_bulk(self, endpoint_ids: Iterable[str], pool_id: Optional[str],
+                                  status: Optional[SyncStatus] = None) -> int:
+        """
+        Assign several endpoints to a pool with set-based UPDATEs.
+        
+        Args:
+            endpoint_ids: Endpoints to assign; unknown IDs are ignored
+            pool_id: Pool identifier, or None to unassign the endpoints
+            status: Sync status to set in the same statement, if any
+        
+        Returns:
+            Number of endpoints assigned
+        """
+        endpoints = await self._move_many(list(dict.fromkeys(endpoint_ids)), pool_id, status)
+        return len(endpoints)
+    
+    async def remove_from_pool_bulk(self, pool_id: str, status: Optional[SyncStatus] = None) -> int:
+        """Unassign all endpoints of a pool with set-based UPDATEs. Returns the number unassigned."""
+        endpoint_ids = [endpoint.id for endpoint in await self.list_by_pool(pool_id)]
+        endpoints = await self._move_many(endpoint_ids, None, status,
+                                          keep=lambda endpoint: endpoint.pool_id == pool_id)
+        return len(endpoints)
+    
+    async def _move_many(self, endpoint_ids: List[str], pool_id: Optional[str], status: Optional[SyncStatus],
+                         keep: Optional[Callable[[Endpoint], bool]] = None) -> List[Endpoint]:
+        columns = {'pool_id': pool_id}
+        if status is not None:
+            columns['sync_status'] = status.value
+        endpoints = await self._update_many(endpoint_ids, keep or (lambda endpoint: True), **columns)
+        
+        notifier = get_change_notifier()
+        for endpoint in endpoints:
+            if endpoint.pool_id != pool_id:
+                notifier.publish(
+                    ChangeEvent.ENDPOINT_POOL_CHANGED, endpoint_id=endpoint.id,
+                    pool_id=pool_id, previous_pool_id=endpoint.pool_id
+                )
+            if status is not None and endpoint.sync_status != status:
+                notifier.publish(
+                    ChangeEvent.ENDPOINT_STATUS_CHANGED, endpoint_id=endpoint.id, pool_id=pool_id,
+                    status=status, previous_status=endpoint.sync_status
+                )
+        return endpoints
+    
+    async def _update_many(self, endpoint_ids: List[str], keep: Callable[[Endpoint], bool],
+                           **columns: Any) -> List[Endpoint]:
+        """
+        Set the same column values on several endpoints, BULK_CHUNK_SIZE at a time.
+        
+        Each chunk is read, filtered with keep and updated in one transaction
+        that locks its rows, so concurrent writes cannot slip in between.
+        
+        Returns:
+            The updated endpoints as they were before the update
+        """
+        names = list(columns) + ['updated_at']
+        updated: List[Endpoint] = []
+        
+        for start in range(0, len(endpoint_ids), self.BULK_CHUNK_SIZE):
+            chunk = endpoint_ids[start:start + self.BULK_CHUNK_SIZE]
+            now = datetime.now()
+            async with self.db.transaction() as conn:
+                if self.db.database_type == "postgresql":
+                    rows = await conn.fetch("SELECT * FROM endpoints WHERE id = ANY($1) FOR UPDATE", chunk)
+                else:
+                    placeholders = ", ".join("?" for _ in chunk)
+                    cursor = await conn.execute(f"SELECT * FROM endpoints WHERE id IN ({placeholders})", chunk)
+                    rows = await cursor.fetchall()
+                endpoints = [endpoint for endpoint in map(self._row_to_endpoint, rows) if keep(endpoint)]
+                if not endpoints:
+                    continue
+                
+                ids = [endpoint.id for endpoint in endpoints]
+                if self.db.database_type == "postgresql":
+                    assignments = ", ".join(f"{name} = ${index}" for index, name in enumerate(names, start=2))
+                    query = f"UPDATE endpoints SET {assignments} WHERE id = ANY($1)"
+                    await conn.execute(query, ids, *columns.values(), now)
+                else:
+                    assignments = ", ".join(f"{name} = ?" for name in names)
+                    placeholders = ", ".join("?" for _ in ids)
+                    query = f"UPDATE endpoints SET {assignments} WHERE id IN ({placeholders})"
+                    await conn.execute(query, [*columns.values(), now.isoformat(), *ids])
+            updated.extend(endpoints)
+        
+        return updated
+    
     async def delete(self, endpoint_id: str) -> bool:
         """Delete an endpoint."""
         endpoint = await self.get_by_id(endpoint_id)
@@ -382,6 +597,9 @@ class EndpointRepository:
             query = "DELETE FROM endpoints WHERE id = ?"
         
         await self.db.execute(query, endpoint_id)
+        get_change_notifier().publish(
+            ChangeEvent.ENDPOINT_DELETED, endpoint_id=endpoint_id, pool_id=endpoint.pool_id
+        )
         return True
     
     def _row_to_endpoint(self, row: Dict[str, Any]) -> Endpoint:
@@ -520,6 +738,40 @@ class PackageStateRepository:
         rows = await self.db.fetch(query, endpoint_id, limit)
         return [self._row_to_system_state(row) for row in rows]
     
+    async def get_latest_state_ids(self, endpoint_ids: List[str]) -> Dict[str, str]:
+        """
+        Get the id of the most recent state of each endpoint.
+        
+        Only ids are read, not the state data, so many endpoints can be
+        looked up in one query.
+        
+        Returns:
+            Endpoint id -> state id, for endpoints that have a state
+        """
+        if not endpoint_ids:
+            return {}
+        
+        if self.db.database_type == "postgresql":
+            query = """
+                SELECT DISTINCT ON (endpoint_id) endpoint_id, id FROM package_states
+                WHERE endpoint_id = ANY($1)
+                ORDER BY endpoint_id, created_at DESC
+            """
+            rows = await self.db.fetch(query, list(endpoint_ids))
+        else:
+            placeholders = ", ".join("?" for _ in endpoint_ids)
+            query = f"""
+                SELECT endpoint_id, id FROM (
+                    SELECT endpoint_id, id, ROW_NUMBER() OVER (
+                        PARTITION BY endpoint_id ORDER BY created_at DESC
+                    ) AS position
+                    FROM package_states WHERE endpoint_id IN ({placeholders})
+                ) WHERE position = 1
+            """
+            rows = await self.db.fetch(query, *endpoint_ids)
+        
+        return {endpoint_id: state_id for endpoint_id, state_id in rows}
+    
     async def set_target_state(self, pool_id: str, state_id: str) -> bool:
         """Set a state as the target for a pool."""
         # Verify state exists
@@ -535,6 +787,8 @@ class PackageStateRepository:
             query = "UPDATE pools SET target_state_id = ?, updated_at = ? WHERE id = ?"
             now = datetime.now()
             await self.db.execute(query, state_id, now.isoformat(), pool_id)
+        
+        get_change_notifier().publish(ChangeEvent.POOL_UPDATED, pool_id=pool_id, target_state_id=state_id)
         return True
     
     def _row_to_system_state(self, row: Dict[str, Any]) -> SystemState:
@@ -603,7 +857,11 @@ class SyncOperationRepository:
             )
             row = await self.db.fetchrow("SELECT * FROM sync_operations WHERE id = ?", operation.id)
         
-        return self._row_to_sync_operation(row)
+        created_operation = self._row_to_sync_operation(row)
+        get_change_notifier().publish(
+            ChangeEvent.OPERATION_CREATED, operation_id=created_operation.id, operation=created_operation
+        )
+        return created_operation
     
     async def get_by_id(self, operation_id: str) -> Optional[SyncOperation]:
         """Get a sync operation by ID."""
@@ -639,6 +897,12 @@ class SyncOperationRepository:
             """
             completed_at_str = completed_at.isoformat() if completed_at else None
             await self.db.execute(query, status.value, error_message, completed_at_str, operation_id)
+        
+        get_change_notifier().publish(
+            ChangeEvent.OPERATION_STATUS_CHANGED, operation_id=operation_id,
+            endpoint_id=operation.endpoint_id, pool_id=operation.pool_id,
+            status=status, error_message=error_message
+        )
         return True
     
     async def list_by_endpoint(self, endpoint_id: str, limit: int = 50) -> List[SyncOperation]:
@@ -816,6 +1080,11 @@ class RepositoryRepository:
         rows = await self.db.fetch(query, endpoint_id)
         return [self._row_to_repository(row) for row in rows]
     
+    async def list_repo_names(self) -> List[str]:
+        """Get the names of the repositories reported by any endpoint."""
+        rows = await self.db.fetch("SELECT DISTINCT repo_name FROM repositories ORDER BY repo_name")
+        return [row[0] for row in rows]
+    
     async def delete_by_endpoint(self, endpoint_id: str) -> bool:
         """Delete all repositories for an endpoint."""
         if self.db.database_type == "postgresql":
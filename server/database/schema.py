@@ -153,6 +153,7 @@ SQLITE_SCHEMA = {
 POSTGRESQL_INDEXES = [
     "CREATE INDEX IF NOT EXISTS idx_endpoints_pool_id ON endpoints(pool_id)",
     "CREATE INDEX IF NOT EXISTS idx_endpoints_sync_status ON endpoints(sync_status)",
+    "CREATE INDEX IF NOT EXISTS idx_endpoints_pool_status ON endpoints(pool_id, sync_status)",
     "CREATE INDEX IF NOT EXISTS idx_package_states_pool_id ON package_states(pool_id)",
     "CREATE INDEX IF NOT EXISTS idx_package_states_endpoint_id ON package_states(endpoint_id)",
     "CREATE INDEX IF NOT EXISTS idx_package_states_is_target ON package_states(is_target)",
@@ -166,6 +167,7 @@ POSTGRESQL_INDEXES = [
 SQLITE_INDEXES = [
     "CREATE INDEX IF NOT EXISTS idx_endpoints_pool_id ON endpoints(pool_id)",
     "CREATE INDEX IF NOT EXISTS idx_endpoints_sync_status ON endpoints(sync_status)",
+    "CREATE INDEX IF NOT EXISTS idx_endpoints_pool_status ON endpoints(pool_id, sync_status)",
     "CREATE INDEX IF NOT EXISTS idx_package_states_pool_id ON package_states(pool_id)",
     "CREATE INDEX IF NOT EXISTS idx_package_states_endpoint_id ON package_states(endpoint_id)",
     "CREATE INDEX IF NOT EXISTS idx_package_states_is_target ON package_states(is_target)",
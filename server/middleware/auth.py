@@ -11,6 +11,7 @@ from typing import Optional, Dict, Any
 from fastapi import HTTPException, Request, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from shared.models import Endpoint
 from server.core.endpoint_manager import EndpointManager, EndpointAuthenticationError
@@ -93,9 +94,18 @@ class AuthenticationMiddleware:
                 detail="Authentication service unavailable"
             )
         
+        token = credentials.credentials
+        auth_cache = getattr(endpoint_manager, 'auth_cache', None)
+        
         try:
+            # Previously verified tokens skip JWT decoding and the database lookup
+            endpoint = auth_cache.get(token) if auth_cache is not None else None
+            if endpoint:
+                await endpoint_manager.update_last_seen(endpoint.id, datetime.now())
+                return endpoint
+            
             # Verify token
-            payload = self.verify_token(credentials.credentials)
+            payload = self.verify_token(token)
             endpoint_id = payload.get('endpoint_id')
             
             if not endpoint_id:
@@ -105,15 +115,28 @@ class AuthenticationMiddleware:
                     headers={"WWW-Authenticate": "Bearer"}
                 )
             
+            if auth_cache is not None and auth_cache.is_revoked(endpoint_id):
+                raise HTTPException(
+                    status_code=401,
+                    detail="Endpoint not found",
+                    headers={"WWW-Authenticate": "Bearer"}
+                )
+            
             # Get endpoint from database
+            generation = auth_cache.generation if auth_cache is not None else None
             endpoint = await endpoint_manager.get_endpoint(endpoint_id)
             if not endpoint:
+                if auth_cache is not None:
+                    auth_cache.revoke(endpoint_id)
                 raise HTTPException(
                     status_code=401,
                     detail="Endpoint not found",
                     headers={"WWW-Authenticate": "Bearer"}
                 )
             
+            if auth_cache is not None:
+                auth_cache.put(token, endpoint, payload.get('expires_at', 0), generation)
+            
             # Update last seen timestamp
             await endpoint_manager.update_last_seen(endpoint_id, datetime.now())
             
@@ -243,4 +266,36 @@ def add_security_headers(response, request: Request):
     if request.url.scheme == "https":
         response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
     
-    return response
\ No newline at end of file
+    return response
+
+
+class SecurityHeadersMiddleware:
+    """Pure ASGI middleware adding the same headers as add_security_headers."""
+    
+    HEADERS = [
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    ]
+    HSTS_HEADER = (b"strict-transport-security", b"max-age=31536000; includeSubDomains")
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        extra_headers = self.HEADERS
+        # Add HSTS header for HTTPS
+        if scope.get("scheme") == "https":
+            extra_headers = self.HEADERS + [self.HSTS_HEADER]
+        
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + extra_headers}
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
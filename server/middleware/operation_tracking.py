@@ -6,156 +6,146 @@ context information, and performance metrics for audit and debugging purposes.
 """
 
 import logging
+import random
 import time
 import uuid
-from datetime import datetime
-from typing import Optional, Dict, Any
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional, Dict, Any, Callable, List, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from shared.logging_config import OperationLogger, AuditLogger, AuditEventType
 
 logger = logging.getLogger(__name__)
 
 
-class OperationTrackingMiddleware(BaseHTTPMiddleware):
+class OperationTrackingMiddleware:
     """
-    Middleware to track operations with unique IDs and context information.
+    Pure ASGI middleware to track operations with unique IDs and context information.
     
     This middleware:
     - Assigns unique operation IDs to requests
     - Tracks operation start/end times and performance
-    - Logs operation context and results
-    - Provides audit trail for all API operations
+    - Logs operation context and results for a configurable sample of requests
+    - Provides an (unsampled) audit trail for sensitive API operations
+    
+    Being a plain ASGI callable it adds no extra task or response copy per
+    request, unlike BaseHTTPMiddleware.
     """
     
-    def __init__(self, app, enable_performance_logging: bool = True):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, enable_performance_logging: bool = True, sample_rate: float = 1.0):
+        self.app = app
         self.enable_performance_logging = enable_performance_logging
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
         self.operation_logger = OperationLogger("api_operations")
         self.audit_logger = AuditLogger("api_audit")
     
-    async def dispatch(self, request: Request, call_next):
+    def _should_sample(self) -> bool:
+        """Decide whether this request's operation logs are emitted."""
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request with operation tracking."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # Generate unique operation ID
         operation_id = str(uuid.uuid4())
-        request.state.operation_id = operation_id
+        scope.setdefault("state", {})["operation_id"] = operation_id
         
-        # Extract operation context
-        operation_type = self._determine_operation_type(request)
-        endpoint_id = self._extract_endpoint_id(request)
+        method = scope["method"]
+        path = scope["path"]
+        sampled = self._should_sample()
+        sensitive = self._is_sensitive_operation(method, path)
+        
+        # Context is only needed when something is going to be logged
+        operation_type = endpoint_id = None
+        if sampled or sensitive:
+            operation_type = self._determine_operation_type(method, path)
+            endpoint_id = self._extract_endpoint_id(path)
         
         # Record operation start
         start_time = time.time()
         
-        # Log operation start
-        self.operation_logger.log_operation_start(
-            operation_type=operation_type,
-            operation_id=operation_id,
-            endpoint_id=endpoint_id,
-            context={
-                'method': request.method,
-                'path': str(request.url.path),
-                'query_params': dict(request.query_params),
-                'client_host': request.client.host if request.client else None,
-                'user_agent': request.headers.get('user-agent'),
-                'content_type': request.headers.get('content-type')
-            }
-        )
+        if sampled:
+            headers = self._header_dict(scope)
+            client = scope.get("client")
+            self.operation_logger.log_operation_start(
+                operation_type=operation_type,
+                operation_id=operation_id,
+                endpoint_id=endpoint_id,
+                context={
+                    'method': method,
+                    'path': path,
+                    'query_string': scope.get("query_string", b"").decode("latin-1"),
+                    'client_host': client[0] if client else None,
+                    'user_agent': headers.get('user-agent'),
+                    'content_type': headers.get('content-type')
+                }
+            )
         
         # Audit log for sensitive operations
-        if self._is_sensitive_operation(request):
+        if sensitive:
+            client = scope.get("client")
             self.audit_logger.log_event(
                 event_type=AuditEventType.SYSTEM_EVENT,
                 message=f"API operation started: {operation_type}",
                 endpoint_id=endpoint_id,
                 operation_id=operation_id,
                 resource_type="api_endpoint",
-                resource_id=str(request.url.path),
+                resource_id=path,
                 additional_context={
-                    'method': request.method,
-                    'client_host': request.client.host if request.client else None
+                    'method': method,
+                    'client_host': client[0] if client else None
                 }
             )
         
+        response_start: Dict[str, Any] = {}
+        
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_start.update(message)
+                raw_headers: List[Tuple[bytes, bytes]] = list(message.get("headers", []))
+                
+                # Add operation ID to response headers
+                raw_headers.append((b"x-operation-id", operation_id.encode("latin-1")))
+                
+                # Add performance headers if enabled
+                if self.enable_performance_logging:
+                    duration = time.time() - start_time
+                    raw_headers.append((b"x-response-time", f"{duration:.3f}s".encode("latin-1")))
+                
+                message = {**message, "headers": raw_headers}
+            await send(message)
+        
         try:
             # Process the request
-            response = await call_next(request)
-            
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Determine success based on status code
-            success = 200 <= response.status_code < 400
-            
-            # Create result summary
-            result_summary = f"HTTP {response.status_code}"
-            if not success:
-                result_summary += f" - {self._get_error_category(response.status_code)}"
-            
-            # Log operation completion
-            self.operation_logger.log_operation_complete(
-                operation_id=operation_id,
-                success=success,
-                duration_seconds=duration,
-                result_summary=result_summary,
-                context={
-                    'status_code': response.status_code,
-                    'response_size': response.headers.get('content-length'),
-                    'content_type': response.headers.get('content-type')
-                }
-            )
-            
-            # Audit log for sensitive operations
-            if self._is_sensitive_operation(request):
-                self.audit_logger.log_event(
-                    event_type=AuditEventType.SYSTEM_EVENT,
-                    message=f"API operation completed: {operation_type}",
-                    endpoint_id=endpoint_id,
-                    operation_id=operation_id,
-                    resource_type="api_endpoint",
-                    resource_id=str(request.url.path),
-                    result="success" if success else "failure",
-                    additional_context={
-                        'status_code': response.status_code,
-                        'duration_seconds': duration
-                    }
-                )
-            
-            # Add operation ID to response headers
-            response.headers['X-Operation-ID'] = operation_id
-            
-            # Add performance headers if enabled
-            if self.enable_performance_logging:
-                response.headers['X-Response-Time'] = f"{duration:.3f}s"
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
             # Calculate duration for failed requests
             duration = time.time() - start_time
             
             # Log operation failure
-            self.operation_logger.log_operation_complete(
-                operation_id=operation_id,
-                success=False,
-                duration_seconds=duration,
-                result_summary=f"Exception: {type(e).__name__}",
-                context={
-                    'exception_type': type(e).__name__,
-                    'exception_message': str(e)
-                }
-            )
+            if sampled:
+                self.operation_logger.log_operation_complete(
+                    operation_id=operation_id,
+                    success=False,
+                    duration_seconds=duration,
+                    result_summary=f"Exception: {type(e).__name__}",
+                    context={
+                        'exception_type': type(e).__name__,
+                        'exception_message': str(e)
+                    }
+                )
             
             # Audit log for failed sensitive operations
-            if self._is_sensitive_operation(request):
+            if sensitive:
                 self.audit_logger.log_event(
                     event_type=AuditEventType.ERROR_EVENT,
                     message=f"API operation failed: {operation_type}",
                     endpoint_id=endpoint_id,
                     operation_id=operation_id,
                     resource_type="api_endpoint",
-                    resource_id=str(request.url.path),
+                    resource_id=path,
                     result="error",
                     additional_context={
                         'exception_type': type(e).__name__,
@@ -166,12 +156,61 @@ class OperationTrackingMiddleware(BaseHTTPMiddleware):
             
             # Re-raise the exception
             raise
-    
-    def _determine_operation_type(self, request: Request) -> str:
-        """Determine operation type from request."""
-        path = str(request.url.path)
-        method = request.method
         
+        # Calculate duration
+        duration = time.time() - start_time
+        status_code = response_start.get("status", 500)
+        
+        # Determine success based on status code
+        success = 200 <= status_code < 400
+        
+        if sampled:
+            # Create result summary
+            result_summary = f"HTTP {status_code}"
+            if not success:
+                result_summary += f" - {self._get_error_category(status_code)}"
+            
+            response_headers = self._header_dict(response_start)
+            
+            # Log operation completion
+            self.operation_logger.log_operation_complete(
+                operation_id=operation_id,
+                success=success,
+                duration_seconds=duration,
+                result_summary=result_summary,
+                context={
+                    'status_code': status_code,
+                    'response_size': response_headers.get('content-length'),
+                    'content_type': response_headers.get('content-type')
+                }
+            )
+        
+        # Audit log for sensitive operations
+        if sensitive:
+            self.audit_logger.log_event(
+                event_type=AuditEventType.SYSTEM_EVENT,
+                message=f"API operation completed: {operation_type}",
+                endpoint_id=endpoint_id,
+                operation_id=operation_id,
+                resource_type="api_endpoint",
+                resource_id=path,
+                result="success" if success else "failure",
+                additional_context={
+                    'status_code': status_code,
+                    'duration_seconds': duration
+                }
+            )
+    
+    @staticmethod
+    def _header_dict(message: Dict[str, Any]) -> Dict[str, str]:
+        """Decode raw ASGI headers into a lower-cased dict."""
+        return {
+            key.decode("latin-1").lower(): value.decode("latin-1")
+            for key, value in message.get("headers", [])
+        }
+    
+    def _determine_operation_type(self, method: str, path: str) -> str:
+        """Determine operation type from request method and path."""
         # Map common API patterns to operation types
         if '/sync/' in path:
             if 'sync-to-latest' in path:
@@ -214,14 +253,10 @@ class OperationTrackingMiddleware(BaseHTTPMiddleware):
         else:
             return f"{method.lower()}_{path.replace('/', '_').strip('_')}"
     
-    def _extract_endpoint_id(self, request: Request) -> Optional[str]:
-        """Extract endpoint ID from request context."""
-        # Try to get from authenticated endpoint
-        if hasattr(request.state, 'current_endpoint'):
-            return request.state.current_endpoint.id
-        
-        # Try to extract from path parameters
-        path_parts = str(request.url.path).split('/')
+    def _extract_endpoint_id(self, path: str) -> Optional[str]:
+        """Extract endpoint ID from the request path."""
+        # Authentication runs inside the route, so only path parameters are available here
+        path_parts = path.split('/')
         for i, part in enumerate(path_parts):
             if part in ['endpoints', 'sync'] and i + 1 < len(path_parts):
                 # Next part might be endpoint ID
@@ -239,11 +274,8 @@ class OperationTrackingMiddleware(BaseHTTPMiddleware):
         except ValueError:
             return False
     
-    def _is_sensitive_operation(self, request: Request) -> bool:
+    def _is_sensitive_operation(self, method: str, path: str) -> bool:
         """Determine if operation should be audit logged."""
-        path = str(request.url.path)
-        method = request.method
-        
         # Audit log for:
         # - Authentication operations
         # - Sync operations
@@ -301,18 +333,22 @@ class OperationTrackingMiddleware(BaseHTTPMiddleware):
 
 
 def create_operation_tracking_middleware(
-    enable_performance_logging: bool = True
-) -> OperationTrackingMiddleware:
+    enable_performance_logging: bool = True,
+    sample_rate: float = 1.0
+) -> Callable[[ASGIApp], OperationTrackingMiddleware]:
     """
     Create operation tracking middleware with configuration.
     
     Args:
         enable_performance_logging: Whether to include performance metrics
+        sample_rate: Fraction of requests whose operation logs are emitted
+            (audit events are never sampled)
         
     Returns:
-        Configured middleware instance
+        Factory wrapping an ASGI app in the configured middleware
     """
     return lambda app: OperationTrackingMiddleware(
         app, 
-        enable_performance_logging=enable_performance_logging
+        enable_performance_logging=enable_performance_logging,
+        sample_rate=sample_rate
     )
\ No newline at end of file
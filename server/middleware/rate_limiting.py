@@ -5,48 +5,156 @@ This module provides rate limiting functionality to prevent abuse of API endpoin
 with support for different rate limits per endpoint type and client identification.
 """
 
+import copy
 import logging
+import threading
 import time
-from typing import Dict, Optional, Tuple
-from collections import defaultdict, deque
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
 
+class RateLimitBackend(ABC):
+    """
+    Storage for GCRA rate limit state.
+    
+    The only state kept per client is its theoretical arrival time (TAT):
+    the time at which the client's bucket would be completely full again.
+    """
+    
+    @abstractmethod
+    async def acquire(self, key: str, now: float, emission_interval: float,
+                      tolerance: float) -> Tuple[bool, float]:
+        """
+        Try to consume one request for key.
+        
+        Returns:
+            Tuple of (is_allowed, theoretical arrival time after the attempt)
+        """
+        pass
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """
+    In-process GCRA state, striped across lock-protected shards.
+    
+    Each client costs one dict entry holding a float. Expired entries (whose
+    TAT is in the past and therefore equivalent to a full bucket) are swept
+    one shard at a time, so no request ever walks the whole client table.
+    """
+    
+    def __init__(self, shards: int = 16, sweep_interval: float = 60.0):
+        self.sweep_interval = sweep_interval
+        self._shards: List[Dict[str, float]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._last_sweep = [time.monotonic()] * shards
+    
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+    
+    def acquire_nowait(self, key: str, now: float, emission_interval: float,
+                       tolerance: float) -> Tuple[bool, float]:
+        """Synchronous variant of acquire()."""
+        index = hash(key) % len(self._shards)
+        shard = self._shards[index]
+        
+        with self._locks[index]:
+            tat = shard.get(key, now)
+            if tat - tolerance > now:
+                allowed = False
+            else:
+                tat = max(tat, now) + emission_interval
+                shard[key] = tat
+                allowed = True
+            
+            monotonic_now = time.monotonic()
+            if monotonic_now - self._last_sweep[index] > self.sweep_interval:
+                self._last_sweep[index] = monotonic_now
+                for expired in [k for k, value in shard.items() if value <= now]:
+                    del shard[expired]
+        
+        return allowed, tat
+    
+    async def acquire(self, key: str, now: float, emission_interval: float,
+                      tolerance: float) -> Tuple[bool, float]:
+        return self.acquire_nowait(key, now, emission_interval, tolerance)
+
+
+class DatabaseRateLimitBackend(RateLimitBackend):
+    """
+    GCRA state shared between server replicas through PostgreSQL.
+    
+    State lives in an UNLOGGED table (no WAL, lost on crash, which only
+    resets rate limits) and every check is a single atomic upsert, so
+    replicas enforce one quota instead of one quota each.
+    """
+    
+    TABLE_NAME = "rate_limits"
+    
+    def __init__(self, db_manager, cleanup_interval: float = 60.0):
+        if db_manager.database_type != "postgresql":
+            raise ValueError("Shared rate limiting requires a PostgreSQL database")
+        self.db = db_manager
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = time.monotonic()
+    
+    async def initialize(self) -> None:
+        """Create the unlogged state table if needed."""
+        await self.db.execute(f"""
+            CREATE UNLOGGED TABLE IF NOT EXISTS {self.TABLE_NAME} (
+                key TEXT PRIMARY KEY,
+                tat DOUBLE PRECISION NOT NULL
+            )
+        """)
+    
+    async def acquire(self, key: str, now: float, emission_interval: float,
+                      tolerance: float) -> Tuple[bool, float]:
+        # The conditional upsert only writes when the request is allowed.
+        # Parameters are cast because PostgreSQL cannot infer the type of
+        # an untyped parameter in arithmetic such as $2 + $3.
+        tat = await self.db.fetchval(f"""
+            INSERT INTO {self.TABLE_NAME} AS r (key, tat) VALUES ($1::text, $2::float8 + $3::float8)
+            ON CONFLICT (key) DO UPDATE SET tat = GREATEST(r.tat, $2::float8) + $3::float8
+            WHERE r.tat - $4::float8 <= $2::float8
+            RETURNING tat
+        """, key, now, emission_interval, tolerance)
+        
+        if time.monotonic() - self._last_cleanup > self.cleanup_interval:
+            self._last_cleanup = time.monotonic()
+            await self.db.execute(f"DELETE FROM {self.TABLE_NAME} WHERE tat <= $1::float8", now)
+        
+        if tat is not None:
+            return True, tat
+        
+        tat = await self.db.fetchval(f"SELECT tat FROM {self.TABLE_NAME} WHERE key = $1", key)
+        return False, tat if tat is not None else now
+
+
 class RateLimiter:
     """
-    Token bucket rate limiter with sliding window.
+    GCRA (generic cell rate algorithm) rate limiter.
     
-    Supports different rate limits for different endpoint types and tracks
-    usage per client IP address or authenticated endpoint.
+    Equivalent to a token bucket refilled at requests_per_minute with
+    burst_size capacity, but stored as a single timestamp per client.
+    Tracks usage per client IP address or authenticated endpoint.
     """
     
-    def __init__(self, requests_per_minute: int = 60, burst_size: Optional[int] = None):
+    def __init__(self, requests_per_minute: int = 60, burst_size: Optional[int] = None,
+                 backend: Optional[RateLimitBackend] = None, name: str = "default"):
         self.requests_per_minute = requests_per_minute
         self.burst_size = burst_size or requests_per_minute
         self.window_size = 60  # 1 minute window
+        self.name = name
         
-        # Storage for rate limiting data
-        # Format: {client_id: deque([(timestamp, request_count), ...])}
-        self._request_history: Dict[str, deque] = defaultdict(lambda: deque())
-        self._last_cleanup = time.time()
-        
-    def _cleanup_old_entries(self, current_time: float) -> None:
-        """Remove old entries from request history."""
-        cutoff_time = current_time - self.window_size
+        self.emission_interval = self.window_size / requests_per_minute
+        self.tolerance = self.emission_interval * (self.burst_size - 1)
         
-        for client_id in list(self._request_history.keys()):
-            history = self._request_history[client_id]
-            
-            # Remove old entries
-            while history and history[0][0] < cutoff_time:
-                history.popleft()
-            
-            # Remove empty histories
-            if not history:
-                del self._request_history[client_id]
+        self._local_backend = LocalRateLimitBackend()
+        self.backend = backend or self._local_backend
     
     def _get_client_id(self, request: Request) -> str:
         """
@@ -72,9 +180,22 @@ class RateLimiter:
         
         return f"ip:{client_ip}"
     
+    def _rate_limit_info(self, is_allowed: bool, tat: float, now: float) -> Dict[str, any]:
+        """Build rate limit info from a client's theoretical arrival time."""
+        remaining = max(0, int((now + self.tolerance - tat + 1e-9) // self.emission_interval) + 1)
+        if not is_allowed:
+            remaining = 0
+        
+        return {
+            'limit': self.requests_per_minute,
+            'remaining': min(remaining, self.burst_size),
+            'reset': int(now + max(0.0, tat - now)),
+            'retry_after': max(1, int(tat - self.tolerance - now + 0.999)) if not is_allowed else None
+        }
+    
     def is_allowed(self, request: Request) -> Tuple[bool, Dict[str, any]]:
         """
-        Check if request is allowed based on rate limits.
+        Check if request is allowed using the in-process backend.
         
         Args:
             request: FastAPI request object
@@ -82,45 +203,28 @@ class RateLimiter:
         Returns:
             Tuple of (is_allowed, rate_limit_info)
         """
-        current_time = time.time()
-        client_id = self._get_client_id(request)
-        
-        # Periodic cleanup of old entries
-        if current_time - self._last_cleanup > 60:  # Cleanup every minute
-            self._cleanup_old_entries(current_time)
-            self._last_cleanup = current_time
-        
-        # Get request history for this client
-        history = self._request_history[client_id]
-        
-        # Remove old entries for this client
-        cutoff_time = current_time - self.window_size
-        while history and history[0][0] < cutoff_time:
-            history.popleft()
-        
-        # Count requests in current window
-        current_requests = sum(count for _, count in history)
-        
-        # Check if request is allowed
-        is_allowed = current_requests < self.requests_per_minute
-        
-        if is_allowed:
-            # Add current request to history
-            history.append((current_time, 1))
-            current_requests += 1
+        now = time.time()
+        key = f"{self.name}|{self._get_client_id(request)}"
+        allowed, tat = self._local_backend.acquire_nowait(key, now, self.emission_interval, self.tolerance)
+        return allowed, self._rate_limit_info(allowed, tat, now)
+    
+    async def check(self, request: Request) -> Tuple[bool, Dict[str, any]]:
+        """
+        Check if request is allowed using the configured backend.
         
-        # Calculate rate limit info
-        remaining = max(0, self.requests_per_minute - current_requests)
-        reset_time = int(current_time + self.window_size)
+        Falls back to the in-process backend if a shared backend fails, so a
+        database outage degrades to per-replica limits rather than errors.
+        """
+        now = time.time()
+        key = f"{self.name}|{self._get_client_id(request)}"
         
-        rate_limit_info = {
-            'limit': self.requests_per_minute,
-            'remaining': remaining,
-            'reset': reset_time,
-            'retry_after': self.window_size if not is_allowed else None
-        }
+        try:
+            allowed, tat = await self.backend.acquire(key, now, self.emission_interval, self.tolerance)
+        except Exception as e:
+            logger.warning(f"Rate limit backend failed, using local limits: {e}")
+            allowed, tat = self._local_backend.acquire_nowait(key, now, self.emission_interval, self.tolerance)
         
-        return is_allowed, rate_limit_info
+        return allowed, self._rate_limit_info(allowed, tat, now)
     
     def get_rate_limit_headers(self, rate_limit_info: Dict[str, any]) -> Dict[str, str]:
         """Get rate limit headers for response."""
@@ -138,12 +242,15 @@ class RateLimiter:
 
 class RateLimitMiddleware:
     """
-    FastAPI middleware for rate limiting.
+    Pure ASGI middleware for rate limiting.
     
     Applies different rate limits based on endpoint patterns and client type.
+    The instance is created before the application is built so its backend
+    can be swapped at startup; register it with ``app.add_middleware(m.bind)``.
     """
     
-    def __init__(self, default_limit: int = 60):
+    def __init__(self, default_limit: int = 60, backend: Optional[RateLimitBackend] = None):
+        self.app: Optional[ASGIApp] = None
         self.default_limiter = RateLimiter(default_limit)
         
         # Different rate limits for different endpoint types
@@ -162,10 +269,25 @@ class RateLimitMiddleware:
             # Repository submission - moderate
             '/api/endpoints/*/repositories': RateLimiter(60),  # 1 per second
             
+            # Package downloads through the server cache - one request per archive
+            '/api/packages/*': RateLimiter(6000),
+            
             # Admin operations - restrictive
             '/api/pools': RateLimiter(30),  # Pool management
             '/api/repositories/analyze': RateLimiter(10),  # Analysis operations
         }
+        
+        for pattern, limiter in self.endpoint_limiters.items():
+            limiter.name = pattern
+        
+        if backend:
+            self.set_backend(backend)
+    
+    def set_backend(self, backend: RateLimitBackend) -> None:
+        """Use a (possibly shared) backend for every limiter."""
+        self.default_limiter.backend = backend
+        for limiter in self.endpoint_limiters.values():
+            limiter.backend = backend
     
     def _get_limiter_for_path(self, path: str) -> RateLimiter:
         """Get appropriate rate limiter for request path."""
@@ -185,21 +307,41 @@ class RateLimitMiddleware:
         
         return self.default_limiter
     
-    async def __call__(self, request: Request, call_next):
+    def bind(self, app: ASGIApp) -> "RateLimitMiddleware":
+        """Attach the wrapped ASGI application (used as the add_middleware factory)."""
+        self.app = app
+        return self
+    
+    def wrap(self, app: ASGIApp) -> "RateLimitMiddleware":
+        """
+        Apply the same limiters to another ASGI application.
+        
+        The returned middleware shares this one's limiters and backend, so
+        requests through either count against the same quotas.
+        """
+        wrapped = copy.copy(self)
+        wrapped.app = app
+        return wrapped
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request with rate limiting."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # Get appropriate rate limiter
-        limiter = self._get_limiter_for_path(request.url.path)
+        request = Request(scope)
+        limiter = self._get_limiter_for_path(scope["path"])
         
         # Check rate limit
-        is_allowed, rate_limit_info = limiter.is_allowed(request)
+        is_allowed, rate_limit_info = await limiter.check(request)
+        headers = limiter.get_rate_limit_headers(rate_limit_info)
         
         if not is_allowed:
             # Rate limit exceeded
-            logger.warning(f"Rate limit exceeded for {limiter._get_client_id(request)} on {request.url.path}")
-            
-            headers = limiter.get_rate_limit_headers(rate_limit_info)
+            logger.warning(f"Rate limit exceeded for {limiter._get_client_id(request)} on {scope['path']}")
             
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=429,
                 content={
                     "error": {
@@ -215,21 +357,25 @@ class RateLimitMiddleware:
                 },
                 headers=headers
             )
+            await response(scope, receive, send)
+            return
         
-        # Process request
-        response = await call_next(request)
+        raw_headers = [(key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()]
         
-        # Add rate limit headers to response
-        headers = limiter.get_rate_limit_headers(rate_limit_info)
-        for key, value in headers.items():
-            response.headers[key] = value
+        async def send_with_headers(message: Message) -> None:
+            # Add rate limit headers to response
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + raw_headers}
+            await send(message)
         
-        return response
+        # Process request
+        await self.app(scope, receive, send_with_headers)
 
 
 def create_rate_limit_middleware(
     default_limit: int = 60,
-    endpoint_limits: Optional[Dict[str, int]] = None
+    endpoint_limits: Optional[Dict[str, int]] = None,
+    backend: Optional[RateLimitBackend] = None
 ) -> RateLimitMiddleware:
     """
     Create rate limiting middleware with custom configuration.
@@ -237,6 +383,7 @@ def create_rate_limit_middleware(
     Args:
         default_limit: Default requests per minute
         endpoint_limits: Custom limits for specific endpoints
+        backend: Shared rate limit backend (defaults to per-process state)
         
     Returns:
         Configured rate limiting middleware
@@ -245,6 +392,9 @@ def create_rate_limit_middleware(
     
     if endpoint_limits:
         for endpoint, limit in endpoint_limits.items():
-            middleware.endpoint_limiters[endpoint] = RateLimiter(limit)
+            middleware.endpoint_limiters[endpoint] = RateLimiter(limit, name=endpoint)
+    
+    if backend:
+        middleware.set_backend(backend)
     
     return middleware
\ No newline at end of file
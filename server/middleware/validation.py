@@ -8,7 +8,7 @@ for API endpoints with detailed error messages and security considerations.
 import re
 import ipaddress
 import logging
-from typing import Any, Optional
+from typing import Any, List, Optional
 from urllib.parse import urlparse
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
@@ -400,6 +400,59 @@ def validate_uuid(uuid_str: str) -> str:
     return uuid_str.lower()
 
 
+# Whole-column patterns: the per-value character classes plus the newline
+# used to join a column into a single string
+_PACKAGE_NAME_COLUMN = re.compile(r'[a-z0-9@._+\n-]+')
+_VERSION_COLUMN = re.compile(r'[a-zA-Z0-9.:_+\n-]+')
+
+
+def validate_package_columns(names: List[str], versions: List[str], repositories: List[str]) -> None:
+    """
+    Validate package name and version columns with one regex match each.
+
+    Equivalent to calling validate_package_name/validate_version on every
+    row (without whitespace stripping), but avoids per-row calls for large
+    columnar submissions. Only when a column fails is it re-checked row by
+    row to report the offending value.
+
+    Args:
+        names: Package name column
+        versions: Version column (same length as names)
+        repositories: Distinct repository names referenced by the rows
+
+    Raises:
+        ValidationError: If any value is invalid
+    """
+    for repository in repositories:
+        if validate_repository_name(repository) != repository:
+            raise ValidationError(
+                "Repository name cannot contain surrounding whitespace",
+                field_name="repository_name",
+                context={'provided_value': repository}
+            )
+
+    for column, pattern, validator in (
+        (names, _PACKAGE_NAME_COLUMN, validate_package_name),
+        (versions, _VERSION_COLUMN, validate_version)
+    ):
+        if not column:
+            continue
+        lengths = list(map(len, column))
+        joined = "\n".join(column)
+        # The separator count also rules out newlines inside values
+        if (min(lengths) >= 1 and max(lengths) <= 255 and pattern.fullmatch(joined)
+                and joined.count("\n") == len(column) - 1):
+            continue
+
+        for value in column:
+            if validator(value) != value:
+                raise ValidationError(
+                    "Package fields cannot contain surrounding whitespace",
+                    field_name=validator.__name__[len("validate_"):],
+                    context={'provided_value': value}
+                )
+
+
 async def validation_middleware(request: Request, call_next):
     """
     Middleware for request validation and error handling.
@@ -99,9 +99,40 @@ function Dashboard() {
   useEffect(() => {
     loadDashboardData()
     
-    // Refresh data every 30 seconds
-    const interval = setInterval(loadDashboardData, 30000)
-    return () => clearInterval(interval)
+    // Live metric and pool status updates; the slow poll only refreshes
+    // endpoint details and system stats, or everything if streaming fails
+    const stream = dashboardApi.openStream({
+      onSnapshot: (data) => {
+        setMetrics((previous) => ({ ...previous, ...data.metrics }))
+        setPoolStatuses(data.pool_statuses)
+      },
+      onDelta: (data) => {
+        if (data.metrics) {
+          setMetrics((previous) => ({ ...previous, ...data.metrics }))
+        }
+        setPoolStatuses((previous) => {
+          const removed = new Set(data.removed_pools || [])
+          const updated = new Map((data.pools || []).map((pool) => [pool.pool_id, pool]))
+          const merged = previous
+            .filter((pool) => !removed.has(pool.pool_id))
+            .map((pool) => updated.get(pool.pool_id) || pool)
+          const known = new Set(merged.map((pool) => pool.pool_id))
+          updated.forEach((pool, poolId) => {
+            if (!known.has(poolId)) merged.push(pool)
+          })
+          return merged
+        })
+      },
+      onMetrics: (data) => setMetrics((previous) => ({ ...previous, ...data.metrics })),
+      onError: (err) => console.warn('Dashboard stream interrupted:', err)
+    })
+    
+    // Refresh remaining data every 30 seconds (or every 2 minutes when streaming)
+    const interval = setInterval(loadDashboardData, stream ? 120000 : 30000)
+    return () => {
+      clearInterval(interval)
+      if (stream) stream.close()
+    }
   }, [])
 
   const loadDashboardData = async () => {
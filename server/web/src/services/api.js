@@ -218,6 +218,20 @@ export const dashboardApi = {
     return response.data
   },
 
+  // Subscribe to live dashboard updates (server-sent events)
+  openStream({ onSnapshot, onDelta, onMetrics, onError }) {
+    if (typeof EventSource === 'undefined') {
+      return null
+    }
+
+    const source = new EventSource('/api/dashboard/stream')
+    source.addEventListener('snapshot', (event) => onSnapshot?.(JSON.parse(event.data)))
+    source.addEventListener('delta', (event) => onDelta?.(JSON.parse(event.data)))
+    source.addEventListener('metrics', (event) => onMetrics?.(JSON.parse(event.data)))
+    source.onerror = (error) => onError?.(error)
+    return source
+  },
+
   // Health check
   async healthCheck() {
     const response = await api.get('/dashboard/health')
@@ -3,12 +3,20 @@ Comprehensive logging configuration for Pacman Sync Utility.
 
 This module provides structured logging with audit trails, operation tracking,
 and configurable output formats for both server and client components.
+
+With async_logging, logging calls only put records on a queue; formatting
+and writing happen on background listener threads, so code running on an
+event loop never waits for JSON encoding, handler locks or disk I/O.
+
+orjson is optional: structured logs are encoded with it when it is installed.
 """
 
+import atexit
+import copy
 import json
 import logging
 import logging.handlers
-import os
+import queue
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -17,6 +25,30 @@ from enum import Enum
 
 from shared.exceptions import PacmanSyncError, ErrorSeverity
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Standard LogRecord attributes and fields reported on their own; anything
+# else on a record was passed through `extra`
+RESERVED_RECORD_KEYS = frozenset(logging.makeLogRecord({}).__dict__) | {
+    'message', 'asctime', 'getMessage', 'error_info', 'audit_info', 'operation_context'
+}
+
+_json_encoder = json.JSONEncoder(default=str, ensure_ascii=False)
+
+
+def _dumps(log_entry: Dict[str, Any]) -> str:
+    """Encode a structured log entry as JSON."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(log_entry, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass  # e.g. integers wider than 64 bits
+    return _json_encoder.encode(log_entry)
+
 
 class LogLevel(Enum):
     """Log level enumeration."""
@@ -69,7 +101,7 @@ class StructuredFormatter(logging.Formatter):
         
         # Add process and thread information
         log_entry['process'] = {
-            'pid': os.getpid(),
+            'pid': record.process,
             'name': getattr(record, 'process_name', 'unknown')
         }
         
@@ -80,10 +112,12 @@ class StructuredFormatter(logging.Formatter):
         
         # Add exception information if present
         if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
             log_entry['exception'] = {
                 'type': record.exc_info[0].__name__ if record.exc_info[0] else None,
                 'message': str(record.exc_info[1]) if record.exc_info[1] else None,
-                'traceback': self.formatException(record.exc_info) if record.exc_info else None
+                'traceback': record.exc_text
             }
         
         # Add structured error information if available
@@ -107,19 +141,15 @@ class StructuredFormatter(logging.Formatter):
         
         # Add extra fields if enabled
         if self.include_extra_fields:
-            extra_fields = {}
-            for key, value in record.__dict__.items():
-                if key not in ['name', 'msg', 'args', 'levelname', 'levelno', 'pathname',
-                              'filename', 'module', 'lineno', 'funcName', 'created', 'msecs',
-                              'relativeCreated', 'thread', 'threadName', 'processName', 'process',
-                              'getMessage', 'exc_info', 'exc_text', 'stack_info', 'error_info',
-                              'audit_info', 'operation_context']:
-                    extra_fields[key] = value
+            extra_fields = {
+                key: value for key, value in record.__dict__.items()
+                if key not in RESERVED_RECORD_KEYS
+            }
             
             if extra_fields:
                 log_entry['extra'] = extra_fields
         
-        return json.dumps(log_entry, default=str, ensure_ascii=False)
+        return _dumps(log_entry)
 
 
 class DetailedFormatter(logging.Formatter):
@@ -159,6 +189,118 @@ class DetailedFormatter(logging.Formatter):
         return formatted
 
 
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves all formatting to the listener thread.
+    
+    The message is merged with its arguments before the record is queued, so
+    later changes to the arguments cannot alter it. Unlike the standard
+    QueueHandler, exception information is kept on the record for the
+    formatters instead of being rendered into the message here.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class BatchingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotating file handler that writes records in batches.
+    
+    Formatted records are buffered and written with a single write and flush
+    once capacity records are waiting, an ERROR or worse arrives, or flush()
+    is called. LogQueueListener flushes it whenever its queue runs empty, so
+    records are only held back while more are waiting to be written.
+    """
+    
+    def __init__(self, filename: str, capacity: int = 100, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.capacity = capacity
+        self.buffer: List[str] = []
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.buffer.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self.buffer) >= self.capacity or record.levelno >= logging.ERROR:
+            self.flush()
+    
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if not self.buffer:
+                super().flush()
+                return
+            
+            data = self.terminator.join(self.buffer) + self.terminator
+            count = len(self.buffer)
+            self.buffer = []
+            try:
+                if self.stream is None:
+                    self.stream = self._open()
+                position = self.stream.tell()
+                if self.maxBytes > 0 and position > 0 and position + len(data) >= self.maxBytes:
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                self.stream.write(data)
+                self.stream.flush()
+            except OSError as e:
+                sys.stderr.write(f"--- Logging error ---\nFailed to write {count} log records "
+                                 f"to {self.baseFilename}: {e}\n")
+        finally:
+            self.release()
+    
+    def close(self) -> None:
+        self.flush()
+        super().close()
+
+
+class LogQueueListener(logging.handlers.QueueListener):
+    """Queue listener that flushes batching handlers whenever its queue runs empty."""
+    
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                if isinstance(handler, BatchingFileHandler):
+                    handler.flush()
+        return self.queue.get(block)
+
+
+# Listeners started by setup_logging(async_logging=True)
+_listeners: List[LogQueueListener] = []
+
+
+def _start_listener(handlers: List[logging.Handler]) -> LogQueueHandler:
+    """Run handlers on a background thread; returns the handler feeding them."""
+    log_queue = queue.SimpleQueue()
+    listener = LogQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return LogQueueHandler(log_queue)
+
+
+def stop_logging() -> None:
+    """
+    Stop the background log writers started by setup_logging.
+    
+    Records queued so far are written before this returns. Runs at exit.
+    """
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(stop_logging)
+
+
 class AuditLogger:
     """
     Specialized logger for audit events with structured information.
@@ -407,7 +549,9 @@ def setup_logging(
     backup_count: int = 5,
     enable_console: bool = True,
     enable_audit: bool = True,
-    audit_file: Optional[str] = None
+    audit_file: Optional[str] = None,
+    async_logging: bool = False,
+    audit_batch_size: int = 100
 ) -> Dict[str, logging.Logger]:
     """
     Set up comprehensive logging configuration.
@@ -421,10 +565,17 @@ def setup_logging(
         enable_console: Whether to enable console logging
         enable_audit: Whether to enable audit logging
         audit_file: Path to audit log file (optional)
+        async_logging: Whether to format and write records on background
+            threads, so that logging calls only enqueue them
+        audit_batch_size: Maximum number of audit records written to the
+            audit file at once (with async_logging)
         
     Returns:
         Dictionary of configured loggers
     """
+    # Stop the writers of a previous setup
+    stop_logging()
+    
     # Clear any existing handlers
     root_logger = logging.getLogger()
     for handler in root_logger.handlers[:]:
@@ -468,8 +619,11 @@ def setup_logging(
         handlers.append(file_handler)
     
     # Add handlers to root logger
-    for handler in handlers:
-        root_logger.addHandler(handler)
+    if async_logging and handlers:
+        root_logger.addHandler(_start_listener(handlers))
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
     
     # Set up specialized loggers
     loggers = {
@@ -486,6 +640,8 @@ def setup_logging(
     if enable_audit:
         audit_logger = logging.getLogger('audit')
         audit_logger.setLevel(logging.INFO)
+        for handler in audit_logger.handlers[:]:
+            audit_logger.removeHandler(handler)
         
         # Use JSON format for audit logs
         audit_formatter = StructuredFormatter()
@@ -495,19 +651,31 @@ def setup_logging(
             audit_path = Path(audit_file)
             audit_path.parent.mkdir(parents=True, exist_ok=True)
             
-            audit_handler = logging.handlers.RotatingFileHandler(
-                audit_file,
-                maxBytes=max_file_size,
-                backupCount=backup_count,
-                encoding='utf-8'
-            )
-            audit_handler.setFormatter(audit_formatter)
-            audit_logger.addHandler(audit_handler)
+            if async_logging:
+                # Written by the listener thread in batches
+                audit_handler = BatchingFileHandler(
+                    audit_file,
+                    capacity=audit_batch_size,
+                    maxBytes=max_file_size,
+                    backupCount=backup_count,
+                    encoding='utf-8'
+                )
+            else:
+                audit_handler = logging.handlers.RotatingFileHandler(
+                    audit_file,
+                    maxBytes=max_file_size,
+                    backupCount=backup_count,
+                    encoding='utf-8'
+                )
         else:
             # Use console if no audit file specified
-            audit_console_handler = logging.StreamHandler(sys.stdout)
-            audit_console_handler.setFormatter(audit_formatter)
-            audit_logger.addHandler(audit_console_handler)
+            audit_handler = logging.StreamHandler(sys.stdout)
+        audit_handler.setFormatter(audit_formatter)
+        
+        if async_logging:
+            audit_logger.addHandler(_start_listener([audit_handler]))
+        else:
+            audit_logger.addHandler(audit_handler)
         
         loggers['audit'] = audit_logger
     
@@ -5,10 +5,12 @@ This module defines the data structures used across the client-server architectu
 for package states, pools, endpoints, and synchronization operations.
 """
 
+from array import array
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple, Union
 from enum import Enum
+import sys
 import uuid
 
 
@@ -74,6 +76,48 @@ class SystemState:
             self.packages = []
 
 
+@dataclass
+class RolloutPolicy:
+    """Staged rollout of new pool targets: a canary group, then waves."""
+    canary_size: int = 1  # endpoints promoted first
+    canary_endpoints: List[str] = field(default_factory=list)  # preferred canaries
+    wave_size: int = 10  # endpoints per wave after the canaries (0: all at once)
+    max_concurrent: int = 0  # endpoints syncing at once per pool (0: unlimited)
+    max_failures: int = 0  # failed syncs a wave may have before the rollout halts
+    wave_delay: int = 0  # seconds to wait after a healthy wave
+    sync_timeout: int = 3600  # seconds a promoted endpoint has to get in sync (0: no limit)
+    
+    def __post_init__(self):
+        for name in ('canary_size', 'wave_size', 'max_concurrent', 'max_failures', 'wave_delay', 'sync_timeout'):
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} cannot be negative")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "canary_size": self.canary_size,
+            "canary_endpoints": self.canary_endpoints,
+            "wave_size": self.wave_size,
+            "max_concurrent": self.max_concurrent,
+            "max_failures": self.max_failures,
+            "wave_delay": self.wave_delay,
+            "sync_timeout": self.sync_timeout
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RolloutPolicy":
+        """Build a policy from to_dict() output, using defaults for missing keys."""
+        defaults = cls()
+        return cls(
+            canary_size=data.get('canary_size', defaults.canary_size),
+            canary_endpoints=list(data.get('canary_endpoints') or []),
+            wave_size=data.get('wave_size', defaults.wave_size),
+            max_concurrent=data.get('max_concurrent', defaults.max_concurrent),
+            max_failures=data.get('max_failures', defaults.max_failures),
+            wave_delay=data.get('wave_delay', defaults.wave_delay),
+            sync_timeout=data.get('sync_timeout', defaults.sync_timeout)
+        )
+
+
 @dataclass
 class SyncPolicy:
     """Configuration for synchronization behavior."""
@@ -81,14 +125,34 @@ class SyncPolicy:
     exclude_packages: List[str] = field(default_factory=list)
     include_aur: bool = False
     conflict_resolution: ConflictResolution = ConflictResolution.MANUAL
+    archive_mirror: Optional[str] = None  # Arch Linux Archive-style mirror for old versions
+    rollout: Optional[RolloutPolicy] = None  # staged rollout; None promotes targets to all endpoints at once
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        result = {
             "auto_sync": self.auto_sync,
             "exclude_packages": self.exclude_packages,
             "include_aur": self.include_aur,
             "conflict_resolution": self.conflict_resolution.value
         }
+        # Optional settings are only stored when set
+        if self.archive_mirror:
+            result["archive_mirror"] = self.archive_mirror
+        if self.rollout:
+            result["rollout"] = self.rollout.to_dict()
+        return result
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SyncPolicy":
+        """Build a policy from to_dict() output, using defaults for missing keys."""
+        return cls(
+            auto_sync=data.get('auto_sync', False),
+            exclude_packages=data.get('exclude_packages', []),
+            include_aur=data.get('include_aur', False),
+            conflict_resolution=ConflictResolution(data.get('conflict_resolution', 'manual')),
+            archive_mirror=data.get('archive_mirror'),
+            rollout=RolloutPolicy.from_dict(data['rollout']) if data.get('rollout') else None
+        )
 
 
 @dataclass
@@ -147,6 +211,345 @@ class RepositoryPackage:
             raise ValueError("Package version cannot be empty")
 
 
+@dataclass
+class PackageSetDiff:
+    """Name-level differences between two package sets."""
+    only_self: List[str] = field(default_factory=list)
+    only_other: List[str] = field(default_factory=list)
+    version_changed: List[str] = field(default_factory=list)
+    
+    @property
+    def is_empty(self) -> bool:
+        return not (self.only_self or self.only_other or self.version_changed)
+
+
+class PackageSet:
+    """
+    Compact, column-oriented collection of packages keyed by name.
+    
+    Stores names, versions, repositories and sizes in parallel columns
+    (interned strings, array-backed integers) with a name -> row index, so a
+    15k package repository costs a few lists instead of 15k dataclass
+    instances. Set operations work on the name index without building
+    objects.
+    
+    For compatibility the set iterates (and indexes) as PackageState objects,
+    or as RepositoryPackage objects when kind is "repository"; these are
+    built on demand.
+    """
+    
+    __slots__ = (
+        "kind", "architecture", "_names", "_versions", "_repo_ids", "_sizes",
+        "_descriptions", "_dependencies", "_repos", "_repo_ids_by_name", "_index"
+    )
+    
+    STATE = "state"
+    REPOSITORY = "repository"
+    
+    def __init__(self, kind: str = STATE, architecture: str = ""):
+        if kind not in (self.STATE, self.REPOSITORY):
+            raise ValueError(f"Unknown package set kind: {kind}")
+        self.kind = kind
+        self.architecture = architecture
+        self._names: List[str] = []
+        self._versions: List[str] = []
+        self._repo_ids = array("I")
+        self._sizes = array("q")
+        # Optional columns are only allocated once a row needs them
+        self._descriptions: Optional[List[Optional[str]]] = None
+        self._dependencies: Optional[List[Tuple[str, ...]]] = None
+        self._repos: List[str] = []
+        self._repo_ids_by_name: Dict[str, int] = {}
+        self._index: Dict[str, int] = {}
+    
+    # Construction
+    
+    def add(self, name: str, version: str, repository: str = "", size: int = 0,
+            description: Optional[str] = None, dependencies: Optional[Iterable[str]] = None) -> None:
+        """Add a package, replacing any existing row with the same name."""
+        if not name:
+            raise ValueError("Package name cannot be empty")
+        if not version:
+            raise ValueError("Package version cannot be empty")
+        
+        repo_id = self._repo_ids_by_name.get(repository)
+        if repo_id is None:
+            repo_id = self._repo_ids_by_name[repository] = len(self._repos)
+            self._repos.append(sys.intern(repository))
+        
+        row = self._index.get(name)
+        if row is None:
+            row = len(self._names)
+            name = sys.intern(name)
+            self._index[name] = row
+            self._names.append(name)
+            self._versions.append(sys.intern(version))
+            self._repo_ids.append(repo_id)
+            self._sizes.append(size or 0)
+            if self._descriptions is not None:
+                self._descriptions.append(None)
+            if self._dependencies is not None:
+                self._dependencies.append(())
+        else:
+            self._versions[row] = sys.intern(version)
+            self._repo_ids[row] = repo_id
+            self._sizes[row] = size or 0
+        
+        if description is not None:
+            if self._descriptions is None:
+                self._descriptions = [None] * len(self._names)
+            self._descriptions[row] = description
+        if dependencies:
+            if self._dependencies is None:
+                self._dependencies = [()] * len(self._names)
+            self._dependencies[row] = tuple(sys.intern(dep) for dep in dependencies)
+    
+    @classmethod
+    def from_package_states(cls, packages: Iterable["PackageState"], architecture: str = "") -> "PackageSet":
+        """Build a set from PackageState objects."""
+        package_set = cls(cls.STATE, architecture)
+        for pkg in packages:
+            package_set.add(pkg.package_name, pkg.version, pkg.repository,
+                            pkg.installed_size, dependencies=pkg.dependencies)
+        return package_set
+    
+    @classmethod
+    def from_repository_packages(cls, packages: Iterable["RepositoryPackage"],
+                                 architecture: str = "") -> "PackageSet":
+        """Build a set from RepositoryPackage objects."""
+        package_set = cls(cls.REPOSITORY, architecture)
+        for pkg in packages:
+            if not package_set.architecture:
+                package_set.architecture = pkg.architecture
+            package_set.add(pkg.name, pkg.version, pkg.repository, description=pkg.description)
+        return package_set
+    
+    @classmethod
+    def coerce(cls, packages: Union["PackageSet", Iterable[Any]]) -> "PackageSet":
+        """Return packages as a PackageSet, converting lists of dataclasses."""
+        if isinstance(packages, cls):
+            return packages
+        packages = list(packages)
+        if packages and isinstance(packages[0], RepositoryPackage):
+            return cls.from_repository_packages(packages)
+        return cls.from_package_states(packages)
+    
+    # Columnar access
+    
+    def columns(self) -> Dict[str, Any]:
+        """Export the set as plain columns (repositories as a lookup table)."""
+        return {
+            "kind": self.kind,
+            "architecture": self.architecture,
+            "names": list(self._names),
+            "versions": list(self._versions),
+            "repositories": list(self._repos),
+            "repository_ids": self._repo_ids.tolist(),
+            "sizes": self._sizes.tolist(),
+            "descriptions": list(self._descriptions) if self._descriptions is not None else None,
+            "dependencies": [list(deps) for deps in self._dependencies] if self._dependencies is not None else None
+        }
+    
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Any]) -> "PackageSet":
+        """
+        Rebuild a set exported with columns().
+        
+        Raises:
+            ValueError: If the columns are missing, differ in length or
+                reference unknown repositories
+        """
+        try:
+            names = columns["names"]
+            versions = columns["versions"]
+        except (KeyError, TypeError):
+            raise ValueError("Package columns must include names and versions")
+        
+        count = len(names)
+        package_set = cls(columns.get("kind", cls.STATE), columns.get("architecture", ""))
+        repos = columns.get("repositories") or [""]
+        repo_ids = columns.get("repository_ids") or [0] * count
+        sizes = columns.get("sizes") or [0] * count
+        descriptions = columns.get("descriptions")
+        dependencies = columns.get("dependencies")
+        
+        for column in (versions, repo_ids, sizes, descriptions, dependencies):
+            if column is not None and len(column) != count:
+                raise ValueError("Package columns must all have the same length")
+        if repo_ids and (min(repo_ids) < 0 or max(repo_ids) >= len(repos)):
+            raise ValueError("Package columns reference an unknown repository")
+        
+        intern = sys.intern
+        index = {name: row for row, name in enumerate(names)}
+        if len(index) != count or not all(names) or not all(versions):
+            # Duplicates or empty values: let add() replace rows and raise
+            for row, (name, version) in enumerate(zip(names, versions)):
+                package_set.add(
+                    name, version, repos[repo_ids[row]], sizes[row],
+                    description=descriptions[row] if descriptions else None,
+                    dependencies=dependencies[row] if dependencies else None
+                )
+            return package_set
+        
+        # Bulk path: adopt the decoded columns directly. Strings are not
+        # interned here since decoded sets are usually short-lived.
+        package_set._names = list(names)
+        package_set._versions = list(versions)
+        package_set._index = index
+        package_set._repos = [intern(repo) for repo in repos]
+        package_set._repo_ids_by_name = {repo: i for i, repo in enumerate(package_set._repos)}
+        package_set._repo_ids = array("I", repo_ids)
+        package_set._sizes = array("q", [size or 0 for size in sizes])
+        if descriptions is not None and any(d is not None for d in descriptions):
+            package_set._descriptions = list(descriptions)
+        if dependencies is not None and any(dependencies):
+            package_set._dependencies = [tuple(deps) if deps else () for deps in dependencies]
+        return package_set
+    
+    @property
+    def names(self) -> List[str]:
+        """Package names in insertion order."""
+        return list(self._names)
+    
+    @property
+    def versions(self) -> List[str]:
+        """Package versions, aligned with names."""
+        return list(self._versions)
+    
+    @property
+    def repositories(self) -> List[str]:
+        """Distinct repository names."""
+        return list(self._repos)
+    
+    def version_of(self, name: str) -> Optional[str]:
+        """Get a package's version without building an object."""
+        row = self._index.get(name)
+        return self._versions[row] if row is not None else None
+    
+    def record(self, name: str) -> Optional[Tuple[str, str, str, int, Tuple[str, ...]]]:
+        """Get a package as a (name, version, repository, size, dependencies) tuple."""
+        row = self._index.get(name)
+        return self._record(row) if row is not None else None
+    
+    def records(self) -> Iterator[Tuple[str, str, str, int, Tuple[str, ...]]]:
+        """Iterate over all packages as record() tuples, in insertion order."""
+        for row in range(len(self._names)):
+            yield self._record(row)
+    
+    def _record(self, row: int) -> Tuple[str, str, str, int, Tuple[str, ...]]:
+        return (
+            self._names[row], self._versions[row], self._repos[self._repo_ids[row]], self._sizes[row],
+            self._dependencies[row] if self._dependencies is not None else ()
+        )
+    
+    # Set operations
+    
+    def diff(self, other: "PackageSet") -> PackageSetDiff:
+        """Compare names and versions with another set."""
+        result = PackageSetDiff()
+        other_index = other._index
+        other_versions = other._versions
+        
+        for name, row in self._index.items():
+            other_row = other_index.get(name)
+            if other_row is None:
+                result.only_self.append(name)
+            elif self._versions[row] != other_versions[other_row]:
+                result.version_changed.append(name)
+        
+        own_index = self._index
+        result.only_other = [name for name in other._names if name not in own_index]
+        return result
+    
+    def intersect(self, other: Union["PackageSet", Iterable[str]]) -> "PackageSet":
+        """Rows of this set whose names also appear in other."""
+        keep = other._index if isinstance(other, PackageSet) else set(other)
+        return self._select(row for row, name in enumerate(self._names) if name in keep)
+    
+    def difference(self, other: Union["PackageSet", Iterable[str]]) -> "PackageSet":
+        """Rows of this set whose names do not appear in other."""
+        drop = other._index if isinstance(other, PackageSet) else set(other)
+        return self._select(row for row, name in enumerate(self._names) if name not in drop)
+    
+    def filter_repository(self, repository: str) -> "PackageSet":
+        """Rows belonging to a single repository."""
+        repo_id = self._repo_ids_by_name.get(repository)
+        if repo_id is None:
+            return PackageSet(self.kind, self.architecture)
+        return self._select(row for row, rid in enumerate(self._repo_ids) if rid == repo_id)
+    
+    def _select(self, rows: Iterable[int]) -> "PackageSet":
+        selected = PackageSet(self.kind, self.architecture)
+        for row in rows:
+            selected.add(
+                self._names[row], self._versions[row], self._repos[self._repo_ids[row]], self._sizes[row],
+                description=self._descriptions[row] if self._descriptions is not None else None,
+                dependencies=self._dependencies[row] if self._dependencies is not None else None
+            )
+        return selected
+    
+    # Dataclass compatibility
+    
+    def _row(self, row: int) -> Union["PackageState", "RepositoryPackage"]:
+        if self.kind == self.REPOSITORY:
+            return RepositoryPackage(
+                name=self._names[row],
+                version=self._versions[row],
+                repository=self._repos[self._repo_ids[row]],
+                architecture=self.architecture,
+                description=self._descriptions[row] if self._descriptions is not None else None
+            )
+        return PackageState(
+            package_name=self._names[row],
+            version=self._versions[row],
+            repository=self._repos[self._repo_ids[row]],
+            installed_size=self._sizes[row],
+            dependencies=list(self._dependencies[row]) if self._dependencies is not None else []
+        )
+    
+    def get(self, name: str) -> Optional[Union["PackageState", "RepositoryPackage"]]:
+        """Get a package by name as a dataclass."""
+        row = self._index.get(name)
+        return self._row(row) if row is not None else None
+    
+    def to_list(self) -> List[Union["PackageState", "RepositoryPackage"]]:
+        """Materialize every row as a dataclass."""
+        count = len(self._names)
+        repositories = [self._repos[repo_id] for repo_id in self._repo_ids]
+        if self.kind == self.REPOSITORY:
+            descriptions = self._descriptions if self._descriptions is not None else [None] * count
+            architecture = self.architecture
+            return [
+                RepositoryPackage(name, version, repository, architecture, description)
+                for name, version, repository, description
+                in zip(self._names, self._versions, repositories, descriptions)
+            ]
+        dependencies = self._dependencies if self._dependencies is not None else [()] * count
+        return [
+            PackageState(name, version, repository, size, list(deps))
+            for name, version, repository, size, deps
+            in zip(self._names, self._versions, repositories, self._sizes, dependencies)
+        ]
+    
+    def __len__(self) -> int:
+        return len(self._names)
+    
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+    
+    def __iter__(self) -> Iterator[Union["PackageState", "RepositoryPackage"]]:
+        for row in range(len(self._names)):
+            yield self._row(row)
+    
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._row(row) for row in range(len(self._names))[item]]
+        return self._row(range(len(self._names))[item])
+    
+    def __repr__(self) -> str:
+        return f"PackageSet(kind={self.kind!r}, packages={len(self)}, repositories={len(self._repos)})"
+
+
 @dataclass
 class PackageConflict:
     """Represents a conflict between package versions."""
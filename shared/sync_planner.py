@@ -0,0 +1,381 @@
+"""
+Sync planning for the Pacman Sync Utility.
+
+Turns the differences between a current and a target state into package
+operations and orders them into pacman transactions. The dependencies
+recorded in each PackageState form a graph over the operations, and a
+topological sort of that graph decides which transaction runs first:
+
+- a package is installed, upgraded or downgraded no later than the
+  packages whose target versions depend on it
+- a package is removed only after the packages that depend on it have
+  been removed or changed to versions that no longer need it
+
+Each transaction applies one kind of change (remove, install/upgrade,
+downgrade), because each kind is a separate pacman command. Operations of
+the same kind are batched into as few transactions as the ordering allows.
+Dependency cycles are reported; cycles spanning several kinds cannot be
+ordered and fall back to the default kind order.
+
+Plans are cached per (current state hash, target state id), so repeated
+dry runs against an unchanged system reuse the plan.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from shared.models import SystemState
+
+logger = logging.getLogger(__name__)
+
+# Transaction kinds, in the order used when dependencies leave a choice
+TRANSACTION_KINDS = ('remove', 'install', 'downgrade')
+
+# Transaction kind of each operation type; upgrades share pacman -S with installs
+OPERATION_KINDS = {
+    'remove': 'remove',
+    'install': 'install',
+    'upgrade': 'install',
+    'downgrade': 'downgrade',
+}
+
+# Version constraint suffixes in dependency strings ("glibc>=2.38")
+VERSION_CONSTRAINT = re.compile(r'[<>=].*')
+
+# State comparison: package name -> 'newer', 'older', 'missing', 'extra' or 'same'
+CompareStates = Callable[[SystemState, SystemState], Dict[str, str]]
+
+
+@dataclass
+class PackageOperation:
+    """Represents a single package operation to be performed."""
+    operation_type: str  # 'install', 'remove', 'upgrade', 'downgrade'
+    package_name: str
+    current_version: Optional[str] = None
+    target_version: Optional[str] = None
+    repository: Optional[str] = None
+
+
+@dataclass
+class SyncTransaction:
+    """A group of operations applied by a single pacman command."""
+    kind: str  # 'remove', 'install' (installs and upgrades) or 'downgrade'
+    operations: List[PackageOperation] = field(default_factory=list)
+
+
+@dataclass
+class SyncPlan:
+    """Ordered operations and transactions taking one state to another."""
+    operations: List[PackageOperation]
+    transactions: List[SyncTransaction]
+    cycles: List[List[str]] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+def state_hash(state: SystemState) -> str:
+    """Hash of the package names and versions in a state."""
+    digest = hashlib.sha256()
+    for name, version in sorted((package.package_name, package.version) for package in state.packages):
+        digest.update(f"{name}\0{version}\n".encode())
+    return digest.hexdigest()
+
+
+def operations_from_differences(differences: Dict[str, str], current_state: SystemState,
+                                target_state: SystemState) -> List[PackageOperation]:
+    """
+    Build package operations from a state comparison.
+
+    Args:
+        differences: Package name -> 'newer', 'older', 'missing', 'extra' or 'same'
+        current_state: Current system package state
+        target_state: Target system package state
+
+    Returns:
+        Operations in comparison order
+    """
+    current_packages = {package.package_name: package for package in current_state.packages}
+    target_packages = {package.package_name: package for package in target_state.packages}
+
+    operations = []
+    for package_name, status in differences.items():
+        if status == 'missing':
+            target = target_packages[package_name]
+            operations.append(PackageOperation(
+                operation_type='install',
+                package_name=package_name,
+                target_version=target.version,
+                repository=target.repository
+            ))
+        elif status == 'extra':
+            operations.append(PackageOperation(
+                operation_type='remove',
+                package_name=package_name,
+                current_version=current_packages[package_name].version
+            ))
+        elif status in ('older', 'newer'):
+            target = target_packages[package_name]
+            operations.append(PackageOperation(
+                operation_type='upgrade' if status == 'older' else 'downgrade',
+                package_name=package_name,
+                current_version=current_packages[package_name].version,
+                target_version=target.version,
+                repository=target.repository
+            ))
+    return operations
+
+
+def dependency_map(state: Optional[SystemState]) -> Dict[str, List[str]]:
+    """Package name -> dependencies recorded in a state."""
+    if state is None:
+        return {}
+    return {package.package_name: list(package.dependencies or ()) for package in state.packages}
+
+
+def order_operations(operations: List[PackageOperation],
+                     current_dependencies: Optional[Dict[str, List[str]]] = None,
+                     target_dependencies: Optional[Dict[str, List[str]]] = None
+                     ) -> Tuple[List[SyncTransaction], List[List[str]], List[str]]:
+    """
+    Order operations into transactions.
+
+    Without dependency information the operations are grouped by kind in
+    TRANSACTION_KINDS order. Otherwise a kind whose operations can all run
+    in one transaction goes first, so no kind is split needlessly.
+
+    Args:
+        operations: Operations to order (one per package)
+        current_dependencies: Dependencies of the installed packages
+        target_dependencies: Dependencies of the target package versions
+
+    Returns:
+        Tuple of (transactions in execution order, dependency cycles as
+        lists of package names, warnings)
+    """
+    def dependency_names(dependencies: Optional[Dict[str, List[str]]]) -> Dict[str, Set[str]]:
+        return {
+            package_name: {VERSION_CONSTRAINT.sub('', dependency) for dependency in package_dependencies}
+            for package_name, package_dependencies in (dependencies or {}).items()
+        }
+
+    current_dependencies = dependency_names(current_dependencies)
+    target_dependencies = dependency_names(target_dependencies)
+    warnings: List[str] = []
+
+    by_name = {op.package_name: index for index, op in enumerate(operations)}
+    kinds = [OPERATION_KINDS.get(op.operation_type) for op in operations]
+    successors: List[Set[int]] = [set() for _ in operations]
+
+    def require(before: int, after: int):
+        if before != after:
+            successors[before].add(after)
+
+    # Changed packages come no later than the packages whose targets need them
+    for index, op in enumerate(operations):
+        if kinds[index] in (None, 'remove'):
+            continue
+        for dependency in target_dependencies.get(op.package_name, ()):
+            provider = by_name.get(dependency)
+            if provider is not None and kinds[provider] != 'remove':
+                require(provider, index)
+
+    # Removals come after their dependents are removed or no longer need them
+    removed = {op.package_name: index for index, op in enumerate(operations) if kinds[index] == 'remove'}
+    if removed:
+        broken: Dict[str, List[str]] = {}
+        for package_name, dependencies in current_dependencies.items():
+            for dependency in dependencies:
+                index = removed.get(dependency)
+                if index is None or package_name == dependency:
+                    continue
+                dependent = by_name.get(package_name)
+                if dependent is None:
+                    broken.setdefault(dependency, []).append(package_name)
+                elif kinds[dependent] == 'remove' or dependency not in target_dependencies.get(package_name, ()):
+                    require(dependent, index)
+        for dependency, dependents in broken.items():
+            warnings.append(f"Removing {dependency} breaks unchanged packages depending on it: "
+                            f"{', '.join(sorted(dependents))}")
+
+    # Cycles cannot be ordered; drop the edges inside them
+    cycles = []
+    for component in _strongly_connected(successors):
+        if len(component) < 2:
+            continue
+        members = set(component)
+        for index in component:
+            successors[index] -= members
+        cycle_names = sorted(operations[index].package_name for index in component)
+        cycles.append(cycle_names)
+        if len({kinds[index] for index in component}) > 1:
+            warnings.append(f"Dependency cycle across operation types: {', '.join(cycle_names)}; "
+                            f"ordering them by operation type")
+
+    # Kahn's algorithm, draining one kind at a time so each batch is one transaction
+    indegree = [0] * len(operations)
+    for targets in successors:
+        for target in targets:
+            indegree[target] += 1
+    ready: Dict[str, deque] = {kind: deque() for kind in TRANSACTION_KINDS}
+    for index in range(len(operations)):
+        if kinds[index] is not None and indegree[index] == 0:
+            ready[kinds[index]].append(index)
+    remaining = {kind: kinds.count(kind) for kind in TRANSACTION_KINDS}
+
+    def drain(kind: str, indegree: List[int], ready: Dict[str, deque]) -> List[int]:
+        batch = []
+        queue = ready[kind]
+        while queue:
+            index = queue.popleft()
+            batch.append(index)
+            for target in successors[index]:
+                indegree[target] -= 1
+                if indegree[target] == 0:
+                    ready[kinds[target]].append(target)
+        return batch
+
+    transactions = []
+    while True:
+        candidates = [kind for kind in TRANSACTION_KINDS if ready[kind]]
+        if not candidates:
+            break
+        chosen = next(
+            (kind for kind in candidates
+             if len(drain(kind, list(indegree), {k: deque(v) for k, v in ready.items()})) == remaining[kind]),
+            candidates[0]
+        )
+        batch = drain(chosen, indegree, ready)
+        remaining[chosen] -= len(batch)
+        transactions.append(SyncTransaction(chosen, [operations[index] for index in sorted(batch)]))
+
+    return transactions, cycles, warnings
+
+
+def _strongly_connected(successors: List[Set[int]]) -> List[List[int]]:
+    """Tarjan's strongly connected components, iteratively."""
+    index_of: Dict[int, int] = {}
+    lowlink: Dict[int, int] = {}
+    on_stack: Set[int] = set()
+    stack: List[int] = []
+    components = []
+    counter = 0
+
+    for root in range(len(successors)):
+        if root in index_of:
+            continue
+        work = [(root, iter(successors[root]))]
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in index_of:
+                    index_of[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors[child])))
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+class SyncPlanner:
+    """
+    Builds and caches sync plans.
+
+    The planner is independent of pacman: the state comparison (which needs
+    version comparison) is passed in.
+    """
+
+    def __init__(self, compare: CompareStates, max_cached_plans: int = 32):
+        """
+        Initialize the planner.
+
+        Args:
+            compare: Function comparing (current, target) states, returning
+                package name -> 'newer', 'older', 'missing', 'extra' or 'same'
+            max_cached_plans: Number of plans kept, least recently used first out
+        """
+        self.compare = compare
+        self.max_cached_plans = max_cached_plans
+        self._plans: "OrderedDict[Tuple[str, str], SyncPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def plan(self, current_state: SystemState, target_state: SystemState,
+             target_state_id: Optional[str] = None) -> SyncPlan:
+        """
+        Get the plan taking current_state to target_state.
+
+        Args:
+            current_state: Current system package state
+            target_state: Target system package state
+            target_state_id: Server id of the target state; when omitted the
+                target is identified by a hash of its packages
+
+        Returns:
+            SyncPlan (shared with later callers; do not modify)
+        """
+        key = (state_hash(current_state), target_state_id or state_hash(target_state))
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+
+        plan = self.build(current_state, target_state)
+
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.max_cached_plans:
+                self._plans.popitem(last=False)
+        return plan
+
+    def build(self, current_state: SystemState, target_state: SystemState) -> SyncPlan:
+        """Build a plan without consulting the cache."""
+        operations = operations_from_differences(
+            self.compare(current_state, target_state), current_state, target_state
+        )
+        transactions, cycles, warnings = order_operations(
+            operations, dependency_map(current_state), dependency_map(target_state)
+        )
+        for warning in warnings:
+            logger.warning(warning)
+
+        return SyncPlan(
+            operations=[op for transaction in transactions for op in transaction.operations],
+            transactions=transactions,
+            cycles=cycles,
+            warnings=warnings
+        )
+
+    def clear(self) -> None:
+        """Drop all cached plans."""
+        with self._lock:
+            self._plans.clear()
+
+    @property
+    def cached_plans(self) -> int:
+        """Number of cached plans."""
+        return len(self._plans)
@@ -0,0 +1,148 @@
+"""
+Package version comparison for the Pacman Sync Utility.
+
+A pure Python implementation of pacman's vercmp (alpm_pkg_vercmp), so that
+code without a pacman installation, such as the server, orders versions the
+same way endpoints do. Versions have the form [epoch:]version[-release].
+
+Comparisons are memoized: across the endpoints of a pool the same version
+pairs come up again and again.
+"""
+
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from shared.models import PackageSet, SystemState
+
+DIGITS = frozenset('0123456789')
+LETTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+ALNUM = DIGITS | LETTERS
+
+
+def parse_evr(version: str) -> Tuple[str, str, Optional[str]]:
+    """Split a version into (epoch, version, release); release may be None."""
+    index = 0
+    while index < len(version) and version[index] in DIGITS:
+        index += 1
+
+    if index < len(version) and version[index] == ':':
+        epoch = version[:index] or '0'
+        rest = version[index + 1:]
+    else:
+        epoch = '0'
+        rest = version
+
+    # The release follows the last dash
+    dash = rest.rfind('-')
+    if dash == -1:
+        return epoch, rest, None
+    return epoch, rest[:dash], rest[dash + 1:]
+
+
+def rpmvercmp(a: str, b: str) -> int:
+    """Compare two version segments the way rpm and pacman do."""
+    if a == b:
+        return 0
+
+    one = two = 0
+    start1 = start2 = 0
+    while one < len(a) and two < len(b):
+        while one < len(a) and a[one] not in ALNUM:
+            one += 1
+        while two < len(b) and b[two] not in ALNUM:
+            two += 1
+        if one >= len(a) or two >= len(b):
+            break
+
+        # More separators wins: "1..0" is newer than "1.0"
+        if one - start1 != two - start2:
+            return -1 if one - start1 < two - start2 else 1
+
+        end1, end2 = one, two
+        numeric = a[one] in DIGITS
+        kind = DIGITS if numeric else LETTERS
+        while end1 < len(a) and a[end1] in kind:
+            end1 += 1
+        while end2 < len(b) and b[end2] in kind:
+            end2 += 1
+
+        # Numbers are newer than letters
+        if end2 == two:
+            return 1 if numeric else -1
+
+        segment1, segment2 = a[one:end1], b[two:end2]
+        if numeric:
+            segment1 = segment1.lstrip('0')
+            segment2 = segment2.lstrip('0')
+            if len(segment1) != len(segment2):
+                return 1 if len(segment1) > len(segment2) else -1
+        if segment1 != segment2:
+            return 1 if segment1 > segment2 else -1
+
+        one = start1 = end1
+        two = start2 = end2
+
+    if one >= len(a) and two >= len(b):
+        return 0
+
+    # A remaining alpha string never beats an empty one ("1.0a" < "1.0");
+    # any other remainder is newer ("1.0.1" > "1.0")
+    if (one >= len(a) and b[two] not in LETTERS) or (one < len(a) and a[one] in LETTERS):
+        return -1
+    return 1
+
+
+@lru_cache(maxsize=65536)
+def vercmp(version1: str, version2: str) -> int:
+    """
+    Compare two package versions.
+
+    Returns:
+        -1 if version1 < version2
+         0 if version1 == version2
+         1 if version1 > version2
+    """
+    if version1 == version2:
+        return 0
+
+    epoch1, ver1, rel1 = parse_evr(version1)
+    epoch2, ver2, rel2 = parse_evr(version2)
+
+    result = rpmvercmp(epoch1, epoch2)
+    if result == 0:
+        result = rpmvercmp(ver1, ver2)
+        if result == 0 and rel1 is not None and rel2 is not None:
+            result = rpmvercmp(rel1, rel2)
+    return result
+
+
+def compare_states(current_state: SystemState, target_state: SystemState) -> Dict[str, str]:
+    """
+    Compare two system states without pacman.
+
+    Only packages whose version strings differ are passed to vercmp, each
+    distinct version pair once.
+
+    Returns:
+        Package name -> 'newer', 'older', 'missing', 'extra' or 'same', as
+        PacmanInterface.compare_package_states
+    """
+    current_packages = PackageSet.coerce(current_state.packages)
+    target_packages = PackageSet.coerce(target_state.packages)
+
+    differences = dict.fromkeys(current_packages.names, 'same')
+    package_diff = current_packages.diff(target_packages)
+
+    for name in package_diff.version_changed:
+        result = vercmp(current_packages.version_of(name), target_packages.version_of(name))
+        if result > 0:
+            differences[name] = 'newer'
+        elif result < 0:
+            differences[name] = 'older'
+
+    for name in package_diff.only_self:
+        differences[name] = 'extra'
+    for name in package_diff.only_other:
+        differences[name] = 'missing'
+
+    return differences
@@ -0,0 +1,293 @@
+"""
+Wire formats for large API payloads in the Pacman Sync Utility.
+
+State and repository submissions can be sent in a columnar layout (one
+list per package field instead of one object per package) serialized as
+msgpack or JSON, and compressed with zstd or gzip. Plain row-oriented JSON
+remains the fallback understood by every server.
+
+msgpack and zstandard are optional: formats that need them are only
+offered when they are installed.
+"""
+
+import gzip
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from shared.models import PackageSet, Repository, SystemState
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+JSON_CONTENT_TYPE = "application/json"
+COLUMNAR_JSON_CONTENT_TYPE = "application/vnd.pacsync.columnar+json"
+COLUMNAR_MSGPACK_CONTENT_TYPE = "application/vnd.pacsync.columnar+msgpack"
+
+IDENTITY_ENCODING = "identity"
+GZIP_ENCODING = "gzip"
+ZSTD_ENCODING = "zstd"
+
+# Refuse bodies that inflate beyond this size (decompression bombs)
+MAX_DECODED_SIZE = 64 * 1024 * 1024
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+
+class WireFormatError(ValueError):
+    """Raised when a payload cannot be encoded or decoded."""
+
+
+class UnsupportedWireFormat(WireFormatError):
+    """Raised for content types or encodings this process cannot handle."""
+
+
+def supported_content_types() -> List[str]:
+    """Content types this process can decode, most preferred first."""
+    types = [COLUMNAR_JSON_CONTENT_TYPE, JSON_CONTENT_TYPE]
+    if MSGPACK_AVAILABLE:
+        types.insert(0, COLUMNAR_MSGPACK_CONTENT_TYPE)
+    return types
+
+
+def supported_encodings() -> List[str]:
+    """Content encodings this process can decode, most preferred first."""
+    encodings = [GZIP_ENCODING, IDENTITY_ENCODING]
+    if ZSTD_AVAILABLE:
+        encodings.insert(0, ZSTD_ENCODING)
+    return encodings
+
+
+def negotiate_format(accepted_types: Optional[List[str]] = None,
+                     accepted_encodings: Optional[List[str]] = None) -> Tuple[str, str]:
+    """
+    Pick the preferred (content type, encoding) pair.
+
+    Args:
+        accepted_types: Content types the peer accepts (None for any)
+        accepted_encodings: Encodings the peer accepts (None for any)
+
+    Returns:
+        The first locally supported pair the peer accepts, or plain
+        uncompressed JSON when nothing better is shared
+    """
+    content_type = next(
+        (t for t in supported_content_types() if accepted_types is None or t in accepted_types),
+        JSON_CONTENT_TYPE
+    )
+    encoding = next(
+        (e for e in supported_encodings() if accepted_encodings is None or e in accepted_encodings),
+        IDENTITY_ENCODING
+    )
+    if content_type == JSON_CONTENT_TYPE:
+        # Only servers that know the compact formats decompress bodies
+        encoding = IDENTITY_ENCODING
+    return content_type, encoding
+
+
+def is_columnar(content_type: Optional[str]) -> bool:
+    """Check whether a content type uses the columnar layout."""
+    return media_type(content_type) in (COLUMNAR_JSON_CONTENT_TYPE, COLUMNAR_MSGPACK_CONTENT_TYPE)
+
+
+def media_type(content_type: Optional[str]) -> str:
+    """Strip parameters (charset etc.) from a Content-Type header value."""
+    if not content_type:
+        return JSON_CONTENT_TYPE
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def parse_header_list(value: Optional[str]) -> List[str]:
+    """Parse a comma-separated header such as Accept-Encoding, dropping q-values."""
+    if not value:
+        return []
+    return [item.split(";", 1)[0].strip().lower() for item in value.split(",") if item.strip()]
+
+
+# Serialization
+
+def encode_body(payload: Any, content_type: str = JSON_CONTENT_TYPE,
+                content_encoding: str = IDENTITY_ENCODING) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Serialize and compress a payload.
+
+    Args:
+        payload: JSON-compatible data
+        content_type: One of the supported content types
+        content_encoding: Requested compression; small bodies are left uncompressed
+
+    Returns:
+        Tuple of (body, headers) where headers carry Content-Type and, when
+        compressed, Content-Encoding
+    """
+    content_type = media_type(content_type)
+    if content_type == COLUMNAR_MSGPACK_CONTENT_TYPE:
+        if not MSGPACK_AVAILABLE:
+            raise UnsupportedWireFormat("msgpack is not installed")
+        body = msgpack.packb(payload, use_bin_type=True)
+    elif content_type in (JSON_CONTENT_TYPE, COLUMNAR_JSON_CONTENT_TYPE):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    else:
+        raise UnsupportedWireFormat(f"Unsupported content type: {content_type}")
+
+    headers = {"Content-Type": content_type}
+    if content_encoding == IDENTITY_ENCODING or len(body) < MIN_COMPRESS_SIZE:
+        return body, headers
+
+    if content_encoding == ZSTD_ENCODING:
+        if not ZSTD_AVAILABLE:
+            raise UnsupportedWireFormat("zstandard is not installed")
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+    elif content_encoding == GZIP_ENCODING:
+        body = gzip.compress(body, compresslevel=6)
+    else:
+        raise UnsupportedWireFormat(f"Unsupported content encoding: {content_encoding}")
+
+    headers["Content-Encoding"] = content_encoding
+    return body, headers
+
+
+def decode_body(body: bytes, content_type: Optional[str] = None,
+                content_encoding: Optional[str] = None,
+                max_size: int = MAX_DECODED_SIZE) -> Any:
+    """
+    Decompress and deserialize a request body.
+
+    Raises:
+        UnsupportedWireFormat: For unknown or unavailable formats
+        WireFormatError: For malformed or oversized bodies
+    """
+    body = decompress(body, content_encoding, max_size)
+    content_type = media_type(content_type)
+
+    try:
+        if content_type == COLUMNAR_MSGPACK_CONTENT_TYPE:
+            if not MSGPACK_AVAILABLE:
+                raise UnsupportedWireFormat("msgpack is not installed")
+            return msgpack.unpackb(body, raw=False)
+        if content_type in (JSON_CONTENT_TYPE, COLUMNAR_JSON_CONTENT_TYPE):
+            return json.loads(body)
+    except UnsupportedWireFormat:
+        raise
+    except Exception as e:
+        raise WireFormatError(f"Malformed {content_type} body: {e}")
+
+    raise UnsupportedWireFormat(f"Unsupported content type: {content_type}")
+
+
+def decompress(body: bytes, content_encoding: Optional[str] = None,
+               max_size: int = MAX_DECODED_SIZE) -> bytes:
+    """Undo Content-Encoding, refusing output larger than max_size."""
+    encoding = (content_encoding or IDENTITY_ENCODING).strip().lower()
+    if encoding == IDENTITY_ENCODING:
+        return body
+
+    try:
+        if encoding == GZIP_ENCODING:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data = decompressor.decompress(body, max_size + 1)
+        elif encoding == ZSTD_ENCODING:
+            if not ZSTD_AVAILABLE:
+                raise UnsupportedWireFormat("zstandard is not installed")
+            with zstandard.ZstdDecompressor().stream_reader(body) as reader:
+                data = reader.read(max_size + 1)
+        else:
+            raise UnsupportedWireFormat(f"Unsupported content encoding: {encoding}")
+    except UnsupportedWireFormat:
+        raise
+    except Exception as e:
+        raise WireFormatError(f"Malformed {encoding} body: {e}")
+
+    if len(data) > max_size:
+        raise WireFormatError(f"Decoded body exceeds {max_size} bytes")
+    return data
+
+
+# Columnar payloads
+
+def state_to_columnar(state: SystemState) -> Dict[str, Any]:
+    """Convert a SystemState to the columnar submission layout."""
+    packages = PackageSet.coerce(state.packages)
+    return {
+        "endpoint_id": state.endpoint_id,
+        "timestamp": state.timestamp.isoformat(),
+        "pacman_version": state.pacman_version,
+        "architecture": state.architecture,
+        "packages": packages.columns()
+    }
+
+
+def state_from_columnar(payload: Dict[str, Any]) -> Tuple[SystemState, PackageSet]:
+    """
+    Rebuild a SystemState from the columnar submission layout.
+
+    Returns:
+        Tuple of (state, package set); the state's packages are materialized
+        from the set
+    """
+    try:
+        packages = PackageSet.from_columns(payload["packages"])
+        state = SystemState(
+            endpoint_id=payload["endpoint_id"],
+            timestamp=datetime.fromisoformat(payload["timestamp"]),
+            packages=packages.to_list(),
+            pacman_version=payload["pacman_version"],
+            architecture=payload["architecture"]
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise WireFormatError(f"Invalid columnar state payload: {e}")
+    return state, packages
+
+
+def repositories_to_columnar(repositories: List[Repository]) -> Dict[str, Any]:
+    """Convert repositories to the columnar submission layout."""
+    return {
+        "repositories": [
+            {
+                "repo_name": repo.repo_name,
+                "repo_url": repo.repo_url,
+                "mirrors": list(repo.mirrors or []),
+                "packages": PackageSet.coerce(repo.packages).columns()
+            }
+            for repo in repositories
+        ]
+    }
+
+
+def repositories_from_columnar(payload: Dict[str, Any], endpoint_id: str) -> List[Tuple[Repository, PackageSet]]:
+    """
+    Rebuild repositories from the columnar submission layout.
+
+    Returns:
+        List of (repository, package set) pairs
+    """
+    result = []
+    try:
+        for repo_data in payload["repositories"]:
+            columns = dict(repo_data["packages"], kind=PackageSet.REPOSITORY)
+            packages = PackageSet.from_columns(columns)
+            result.append((Repository(
+                id="",  # Will be generated
+                endpoint_id=endpoint_id,
+                repo_name=repo_data["repo_name"],
+                repo_url=repo_data.get("repo_url"),
+                mirrors=list(repo_data.get("mirrors") or []),
+                packages=packages.to_list()
+            ), packages))
+    except (KeyError, TypeError, ValueError) as e:
+        raise WireFormatError(f"Invalid columnar repository payload: {e}")
+    return result
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark for client cold-start import time.
+
+Runs each client entry path in a fresh interpreter under
+`python -X importtime` and reports the total import time and the slowest
+top-level imports. tests/test_import_time_unit.py guards which modules the
+fast paths may load; this script shows what they cost.
+
+Usage:
+    python tests/benchmark_import_time.py [--runs 5] [--top 8]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+
+PATHS = {
+    'status shim': ['client/status_cli.py', '--json'],
+    '--status --json': ['client/main.py', '--status', '--json'],
+    'waybar click': ['client/main.py', '--waybar-click', 'left', '--waybar-action', 'show_status'],
+    'sync manager': ['-c', 'import client.sync_manager'],
+}
+
+
+def importtime(argv, env):
+    """Return {top-level module: cumulative microseconds} for one cold start."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + argv,
+        cwd=project_root, env=env, capture_output=True, text=True
+    )
+    top_level = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.startswith('  ') or 'imported package' in name:
+            continue
+        top_level[name.strip()] = int(cumulative)
+    return top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            'XDG_CONFIG_HOME': os.path.join(tmp, 'config'),
+            'XDG_RUNTIME_DIR': os.path.join(tmp, 'run'),
+            'XDG_STATE_HOME': os.path.join(tmp, 'state'),
+        })
+
+        for label, argv in PATHS.items():
+            runs = [importtime(argv, env) for _ in range(args.runs)]
+            totals = [sum(run.values()) / 1000 for run in runs]
+            print(f"{label:<18} median {statistics.median(totals):7.1f} ms  "
+                  f"(min {min(totals):.1f}, max {max(totals):.1f})")
+
+            slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)[:args.top]
+            for name, micros in slowest:
+                print(f"    {micros / 1000:7.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
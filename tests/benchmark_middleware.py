@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the per-request overhead of the API middleware stack.
+
+Drives the ASGI application directly (no HTTP client or server in the
+loop) and compares a bare route against the server's middleware stack at
+different operation log sample rates. Log records are formatted with the
+structured JSON formatter and written to /dev/null so formatting cost is
+included.
+
+Usage:
+    python tests/benchmark_middleware.py [--requests 5000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from fastapi import FastAPI
+
+from server.middleware.auth import SecurityHeadersMiddleware
+from server.middleware.operation_tracking import create_operation_tracking_middleware
+from server.middleware.rate_limiting import create_rate_limit_middleware
+from shared.logging_config import StructuredFormatter
+
+
+def build_app(with_stack: bool, sample_rate: float = 1.0) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items")
+    async def list_items():
+        return {"items": []}
+
+    if with_stack:
+        app.add_middleware(create_operation_tracking_middleware(
+            enable_performance_logging=False, sample_rate=sample_rate
+        ))
+        app.add_middleware(create_rate_limit_middleware(default_limit=10 ** 9).bind)
+        app.add_middleware(SecurityHeadersMiddleware)
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> float:
+    """Send requests straight through the ASGI callable, returning seconds per request."""
+    scope_template = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/items", "raw_path": b"/api/items",
+        "query_string": b"", "root_path": "", "server": ("test", 80),
+        "client": ("10.0.0.1", 12345), "headers": [(b"host", b"test")],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    # Warm up routing and middleware construction
+    for _ in range(100):
+        await app(dict(scope_template), receive, send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope_template), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+async def run(requests: int) -> None:
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(StructuredFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+
+    baseline = await drive(build_app(False), requests)
+    print(f"Bare route:                 {baseline * 1e6:8.1f} µs/request")
+
+    for sample_rate in (1.0, 0.1, 0.0):
+        per_request = await drive(build_app(True, sample_rate), requests)
+        print(f"Stack, sample rate {sample_rate:<4}:   {per_request * 1e6:8.1f} µs/request "
+              f"(+{(per_request - baseline) * 1e6:.1f} µs)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
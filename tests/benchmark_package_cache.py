@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark for downgrade lookups in the pacman package cache.
+
+Fills a temporary directory with empty archives named like a long-lived
+pacman cache and compares a filename glob per lookup (the previous
+implementation) with PackageCacheIndex, including its initial scan.
+
+Usage:
+    python tests/benchmark_package_cache.py [--archives 20000] [--lookups 200]
+"""
+
+import argparse
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from client.package_cache import PackageCacheIndex
+
+
+def populate(cache_dir: str, archives: int):
+    """Create archives for packages with several cached versions each."""
+    targets = []
+    for i in range(archives // 4):
+        name = f"pkg{i}" if i % 3 else f"lib{i}-common"
+        for release in range(1, 5):
+            version = f"1.{i % 7}.{release}-1"
+            for suffix in ('', '.sig'):
+                Path(cache_dir, f"{name}-{version}-x86_64.pkg.tar.zst{suffix}").touch()
+            targets.append((name, version))
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--archives', type=int, default=20000)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        targets = populate(cache_dir, args.archives)
+        sample = random.Random(0).sample(targets, min(args.lookups, len(targets)))
+
+        start = time.perf_counter()
+        for name, version in sample:
+            matches = glob.glob(os.path.join(cache_dir, f"{name}-{version}-*.pkg.tar.*"))
+            assert matches
+        glob_seconds = time.perf_counter() - start
+
+        index = PackageCacheIndex(cache_dir, 'x86_64')
+        start = time.perf_counter()
+        index.find(*sample[0])
+        scan_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name, version in sample:
+            assert index.find(name, version)
+        lookup_seconds = time.perf_counter() - start
+
+    print(f"{len(targets)} archives, {len(sample)} lookups")
+    print(f"glob per lookup   {glob_seconds * 1000:9.1f} ms total  {glob_seconds / len(sample) * 1e6:9.1f} us/lookup")
+    print(f"index initial scan{scan_seconds * 1000:9.1f} ms")
+    print(f"index lookups     {lookup_seconds * 1000:9.1f} ms total  {lookup_seconds / len(sample) * 1e6:9.1f} us/lookup")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the rate limiter with a large client population.
+
+Simulates 10,000 distinct clients issuing requests round-robin and reports
+throughput, per-check latency and memory held by the limiter state.
+
+Usage:
+    python tests/benchmark_rate_limiting.py [--clients 10000] [--requests 200000]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from server.middleware.rate_limiting import RateLimiter
+
+
+def make_requests(clients: int):
+    """Build one lightweight request stand-in per simulated client."""
+    return [
+        SimpleNamespace(
+            client=SimpleNamespace(host=f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}"),
+            headers={},
+            state=SimpleNamespace(endpoint=None)
+        )
+        for i in range(clients)
+    ]
+
+
+def run(clients: int, total_requests: int) -> None:
+    requests = make_requests(clients)
+    limiter = RateLimiter(requests_per_minute=120)
+
+    # Measure the memory of the populated state separately from throughput
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for request in requests:
+        limiter.is_allowed(request)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    allowed = 0
+    start = time.perf_counter()
+    for i in range(total_requests):
+        if limiter.is_allowed(requests[i % clients])[0]:
+            allowed += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"Clients:            {clients}")
+    print(f"Requests:           {total_requests} ({allowed} allowed)")
+    print(f"Throughput:         {total_requests / elapsed:,.0f} checks/s")
+    print(f"Mean check latency: {elapsed / total_requests * 1e6:.2f} µs")
+    print(f"Tracked clients:    {len(limiter.backend)}")
+    print(f"Limiter state:      {(current - baseline) / 1024:.0f} KiB "
+          f"({(current - baseline) / clients:.0f} bytes/client)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+    run(args.clients, args.requests)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the state and repository submission wire formats.
+
+Builds a realistic package state and repository listing, then reports the
+bytes on the wire for every available format and the server CPU time per
+submission. Requests are driven straight through the ASGI routers (storage
+mocked out), so the figures cover body decoding, validation and conversion.
+
+Usage:
+    python tests/benchmark_wire_format.py [--packages 1500] [--repo-packages 15000] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from fastapi import FastAPI
+
+from server.api.endpoints import router as endpoints_router
+from server.api.states import router as states_router
+from shared.models import Endpoint, PackageState, Repository, RepositoryPackage, SystemState
+from shared.wire_format import (
+    JSON_CONTENT_TYPE, IDENTITY_ENCODING, encode_body,
+    repositories_to_columnar, state_to_columnar, supported_content_types, supported_encodings
+)
+
+
+def build_state(count: int) -> SystemState:
+    repos = ["core", "extra", "multilib"]
+    return SystemState(
+        endpoint_id="ep-1",
+        timestamp=datetime.now(),
+        packages=[
+            PackageState(f"package-{i}", f"{i % 7}.{i % 13}.{i % 5}-{i % 3 + 1}", repos[i % 3],
+                         1024 * (i % 977), dependencies=[f"package-{j}" for j in range(i % 4)])
+            for i in range(count)
+        ],
+        pacman_version="6.1.0",
+        architecture="x86_64"
+    )
+
+
+def build_repositories(count: int) -> list:
+    packages = [
+        RepositoryPackage(f"package-{i}", f"{i % 7}.{i % 13}.{i % 5}-1", "extra", "x86_64",
+                          f"Description of package {i}")
+        for i in range(count)
+    ]
+    return [Repository("", "ep-1", "extra", "https://mirror.example.org/extra/os/x86_64", packages)]
+
+
+def row_state(state: SystemState) -> dict:
+    """The plain JSON layout sent by PacmanSyncAPIClient."""
+    return {
+        'endpoint_id': state.endpoint_id,
+        'timestamp': state.timestamp.isoformat(),
+        'packages': [
+            {'package_name': p.package_name, 'version': p.version, 'repository': p.repository,
+             'installed_size': p.installed_size, 'dependencies': p.dependencies}
+            for p in state.packages
+        ],
+        'pacman_version': state.pacman_version,
+        'architecture': state.architecture
+    }
+
+
+def row_repositories(repositories: list) -> dict:
+    return {'repositories': [
+        {'repo_name': r.repo_name, 'repo_url': r.repo_url, 'mirrors': r.mirrors,
+         'packages': [{'name': p.name, 'version': p.version, 'repository': p.repository,
+                       'architecture': p.architecture, 'description': p.description} for p in r.packages]}
+        for r in repositories
+    ]}
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(states_router, prefix="/api")
+    app.include_router(endpoints_router, prefix="/api")
+
+    async def authenticate(request, credentials):
+        return Endpoint("ep-1", "ep", "host", pool_id="pool-1")
+
+    app.state.authenticate_endpoint = authenticate
+    app.state.sync_coordinator = MagicMock()
+    app.state.sync_coordinator.state_manager.save_state = AsyncMock(return_value="state-1")
+    app.state.endpoint_manager = MagicMock()
+    app.state.endpoint_manager.update_repository_info = AsyncMock(return_value=True)
+    return app
+
+
+async def drive(app: FastAPI, path: str, body: bytes, headers: dict, rounds: int) -> float:
+    """POST the body through the ASGI app, returning CPU seconds per request."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "server": ("test", 80), "client": ("10.0.0.1", 1234),
+        "headers": [(b"host", b"test")] + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(dict(scope), receive, send)
+    if status[-1] != 200:
+        raise RuntimeError(f"{path} returned {status[-1]}")
+
+    gc.collect()
+    start = time.process_time()
+    for _ in range(rounds):
+        await app(dict(scope), receive, send)
+    return (time.process_time() - start) / rounds
+
+
+def formats():
+    yield "JSON (rows)", JSON_CONTENT_TYPE, IDENTITY_ENCODING
+    for content_type in supported_content_types():
+        if content_type == JSON_CONTENT_TYPE:
+            continue
+        for encoding in supported_encodings():
+            yield f"{content_type.split('.')[-1]} + {encoding}", content_type, encoding
+
+
+async def run(packages: int, repo_packages: int, rounds: int) -> None:
+    # Keep per-request info logging out of the measurement
+    logging.disable(logging.INFO)
+    app = build_app()
+    cases = [
+        ("State submission", "/api/states/ep-1", build_state(packages), row_state, state_to_columnar),
+        ("Repository submission", "/api/endpoints/ep-1/repositories", build_repositories(repo_packages),
+         row_repositories, repositories_to_columnar),
+    ]
+
+    for title, path, value, to_rows, to_columns in cases:
+        print(f"{title} ({path})")
+        print(f"  {'format':<28} {'bytes':>10} {'server CPU':>12}")
+        baseline = None
+        for label, content_type, encoding in formats():
+            payload = to_rows(value) if content_type == JSON_CONTENT_TYPE else to_columns(value)
+            body, headers = encode_body(payload, content_type, encoding)
+            cpu = await drive(app, path, body, headers, rounds)
+            baseline = baseline or (len(body), cpu)
+            print(f"  {label:<28} {len(body):>10,} {cpu * 1e3:>9.2f} ms"
+                  f"   ({len(body) / baseline[0]:.0%} bytes, {cpu / baseline[1]:.0%} CPU)")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--packages", type=int, default=1500)
+    parser.add_argument("--repo-packages", type=int, default=15000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.packages, args.repo_packages, args.rounds))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the queued logging pipeline.
+
+Tests structured formatting, queueing records for background listener
+threads, batched audit file writes and flushing on shutdown.
+"""
+
+import json
+import logging
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+import shared.logging_config as logging_config
+from shared.logging_config import (
+    AuditLogger, BatchingFileHandler, LogFormat, LogLevel, LogQueueHandler,
+    StructuredFormatter, setup_logging, stop_logging
+)
+
+
+@pytest.fixture
+def restore_logging():
+    """Put back the root and audit logger configuration after a test."""
+    root_logger = logging.getLogger()
+    audit_logger = logging.getLogger('audit')
+    saved = (root_logger.handlers[:], root_logger.level, audit_logger.handlers[:], audit_logger.level)
+    yield
+    stop_logging()
+    root_logger.handlers[:], root_logger.level, audit_logger.handlers[:], audit_logger.level = saved
+
+
+def read_entries(path):
+    with open(path) as log:
+        return [json.loads(line) for line in log]
+
+
+def wait_for_entries(path, count, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if path.exists() and len(path.read_text().splitlines()) >= count:
+            return read_entries(path)
+        time.sleep(0.01)
+    return read_entries(path)
+
+
+class TestStructuredFormatter:
+    """Test JSON formatting of records."""
+
+    def record(self, **extra):
+        record = logging.LogRecord('api', logging.INFO, 'app.py', 10, 'Handled %s', ('GET',), None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_extra_fields(self):
+        """Test that only fields passed through extra are reported as extra."""
+        entry = json.loads(StructuredFormatter().format(self.record(request_id='r-1', audit_info={'a': 1})))
+
+        assert entry['message'] == 'Handled GET'
+        assert entry['extra'] == {'request_id': 'r-1'}
+        assert entry['audit'] == {'a': 1}
+
+    def test_json_without_orjson(self):
+        """Test that the standard library encoder gives the same entries."""
+        record = self.record(count=3, tags=['a', 'b'], opaque=object())
+
+        with patch.object(logging_config, 'ORJSON_AVAILABLE', False):
+            fallback = json.loads(StructuredFormatter().format(record))
+        preferred = json.loads(StructuredFormatter().format(record))
+
+        assert fallback['extra']['tags'] == preferred['extra']['tags'] == ['a', 'b']
+        assert fallback['extra']['opaque'].startswith('<object object')
+        assert fallback == preferred
+
+
+class TestQueuedLogging:
+    """Test setup_logging(async_logging=True)."""
+
+    def test_records_are_written_by_listener_thread(self, tmp_path, restore_logging):
+        """Test that logging calls only enqueue records."""
+        log_file = tmp_path / 'server.log'
+        setup_logging(LogLevel.INFO, LogFormat.JSON, log_file=str(log_file),
+                      enable_console=False, enable_audit=False, async_logging=True)
+        root_logger = logging.getLogger()
+        assert [type(handler) for handler in root_logger.handlers] == [LogQueueHandler]
+
+        writers = set()
+        original_emit = logging.FileHandler.emit
+
+        def emit(handler, record):
+            writers.add(threading.current_thread().name)
+            original_emit(handler, record)
+
+        arguments = ['first']
+        with patch.object(logging.FileHandler, 'emit', emit):
+            logging.getLogger('api').info('Packages: %s', arguments)
+            arguments.append('changed later')
+            try:
+                raise RuntimeError('boom')
+            except RuntimeError:
+                logging.getLogger('api').exception('Request failed')
+            logging.getLogger('api').debug('Filtered out')
+            stop_logging()
+
+        assert writers and threading.current_thread().name not in writers
+        entries = read_entries(log_file)
+        assert [entry['message'] for entry in entries] == ["Packages: ['first']", 'Request failed']
+        assert entries[1]['exception']['type'] == 'RuntimeError'
+        assert 'boom' in entries[1]['exception']['traceback']
+
+    def test_audit_records_are_batched(self, tmp_path, restore_logging):
+        """Test that queued audit records reach the audit file without waiting for shutdown."""
+        audit_file = tmp_path / 'audit.log'
+        setup_logging(LogLevel.INFO, enable_console=False, audit_file=str(audit_file),
+                      async_logging=True, audit_batch_size=50)
+
+        audit_handler = logging_config._listeners[-1].handlers[0]
+        assert isinstance(audit_handler, BatchingFileHandler)
+        assert audit_handler.capacity == 50
+
+        audit_logger = AuditLogger()
+        for index in range(5):
+            audit_logger.log_authentication(endpoint_name=f'desk{index}', endpoint_id=f'ep-{index}')
+
+        entries = wait_for_entries(audit_file, 5)
+        assert [entry['audit']['endpoint_id'] for entry in entries] == [f'ep-{index}' for index in range(5)]
+
+    def test_setup_again_replaces_listeners(self, tmp_path, restore_logging):
+        """Test that reconfiguring stops the previous writers."""
+        setup_logging(enable_console=False, audit_file=str(tmp_path / 'a.log'), async_logging=True)
+        first = list(logging_config._listeners)
+        setup_logging(enable_console=False, audit_file=str(tmp_path / 'b.log'), async_logging=True)
+
+        assert all(listener._thread is None for listener in first)
+        assert len(logging.getLogger('audit').handlers) == 1
+
+
+class TestBatchingFileHandler:
+    """Test batched file writes."""
+
+    def handler(self, path, **kwargs):
+        handler = BatchingFileHandler(str(path), encoding='utf-8', **kwargs)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        return handler
+
+    def record(self, message, level=logging.INFO):
+        return logging.LogRecord('audit', level, 'app.py', 1, message, None, None)
+
+    def test_buffers_until_capacity_or_error(self, tmp_path):
+        """Test when buffered records are written."""
+        path = tmp_path / 'audit.log'
+        handler = self.handler(path, capacity=3)
+
+        handler.handle(self.record('one'))
+        handler.handle(self.record('two'))
+        assert path.read_text() == ''
+
+        handler.handle(self.record('three'))
+        assert path.read_text().splitlines() == ['one', 'two', 'three']
+
+        handler.handle(self.record('four'))
+        handler.handle(self.record('five', logging.ERROR))
+        assert path.read_text().splitlines()[-2:] == ['four', 'five']
+
+        handler.handle(self.record('six'))
+        handler.close()
+        assert path.read_text().splitlines()[-1] == 'six'
+
+    def test_rotation(self, tmp_path):
+        """Test that a batch that would overflow the file starts a new one."""
+        path = tmp_path / 'audit.log'
+        handler = self.handler(path, capacity=2, maxBytes=20, backupCount=1)
+
+        for message in ('aaaaaaaa', 'bbbbbbbb', 'cccccccc', 'dddddddd'):
+            handler.handle(self.record(message))
+        handler.close()
+
+        assert (tmp_path / 'audit.log.1').read_text().splitlines() == ['aaaaaaaa', 'bbbbbbbb']
+        assert path.read_text().splitlines() == ['cccccccc', 'dddddddd']
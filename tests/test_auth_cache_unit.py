@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the authenticated endpoint cache.
+
+Tests TTL and size bounds, invalidation on endpoint changes, the negative
+cache for revoked endpoints and the cached authentication paths.
+"""
+
+import pytest
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from server.core.auth_cache import AuthCache
+from server.core.endpoint_manager import EndpointManager, EndpointAuthenticationError
+from server.database.events import ChangeEvent
+from server.middleware.auth import AuthenticationMiddleware
+from shared.models import Endpoint, SyncStatus
+
+
+def make_endpoint(endpoint_id="ep-1", pool_id="pool-1"):
+    return Endpoint(endpoint_id, "ep", "host", pool_id=pool_id, sync_status=SyncStatus.IN_SYNC)
+
+
+FAR_FUTURE = time.time() + 3600
+
+
+class TestAuthCache:
+    """Test AuthCache bookkeeping."""
+
+    def test_put_and_get_returns_copy(self):
+        """Test that cached endpoints are returned as independent copies."""
+        cache = AuthCache()
+        cache.put("token-1", make_endpoint(), FAR_FUTURE)
+
+        first = cache.get("token-1")
+        first.sync_status = SyncStatus.BEHIND
+
+        assert cache.get("token-1").sync_status == SyncStatus.IN_SYNC
+        assert cache.get("unknown") is None
+
+    def test_expired_entries_are_dropped(self):
+        """Test cache TTL and token expiry."""
+        cache = AuthCache(ttl=10)
+        cache.put("expired-token", make_endpoint(), time.time() - 1)
+        assert cache.get("expired-token") is None
+
+        cache.put("token-1", make_endpoint(), FAR_FUTURE)
+        with patch("server.core.auth_cache.time.monotonic", return_value=time.monotonic() + 11):
+            assert cache.get("token-1") is None
+        assert len(cache) == 0
+
+    def test_size_bound_evicts_least_recently_used(self):
+        """Test that the cache never exceeds max_entries."""
+        cache = AuthCache(max_entries=2)
+        cache.put("token-1", make_endpoint("ep-1"), FAR_FUTURE)
+        cache.put("token-2", make_endpoint("ep-2"), FAR_FUTURE)
+        cache.get("token-1")
+        cache.put("token-3", make_endpoint("ep-3"), FAR_FUTURE)
+
+        assert len(cache) == 2
+        assert cache.get("token-2") is None
+        assert cache.get("token-1") is not None
+
+    def test_change_events_invalidate(self):
+        """Test invalidation from ORM change notifications."""
+        cache = AuthCache()
+        cache.put("token-1", make_endpoint("ep-1"), FAR_FUTURE)
+        cache.put("token-2", make_endpoint("ep-2", pool_id="pool-2"), FAR_FUTURE)
+        cache.put("token-3", make_endpoint("ep-3", pool_id="pool-2"), FAR_FUTURE)
+
+        cache.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED, {'endpoint_id': "ep-1"})
+        assert cache.get("token-1") is None
+
+        cache.handle_change(ChangeEvent.POOL_DELETED, {'pool_id': "pool-2"})
+        assert len(cache) == 0
+
+    def test_deleted_endpoint_is_revoked(self):
+        """Test the negative cache for removed endpoints."""
+        cache = AuthCache()
+        cache.put("token-1", make_endpoint("ep-1"), FAR_FUTURE)
+
+        cache.handle_change(ChangeEvent.ENDPOINT_DELETED, {'endpoint_id': "ep-1"})
+        assert cache.get("token-1") is None
+        assert cache.is_revoked("ep-1")
+
+        cache.handle_change(ChangeEvent.ENDPOINT_CREATED, {'endpoint_id': "ep-1"})
+        assert not cache.is_revoked("ep-1")
+
+    def test_stale_fill_is_discarded(self):
+        """Test that a fill racing with an invalidation is not cached."""
+        cache = AuthCache()
+        generation = cache.generation
+        cache.invalidate_endpoint("ep-1")
+
+        cache.put("token-1", make_endpoint("ep-1"), FAR_FUTURE, generation)
+        assert cache.get("token-1") is None
+
+    def test_zero_ttl_disables_cache(self):
+        """Test that a TTL of 0 disables caching."""
+        cache = AuthCache(ttl=0)
+        cache.put("token-1", make_endpoint(), FAR_FUTURE)
+        cache.revoke("ep-1")
+
+        assert cache.get("token-1") is None
+        assert not cache.is_revoked("ep-1")
+
+
+class TestCachedAuthentication:
+    """Test the cached authentication paths."""
+
+    @pytest.fixture
+    def manager(self):
+        manager = EndpointManager(MagicMock(), jwt_secret="test-secret")
+        manager.orm.endpoints = AsyncMock()
+        manager.orm.repositories = AsyncMock()
+        manager.orm.endpoints.get_by_id.return_value = make_endpoint()
+        manager.orm.endpoints.update_last_seen.return_value = True
+        return manager
+
+    @pytest.mark.asyncio
+    async def test_manager_authenticate_uses_cache(self, manager):
+        """Test that repeated authentication performs a single lookup."""
+        token = manager.generate_auth_token("ep-1", "ep")
+
+        for _ in range(3):
+            endpoint = await manager.authenticate_endpoint(token)
+            assert endpoint.id == "ep-1"
+
+        manager.orm.endpoints.get_by_id.assert_awaited_once_with("ep-1")
+
+    @pytest.mark.asyncio
+    async def test_manager_remove_revokes_token(self, manager):
+        """Test that removing an endpoint rejects its cached token."""
+        token = manager.generate_auth_token("ep-1", "ep")
+        await manager.authenticate_endpoint(token)
+
+        manager.orm.endpoints.delete.return_value = True
+        await manager.remove_endpoint("ep-1")
+
+        with pytest.raises(EndpointAuthenticationError, match="Endpoint not found"):
+            await manager.authenticate_endpoint(token)
+        manager.orm.endpoints.get_by_id.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_manager_pool_assignment_invalidates(self, manager):
+        """Test that pool assignment forces a reload."""
+        token = manager.generate_auth_token("ep-1", "ep")
+        await manager.authenticate_endpoint(token)
+
+        manager.orm.endpoints.assign_to_pool.return_value = True
+        await manager.assign_to_pool("ep-1", "pool-2")
+        await manager.authenticate_endpoint(token)
+
+        assert manager.orm.endpoints.get_by_id.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_middleware_uses_cache(self, manager):
+        """Test that the request middleware only hits the database once."""
+        middleware = AuthenticationMiddleware("test-secret")
+        token = manager.generate_auth_token("ep-1", "ep")
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        for _ in range(3):
+            endpoint = await middleware.authenticate_endpoint(credentials, manager)
+            assert endpoint.id == "ep-1"
+
+        manager.orm.endpoints.get_by_id.assert_awaited_once_with("ep-1")
+        assert manager.orm.endpoints.update_last_seen.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_middleware_negative_cache(self, manager):
+        """Test that unknown endpoints are rejected without repeated lookups."""
+        middleware = AuthenticationMiddleware("test-secret")
+        manager.orm.endpoints.get_by_id.return_value = None
+        token = manager.generate_auth_token("ep-gone", "ep")
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        for _ in range(2):
+            with pytest.raises(HTTPException, match="Endpoint not found"):
+                await middleware.authenticate_endpoint(credentials, manager)
+
+        manager.orm.endpoints.get_by_id.assert_awaited_once_with("ep-gone")
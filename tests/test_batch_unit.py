@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Unit tests for request batching.
+
+Tests the POST /api/batch endpoint, the client's request coalescing and
+its fallbacks, and batched replay of offline operations.
+"""
+
+import asyncio
+import gzip
+import json
+import pytest
+import httpx
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+
+from client.api_client import APIClientError, PacmanSyncAPIClient
+from client.request_batcher import BATCH_PATH, BatchOperationError, RequestBatcher
+from server.api.batch import MAX_BATCH_OPERATIONS, router as batch_router
+from server.api.endpoints import router as endpoints_router
+from server.api.states import router as states_router
+from server.middleware.operation_tracking import OperationTrackingMiddleware
+from server.middleware.rate_limiting import create_rate_limit_middleware
+from shared.exceptions import ErrorCode, NetworkError, PacmanSyncError
+from shared.models import Endpoint
+
+
+class TestBatchEndpoint:
+    """Test server-side batch execution."""
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI()
+        app.include_router(endpoints_router, prefix="/api")
+        app.include_router(states_router, prefix="/api")
+        app.include_router(batch_router)
+
+        @app.exception_handler(PacmanSyncError)
+        async def structured_error(request, exc):
+            return JSONResponse(status_code=exc.get_http_status_code(), content={'error': str(exc)})
+
+        async def authenticate(request, credentials):
+            if credentials is None or credentials.credentials != "token":
+                raise HTTPException(status_code=401, detail="Not authenticated")
+            return Endpoint("ep-1", "ep", "host", pool_id="pool-1")
+
+        app.state.authenticate_endpoint = authenticate
+        app.state.endpoint_manager = MagicMock()
+        app.state.endpoint_manager.update_endpoint_status = AsyncMock(return_value=True)
+        return app
+
+    async def post(self, app, payload, token="token", **kwargs):
+        transport = httpx.ASGITransport(app=app)
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            if 'content' in kwargs:
+                headers.update(kwargs.pop('headers', {}))
+                return await client.post(BATCH_PATH, headers=headers, **kwargs)
+            return await client.post(BATCH_PATH, json=payload, headers=headers)
+
+    @pytest.mark.asyncio
+    async def test_operations_run_in_order_with_own_status(self, app):
+        """Test per-operation results, including errors raised by a route."""
+        response = await self.post(app, {'operations': [
+            {'id': 'a', 'method': 'PUT', 'path': '/api/endpoints/ep-1/status', 'body': {'status': 'in_sync'}},
+            {'id': 'b', 'method': 'PUT', 'path': '/api/endpoints/ep-2/status', 'body': {'status': 'in_sync'}},
+            {'id': 'c', 'method': 'PUT', 'path': '/api/endpoints/ep-1/status', 'body': {}},
+            {'id': 'd', 'method': 'GET', 'path': '/api/sync/operations/op-1'},
+        ]})
+
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [r['id'] for r in results] == ['a', 'b', 'c', 'd']
+        assert [r['status'] for r in results] == [200, 403, 422, 404]
+        assert results[0]['body'] == {'message': 'Status updated successfully'}
+        app.state.endpoint_manager.update_endpoint_status.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_credentials_are_forwarded(self, app):
+        """Test that sub-operations authenticate with the batch's token."""
+        operations = {'operations': [
+            {'method': 'PUT', 'path': '/api/endpoints/ep-1/status', 'body': {'status': 'in_sync'}}
+        ]}
+
+        response = await self.post(app, operations, token="wrong")
+
+        assert response.status_code == 200
+        assert response.json()['results'][0]['status'] == 401
+
+    @pytest.mark.asyncio
+    async def test_rejects_nesting_and_oversized_batches(self, app):
+        """Test path validation and the operation limit."""
+        response = await self.post(app, {'operations': [
+            {'method': 'POST', 'path': BATCH_PATH, 'body': {'operations': []}},
+            {'method': 'GET', 'path': '/health'},
+            {'method': 'GET', 'path': '/api/packages/core/os/x86_64/zlib-1.3-1-x86_64.pkg.tar.zst'},
+            {'method': 'GET', 'path': '/api/dashboard/stream'},
+            {'method': 'POST', 'path': '/api/endpoints/register', 'body': {'name': 'a', 'hostname': 'b'}},
+            {'method': 'GET', 'path': '/api/endpoints/ep-1/status'},
+            {'method': 'PUT', 'path': '/api/endpoints/ep-1/status?x=1', 'body': {'status': 'in_sync'}},
+        ]})
+        assert [r['status'] for r in response.json()['results']] == [400] * 7
+        assert response.json()['results'][1]['body'] == {'detail': 'GET /health cannot be part of a batch'}
+
+        operation = {'method': 'GET', 'path': '/api/endpoints'}
+        response = await self.post(app, {'operations': [operation] * (MAX_BATCH_OPERATIONS + 1)})
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_sub_operations_are_rate_limited(self, app):
+        """Test that a batch cannot exceed a route's rate limit."""
+        rate_limits = create_rate_limit_middleware(endpoint_limits={'/api/endpoints/*/status': 2})
+        app.state.batch_dispatch_app = rate_limits.wrap(app.router)
+        operation = {'method': 'PUT', 'path': '/api/endpoints/ep-1/status', 'body': {'status': 'in_sync'}}
+
+        response = await self.post(app, {'operations': [operation] * 3})
+
+        results = response.json()['results']
+        assert [r['status'] for r in results] == [200, 200, 429]
+        assert results[2]['body']['error']['code'] == 'RATE_LIMIT_EXCEEDED'
+        assert app.state.endpoint_manager.update_endpoint_status.await_count == 2
+        # The same quota applies to requests sent on their own
+        request = MagicMock(client=MagicMock(host='127.0.0.1'), headers={}, state=MagicMock(endpoint=None))
+        assert rate_limits._get_limiter_for_path('/api/endpoints/ep-1/status').is_allowed(request)[0] is False
+
+    @pytest.mark.asyncio
+    async def test_sub_operations_are_audited(self, app):
+        """Test that sensitive sub-operations get their own audit records."""
+        tracking = OperationTrackingMiddleware(app.router, sample_rate=0.0)
+        app.state.batch_dispatch_app = tracking
+        operation = {'method': 'PUT', 'path': '/api/endpoints/ep-1/status', 'body': {'status': 'in_sync'}}
+
+        with patch.object(tracking.audit_logger, 'log_event') as log_event:
+            await self.post(app, {'operations': [operation, operation]})
+
+        audited = [(call.kwargs['resource_id'], call.kwargs.get('result')) for call in log_event.call_args_list]
+        assert audited == [('/api/endpoints/ep-1/status', None), ('/api/endpoints/ep-1/status', 'success')] * 2
+        operation_ids = {call.kwargs['operation_id'] for call in log_event.call_args_list}
+        assert len(operation_ids) == 2
+
+    @pytest.mark.asyncio
+    async def test_compressed_batch(self, app):
+        """Test a gzip-encoded batch body."""
+        body = gzip.compress(json.dumps({'operations': [
+            {'method': 'PUT', 'path': '/api/endpoints/ep-1/status', 'body': {'status': 'behind'}}
+        ]}).encode())
+
+        response = await self.post(app, None, content=body, headers={
+            'Content-Type': 'application/json', 'Content-Encoding': 'gzip'
+        })
+
+        assert response.status_code == 200
+        assert response.json()['results'][0]['status'] == 200
+
+
+class TestRequestBatcher:
+    """Test client-side coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_request(self):
+        """Test that calls within the window become one batch."""
+        send = AsyncMock(return_value={'results': [
+            {'id': '0', 'status': 200, 'body': {'message': 'ok'}},
+            {'id': '1', 'status': 404, 'body': {'detail': 'Endpoint not found'}},
+        ]})
+        batcher = RequestBatcher(send, window=0)
+
+        first, second = await asyncio.gather(
+            batcher.submit('PUT', '/api/endpoints/ep-1/status', {'status': 'in_sync'}),
+            batcher.submit('GET', '/api/endpoints/ep-1/pool'),
+            return_exceptions=True
+        )
+
+        assert first == {'message': 'ok'}
+        assert isinstance(second, BatchOperationError)
+        assert second.status_code == 404
+        assert "Endpoint not found" in str(second)
+
+        send.assert_awaited_once()
+        args, kwargs = send.call_args
+        assert args == ('POST', BATCH_PATH)
+        operations = json.loads(kwargs['body'])['operations']
+        assert [op['path'] for op in operations] == ['/api/endpoints/ep-1/status', '/api/endpoints/ep-1/pool']
+
+    @pytest.mark.asyncio
+    async def test_single_call_is_sent_directly(self):
+        """Test that a lone call does not pay for the batch envelope."""
+        send = AsyncMock(return_value={'pool_id': 'pool-1'})
+        batcher = RequestBatcher(send, window=0)
+
+        assert await batcher.submit('GET', '/api/endpoints/ep-1/pool') == {'pool_id': 'pool-1'}
+        send.assert_awaited_once_with('GET', '/api/endpoints/ep-1/pool', data=None, params=None)
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_batch_endpoint_missing(self):
+        """Test individual requests against servers without /api/batch."""
+        async def send(method, endpoint, **kwargs):
+            if endpoint == BATCH_PATH:
+                raise APIClientError("Request failed: Resource not found", status_code=404)
+            return {'path': endpoint}
+
+        batcher = RequestBatcher(send, window=0)
+        results = await asyncio.gather(batcher.submit('GET', '/api/a'), batcher.submit('GET', '/api/b'))
+
+        assert results == [{'path': '/api/a'}, {'path': '/api/b'}]
+        assert not batcher.batching_available
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status_code", [429, 500, 503, None])
+    async def test_other_batch_failures_keep_batching(self, status_code):
+        """Test that rate limiting or a server error only resends that batch individually."""
+        batches = []
+
+        async def send(method, endpoint, **kwargs):
+            if endpoint == BATCH_PATH:
+                batches.append(kwargs['body'])
+                raise APIClientError("Request failed", status_code=status_code)
+            return {'path': endpoint}
+
+        batcher = RequestBatcher(send, window=0)
+        results = await asyncio.gather(batcher.submit('GET', '/api/a'), batcher.submit('GET', '/api/b'))
+
+        assert results == [{'path': '/api/a'}, {'path': '/api/b'}]
+        assert batcher.batching_available
+
+        await asyncio.gather(batcher.submit('GET', '/api/c'), batcher.submit('GET', '/api/d'))
+        assert len(batches) == 2
+
+    @pytest.mark.asyncio
+    async def test_network_errors_fail_every_call(self):
+        """Test that a network failure is not retried request by request."""
+        send = AsyncMock(side_effect=NetworkError("Connection refused", ErrorCode.NETWORK_CONNECTION_FAILED))
+        batcher = RequestBatcher(send, window=0)
+
+        results = await asyncio.gather(
+            batcher.submit('GET', '/api/a'), batcher.submit('GET', '/api/b'), return_exceptions=True
+        )
+
+        assert all(isinstance(result, NetworkError) for result in results)
+        send.assert_awaited_once()
+        assert batcher.batching_available
+
+    @pytest.mark.asyncio
+    async def test_unauthorized_operations_are_resent(self):
+        """Test that a 401 inside a batch goes through the normal token refresh path."""
+        send = AsyncMock(side_effect=[
+            {'results': [{'status': 200, 'body': {}}, {'status': 401, 'body': {'detail': 'expired'}}]},
+            {'message': 'ok'}
+        ])
+        batcher = RequestBatcher(send, window=0)
+
+        results = await asyncio.gather(batcher.submit('GET', '/api/a'), batcher.submit('GET', '/api/b'))
+
+        assert results == [{}, {'message': 'ok'}]
+        assert send.call_args_list[1].args == ('GET', '/api/b')
+
+
+class TestClientBatchFallback:
+    """Test batch fallback with the client's HTTP error handling."""
+
+    async def run_against(self, batch_status):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+
+        requests = []
+
+        async def handler(request):
+            requests.append(request.path)
+            if request.path == BATCH_PATH:
+                return web.json_response({'detail': 'batch failed'}, status=batch_status)
+            return web.json_response({'path': request.path})
+
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handler)
+        async with TestServer(app) as server:
+            client = PacmanSyncAPIClient(str(server.make_url('/')), batch_window=0)
+            client.token_manager = MagicMock()
+            client.token_manager.get_current_token.return_value = "token"
+            client.retry_config.max_retries = 0
+            try:
+                results = await asyncio.gather(
+                    client._make_request('GET', '/api/a'), client._make_request('GET', '/api/b')
+                )
+            finally:
+                await client.close()
+        return client, requests, results
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("batch_status", [404, 405])
+    async def test_missing_batch_endpoint_disables_batching(self, batch_status):
+        """Test that servers without /api/batch get individual requests from then on."""
+        client, requests, results = await self.run_against(batch_status)
+
+        assert results == [{'path': '/api/a'}, {'path': '/api/b'}]
+        assert requests == [BATCH_PATH, '/api/a', '/api/b']
+        assert not client._batcher.batching_available
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("batch_status", [429, 503])
+    async def test_transient_batch_failure_keeps_batching(self, batch_status):
+        """Test that a throttled or failing batch is resent individually without disabling batching."""
+        client, requests, results = await self.run_against(batch_status)
+
+        assert results == [{'path': '/api/a'}, {'path': '/api/b'}]
+        assert requests == [BATCH_PATH, '/api/a', '/api/b']
+        assert client._batcher.batching_available
+
+
+class TestOfflineReplay:
+    """Test batched replay of offline operations."""
+
+    @pytest.mark.asyncio
+    async def test_replay_is_batched_in_order(self):
+        """Test that queued operations go out in one batch, oldest first."""
+        client = PacmanSyncAPIClient("http://test")
+        client.token_manager = MagicMock()
+        client.token_manager.get_current_token.return_value = "token"
+        for operation in [
+            {'type': 'status_update', 'endpoint_id': 'ep-1', 'status': 'behind'},
+            {'type': 'state_submission', 'endpoint_id': 'ep-1', 'state_data': {'packages': []}},
+            {'type': 'sync_operation', 'endpoint_id': 'ep-1', 'operation': 'sync'},
+            {'type': 'status_update', 'endpoint_id': 'ep-2', 'status': 'in_sync'},
+        ]:
+            client._offline_journal.append(operation)
+        send = AsyncMock(return_value={'results': [
+            {'status': 200, 'body': {}}, {'status': 200, 'body': {'state_id': 's'}},
+            {'status': 500, 'body': {'detail': 'boom'}}, {'status': 200, 'body': {}},
+        ]})
+        client._batcher._send = send
+
+        assert await client.process_offline_operations() == 3
+
+        send.assert_awaited_once()
+        operations = json.loads(send.call_args.kwargs['body'])['operations']
+        assert [(op['method'], op['path']) for op in operations] == [
+            ('PUT', '/api/endpoints/ep-1/status'),
+            ('POST', '/api/states/ep-1'),
+            ('POST', '/api/sync/ep-1/sync-to-latest'),
+            ('PUT', '/api/endpoints/ep-2/status'),
+        ]
+        assert operations[3]['body'] == {'status': 'in_sync'}
+        # Failed operations stay queued for the next attempt
+        assert [op['type'] for op in client._offline_operations] == ['sync_operation']
+
+    @pytest.mark.asyncio
+    async def test_replay_without_batching(self):
+        """Test replay with batching disabled."""
+        client = PacmanSyncAPIClient("http://test", batch_requests=False)
+        client._offline_journal.append({'type': 'pool_assignment', 'endpoint_id': 'ep-1', 'pool_id': 'pool-1'})
+        client._offline_journal.append({'type': 'unknown', 'endpoint_id': 'ep-1'})
+        client._make_request = AsyncMock(return_value={})
+
+        assert await client.process_offline_operations() == 1
+
+        client._make_request.assert_awaited_once_with(
+            method='PUT', endpoint='/api/endpoints/ep-1/pool', data=None, params={'pool_id': 'pool-1'}
+        )
+        assert client._offline_operations == []
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Unit tests for set-based endpoint updates.
+
+Tests pool-wide status transitions, bulk pool assignment and unassignment
+on a real SQLite database, the change events they publish, and their use
+by the pool manager and the set-latest operation.
+"""
+
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from server.core.pool_manager import PackagePoolManager
+from server.core.sync_coordinator import SyncCoordinator
+from server.database.connection import DatabaseManager
+from server.database.events import ChangeEvent, ChangeNotifier
+from server.database.orm import EndpointRepository, NotFoundError, PoolRepository
+from server.database.schema import create_tables
+from shared.models import (
+    Endpoint, OperationStatus, OperationType, PackagePool, SyncOperation, SyncStatus
+)
+
+
+async def endpoint_database(tmp_path):
+    """Repository on a database with pool-1 (ep-1..ep-4), pool-2 (ep-5) and unassigned ep-6."""
+    db_manager = DatabaseManager("internal")
+    db_manager.database_url = str(tmp_path / "endpoints.db")
+    await create_tables(db_manager)
+
+    statuses = {'ep-1': SyncStatus.IN_SYNC, 'ep-2': SyncStatus.AHEAD, 'ep-3': SyncStatus.OFFLINE,
+                'ep-4': SyncStatus.BEHIND, 'ep-5': SyncStatus.IN_SYNC, 'ep-6': SyncStatus.IN_SYNC}
+    with patch('server.database.orm.get_change_notifier'):
+        pools = PoolRepository(db_manager)
+        await pools.create(PackagePool(id='pool-1', name='desktops', description=''))
+        await pools.create(PackagePool(id='pool-2', name='servers', description=''))
+        repo = EndpointRepository(db_manager)
+        for endpoint_id, status in statuses.items():
+            await repo.create(Endpoint(endpoint_id, f'name-{endpoint_id}', f'host-{endpoint_id}'))
+            await repo.update_status(endpoint_id, status)
+        for endpoint_id in ('ep-1', 'ep-2', 'ep-3', 'ep-4'):
+            await repo.assign_to_pool(endpoint_id, 'pool-1')
+        await repo.assign_to_pool('ep-5', 'pool-2')
+
+    return repo
+
+
+def record_events():
+    notifier = ChangeNotifier()
+    events = []
+    notifier.subscribe(lambda event, payload: events.append((event, payload['endpoint_id'], payload)))
+    return notifier, events
+
+
+async def snapshot(repo):
+    return {endpoint.id: (endpoint.pool_id, endpoint.sync_status) for endpoint in await repo.list_by_pool()}
+
+
+class TestBulkRepository:
+    """Test the set-based EndpointRepository operations."""
+
+    @pytest.mark.asyncio
+    async def test_update_status_bulk(self, tmp_path):
+        """Test a pool-wide transition skipping excluded, offline and unchanged endpoints."""
+        repo = await endpoint_database(tmp_path)
+        notifier, events = record_events()
+
+        with patch('server.database.orm.get_change_notifier', return_value=notifier), \
+                patch.object(repo.db, 'transaction', wraps=repo.db.transaction) as transaction:
+            changed = await repo.update_status_bulk('pool-1', SyncStatus.BEHIND, exclude=['ep-1'])
+
+        assert changed == 1
+        assert transaction.call_count == 1
+        endpoints = await snapshot(repo)
+        assert [endpoints[f'ep-{index}'][1] for index in range(1, 6)] == [
+            SyncStatus.IN_SYNC, SyncStatus.BEHIND, SyncStatus.OFFLINE, SyncStatus.BEHIND, SyncStatus.IN_SYNC
+        ]
+        assert events == [(ChangeEvent.ENDPOINT_STATUS_CHANGED, 'ep-2', {
+            'endpoint_id': 'ep-2', 'pool_id': 'pool-1',
+            'status': SyncStatus.BEHIND, 'previous_status': SyncStatus.AHEAD
+        })]
+
+    @pytest.mark.asyncio
+    async def test_update_status_bulk_without_changes(self, tmp_path):
+        """Test that nothing is written when no endpoint needs the new status."""
+        repo = await endpoint_database(tmp_path)
+
+        with patch.object(repo.db, 'transaction', wraps=repo.db.transaction) as transaction:
+            assert await repo.update_status_bulk('pool-2', SyncStatus.IN_SYNC) == 0
+            assert await repo.update_status_bulk('pool-3', SyncStatus.BEHIND) == 0
+
+        transaction.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_assign_to_pool_bulk(self, tmp_path):
+        """Test moving endpoints from several pools into one in a single transaction."""
+        repo = await endpoint_database(tmp_path)
+        notifier, events = record_events()
+
+        with patch('server.database.orm.get_change_notifier', return_value=notifier), \
+                patch.object(repo.db, 'transaction', wraps=repo.db.transaction) as transaction:
+            assigned = await repo.assign_to_pool_bulk(
+                ['ep-4', 'ep-5', 'ep-6', 'missing'], 'pool-1', status=SyncStatus.BEHIND
+            )
+
+        assert assigned == 3
+        assert transaction.call_count == 1
+        endpoints = await snapshot(repo)
+        assert all(endpoints[endpoint_id] == ('pool-1', SyncStatus.BEHIND) for endpoint_id in ('ep-4', 'ep-5', 'ep-6'))
+        # ep-4 was already in the pool and behind
+        assert sorted((event.value, endpoint_id) for event, endpoint_id, _ in events) == [
+            (ChangeEvent.ENDPOINT_POOL_CHANGED.value, 'ep-5'), (ChangeEvent.ENDPOINT_POOL_CHANGED.value, 'ep-6'),
+            (ChangeEvent.ENDPOINT_STATUS_CHANGED.value, 'ep-5'), (ChangeEvent.ENDPOINT_STATUS_CHANGED.value, 'ep-6'),
+        ]
+        moved = next(payload for event, endpoint_id, payload in events
+                     if endpoint_id == 'ep-5' and event == ChangeEvent.ENDPOINT_POOL_CHANGED)
+        assert moved['previous_pool_id'] == 'pool-2'
+
+    @pytest.mark.asyncio
+    async def test_remove_from_pool_bulk(self, tmp_path):
+        """Test unassigning a whole pool."""
+        repo = await endpoint_database(tmp_path)
+        notifier, events = record_events()
+
+        with patch('server.database.orm.get_change_notifier', return_value=notifier):
+            removed = await repo.remove_from_pool_bulk('pool-1')
+
+        assert removed == 4
+        assert await repo.list_by_pool('pool-1') == []
+        endpoints = await snapshot(repo)
+        assert endpoints['ep-2'] == (None, SyncStatus.AHEAD)
+        assert endpoints['ep-5'] == ('pool-2', SyncStatus.IN_SYNC)
+        assert {event for event, _, _ in events} == {ChangeEvent.ENDPOINT_POOL_CHANGED}
+        assert len(events) == 4
+
+    @pytest.mark.asyncio
+    async def test_bulk_updates_are_chunked(self, tmp_path):
+        """Test that large ID lists are written in one transaction per chunk."""
+        repo = await endpoint_database(tmp_path)
+        repo.BULK_CHUNK_SIZE = 2
+
+        with patch('server.database.orm.get_change_notifier'), \
+                patch.object(repo.db, 'transaction', wraps=repo.db.transaction) as transaction:
+            assigned = await repo.assign_to_pool_bulk(['ep-1', 'ep-2', 'ep-5', 'ep-6', 'missing'], 'pool-2')
+
+        assert assigned == 4
+        assert transaction.call_count == 3
+        assert sorted(endpoint.id for endpoint in await repo.list_by_pool('pool-2')) == ['ep-1', 'ep-2', 'ep-5', 'ep-6']
+
+    @pytest.mark.asyncio
+    async def test_rows_changed_after_listing_are_rechecked(self, tmp_path):
+        """Test that endpoints moved away after the pool was listed are left alone."""
+        repo = await endpoint_database(tmp_path)
+        listed = await repo.list_by_pool('pool-1')
+        with patch('server.database.orm.get_change_notifier'):
+            await repo.assign_to_pool('ep-2', 'pool-2')
+        notifier, events = record_events()
+
+        with patch('server.database.orm.get_change_notifier', return_value=notifier), \
+                patch.object(repo, 'list_by_pool', AsyncMock(return_value=listed)):
+            assert await repo.update_status_bulk('pool-1', SyncStatus.BEHIND) == 1
+            assert await repo.remove_from_pool_bulk('pool-1') == 3
+
+        endpoints = await snapshot(repo)
+        assert endpoints['ep-2'] == ('pool-2', SyncStatus.AHEAD)
+        assert 'ep-2' not in {endpoint_id for _, endpoint_id, _ in events}
+
+
+class TestBulkCallers:
+    """Test pool-wide transitions in the pool manager and sync coordinator."""
+
+    @pytest.mark.asyncio
+    async def test_delete_pool_unassigns_in_one_update(self, tmp_path):
+        """Test that deleting a pool unassigns its endpoints together."""
+        repo = await endpoint_database(tmp_path)
+        manager = PackagePoolManager(repo.db)
+
+        with patch('server.database.orm.get_change_notifier'), \
+                patch.object(repo.db, 'transaction', wraps=repo.db.transaction) as transaction:
+            assert await manager.delete_pool('pool-1')
+
+        # One transaction unassigning the endpoints
+        assert transaction.call_count == 1
+        endpoints = await snapshot(repo)
+        assert [endpoints[f'ep-{index}'][0] for index in range(1, 5)] == [None] * 4
+
+    @pytest.mark.asyncio
+    async def test_move_endpoint_to_pool(self, tmp_path):
+        """Test that a move reassigns and marks the endpoint behind at once."""
+        repo = await endpoint_database(tmp_path)
+        manager = PackagePoolManager(repo.db)
+
+        with patch('server.database.orm.get_change_notifier'):
+            assert not await manager.move_endpoint_to_pool('ep-5', 'pool-1', 'pool-2')
+            assert not await manager.move_endpoint_to_pool('ep-1', 'pool-1', 'pool-3')
+            assert await manager.move_endpoint_to_pool('ep-1', 'pool-1', 'pool-2')
+
+        endpoints = await snapshot(repo)
+        assert endpoints['ep-1'] == ('pool-2', SyncStatus.BEHIND)
+        assert endpoints['ep-5'] == ('pool-2', SyncStatus.IN_SYNC)
+
+    @pytest.mark.asyncio
+    async def test_assign_endpoints(self, tmp_path):
+        """Test assigning several endpoints through the pool manager."""
+        repo = await endpoint_database(tmp_path)
+        manager = PackagePoolManager(repo.db)
+
+        with patch('server.database.orm.get_change_notifier'):
+            assert await manager.assign_endpoints('pool-2', ['ep-1', 'ep-6']) == 2
+            with pytest.raises(NotFoundError):
+                await manager.assign_endpoints('pool-3', ['ep-2'])
+
+        assert [endpoint.id for endpoint in await repo.list_by_pool('pool-2')] == ['ep-1', 'ep-5', 'ep-6']
+
+    @pytest.mark.asyncio
+    async def test_set_latest_marks_pool_behind(self):
+        """Test that set-latest updates the rest of the pool with one bulk call."""
+        coordinator = SyncCoordinator(MagicMock())
+        coordinator.state_manager = AsyncMock()
+        coordinator.state_manager.get_endpoint_states.return_value = [MagicMock(packages=[])]
+        coordinator.state_manager.save_state.return_value = 'state-2'
+        coordinator.operation_repo = AsyncMock()
+        coordinator.endpoint_repo = AsyncMock()
+        coordinator.pool_repo = AsyncMock()
+        operation = SyncOperation(
+            id='op-1', pool_id='pool-1', endpoint_id='ep-1', operation_type=OperationType.SET_LATEST,
+            status=OperationStatus.PENDING, created_at=datetime.now()
+        )
+
+        await coordinator._process_set_latest_operation(operation)
+
+        coordinator.endpoint_repo.update_status_bulk.assert_awaited_once_with(
+            'pool-1', SyncStatus.BEHIND, exclude=['ep-1']
+        )
+        coordinator.endpoint_repo.list_by_pool.assert_not_called()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Unit tests for event-driven change notification.
+
+Tests the client-side path watcher (inotify and polling) and the server's
+WebSocket connection manager forwarding change events to clients, and
+authentication of the WebSocket handshake.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from client.change_watcher import PathWatcher
+from fastapi import WebSocketDisconnect
+
+from server.api.sync import ConnectionManager, connection_manager
+from server.database.events import ChangeEvent
+from shared.models import Endpoint, SyncStatus
+
+
+@pytest.fixture(params=[True, False], ids=['inotify', 'polling'])
+def use_inotify(request):
+    return request.param
+
+
+class TestPathWatcher:
+    """Test waiting for file and directory changes."""
+
+    def test_timeout_without_changes(self, tmp_path, use_inotify):
+        """Test that wait returns False when nothing changes."""
+        with PathWatcher([tmp_path], poll_interval=0.01, use_inotify=use_inotify) as watcher:
+            assert watcher.wait(0.05) is False
+
+    def test_directory_entry_added(self, tmp_path, use_inotify):
+        """Test that a new entry in a watched directory is reported."""
+        with PathWatcher([tmp_path], poll_interval=0.01, use_inotify=use_inotify) as watcher:
+            (tmp_path / 'pkg-1.0-1').mkdir()
+
+            assert watcher.wait(1.0) is True
+
+    def test_file_replaced_atomically(self, tmp_path, use_inotify):
+        """Test that replacing a watched file is reported."""
+        status_file = tmp_path / 'status.json'
+        status_file.write_text('{}')
+
+        with PathWatcher([status_file], poll_interval=0.01, use_inotify=use_inotify) as watcher:
+            temp_file = tmp_path / 'status.tmp'
+            temp_file.write_text('{"status": "behind"}')
+            temp_file.replace(status_file)
+
+            assert watcher.wait(1.0) is True
+
+    def test_unrelated_file_ignored(self, tmp_path):
+        """Test that other files in a watched file's directory are ignored."""
+        status_file = tmp_path / 'status.json'
+        status_file.write_text('{}')
+
+        with PathWatcher([status_file]) as watcher:
+            if not watcher.uses_inotify:
+                pytest.skip("inotify not available")
+            (tmp_path / 'status.lock').write_text('1')
+
+            assert watcher.wait(0.05) is False
+
+    def test_missing_file_picked_up(self, tmp_path, use_inotify):
+        """Test that a file created after the watcher started is reported."""
+        stamp = tmp_path / 'transaction'
+
+        with PathWatcher([stamp], poll_interval=0.01, use_inotify=use_inotify) as watcher:
+            stamp.touch()
+
+            assert watcher.wait(1.0) is True
+
+
+class TestConnectionManagerNotifications:
+    """Test forwarding of server-side changes to WebSocket clients."""
+
+    async def connect(self, manager, endpoint_id, pool_id):
+        websocket = MagicMock()
+        websocket.accept = AsyncMock()
+        websocket.send_json = AsyncMock()
+        await manager.connect(websocket, endpoint_id, pool_id)
+        return websocket
+
+    @pytest.mark.asyncio
+    async def test_status_change_sent_to_endpoint(self):
+        """Test that status changes only reach the affected endpoint."""
+        manager = ConnectionManager()
+        ws_1 = await self.connect(manager, 'ep-1', 'pool-1')
+        ws_2 = await self.connect(manager, 'ep-2', 'pool-1')
+
+        manager.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED, {
+            'endpoint_id': 'ep-1', 'pool_id': 'pool-1',
+            'status': SyncStatus.BEHIND, 'previous_status': SyncStatus.IN_SYNC
+        })
+        await asyncio.sleep(0)
+
+        message = ws_1.send_json.await_args.args[0]
+        assert message['type'] == 'status_changed'
+        assert message['status'] == 'behind'
+        ws_2.send_json.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_target_state_change_sent_to_pool_members(self):
+        """Test that a new target state reaches every endpoint in the pool."""
+        manager = ConnectionManager()
+        ws_1 = await self.connect(manager, 'ep-1', 'pool-1')
+        ws_2 = await self.connect(manager, 'ep-2', 'pool-2')
+
+        manager.handle_change(ChangeEvent.POOL_UPDATED, {'pool_id': 'pool-1', 'target_state_id': 'state-1'})
+        await asyncio.sleep(0)
+
+        assert ws_1.send_json.await_args.args[0]['type'] == 'target_state_changed'
+        ws_2.send_json.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_pool_reassignment_tracked(self):
+        """Test that target changes follow the endpoint to its new pool."""
+        manager = ConnectionManager()
+        ws = await self.connect(manager, 'ep-1', None)
+
+        manager.handle_change(ChangeEvent.ENDPOINT_POOL_CHANGED, {
+            'endpoint_id': 'ep-1', 'pool_id': 'pool-1', 'previous_pool_id': None
+        })
+        manager.handle_change(ChangeEvent.POOL_UPDATED, {'pool_id': 'pool-1', 'target_state_id': 'state-1'})
+        await asyncio.sleep(0)
+
+        sent = [call.args[0]['type'] for call in ws.send_json.await_args_list]
+        assert sent == ['pool_assignment_changed', 'target_state_changed']
+
+    def test_no_connections_is_noop(self):
+        """Test that events are ignored without connected clients or loop."""
+        manager = ConnectionManager()
+
+        manager.handle_change(ChangeEvent.POOL_DELETED, {'pool_id': 'pool-1'})
+
+        assert manager._pending_sends == set()
+
+
+class TestEventSocketAuthentication:
+    """Test that only the endpoint itself can subscribe to its events."""
+
+    def make_client(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from server.api.sync import router
+
+        app = FastAPI()
+        app.include_router(router, prefix="/api")
+        endpoint_manager = MagicMock()
+
+        async def authenticate(token):
+            if token != 'token-1':
+                raise ValueError("invalid token")
+            return Endpoint('ep-1', 'desk1', 'host1', pool_id='pool-1')
+
+        endpoint_manager.authenticate_endpoint = authenticate
+        app.state.endpoint_manager = endpoint_manager
+        return TestClient(app)
+
+    @pytest.mark.parametrize("headers", [
+        {}, {'Authorization': 'Bearer wrong'}, {'Authorization': 'Basic token-1'}
+    ])
+    def test_unauthenticated_rejected(self, headers):
+        """Test that handshakes without a valid token are closed with 1008."""
+        with self.make_client() as client:
+            with pytest.raises(WebSocketDisconnect) as error:
+                with client.websocket_connect('/api/sync/ep-1/status', headers=headers):
+                    pass
+
+        assert error.value.code == 1008
+
+    def test_other_endpoint_rejected(self):
+        """Test that a token cannot subscribe to another endpoint's events."""
+        with self.make_client() as client:
+            with pytest.raises(WebSocketDisconnect) as error:
+                with client.websocket_connect('/api/sync/ep-2/status',
+                                              headers={'Authorization': 'Bearer token-1'}):
+                    pass
+
+        assert error.value.code == 1008
+
+    def test_own_endpoint_accepted(self):
+        """Test that an endpoint receives its events with its pool tracked."""
+        with self.make_client() as client:
+            with client.websocket_connect('/api/sync/ep-1/status',
+                                          headers={'Authorization': 'Bearer token-1'}) as websocket:
+                assert websocket.receive_json()['type'] == 'connected'
+                assert connection_manager.endpoint_pools['ep-1'] == 'pool-1'
+
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the in-memory DashboardAggregator.
+
+Tests initial loading, incremental updates from ORM change events,
+subscriber fan-out and server-sent event encoding.
+"""
+
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from server.core.dashboard_aggregator import DashboardAggregator
+from server.database.events import ChangeEvent, ChangeNotifier
+from server.api.dashboard import format_sse_event
+from shared.models import (
+    PackagePool, Endpoint, SyncStatus, SyncPolicy, OperationStatus,
+    SyncOperation, OperationType
+)
+
+
+class TestChangeNotifier:
+    """Test the ORM change notifier."""
+
+    def test_publish_delivers_to_listeners(self):
+        """Test that events reach every subscribed listener."""
+        notifier = ChangeNotifier()
+        received = []
+        notifier.subscribe(lambda event, payload: received.append((event, payload)))
+
+        notifier.publish(ChangeEvent.POOL_DELETED, pool_id="pool-1")
+
+        assert received == [(ChangeEvent.POOL_DELETED, {"pool_id": "pool-1"})]
+
+    def test_failing_listener_is_isolated(self):
+        """Test that a failing listener does not stop delivery."""
+        notifier = ChangeNotifier()
+        received = []
+
+        def broken(event, payload):
+            raise RuntimeError("boom")
+
+        notifier.subscribe(broken)
+        notifier.subscribe(lambda event, payload: received.append(event))
+        notifier.publish(ChangeEvent.POOL_DELETED, pool_id="pool-1")
+
+        assert received == [ChangeEvent.POOL_DELETED]
+
+
+class TestDashboardAggregator:
+    """Test DashboardAggregator incremental aggregates."""
+
+    @pytest.fixture
+    def notifier(self):
+        return ChangeNotifier()
+
+    @pytest.fixture
+    def aggregator(self, notifier):
+        """Create an aggregator over mocked repositories."""
+        aggregator = DashboardAggregator(
+            MagicMock(),
+            stats_loader=AsyncMock(return_value={'total_repositories': 3}),
+            notifier=notifier
+        )
+        aggregator.pool_repo = AsyncMock()
+        aggregator.endpoint_repo = AsyncMock()
+        aggregator.pool_repo.list_all.return_value = [
+            PackagePool("pool-1", "Pool 1", "", target_state_id="state-1",
+                        sync_policy=SyncPolicy(auto_sync=True)),
+            PackagePool("pool-2", "Pool 2", "")
+        ]
+        aggregator.endpoint_repo.list_by_pool.return_value = [
+            Endpoint("ep-1", "ep1", "host1", pool_id="pool-1", sync_status=SyncStatus.IN_SYNC),
+            Endpoint("ep-2", "ep2", "host2", pool_id="pool-1", sync_status=SyncStatus.BEHIND),
+            Endpoint("ep-3", "ep3", "host3", sync_status=SyncStatus.OFFLINE)
+        ]
+        return aggregator
+
+    @pytest.mark.asyncio
+    async def test_load_builds_aggregates(self, aggregator):
+        """Test initial load from the database."""
+        await aggregator.load()
+
+        metrics = aggregator.get_metrics()
+        assert aggregator.is_loaded
+        assert metrics['total_endpoints'] == 3
+        assert metrics['endpoints_online'] == 2
+        assert metrics['endpoints_offline'] == 1
+        assert metrics['endpoints_unassigned'] == 1
+        assert metrics['total_pools'] == 2
+        assert metrics['pools_healthy'] == 1
+        assert metrics['total_repositories'] == 3
+
+        pool_status = aggregator.get_pool_status("pool-1")
+        assert pool_status['total_endpoints'] == 2
+        assert pool_status['in_sync_count'] == 1
+        assert pool_status['behind_count'] == 1
+        assert pool_status['sync_percentage'] == 50.0
+        assert pool_status['overall_status'] == "warning"
+        assert pool_status['has_target_state'] is True
+        assert pool_status['auto_sync_enabled'] is True
+        assert aggregator.get_pool_status("pool-2")['overall_status'] == "empty"
+
+    @pytest.mark.asyncio
+    async def test_status_change_updates_counts(self, aggregator, notifier):
+        """Test that endpoint status changes are applied incrementally."""
+        await aggregator.load()
+        notifier.subscribe(aggregator.handle_change)
+
+        notifier.publish(
+            ChangeEvent.ENDPOINT_STATUS_CHANGED, endpoint_id="ep-2", pool_id="pool-1",
+            status=SyncStatus.IN_SYNC, previous_status=SyncStatus.BEHIND
+        )
+
+        pool_status = aggregator.get_pool_status("pool-1")
+        assert pool_status['in_sync_count'] == 2
+        assert pool_status['behind_count'] == 0
+        assert pool_status['overall_status'] == "healthy"
+        assert aggregator.get_metrics()['pools_healthy'] == 2
+
+    @pytest.mark.asyncio
+    async def test_pool_assignment_moves_endpoint(self, aggregator):
+        """Test moving an endpoint between pools."""
+        await aggregator.load()
+
+        aggregator.handle_change(ChangeEvent.ENDPOINT_POOL_CHANGED, {
+            'endpoint_id': "ep-3", 'pool_id': "pool-2", 'previous_pool_id': None
+        })
+
+        assert aggregator.get_metrics()['endpoints_unassigned'] == 0
+        assert aggregator.get_pool_status("pool-2")['offline_count'] == 1
+        assert aggregator.get_pool_status("pool-2")['overall_status'] == "critical"
+
+    @pytest.mark.asyncio
+    async def test_endpoint_and_pool_lifecycle(self, aggregator):
+        """Test endpoint creation/deletion and pool deletion events."""
+        await aggregator.load()
+
+        endpoint = Endpoint("ep-4", "ep4", "host4", pool_id="pool-2", sync_status=SyncStatus.IN_SYNC)
+        aggregator.handle_change(ChangeEvent.ENDPOINT_CREATED, {'endpoint_id': "ep-4", 'endpoint': endpoint})
+        assert aggregator.get_metrics()['total_endpoints'] == 4
+
+        aggregator.handle_change(ChangeEvent.ENDPOINT_DELETED, {'endpoint_id': "ep-1", 'pool_id': "pool-1"})
+        assert aggregator.get_pool_status("pool-1")['total_endpoints'] == 1
+
+        aggregator.handle_change(ChangeEvent.POOL_DELETED, {'pool_id': "pool-2"})
+        assert aggregator.get_pool_status("pool-2") is None
+        assert aggregator.get_metrics()['total_pools'] == 1
+
+    @pytest.mark.asyncio
+    async def test_operation_events_update_counters(self, aggregator):
+        """Test sync operation counters."""
+        await aggregator.load()
+        operation = SyncOperation("op-1", "pool-1", "ep-1", OperationType.SYNC)
+
+        aggregator.handle_change(ChangeEvent.OPERATION_CREATED, {'operation_id': "op-1", 'operation': operation})
+        assert aggregator.get_metrics()['active_operations'] == 1
+        assert aggregator.get_metrics()['total_sync_operations'] == 1
+
+        aggregator.handle_change(ChangeEvent.OPERATION_STATUS_CHANGED, {
+            'operation_id': "op-1", 'status': OperationStatus.COMPLETED
+        })
+        assert aggregator.get_metrics()['active_operations'] == 0
+
+    @pytest.mark.asyncio
+    async def test_subscribers_receive_deltas(self, aggregator):
+        """Test that subscribers receive only the changed pools."""
+        await aggregator.load()
+        queue = aggregator.subscribe()
+
+        aggregator.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED, {
+            'endpoint_id': "ep-1", 'pool_id': "pool-1", 'status': SyncStatus.AHEAD
+        })
+
+        _, event_type, data = queue.get_nowait()
+        assert event_type == 'delta'
+        assert [pool['pool_id'] for pool in data['pools']] == ["pool-1"]
+        assert data['metrics']['total_endpoints'] == 3
+
+        aggregator.unsubscribe(queue)
+        assert aggregator.subscriber_count == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_gets_snapshot(self, aggregator):
+        """Test that an overflowing subscriber is resynchronized with a snapshot."""
+        aggregator.subscriber_queue_size = 2
+        await aggregator.load()
+        queue = aggregator.subscribe()
+
+        for status in (SyncStatus.AHEAD, SyncStatus.BEHIND, SyncStatus.IN_SYNC):
+            aggregator.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED, {
+                'endpoint_id': "ep-1", 'pool_id': "pool-1", 'status': status
+            })
+
+        assert queue.qsize() == 1
+        _, event_type, data = queue.get_nowait()
+        assert event_type == 'snapshot'
+        assert data['metrics']['total_endpoints'] == 3
+
+
+def test_format_sse_event():
+    """Test server-sent event encoding."""
+    encoded = format_sse_event('delta', {'pools': []}, event_id=7)
+
+    assert encoded == 'id: 7\nevent: delta\ndata: {"pools":[]}\n\n'
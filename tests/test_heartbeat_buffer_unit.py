@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the endpoint heartbeat buffer.
+
+Tests coalescing of last_seen updates, bulk flushing, failure handling,
+offline detection and the bulk UPDATE against a real SQLite database.
+"""
+
+import pytest
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from server.core.heartbeat_buffer import HeartbeatBuffer
+from server.core.endpoint_manager import EndpointManager
+from server.database.connection import DatabaseManager
+from server.database.schema import create_tables
+from server.database.orm import EndpointRepository
+from shared.models import Endpoint, SyncStatus
+
+
+class TestHeartbeatBuffer:
+    """Test HeartbeatBuffer coalescing and flushing."""
+
+    @pytest.fixture
+    def endpoint_repo(self):
+        repo = AsyncMock()
+        repo.update_last_seen_bulk.return_value = 0
+        return repo
+
+    @pytest.fixture
+    def buffer(self, endpoint_repo):
+        return HeartbeatBuffer(endpoint_repo, flush_interval=60.0)
+
+    @pytest.mark.asyncio
+    async def test_record_coalesces_per_endpoint(self, buffer, endpoint_repo):
+        """Test that only the newest timestamp per endpoint is written."""
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        buffer.record("ep-1", base)
+        buffer.record("ep-1", base + timedelta(seconds=5))
+        buffer.record("ep-1", base + timedelta(seconds=2))
+        buffer.record("ep-2", base)
+
+        assert buffer.pending_count == 2
+        assert await buffer.flush() == 2
+
+        endpoint_repo.update_last_seen_bulk.assert_awaited_once_with({
+            "ep-1": base + timedelta(seconds=5),
+            "ep-2": base
+        })
+        assert buffer.pending_count == 0
+        assert await buffer.flush() == 0
+        endpoint_repo.update_last_seen_bulk.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_requeues(self, buffer, endpoint_repo):
+        """Test that a failed flush keeps heartbeats for the next attempt."""
+        endpoint_repo.update_last_seen_bulk.side_effect = Exception("database unavailable")
+        buffer.record("ep-1", datetime(2024, 1, 1))
+
+        assert await buffer.flush() == 0
+        assert buffer.pending_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_pending(self, buffer, endpoint_repo):
+        """Test that stopping the buffer writes outstanding heartbeats."""
+        await buffer.start()
+        assert buffer.is_running
+
+        buffer.record("ep-1", datetime(2024, 1, 1))
+        await buffer.stop()
+
+        assert not buffer.is_running
+        endpoint_repo.update_last_seen_bulk.assert_awaited_once()
+        assert buffer.pending_count == 0
+
+    @pytest.mark.asyncio
+    async def test_periodic_flush(self, endpoint_repo):
+        """Test the background flush loop."""
+        buffer = HeartbeatBuffer(endpoint_repo, flush_interval=0.01)
+        await buffer.start()
+        buffer.record("ep-1", datetime(2024, 1, 1))
+
+        await asyncio.sleep(0.05)
+        await buffer.stop()
+
+        endpoint_repo.update_last_seen_bulk.assert_awaited_once_with({"ep-1": datetime(2024, 1, 1)})
+
+    def test_apply_and_stale_endpoints(self, buffer):
+        """Test that offline detection uses buffered heartbeats."""
+        now = datetime(2024, 1, 1, 12, 0, 0)
+        fresh = Endpoint("ep-1", "ep1", "host1", last_seen=now - timedelta(hours=1))
+        stale = Endpoint("ep-2", "ep2", "host2", last_seen=now - timedelta(hours=1))
+        never_seen = Endpoint("ep-3", "ep3", "host3")
+
+        buffer.record("ep-1", now - timedelta(seconds=10))
+
+        result = buffer.stale_endpoints([fresh, stale, never_seen], timedelta(minutes=5), now=now)
+
+        assert [endpoint.id for endpoint in result] == ["ep-2", "ep-3"]
+        assert fresh.last_seen == now - timedelta(seconds=10)
+
+
+class TestEndpointManagerHeartbeats:
+    """Test EndpointManager integration with the heartbeat buffer."""
+
+    @pytest.fixture
+    def manager(self):
+        manager = EndpointManager(MagicMock(), jwt_secret="test-secret")
+        manager.orm.endpoints = AsyncMock()
+        manager.heartbeats.endpoint_repo = manager.orm.endpoints
+        return manager
+
+    @pytest.mark.asyncio
+    async def test_writes_through_when_not_running(self, manager):
+        """Test that heartbeats are written directly without a running buffer."""
+        manager.orm.endpoints.update_last_seen.return_value = True
+
+        assert await manager.update_last_seen("ep-1", datetime(2024, 1, 1))
+        manager.orm.endpoints.update_last_seen.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_buffers_when_running(self, manager):
+        """Test that heartbeats are buffered and overlaid on reads."""
+        timestamp = datetime(2024, 1, 1, 12, 0, 0)
+        manager.orm.endpoints.get_by_id.return_value = Endpoint(
+            "ep-1", "ep1", "host1", sync_status=SyncStatus.IN_SYNC, last_seen=datetime(2024, 1, 1)
+        )
+
+        await manager.heartbeats.start()
+        try:
+            assert await manager.update_last_seen("ep-1", timestamp)
+            manager.orm.endpoints.update_last_seen.assert_not_awaited()
+
+            endpoint = await manager.get_endpoint("ep-1")
+            assert endpoint.last_seen == timestamp
+        finally:
+            await manager.heartbeats.stop()
+
+        manager.orm.endpoints.update_last_seen_bulk.assert_awaited_once_with({"ep-1": timestamp})
+
+    @pytest.mark.asyncio
+    async def test_mark_offline_endpoints(self, manager):
+        """Test that offline detection uses buffered heartbeats."""
+        now = datetime.now()
+        manager.orm.endpoints.list_by_pool.return_value = [
+            Endpoint("ep-1", "ep1", "host1", sync_status=SyncStatus.IN_SYNC, last_seen=now - timedelta(hours=3)),
+            Endpoint("ep-2", "ep2", "host2", sync_status=SyncStatus.BEHIND, last_seen=now - timedelta(hours=3)),
+            Endpoint("ep-3", "ep3", "host3", sync_status=SyncStatus.OFFLINE, last_seen=now - timedelta(hours=3)),
+        ]
+        manager.orm.endpoints.update_status_many.return_value = ["ep-1"]
+        manager.heartbeats.record("ep-2", now)
+
+        offline = await manager.mark_offline_endpoints(timedelta(hours=2))
+
+        assert offline == ["ep-1"]
+        manager.orm.endpoints.update_status_many.assert_awaited_once_with(["ep-1"], SyncStatus.OFFLINE)
+        manager.orm.endpoints.update_status.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_mark_offline_endpoints_without_stale(self, manager):
+        """Test that nothing is written when every endpoint has a recent heartbeat."""
+        manager.orm.endpoints.list_by_pool.return_value = [
+            Endpoint("ep-1", "ep1", "host1", sync_status=SyncStatus.IN_SYNC, last_seen=datetime.now()),
+        ]
+
+        assert await manager.mark_offline_endpoints(timedelta(hours=2)) == []
+        manager.orm.endpoints.update_status_many.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_offline_detection_loop(self, manager):
+        """Test that the detection loop runs until stopped."""
+        manager.orm.endpoints.list_by_pool.side_effect = [Exception("database unavailable")] + [[]] * 100
+
+        await manager.start_offline_detection(timedelta(hours=2), interval=0.01)
+        await asyncio.sleep(0.05)
+        await manager.stop_offline_detection()
+
+        assert manager.orm.endpoints.list_by_pool.await_count >= 2
+        assert manager._offline_task is None
+
+
+@pytest.mark.asyncio
+async def test_update_last_seen_bulk_sqlite(tmp_path):
+    """Test the bulk UPDATE ... FROM (VALUES ...) statement on SQLite."""
+    db_manager = DatabaseManager("internal")
+    db_manager.database_url = str(tmp_path / "heartbeats.db")
+    await create_tables(db_manager)
+
+    repo = EndpointRepository(db_manager)
+    await repo.create(Endpoint("ep-1", "ep1", "host1"))
+    await repo.create(Endpoint("ep-2", "ep2", "host2"))
+
+    timestamp = datetime(2024, 1, 1, 12, 0, 0)
+    written = await repo.update_last_seen_bulk(
+        {"ep-1": timestamp, "missing": timestamp}, chunk_size=1
+    )
+
+    assert written == 2
+    assert (await repo.get_by_id("ep-1")).last_seen == timestamp
+    assert (await repo.get_by_id("ep-2")).last_seen is None
+
+
+@pytest.mark.asyncio
+async def test_update_status_many_sqlite(tmp_path):
+    """Test marking endpoints offline in chunked bulk UPDATEs on SQLite."""
+    db_manager = DatabaseManager("internal")
+    db_manager.database_url = str(tmp_path / "offline.db")
+    await create_tables(db_manager)
+
+    repo = EndpointRepository(db_manager)
+    repo.BULK_CHUNK_SIZE = 2
+    with patch('server.database.orm.get_change_notifier'):
+        for index in range(1, 5):
+            await repo.create(Endpoint(f"ep-{index}", f"ep{index}", f"host{index}"))
+            if index < 4:
+                await repo.update_status(f"ep-{index}", SyncStatus.IN_SYNC)
+
+    with patch('server.database.orm.get_change_notifier') as get_notifier:
+        offline = await repo.update_status_many(["ep-1", "ep-2", "ep-3", "ep-4", "missing"], SyncStatus.OFFLINE)
+
+    assert sorted(offline) == ["ep-1", "ep-2", "ep-3"]
+    assert get_notifier.return_value.publish.call_count == 3
+    assert all(endpoint.sync_status == SyncStatus.OFFLINE for endpoint in await repo.list_by_pool())
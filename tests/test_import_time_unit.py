@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Import-time regression tests for the client's fast command-line paths.
+
+Runs each path in a fresh interpreter under `python -X importtime` and
+checks that modes which only read local status do not load Qt, aiohttp,
+the crypto/keyring stack or the API client. See
+tests/benchmark_import_time.py for timings.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+
+# Modules (and their submodules) the fast paths must not import
+HEAVY_MODULES = (
+    'PyQt6', 'aiohttp', 'cryptography', 'keyring', 'jose',
+    'client.api_client', 'client.sync_manager', 'client.qt',
+)
+
+
+def imported_modules(argv, tmp_path):
+    """Run the client with -X importtime and return the imported module names."""
+    env = dict(os.environ)
+    env.update({
+        'XDG_CONFIG_HOME': str(tmp_path / 'config'),
+        'XDG_RUNTIME_DIR': str(tmp_path / 'run'),
+        'XDG_STATE_HOME': str(tmp_path / 'state'),
+        'HOME': str(tmp_path),
+    })
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + argv,
+        cwd=project_root, env=env, capture_output=True, text=True, timeout=60
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            name = line.rsplit('|', 1)[1].strip()
+            if name != 'imported package':
+                modules.add(name)
+    return modules
+
+
+def heavy(modules):
+    return sorted(
+        name for name in modules
+        if any(name == heavy or name.startswith(heavy + '.') for heavy in HEAVY_MODULES)
+    )
+
+
+@pytest.mark.parametrize('argv', [
+    ['client/main.py', '--status'],
+    ['client/main.py', '--status', '--json'],
+    ['client/main.py', '--waybar-click', 'left', '--waybar-action', 'show_status'],
+    ['client/status_cli.py', '--json'],
+], ids=['status', 'status-json', 'waybar-click', 'status-shim'])
+def test_status_paths_stay_light(argv, tmp_path):
+    """Test that status-only modes avoid the GUI and network stacks."""
+    modules = imported_modules(argv, tmp_path)
+
+    assert 'client.status_persistence' in modules or 'client.status_socket' in modules
+    assert heavy(modules) == []
+
+
+def test_token_storage_defers_crypto(tmp_path):
+    """Test that creating token storage does not load cryptography or keyring."""
+    code = 'from client.auth.token_storage import SecureTokenStorage; SecureTokenStorage()'
+    modules = imported_modules(['-c', code], tmp_path)
+
+    assert 'client.auth.token_storage' in modules
+    assert not [name for name in modules if name.split('.')[0] in ('cryptography', 'keyring')]
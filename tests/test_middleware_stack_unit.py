@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pure ASGI middleware stack.
+
+Tests operation tracking with log sampling, unsampled audit logging,
+rate limit responses and security headers.
+"""
+
+import pytest
+import httpx
+from unittest.mock import MagicMock
+
+from fastapi import FastAPI, Request
+
+from server.middleware.auth import SecurityHeadersMiddleware
+from server.middleware.operation_tracking import (
+    OperationTrackingMiddleware, create_operation_tracking_middleware
+)
+from server.middleware.rate_limiting import create_rate_limit_middleware
+
+
+def build_app(sample_rate=1.0, rate_limit=None):
+    """Build a small app wrapped in the middleware stack."""
+    app = FastAPI()
+
+    @app.get("/api/items")
+    async def list_items(request: Request):
+        return {"operation_id": request.state.operation_id}
+
+    @app.post("/api/pools")
+    async def create_pool():
+        return {"created": True}
+
+    @app.get("/api/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(create_operation_tracking_middleware(sample_rate=sample_rate))
+    if rate_limit:
+        app.add_middleware(create_rate_limit_middleware(default_limit=rate_limit).bind)
+    app.add_middleware(SecurityHeadersMiddleware)
+    return app
+
+
+def get_tracker(app) -> OperationTrackingMiddleware:
+    """Build the middleware stack and return its operation tracking layer."""
+    app.middleware_stack = app.build_middleware_stack()
+    layer = app.middleware_stack
+    while not isinstance(layer, OperationTrackingMiddleware):
+        layer = layer.app
+    return layer
+
+
+async def request(app, method, path, base_url="http://test"):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url) as client:
+        return await client.request(method, path)
+
+
+class TestOperationTracking:
+    """Test the ASGI operation tracking middleware."""
+
+    @pytest.mark.asyncio
+    async def test_operation_id_header_matches_state(self):
+        """Test that the operation ID is exposed to routes and clients."""
+        response = await request(build_app(), "GET", "/api/items")
+
+        assert response.status_code == 200
+        assert response.headers["x-operation-id"] == response.json()["operation_id"]
+        assert response.headers["x-response-time"].endswith("s")
+
+    @pytest.mark.asyncio
+    async def test_sampling_skips_operation_logs_but_not_audit(self):
+        """Test that sampling never drops audit events."""
+        app = build_app(sample_rate=0.0)
+        tracker = get_tracker(app)
+        tracker.operation_logger = MagicMock()
+        tracker.audit_logger = MagicMock()
+
+        await request(app, "GET", "/api/items")
+        await request(app, "POST", "/api/pools")
+
+        tracker.operation_logger.log_operation_start.assert_not_called()
+        tracker.operation_logger.log_operation_complete.assert_not_called()
+        assert tracker.audit_logger.log_event.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_sampled_request_logs_start_and_complete(self):
+        """Test full logging when every request is sampled."""
+        app = build_app(sample_rate=1.0)
+        tracker = get_tracker(app)
+        tracker.operation_logger = MagicMock()
+
+        await request(app, "GET", "/api/items")
+
+        tracker.operation_logger.log_operation_start.assert_called_once()
+        complete = tracker.operation_logger.log_operation_complete.call_args.kwargs
+        assert complete['success'] is True
+        assert complete['context']['status_code'] == 200
+
+    @pytest.mark.asyncio
+    async def test_exception_is_logged(self):
+        """Test that unhandled exceptions are recorded as failures."""
+        app = build_app()
+        tracker = get_tracker(app)
+        tracker.operation_logger = MagicMock()
+
+        response = await request(app, "GET", "/api/boom")
+
+        assert response.status_code == 500
+        complete = tracker.operation_logger.log_operation_complete.call_args.kwargs
+        assert complete['success'] is False
+
+
+class TestRateLimitAndSecurityHeaders:
+    """Test the ASGI rate limit and security header middleware."""
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_headers_and_rejection(self):
+        """Test headers on allowed requests and a 429 once exhausted."""
+        app = build_app(rate_limit=1)
+
+        allowed = await request(app, "GET", "/api/items")
+        rejected = await request(app, "GET", "/api/items")
+
+        assert allowed.headers["x-ratelimit-limit"] == "1"
+        assert allowed.headers["x-ratelimit-remaining"] == "0"
+        assert rejected.status_code == 429
+        assert rejected.json()["error"]["code"] == "RATE_LIMIT_EXCEEDED"
+        assert "retry-after" in rejected.headers
+
+    @pytest.mark.asyncio
+    async def test_security_headers(self):
+        """Test security headers and HSTS over HTTPS only."""
+        app = build_app()
+
+        plain = await request(app, "GET", "/api/items")
+        secure = await request(app, "GET", "/api/items", base_url="https://test")
+
+        assert plain.headers["x-frame-options"] == "DENY"
+        assert plain.headers["x-content-type-options"] == "nosniff"
+        assert "strict-transport-security" not in plain.headers
+        assert secure.headers["strict-transport-security"].startswith("max-age=")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the persistent offline operation journal.
+
+Tests persistence across restarts, coalescing of superseded entries, the
+size bound, compaction, crash recovery and replay backoff in the client.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+from client.api_client import PacmanSyncAPIClient
+from client.offline_journal import COMPACT_SLACK, OfflineJournal, get_state_directory
+from shared.exceptions import ErrorCode, NetworkError
+
+
+def status(endpoint_id, value):
+    return {'type': 'status_update', 'endpoint_id': endpoint_id, 'status': value}
+
+
+def sync(endpoint_id):
+    return {'type': 'sync_operation', 'endpoint_id': endpoint_id, 'operation': 'sync'}
+
+
+class TestOfflineJournal:
+    """Test journal storage."""
+
+    def test_survives_restart(self, tmp_path):
+        """Test that queued operations are reloaded from disk."""
+        path = tmp_path / "journal.jsonl"
+        journal = OfflineJournal(path)
+        first = journal.append(sync('ep-1'))
+        journal.append(status('ep-1', 'behind'))
+        journal.remove([first])
+
+        reloaded = OfflineJournal(path)
+
+        assert [op for _, op in reloaded.pending()] == [status('ep-1', 'behind')]
+        # New entries never reuse sequence numbers
+        assert reloaded.append(sync('ep-1')) > first
+
+    def test_superseded_entries_are_coalesced(self, tmp_path):
+        """Test that only the latest snapshot per endpoint is kept."""
+        journal = OfflineJournal(tmp_path / "journal.jsonl")
+        journal.append(status('ep-1', 'behind'))
+        journal.append(sync('ep-1'))
+        journal.append({'type': 'repository_submission', 'endpoint_id': 'ep-1', 'repositories': ['old']})
+        journal.append(status('ep-2', 'ahead'))
+        journal.append(sync('ep-1'))
+        journal.append(status('ep-1', 'in_sync'))
+        journal.append({'type': 'repository_submission', 'endpoint_id': 'ep-1', 'repositories': ['new']})
+
+        assert [op for _, op in journal.pending()] == [
+            sync('ep-1'),
+            status('ep-2', 'ahead'),
+            sync('ep-1'),
+            status('ep-1', 'in_sync'),
+            {'type': 'repository_submission', 'endpoint_id': 'ep-1', 'repositories': ['new']},
+        ]
+
+    def test_size_is_bounded(self):
+        """Test that the oldest entries are dropped beyond the limit."""
+        journal = OfflineJournal(max_entries=3)
+        for _ in range(5):
+            journal.append(sync('ep-1'))
+
+        assert [seq for seq, _ in journal.pending()] == [3, 4, 5]
+
+    def test_compaction(self, tmp_path):
+        """Test that dead records are rewritten away."""
+        path = tmp_path / "journal.jsonl"
+        journal = OfflineJournal(path)
+        for i in range(COMPACT_SLACK * 2):
+            journal.append(status('ep-1', f'status-{i}'))
+
+        lines = path.read_text().splitlines()
+        assert len(lines) < COMPACT_SLACK * 2
+        assert OfflineJournal(path).pending() == journal.pending()
+
+    def test_truncated_record_is_discarded(self, tmp_path):
+        """Test recovery from a crash in the middle of an append."""
+        path = tmp_path / "journal.jsonl"
+        OfflineJournal(path).append(sync('ep-1'))
+        with open(path, 'a') as f:
+            f.write('{"seq": 2, "op": {"ty')
+
+        journal = OfflineJournal(path)
+        journal.append(sync('ep-2'))
+
+        assert [op for _, op in OfflineJournal(path).pending()] == [sync('ep-1'), sync('ep-2')]
+        assert json.loads(path.read_text().splitlines()[-1])['op'] == sync('ep-2')
+
+    def test_shared_between_instances(self, tmp_path):
+        """Test that two processes see each other's changes."""
+        path = tmp_path / "journal.jsonl"
+        gui, cli = OfflineJournal(path), OfflineJournal(path)
+
+        seq = cli.append(sync('ep-1'))
+        assert len(gui) == 1
+        gui.remove([seq])
+        assert cli.pending() == []
+
+    def test_state_directory(self, monkeypatch, tmp_path):
+        """Test the XDG state directory lookup."""
+        monkeypatch.setenv('XDG_STATE_HOME', str(tmp_path))
+
+        assert get_state_directory() == tmp_path / 'pacman-sync'
+
+
+class TestReplay:
+    """Test offline replay from the journal."""
+
+    @pytest.mark.asyncio
+    async def test_backoff_after_failed_replay(self):
+        """Test that a failed replay is not retried immediately."""
+        client = PacmanSyncAPIClient("http://test", batch_requests=False)
+        client._offline_journal.append(sync('ep-1'))
+        client._make_request = AsyncMock(
+            side_effect=NetworkError("Connection refused", ErrorCode.NETWORK_CONNECTION_FAILED)
+        )
+
+        assert await client.process_offline_operations() == 0
+        assert await client.process_offline_operations() == 0
+
+        client._make_request.assert_awaited_once()
+        assert client._replay_delay == client.REPLAY_BACKOFF_BASE
+        assert len(client._offline_journal) == 1
+
+        client._replay_not_before = 0.0
+        client._make_request = AsyncMock(return_value={})
+        assert await client.process_offline_operations() == 1
+        assert client._replay_delay == 0.0
+        assert len(client._offline_journal) == 0
+
+    @pytest.mark.asyncio
+    async def test_rejected_operations_are_dropped(self):
+        """Test that operations the server refuses are not retried forever."""
+        client = PacmanSyncAPIClient("http://test")
+        client.token_manager.get_current_token = lambda: "token"
+        client._offline_journal.append(status('ep-1', 'behind'))
+        client._offline_journal.append(sync('ep-1'))
+        client._batcher._send = AsyncMock(return_value={'results': [
+            {'status': 403, 'body': {'detail': 'Can only update own endpoint status'}},
+            {'status': 503, 'body': {'detail': 'Unavailable'}},
+        ]})
+
+        assert await client.process_offline_operations() == 0
+
+        assert client._offline_operations == [sync('ep-1')]
+
+    @pytest.mark.asyncio
+    async def test_rejected_unbatched_operations_are_dropped(self):
+        """Test that client errors without request batching are not retried forever."""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+
+        async def handler(request):
+            if request.path.endswith('/status'):
+                return web.json_response({'detail': 'Not your endpoint'}, status=403)
+            return web.json_response({'detail': 'Unavailable'}, status=503)
+
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handler)
+        async with TestServer(app) as server:
+            client = PacmanSyncAPIClient(str(server.make_url('/')), batch_requests=False)
+            client.token_manager.get_current_token = lambda: "token"
+            client.retry_config.max_retries = 0
+            client._offline_journal.append(status('ep-1', 'behind'))
+            client._offline_journal.append(sync('ep-1'))
+            try:
+                assert await client.process_offline_operations() == 0
+            finally:
+                await client.close()
+
+        assert client._offline_operations == [sync('ep-1')]
+
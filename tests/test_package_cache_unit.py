@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pacman package cache index.
+
+Tests archive filename parsing, exact lookups, refreshing when the cache
+changes and the downgrade availability report.
+"""
+
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from client.package_cache import PackageCacheIndex, parse_archive_filename
+from client.package_operations import PackageSynchronizer
+from shared.models import PackageState, SystemState
+
+
+def touch(cache_dir, *names):
+    for name in names:
+        (cache_dir / name).write_bytes(b'archive')
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    path = tmp_path / 'pkg'
+    path.mkdir()
+    touch(
+        path,
+        'python-3.12.3-1-x86_64.pkg.tar.zst',
+        'python-3.12.3-1-x86_64.pkg.tar.zst.sig',
+        'python-3.11.8-1-x86_64.pkg.tar.zst',
+        'python-requests-2.31.0-3-any.pkg.tar.zst',
+        'zlib-1:1.3.1-1-x86_64.pkg.tar.xz',
+        'glibc-2.39-1-x86_64.pkg.tar.zst.part',
+        'download-abc123',
+    )
+    return path
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ('python-3.12.3-1-x86_64.pkg.tar.zst', ('python', '3.12.3-1', 'x86_64')),
+    ('python-requests-2.31.0-3-any.pkg.tar.zst', ('python-requests', '2.31.0-3', 'any')),
+    ('zlib-1:1.3.1-1-x86_64.pkg.tar.xz', ('zlib', '1:1.3.1-1', 'x86_64')),
+    ('lib32-gcc-libs-14.1.1+r1+g43b730b9134-1-x86_64.pkg.tar', ('lib32-gcc-libs', '14.1.1+r1+g43b730b9134-1', 'x86_64')),
+    ('python-3.12.3-1-x86_64.pkg.tar.zst.sig', None),
+    ('glibc-2.39-1-x86_64.pkg.tar.zst.part', None),
+    ('broken.pkg.tar.zst', None),
+    ('notes.txt', None),
+])
+def test_parse_archive_filename(filename, expected):
+    """Test splitting archive filenames into name, version and architecture."""
+    assert parse_archive_filename(filename) == expected
+
+
+class TestPackageCacheIndex:
+    """Test cache lookups."""
+
+    def test_exact_lookup(self, cache_dir):
+        """Test that lookups match whole names and versions only."""
+        index = PackageCacheIndex(str(cache_dir), 'x86_64')
+
+        assert index.find('python', '3.11.8-1') == str(cache_dir / 'python-3.11.8-1-x86_64.pkg.tar.zst')
+        assert index.find('zlib', '1:1.3.1-1') == str(cache_dir / 'zlib-1:1.3.1-1-x86_64.pkg.tar.xz')
+        assert index.find('python', '2.31.0-3') is None  # python-requests must not match
+        assert index.find('glibc', '2.39-1') is None  # partial download
+        assert set(index.versions('python')) == {'3.12.3-1', '3.11.8-1'}
+
+    def test_refreshes_when_cache_changes(self, cache_dir):
+        """Test that added and removed archives are picked up."""
+        index = PackageCacheIndex(str(cache_dir), 'x86_64')
+        assert index.find('vim', '9.1-1') is None
+
+        touch(cache_dir, 'vim-9.1-1-x86_64.pkg.tar.zst')
+        (cache_dir / 'python-3.11.8-1-x86_64.pkg.tar.zst').unlink()
+
+        assert index.find('vim', '9.1-1') is not None
+        assert index.find('python', '3.11.8-1') is None
+
+    def test_unchanged_cache_is_not_rescanned(self, cache_dir, monkeypatch):
+        """Test that lookups against an unchanged cache only stat the directory."""
+        index = PackageCacheIndex(str(cache_dir), 'x86_64')
+        index.find('python', '3.12.3-1')
+
+        monkeypatch.setattr('client.package_cache.os.scandir', MagicMock(side_effect=AssertionError))
+        assert index.find('python', '3.11.8-1') is not None
+
+    def test_prefers_native_architecture(self, tmp_path):
+        """Test that the machine's architecture wins over foreign archives."""
+        touch(tmp_path, 'tool-1.0-1-aarch64.pkg.tar.zst', 'tool-1.0-1-x86_64.pkg.tar.zst')
+        index = PackageCacheIndex(str(tmp_path), 'x86_64')
+
+        assert index.find('tool', '1.0-1') == str(tmp_path / 'tool-1.0-1-x86_64.pkg.tar.zst')
+
+    def test_missing_cache_directory(self, tmp_path):
+        """Test lookups when the cache directory does not exist."""
+        index = PackageCacheIndex(str(tmp_path / 'missing'))
+
+        assert index.find('python', '3.12.3-1') is None
+        assert index.availability([('python', '3.12.3-1')]) == {'python': None}
+
+
+def test_downgrade_availability(cache_dir):
+    """Test the report of cached versions for a planned revert."""
+    def state(versions):
+        return SystemState(
+            endpoint_id='desk', timestamp=None, pacman_version='6.1.0', architecture='x86_64',
+            packages=[PackageState(package_name=name, version=version, repository='core', installed_size=1)
+                      for name, version in versions.items()]
+        )
+
+    pacman = MagicMock()
+    pacman.config.cache_dir = str(cache_dir)
+    pacman.config.architecture = 'x86_64'
+    pacman.get_system_state.return_value = state({'python': '3.12.3-1', 'glibc': '2.40-1', 'vim': '9.1-1'})
+    pacman.compare_package_states.return_value = {'python': 'newer', 'glibc': 'newer', 'vim': 'older'}
+    synchronizer = PackageSynchronizer(pacman)
+
+    availability = synchronizer.get_downgrade_availability(
+        state({'python': '3.11.8-1', 'glibc': '2.39-1', 'vim': '9.2-1'})
+    )
+
+    assert availability == {
+        'python': os.path.join(str(cache_dir), 'python-3.11.8-1-x86_64.pkg.tar.zst'),
+        'glibc': None,
+    }
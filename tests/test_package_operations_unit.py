@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the package operation pipeline.
+
+Tests archive prefetching, verification and the batching of changes into
+as few pacman transactions as possible.
+"""
+
+import io
+import subprocess
+import pytest
+from unittest.mock import MagicMock, patch
+
+from client.package_operations import PackageOperation, PackageSynchronizer
+
+
+class FakeResponse(io.BytesIO):
+    """Minimal urlopen response."""
+
+    def __init__(self, data, length=None):
+        super().__init__(data)
+        self.headers = {'Content-Length': str(len(data) if length is None else length)}
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    path = tmp_path / 'pkg'
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def synchronizer(cache_dir):
+    pacman = MagicMock()
+    pacman.config.cache_dir = str(cache_dir)
+    return PackageSynchronizer(pacman)
+
+
+@pytest.fixture
+def operations():
+    return [
+        PackageOperation('remove', 'old-tool', current_version='1.0-1'),
+        PackageOperation('install', 'vim', target_version='9.1-1'),
+        PackageOperation('upgrade', 'bash', current_version='5.1-1', target_version='5.2-1'),
+        PackageOperation('downgrade', 'glibc', current_version='2.40-1', target_version='2.39-1'),
+        PackageOperation('downgrade', 'zlib', current_version='1.3-2', target_version='1.3-1'),
+    ]
+
+
+def pacman_runner(urls=()):
+    """Return a subprocess.run replacement answering `pacman -Sp` with urls."""
+    def run(cmd, **kwargs):
+        stdout = '\n'.join(urls) if cmd[:2] == ['pacman', '-Sp'] else ''
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr='')
+    return MagicMock(side_effect=run)
+
+
+class TestTransactions:
+    """Test how operations are applied."""
+
+    def test_changes_applied_in_three_transactions(self, synchronizer, operations, cache_dir):
+        """Test that installs/upgrades share one -S and downgrades share one -U."""
+        for name in ('glibc-2.39-1-x86_64.pkg.tar.zst', 'zlib-1:1.3-1-x86_64.pkg.tar.zst',
+                     'zlib-1.3-1-x86_64.pkg.tar.zst', 'zlib-1.3-1-x86_64.pkg.tar.zst.sig'):
+            (cache_dir / name).write_bytes(b'archive')
+        run = pacman_runner()
+
+        with patch('client.package_operations.subprocess.run', run):
+            result = synchronizer._execute_operations(operations)
+
+        assert result.success
+        assert result.packages_changed == 5
+        commands = [call.args[0] for call in run.call_args_list]
+        assert commands[0][:2] == ['pacman', '-Sp']
+        assert commands[1] == ['pacman', '-R', '--noconfirm', 'old-tool']
+        assert commands[2] == ['pacman', '-S', '--noconfirm', 'vim=9.1-1', 'bash=5.2-1']
+        assert commands[3] == ['pacman', '-U', '--noconfirm',
+                               str(cache_dir / 'glibc-2.39-1-x86_64.pkg.tar.zst'),
+                               str(cache_dir / 'zlib-1.3-1-x86_64.pkg.tar.zst')]
+        assert len(commands) == 4
+
+    def test_missing_downgrade_aborts_before_changes(self, synchronizer, operations, cache_dir):
+        """Test that nothing is changed when a downgrade archive is unavailable."""
+        (cache_dir / 'glibc-2.39-1-x86_64.pkg.tar.zst').write_bytes(b'archive')
+        run = pacman_runner()
+
+        with patch('client.package_operations.subprocess.run', run):
+            result = synchronizer._execute_operations(operations)
+
+        assert not result.success
+        assert result.packages_changed == 0
+        assert any('zlib' in error for error in result.errors)
+        assert all(call.args[0][:2] == ['pacman', '-Sp'] for call in run.call_args_list)
+
+    def test_revert_applies_available_downgrades(self, synchronizer, operations, cache_dir):
+        """Test that reverts continue with the downgrades that can be applied."""
+        (cache_dir / 'glibc-2.39-1-x86_64.pkg.tar.zst').write_bytes(b'archive')
+        run = pacman_runner()
+
+        with patch('client.package_operations.subprocess.run', run):
+            result = synchronizer._execute_operations(operations, is_revert=True)
+
+        assert result.success
+        assert result.packages_changed == 4
+        assert run.call_args_list[-1].args[0] == [
+            'pacman', '-U', '--noconfirm', str(cache_dir / 'glibc-2.39-1-x86_64.pkg.tar.zst')
+        ]
+
+    def test_dry_run_runs_no_commands(self, synchronizer, operations):
+        """Test that dry runs neither fetch nor change anything."""
+        synchronizer.set_dry_run(True)
+        run = pacman_runner()
+
+        with patch('client.package_operations.subprocess.run', run), \
+                patch('client.package_operations.urllib.request.urlopen') as urlopen:
+            result = synchronizer._execute_operations(operations)
+
+        assert result.success
+        assert result.packages_changed == 5
+        run.assert_not_called()
+        urlopen.assert_not_called()
+
+
+class TestPrefetch:
+    """Test concurrent archive prefetching."""
+
+    def test_downloads_uncached_archives(self, synchronizer, cache_dir):
+        """Test that only archives missing from the cache are downloaded."""
+        (cache_dir / 'bash-5.2-1-x86_64.pkg.tar.zst').write_bytes(b'cached')
+        urls = [
+            'https://mirror.example/core/os/x86_64/bash-5.2-1-x86_64.pkg.tar.zst',
+            'https://mirror.example/extra/os/x86_64/vim-9.1-1-x86_64.pkg.tar.zst',
+            'https://mirror.example/extra/os/x86_64/vim-runtime-9.1-1-x86_64.pkg.tar.zst',
+            'file:///srv/repo/local-1.0-1-any.pkg.tar.zst',
+        ]
+
+        with patch('client.package_operations.urllib.request.urlopen',
+                   side_effect=lambda url, timeout: FakeResponse(url.encode())) as urlopen:
+            warnings = []
+            downloaded = synchronizer._download_archives(urls, warnings)
+
+        assert urlopen.call_count == 2
+        assert sorted(downloaded) == sorted([
+            str(cache_dir / 'vim-9.1-1-x86_64.pkg.tar.zst'),
+            str(cache_dir / 'vim-runtime-9.1-1-x86_64.pkg.tar.zst'),
+        ])
+        assert (cache_dir / 'vim-9.1-1-x86_64.pkg.tar.zst').read_bytes() == urls[1].encode()
+        assert warnings == []
+
+    def test_failed_downloads_are_left_to_pacman(self, synchronizer, cache_dir):
+        """Test that failed or truncated downloads become warnings and leave no files."""
+        urls = [
+            'https://mirror.example/extra/os/x86_64/vim-9.1-1-x86_64.pkg.tar.zst',
+            'https://mirror.example/extra/os/x86_64/gcc-14-1-x86_64.pkg.tar.zst',
+        ]
+
+        def urlopen(url, timeout):
+            if 'vim' in url:
+                raise OSError('connection reset')
+            return FakeResponse(b'short', length=1000)
+
+        with patch('client.package_operations.urllib.request.urlopen', side_effect=urlopen):
+            warnings = []
+            downloaded = synchronizer._download_archives(urls, warnings)
+
+        assert downloaded == []
+        assert len(warnings) == 2
+        assert list(cache_dir.iterdir()) == []
+
+    def test_unresolvable_targets_do_not_block_install(self, synchronizer):
+        """Test that a failing `pacman -Sp` only skips the prefetch."""
+        def run(cmd, **kwargs):
+            if cmd[:2] == ['pacman', '-Sp']:
+                raise subprocess.CalledProcessError(1, cmd, stderr='target not found')
+            return subprocess.CompletedProcess(cmd, 0, stdout='', stderr='')
+
+        operations = [PackageOperation('install', 'vim', target_version='9.1-1')]
+        with patch('client.package_operations.subprocess.run', side_effect=run) as mock_run:
+            result = synchronizer._execute_operations(operations)
+
+        assert result.success
+        assert result.warnings
+        assert mock_run.call_args_list[-1].args[0] == ['pacman', '-S', '--noconfirm', 'vim=9.1-1']
+
+    def test_progress_reported_per_stage(self, synchronizer, operations, cache_dir):
+        """Test that every stage reports its completion."""
+        for name in ('glibc-2.39-1-x86_64.pkg.tar.zst', 'zlib-1.3-1-x86_64.pkg.tar.zst'):
+            (cache_dir / name).write_bytes(b'archive')
+        progress = []
+        synchronizer.set_progress_callback(lambda *update: progress.append(update))
+        urls = ['https://mirror.example/extra/os/x86_64/vim-9.1-1-x86_64.pkg.tar.zst']
+
+        with patch('client.package_operations.subprocess.run', pacman_runner(urls)), \
+                patch('client.package_operations.urllib.request.urlopen',
+                      side_effect=lambda url, timeout: FakeResponse(b'vim')):
+            synchronizer._execute_operations(operations)
+
+        finished = [(stage, total) for stage, completed, total in progress if completed == total]
+        assert finished == [
+            ('resolve', 4), ('download', 1), ('verify', 3),
+            ('remove', 1), ('install', 2), ('downgrade', 2),
+        ]
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the columnar PackageSet model.
+
+Tests construction, dataclass compatibility, set operations, row records
+and column round-trips.
+"""
+
+import pytest
+
+from shared.models import PackageSet, PackageState, RepositoryPackage
+
+
+@pytest.fixture
+def current():
+    return PackageSet.from_package_states([
+        PackageState("bash", "5.2-1", "core", 1024, dependencies=["glibc"]),
+        PackageState("vim", "9.0-1", "extra", 2048),
+        PackageState("htop", "3.2-1", "extra", 512),
+    ])
+
+
+@pytest.fixture
+def target():
+    return PackageSet.from_package_states([
+        PackageState("bash", "5.2-1", "core", 1024),
+        PackageState("vim", "9.1-1", "extra", 2048),
+        PackageState("git", "2.44-1", "extra", 4096),
+    ])
+
+
+class TestPackageSet:
+    """Test PackageSet behaviour."""
+
+    def test_iterates_as_dataclasses(self, current):
+        """Test compatibility with code expecting PackageState lists."""
+        packages = list(current)
+
+        assert len(current) == 3
+        assert all(isinstance(pkg, PackageState) for pkg in packages)
+        assert packages[0] == PackageState("bash", "5.2-1", "core", 1024, dependencies=["glibc"])
+        assert current[1].package_name == "vim"
+        assert [pkg.package_name for pkg in current[1:]] == ["vim", "htop"]
+        assert "htop" in current and "git" not in current
+
+    def test_add_replaces_existing_row(self, current):
+        """Test that names are unique."""
+        current.add("vim", "9.2-1", "extra", 4096)
+
+        assert len(current) == 3
+        assert current.version_of("vim") == "9.2-1"
+        assert current.get("vim").installed_size == 4096
+
+    def test_validation(self):
+        """Test the same validation as the dataclasses."""
+        package_set = PackageSet()
+        with pytest.raises(ValueError):
+            package_set.add("", "1.0")
+        with pytest.raises(ValueError):
+            package_set.add("name", "")
+
+    def test_diff(self, current, target):
+        """Test name and version differences."""
+        diff = current.diff(target)
+
+        assert diff.only_self == ["htop"]
+        assert diff.only_other == ["git"]
+        assert diff.version_changed == ["vim"]
+        assert not diff.is_empty
+        assert current.diff(current).is_empty
+
+    def test_records(self, current):
+        """Test reading rows as tuples without building dataclasses."""
+        assert current.record("bash") == ("bash", "5.2-1", "core", 1024, ("glibc",))
+        assert current.record("missing") is None
+        assert [record[0] for record in current.records()] == ["bash", "vim", "htop"]
+        assert list(current.records())[1] == ("vim", "9.0-1", "extra", 2048, ())
+
+    def test_intersect_and_difference(self, current, target):
+        """Test set operations returning new sets."""
+        assert current.intersect(target).names == ["bash", "vim"]
+        assert current.difference(target).names == ["htop"]
+        assert current.intersect(["htop"]).names == ["htop"]
+        assert current.filter_repository("extra").names == ["vim", "htop"]
+
+    def test_repository_kind(self):
+        """Test iteration as RepositoryPackage objects."""
+        packages = [
+            RepositoryPackage("acl", "2.3-1", "core", "x86_64", "[installed]"),
+            RepositoryPackage("vim", "9.1-1", "extra", "x86_64"),
+        ]
+        package_set = PackageSet.coerce(packages)
+
+        assert package_set.kind == PackageSet.REPOSITORY
+        assert list(package_set) == packages
+        assert package_set.repositories == ["core", "extra"]
+
+    def test_columns_round_trip(self, current):
+        """Test exporting and rebuilding columns."""
+        rebuilt = PackageSet.from_columns(current.columns())
+
+        assert rebuilt.to_list() == current.to_list()
+
+    def test_strings_are_interned(self):
+        """Test that equal names share one string object across sets."""
+        name = "".join(["lib", "foo"])
+        first = PackageSet()
+        first.add(name, "1.0", "core")
+        second = PackageSet()
+        second.add("".join(["lib", "foo"]), "1.0", "core")
+
+        assert first.names[0] is second.names[0]
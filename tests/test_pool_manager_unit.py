@@ -336,19 +336,15 @@ class TestPackagePoolManager:
     async def test_delete_pool_success(self, pool_manager, mock_pool_repo, mock_endpoint_repo):
         """Test successful pool deletion."""
         # Setup mocks
-        endpoints = [
-            Endpoint("ep-1", "Endpoint 1", "host1"),
-            Endpoint("ep-2", "Endpoint 2", "host2")
-        ]
-        mock_endpoint_repo.list_by_pool.return_value = endpoints
-        mock_endpoint_repo.remove_from_pool.return_value = True
+        mock_endpoint_repo.remove_from_pool_bulk.return_value = 2
         mock_pool_repo.delete.return_value = True
         
         result = await pool_manager.delete_pool("pool-1")
         
         assert result == True
-        mock_endpoint_repo.list_by_pool.assert_called_once_with("pool-1")
-        assert mock_endpoint_repo.remove_from_pool.call_count == 2
+        # All endpoints are unassigned in one update
+        mock_endpoint_repo.remove_from_pool_bulk.assert_called_once_with("pool-1")
+        mock_endpoint_repo.remove_from_pool.assert_not_called()
         mock_pool_repo.delete.assert_called_once_with("pool-1")
     
     @pytest.mark.asyncio
@@ -488,21 +484,16 @@ class TestPackagePoolManager:
     @pytest.mark.asyncio
     async def test_set_target_state_success(self, pool_manager, mock_pool_repo, mock_endpoint_repo):
         """Test successful target state setting."""
-        endpoints = [
-            Endpoint("ep-1", "Endpoint 1", "host1", sync_status=SyncStatus.IN_SYNC),
-            Endpoint("ep-2", "Endpoint 2", "host2", sync_status=SyncStatus.AHEAD)
-        ]
-        
         with patch.object(pool_manager, 'update_pool') as mock_update:
-            mock_endpoint_repo.list_by_pool.return_value = endpoints
-            mock_endpoint_repo.update_status.return_value = True
+            mock_endpoint_repo.update_status_bulk.return_value = 2
             
             result = await pool_manager.set_target_state("pool-1", "state-1")
             
             assert result == True
             mock_update.assert_called_once_with("pool-1", target_state_id="state-1")
-            # Should update non-offline endpoints to BEHIND
-            assert mock_endpoint_repo.update_status.call_count == 2
+            # Should update the pool's non-offline endpoints to BEHIND in one update
+            mock_endpoint_repo.update_status_bulk.assert_called_once_with("pool-1", SyncStatus.BEHIND)
+            mock_endpoint_repo.update_status.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_clear_target_state_success(self, pool_manager):
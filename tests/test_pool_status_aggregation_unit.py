@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Unit tests for aggregated pool status queries.
+
+Tests the grouped endpoint count query, building PoolStatusInfo from counts
+and the pool status and dashboard fallbacks that use them instead of
+listing the endpoints of every pool.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from server.api.dashboard import get_dashboard_metrics, get_pool_statuses
+from server.core.pool_manager import PackagePoolManager, PoolStatusInfo
+from server.database.connection import DatabaseManager
+from server.database.orm import EndpointRepository, PoolRepository
+from server.database.schema import create_tables
+from shared.models import Endpoint, PackagePool, SyncStatus
+
+
+async def pool_database(tmp_path):
+    """Pool manager on a database with three pools and an unassigned endpoint."""
+    db_manager = DatabaseManager("internal")
+    db_manager.database_url = str(tmp_path / "statuses.db")
+    await create_tables(db_manager)
+
+    assignments = [
+        ('ep-1', 'pool-1', SyncStatus.IN_SYNC), ('ep-2', 'pool-1', SyncStatus.IN_SYNC),
+        ('ep-3', 'pool-1', SyncStatus.BEHIND), ('ep-4', 'pool-1', SyncStatus.OFFLINE),
+        ('ep-5', 'pool-2', SyncStatus.AHEAD), ('ep-6', None, SyncStatus.OFFLINE),
+    ]
+    with patch('server.database.orm.get_change_notifier'):
+        pools = PoolRepository(db_manager)
+        for pool_id, name in (('pool-1', 'desktops'), ('pool-2', 'servers'), ('pool-3', 'spare')):
+            await pools.create(PackagePool(id=pool_id, name=name, description=''))
+        endpoints = EndpointRepository(db_manager)
+        for endpoint_id, pool_id, status in assignments:
+            await endpoints.create(Endpoint(endpoint_id, f'name-{endpoint_id}', f'host-{endpoint_id}'))
+            await endpoints.update_status(endpoint_id, status)
+            if pool_id:
+                await endpoints.assign_to_pool(endpoint_id, pool_id)
+
+    return PackagePoolManager(db_manager)
+
+
+@pytest.mark.asyncio
+async def test_count_by_pool_and_status(tmp_path):
+    """Test counting endpoints per pool and status in one query."""
+    manager = await pool_database(tmp_path)
+
+    counts = await manager.endpoint_repo.count_by_pool_and_status()
+
+    assert counts == {
+        'pool-1': {SyncStatus.IN_SYNC: 2, SyncStatus.BEHIND: 1, SyncStatus.OFFLINE: 1},
+        'pool-2': {SyncStatus.AHEAD: 1},
+        None: {SyncStatus.OFFLINE: 1},
+    }
+
+
+def test_status_info_from_counts():
+    """Test that counts give the same status as the endpoints they count."""
+    pool = PackagePool(id='pool-1', name='desktops', description='')
+    endpoints = [
+        Endpoint('ep-1', 'one', 'host1', sync_status=SyncStatus.IN_SYNC),
+        Endpoint('ep-2', 'two', 'host2', sync_status=SyncStatus.BEHIND),
+        Endpoint('ep-3', 'three', 'host3', sync_status=SyncStatus.BEHIND),
+    ]
+
+    from_counts = PoolStatusInfo.from_counts(pool, {SyncStatus.IN_SYNC: 1, SyncStatus.BEHIND: 2})
+
+    assert from_counts.to_dict() == PoolStatusInfo(pool, endpoints).to_dict()
+    assert from_counts.endpoints == []
+    assert PoolStatusInfo.from_counts(pool, {}).overall_status == "empty"
+
+
+@pytest.mark.asyncio
+async def test_list_pool_statuses_uses_two_queries(tmp_path):
+    """Test that listing pool statuses does not query each pool's endpoints."""
+    manager = await pool_database(tmp_path)
+
+    with patch.object(manager.db_manager, 'fetch', wraps=manager.db_manager.fetch) as fetch, \
+            patch.object(manager.endpoint_repo, 'list_by_pool') as list_by_pool:
+        statuses = await manager.list_pool_statuses()
+
+    assert fetch.call_count == 2
+    list_by_pool.assert_not_called()
+    by_pool = {status.pool.id: status for status in statuses}
+    assert (by_pool['pool-1'].total_endpoints, by_pool['pool-1'].in_sync_count, by_pool['pool-1'].offline_count) == (4, 2, 1)
+    assert by_pool['pool-1'].sync_percentage == 50.0
+    assert by_pool['pool-2'].overall_status == "out_of_sync"
+    assert by_pool['pool-3'].overall_status == "empty"
+
+
+class TestDashboardFallback:
+    """Test the dashboard routes when the in-memory aggregates are not loaded."""
+
+    @pytest.mark.asyncio
+    async def test_pool_statuses(self, tmp_path):
+        """Test pool status dictionaries built from grouped counts."""
+        manager = await pool_database(tmp_path)
+
+        statuses = {status['pool_id']: status for status in await get_pool_statuses(manager, None)}
+
+        assert statuses['pool-1']['total_endpoints'] == 4
+        assert statuses['pool-1']['behind_count'] == 1
+        assert statuses['pool-1']['overall_status'] == "warning"
+        assert statuses['pool-2']['ahead_count'] == 1
+        assert statuses['pool-3']['overall_status'] == "empty"
+
+    @pytest.mark.asyncio
+    async def test_metrics(self, tmp_path):
+        """Test fleet metrics built from grouped counts."""
+        manager = await pool_database(tmp_path)
+
+        with patch.object(manager.endpoint_repo, 'list_by_pool') as list_by_pool:
+            metrics = await get_dashboard_metrics(manager, MagicMock(), manager.db_manager, None)
+
+        list_by_pool.assert_not_called()
+        assert metrics.total_endpoints == 6
+        assert metrics.endpoints_online == 4
+        assert metrics.endpoints_offline == 2
+        assert metrics.endpoints_unassigned == 1
+        assert metrics.total_pools == 3
+        # pool-3 is empty, so healthy; pool-1 is 50% and pool-2 0% in sync
+        assert metrics.pools_healthy == 1
+        assert metrics.average_sync_percentage == 50.0
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the GCRA rate limiter and its backends.
+
+Tests burst and refill behaviour, shard sweeping, the shared database
+backend and middleware fallback when the backend fails.
+"""
+
+import os
+import re
+import time
+import uuid
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from fastapi import Request
+
+from server.database.connection import DatabaseManager
+from server.middleware.rate_limiting import (
+    RateLimiter, RateLimitBackend, LocalRateLimitBackend, DatabaseRateLimitBackend,
+    RateLimitMiddleware, create_rate_limit_middleware
+)
+
+# Set to a PostgreSQL URL (a scratch database) to run the shared backend
+# statements against a real server
+POSTGRES_URL = os.getenv("PACMAN_SYNC_TEST_POSTGRES_URL")
+
+
+def make_request(host="127.0.0.1"):
+    request = Mock(spec=Request)
+    request.client.host = host
+    request.headers = {}
+    request.state = Mock()
+    request.state.endpoint = None
+    return request
+
+
+class TestLocalRateLimitBackend:
+    """Test the in-process sharded backend."""
+
+    def test_burst_then_refill(self):
+        """Test that a full burst is allowed and refills at the configured rate."""
+        limiter = RateLimiter(requests_per_minute=60, burst_size=3)
+        request = make_request()
+
+        with patch("server.middleware.rate_limiting.time.time", return_value=1000.0):
+            results = [limiter.is_allowed(request)[0] for _ in range(4)]
+        assert results == [True, True, True, False]
+
+        # One request is earned back every second
+        with patch("server.middleware.rate_limiting.time.time", return_value=1001.0):
+            allowed, info = limiter.is_allowed(request)
+            assert allowed is True
+            assert info['remaining'] == 0
+            assert limiter.is_allowed(request)[0] is False
+
+    def test_denied_info(self):
+        """Test rate limit info for a denied request."""
+        limiter = RateLimiter(requests_per_minute=2)
+        request = make_request()
+
+        with patch("server.middleware.rate_limiting.time.time", return_value=1000.0):
+            limiter.is_allowed(request)
+            limiter.is_allowed(request)
+            allowed, info = limiter.is_allowed(request)
+
+        assert allowed is False
+        assert info == {'limit': 2, 'remaining': 0, 'reset': 1060, 'retry_after': 30}
+
+    def test_clients_are_independent(self):
+        """Test that clients do not share quota."""
+        limiter = RateLimiter(requests_per_minute=1)
+
+        assert limiter.is_allowed(make_request("10.0.0.1"))[0] is True
+        assert limiter.is_allowed(make_request("10.0.0.1"))[0] is False
+        assert limiter.is_allowed(make_request("10.0.0.2"))[0] is True
+
+    def test_sweep_drops_expired_clients(self):
+        """Test that idle clients are removed shard by shard."""
+        backend = LocalRateLimitBackend(shards=4, sweep_interval=0)
+        for i in range(100):
+            backend.acquire_nowait(f"client-{i}", 1000.0, 1.0, 0.0)
+        assert len(backend) == 100
+
+        # Every shard is swept once it is touched after all entries expired
+        for i in range(100):
+            backend.acquire_nowait(f"other-{i}", 2000.0, 1.0, 0.0)
+        assert len(backend) == 100
+        assert all(not key.startswith("client-") for shard in backend._shards for key in shard)
+
+
+class TestDatabaseRateLimitBackend:
+    """Test the shared PostgreSQL backend."""
+
+    @pytest.fixture
+    def db_manager(self):
+        db_manager = AsyncMock()
+        db_manager.database_type = "postgresql"
+        return db_manager
+
+    def test_requires_postgresql(self):
+        """Test that SQLite is rejected."""
+        db_manager = Mock()
+        db_manager.database_type = "internal"
+        with pytest.raises(ValueError):
+            DatabaseRateLimitBackend(db_manager)
+
+    @pytest.mark.asyncio
+    async def test_allowed_uses_single_upsert(self, db_manager):
+        """Test the allowed path issues one statement."""
+        db_manager.fetchval.return_value = 1001.0
+        backend = DatabaseRateLimitBackend(db_manager)
+
+        allowed, tat = await backend.acquire("key", 1000.0, 1.0, 2.0)
+
+        assert (allowed, tat) == (True, 1001.0)
+        db_manager.fetchval.assert_awaited_once()
+        assert "ON CONFLICT" in db_manager.fetchval.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_denied_reads_current_state(self, db_manager):
+        """Test the denied path reports the stored arrival time."""
+        db_manager.fetchval.side_effect = [None, 1010.0]
+        backend = DatabaseRateLimitBackend(db_manager)
+
+        allowed, tat = await backend.acquire("key", 1000.0, 1.0, 2.0)
+
+        assert (allowed, tat) == (False, 1010.0)
+
+    @pytest.mark.asyncio
+    async def test_parameters_are_typed(self, db_manager):
+        """Test that every parameter is cast, as PostgreSQL cannot infer $2 + $3."""
+        db_manager.fetchval.return_value = 1001.0
+        backend = DatabaseRateLimitBackend(db_manager)
+
+        await backend.acquire("key", 1000.0, 1.0, 2.0)
+
+        query = db_manager.fetchval.call_args[0][0]
+        assert re.findall(r"\$\d+(?!\d|::)", query) == []
+
+    def test_backend_interface_is_abstract(self):
+        """Test that backends must implement acquire."""
+        with pytest.raises(TypeError):
+            RateLimitBackend()
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="PACMAN_SYNC_TEST_POSTGRES_URL is not set")
+@pytest.mark.asyncio
+async def test_database_backend_on_postgresql():
+    """Test the shared backend statements on a real PostgreSQL server."""
+    db_manager = DatabaseManager("postgresql", POSTGRES_URL)
+    await db_manager.initialize()
+    try:
+        backend = DatabaseRateLimitBackend(db_manager, cleanup_interval=0)
+        await backend.initialize()
+        key = f"test|{uuid.uuid4()}"
+        now = time.time()
+
+        results = [await backend.acquire(key, now, 1.0, 1.0) for _ in range(3)]
+
+        assert [allowed for allowed, _ in results] == [True, True, False]
+        assert results[1][1] == pytest.approx(now + 2.0)
+        assert results[2][1] == pytest.approx(now + 2.0)
+        await db_manager.execute(f"DELETE FROM {backend.TABLE_NAME} WHERE key = $1", key)
+    finally:
+        await db_manager.close()
+
+
+class TestRateLimitMiddleware:
+    """Test middleware wiring of backends."""
+
+    @pytest.mark.asyncio
+    async def test_shared_backend_is_namespaced(self):
+        """Test that every limiter uses the shared backend with its own keys."""
+        backend = AsyncMock()
+        backend.acquire.return_value = (True, 0.0)
+        middleware = create_rate_limit_middleware(default_limit=60, backend=backend)
+
+        await middleware._get_limiter_for_path("/api/pools").check(make_request())
+        await middleware._get_limiter_for_path("/api/other").check(make_request())
+
+        keys = [call.args[0] for call in backend.acquire.await_args_list]
+        assert keys == ["/api/pools|ip:127.0.0.1", "default|ip:127.0.0.1"]
+
+    @pytest.mark.asyncio
+    async def test_backend_failure_falls_back_to_local(self):
+        """Test that a failing shared backend degrades to local limits."""
+        backend = AsyncMock()
+        backend.acquire.side_effect = Exception("connection refused")
+        middleware = RateLimitMiddleware(default_limit=1, backend=backend)
+        limiter = middleware.default_limiter
+
+        assert (await limiter.check(make_request()))[0] is True
+        assert (await limiter.check(make_request()))[0] is False
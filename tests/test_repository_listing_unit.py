@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Unit tests for columnar sync repository listing.
+
+Tests parsing of `pacman -Sl` output, the single-process listing path and
+the bounded per-repository fallback.
+"""
+
+import subprocess
+from unittest.mock import patch
+
+from client.pacman_interface import PacmanInterface, PacmanConfig, parse_sync_listing
+
+
+SL_OUTPUT = """core acl 2.3.2-1 [installed]
+core bash 5.2.026-2 [installed: 5.2.021-1]
+extra vim 9.1.0-1
+multilib lib32-glibc 2.39-1
+custom mytool 1.0-1
+"""
+
+
+def make_interface(repos):
+    """Create a PacmanInterface without touching the host's pacman."""
+    interface = PacmanInterface.__new__(PacmanInterface)
+    interface.config = PacmanConfig(
+        architecture="x86_64",
+        repositories=[{"name": name, "server": f"https://mirror/{name}"} for name in repos],
+        cache_dir="/var/cache/pacman/pkg/",
+        db_path="/var/lib/pacman/",
+        log_file="/var/log/pacman.log"
+    )
+    interface.pacman_version = "6.1.0"
+    return interface
+
+
+def completed(stdout):
+    return subprocess.CompletedProcess(args=[], returncode=0, stdout=stdout, stderr="")
+
+
+class TestParseSyncListing:
+    """Test `pacman -Sl` parsing."""
+
+    def test_splits_by_repository(self):
+        """Test that output is split into per-repository columns."""
+        listings = parse_sync_listing(SL_OUTPUT)
+
+        assert set(listings) == {"core", "extra", "multilib", "custom"}
+        core = listings["core"]
+        assert len(core) == 2
+        assert core.names == ["acl", "bash"]
+        assert core.version_of("bash") == "5.2.026-2"
+        assert core.get("bash").description == "[installed: 5.2.021-1]"
+        assert listings["extra"].get("vim").description == ""
+
+    def test_filters_repositories(self):
+        """Test that unrequested repositories are skipped."""
+        listings = parse_sync_listing(SL_OUTPUT, ["core", "extra"])
+
+        assert set(listings) == {"core", "extra"}
+
+    def test_to_packages(self):
+        """Test materializing RepositoryPackage objects."""
+        packages = parse_sync_listing(SL_OUTPUT, architecture="x86_64")["extra"].to_list()
+
+        assert len(packages) == 1
+        assert packages[0].name == "vim"
+        assert packages[0].repository == "extra"
+        assert packages[0].architecture == "x86_64"
+
+
+class TestListSyncRepositories:
+    """Test repository collection strategies."""
+
+    def test_single_process_listing(self):
+        """Test that all repositories are collected with one pacman call."""
+        interface = make_interface(["core", "extra", "multilib", "custom"])
+
+        with patch("client.pacman_interface.subprocess.run", return_value=completed(SL_OUTPUT)) as run:
+            repositories = interface.get_all_repositories("endpoint-1")
+
+        run.assert_called_once()
+        assert run.call_args[0][0] == ["pacman", "-Sl"]
+        assert [repo.repo_name for repo in repositories] == ["core", "extra", "multilib", "custom"]
+        assert [len(repo.packages) for repo in repositories] == [2, 1, 1, 1]
+        assert repositories[0].mirrors == ["https://mirror/core"]
+
+    def test_fallback_lists_repositories_individually(self):
+        """Test the per-repository fallback when the combined listing fails."""
+        interface = make_interface(["core", "extra", "broken"])
+
+        def fake_run(cmd, **kwargs):
+            if cmd == ["pacman", "-Sl"] or cmd[-1] == "broken":
+                raise subprocess.CalledProcessError(1, cmd)
+            return completed("\n".join(line for line in SL_OUTPUT.splitlines()
+                                       if line.startswith(cmd[-1] + " ")))
+
+        with patch("client.pacman_interface.subprocess.run", side_effect=fake_run):
+            listings = interface.list_sync_repositories(["core", "extra", "broken"])
+            repositories = interface.get_all_repositories("endpoint-1")
+
+        assert set(listings) == {"core", "extra"}
+        assert len(listings["core"]) == 2
+        assert [len(repo.packages) for repo in repositories] == [2, 1, 0]
+
+    def test_missing_pacman_gives_empty_repositories(self):
+        """Test that a missing pacman binary degrades to empty repositories."""
+        interface = make_interface(["core", "extra"])
+
+        with patch("client.pacman_interface.subprocess.run", side_effect=FileNotFoundError("pacman")):
+            assert interface.list_sync_repositories(["core", "extra"]) == {}
+            repositories = interface.get_all_repositories("endpoint-1")
+
+        assert [(repo.repo_name, repo.packages) for repo in repositories] == [("core", []), ("extra", [])]
+
+    def test_unparsable_listing_is_skipped(self):
+        """Test that output that cannot be parsed is logged and skipped."""
+        interface = make_interface(["core"])
+
+        with patch("client.pacman_interface.subprocess.run", return_value=completed(SL_OUTPUT)) as run, \
+                patch("client.pacman_interface.parse_sync_listing", side_effect=ValueError("bad line")):
+            assert interface.list_sync_repositories(["core"]) == {}
+
+        assert run.call_count == 2
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Unit tests for staged pool rollouts.
+
+Tests canary selection, waves, the concurrency limit, health gates, wave
+delays, offline and timed out endpoints, operator controls, the targets
+of endpoints not promoted yet and stale status reports, notifying promoted
+clients, rollout policy serialization and the fallback to promoting every
+endpoint for pools without a rollout policy.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from server.api.sync import ConnectionManager
+from server.core.pool_manager import PackagePoolManager
+from server.core.rollout_scheduler import (
+    CANCELLED, COMPLETED, HALTED, RUNNING, WAITING, RolloutScheduler
+)
+from server.database.events import ChangeEvent
+from shared.models import (
+    Endpoint, OperationStatus, PackagePool, RolloutPolicy, SyncPolicy, SyncStatus
+)
+
+
+def pool_with(policy):
+    return PackagePool(id='pool-1', name='desktops', description='', sync_policy=SyncPolicy(rollout=policy))
+
+
+def make_scheduler(policy, count=6, offline=()):
+    scheduler = RolloutScheduler(MagicMock())
+    scheduler.pool_repo = AsyncMock()
+    scheduler.pool_repo.get_by_id.return_value = pool_with(policy)
+    scheduler.endpoint_repo = AsyncMock()
+    scheduler.endpoint_repo.list_by_pool.return_value = [
+        Endpoint(f'ep-{index}', f'desk{index}', f'host{index}', pool_id='pool-1',
+                 sync_status=SyncStatus.OFFLINE if f'ep-{index}' in offline else SyncStatus.IN_SYNC)
+        for index in range(1, count + 1)
+    ]
+    return scheduler
+
+
+def promoted(scheduler):
+    return [call.args[0] for call in scheduler.endpoint_repo.update_status.call_args_list
+            if call.args[1] == SyncStatus.BEHIND]
+
+
+async def report(scheduler, endpoint_id, success=True):
+    """Deliver the change event an endpoint finishing or failing would cause."""
+    if success:
+        scheduler.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED,
+                                {'endpoint_id': endpoint_id, 'status': SyncStatus.IN_SYNC})
+    else:
+        scheduler.handle_change(ChangeEvent.OPERATION_STATUS_CHANGED,
+                                {'endpoint_id': endpoint_id, 'status': OperationStatus.FAILED})
+    await asyncio.gather(*scheduler._tasks)
+
+
+class TestWaves:
+    """Test promotion through canaries and waves."""
+
+    @pytest.mark.asyncio
+    async def test_canary_then_waves(self):
+        """Test that waves start only after the previous wave is in sync."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=2), offline={'ep-6'})
+
+        rollout = await scheduler.start('pool-1', 'state-2', exclude=['ep-1'])
+
+        assert rollout.waves == [['ep-2'], ['ep-3', 'ep-4'], ['ep-5']]
+        assert promoted(scheduler) == ['ep-2']
+
+        await report(scheduler, 'ep-2')
+        assert promoted(scheduler) == ['ep-2', 'ep-3', 'ep-4']
+
+        await report(scheduler, 'ep-3')
+        assert promoted(scheduler) == ['ep-2', 'ep-3', 'ep-4']
+
+        await report(scheduler, 'ep-4')
+        await report(scheduler, 'ep-5')
+        assert promoted(scheduler) == ['ep-2', 'ep-3', 'ep-4', 'ep-5']
+        assert rollout.status == COMPLETED
+        assert len(rollout.finished) == 4
+
+    @pytest.mark.asyncio
+    async def test_preferred_canaries(self):
+        """Test that configured canaries go first."""
+        scheduler = make_scheduler(RolloutPolicy(canary_endpoints=['ep-5', 'ep-9'], canary_size=2, wave_size=0))
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+
+        assert rollout.waves == [['ep-5', 'ep-1'], ['ep-2', 'ep-3', 'ep-4', 'ep-6']]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        """Test that no more than max_concurrent endpoints sync at once."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=0, wave_size=0, max_concurrent=2), count=4)
+
+        await scheduler.start('pool-1', 'state-2')
+        assert promoted(scheduler) == ['ep-1', 'ep-2']
+
+        await report(scheduler, 'ep-2')
+        assert promoted(scheduler) == ['ep-1', 'ep-2', 'ep-3']
+
+        await report(scheduler, 'ep-1', success=False)
+        assert promoted(scheduler) == ['ep-1', 'ep-2', 'ep-3', 'ep-4']
+
+    @pytest.mark.asyncio
+    async def test_endpoint_leaving_the_pool(self):
+        """Test that an endpoint removed mid-rollout does not block its wave."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=5), count=3)
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        scheduler.handle_change(ChangeEvent.ENDPOINT_DELETED, {'endpoint_id': 'ep-1', 'pool_id': 'pool-1'})
+        await asyncio.gather(*scheduler._tasks)
+
+        assert rollout.wave_index == 1
+        assert promoted(scheduler) == ['ep-1', 'ep-2', 'ep-3']
+
+
+class TestHealthGates:
+    """Test halting, resuming and cancelling rollouts."""
+
+    @pytest.mark.asyncio
+    async def test_failed_canary_halts_rollout(self):
+        """Test that a failing canary stops the rollout until it is resumed."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=5), count=3)
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        await report(scheduler, 'ep-1', success=False)
+
+        assert rollout.status == HALTED
+        assert rollout.failed == {'ep-1'}
+        assert promoted(scheduler) == ['ep-1']
+
+        await scheduler.resume('pool-1')
+        assert rollout.status == RUNNING
+        assert promoted(scheduler) == ['ep-1', 'ep-2', 'ep-3']
+
+    @pytest.mark.asyncio
+    async def test_failures_within_budget(self):
+        """Test that a wave may fail up to max_failures endpoints."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=2, wave_size=5, max_failures=1), count=3)
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        await report(scheduler, 'ep-1', success=False)
+        await report(scheduler, 'ep-2')
+
+        assert rollout.status == RUNNING
+        assert promoted(scheduler) == ['ep-1', 'ep-2', 'ep-3']
+
+    @pytest.mark.asyncio
+    async def test_wave_delay(self):
+        """Test waiting between healthy waves."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=5, wave_delay=30), count=2)
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        scheduler.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED,
+                                {'endpoint_id': 'ep-1', 'status': SyncStatus.IN_SYNC})
+        await asyncio.sleep(0.01)
+
+        assert rollout.status == WAITING
+        assert rollout.next_wave_at is not None
+        assert promoted(scheduler) == ['ep-1']
+
+        await scheduler.cancel('pool-1')
+        await scheduler.stop()
+        assert rollout.status == CANCELLED
+        assert promoted(scheduler) == ['ep-1']
+
+    @pytest.mark.asyncio
+    async def test_new_target_replaces_rollout(self):
+        """Test that a newer target takes over from a running rollout."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=5), count=2)
+
+        first = await scheduler.start('pool-1', 'state-2')
+        second = await scheduler.start('pool-1', 'state-3')
+        await report(scheduler, 'ep-1')
+
+        assert scheduler.get_rollout('pool-1') is second
+        assert first.status == CANCELLED and first.finished == set()
+        assert second.wave_index == 1
+
+
+
+class TestStalledEndpoints:
+    """Test endpoints that never get in sync."""
+
+    @pytest.mark.asyncio
+    async def test_offline_endpoint_fails(self):
+        """Test that a promoted endpoint going offline counts as failed."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=1, max_concurrent=1), count=3)
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        scheduler.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED,
+                                {'endpoint_id': 'ep-1', 'status': SyncStatus.OFFLINE})
+        await asyncio.gather(*scheduler._tasks)
+
+        assert rollout.status == HALTED
+        assert rollout.failed == {'ep-1'}
+        assert rollout.deadlines == {}
+
+    @pytest.mark.asyncio
+    async def test_offline_queued_endpoint_dropped(self):
+        """Test that an endpoint going offline before its promotion is left out."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=0, wave_size=0, max_concurrent=1), count=3)
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        scheduler.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED,
+                                {'endpoint_id': 'ep-2', 'status': SyncStatus.OFFLINE})
+        await asyncio.gather(*scheduler._tasks)
+        await report(scheduler, 'ep-1')
+
+        assert promoted(scheduler) == ['ep-1', 'ep-3']
+        assert rollout.failed == set()
+
+    @pytest.mark.asyncio
+    async def test_sync_timeout(self):
+        """Test that an endpoint not in sync by its deadline counts as failed."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=5, max_failures=1), count=3)
+        scheduler.pool_repo.get_by_id.return_value.sync_policy.rollout.sync_timeout = 0.01
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        assert set(rollout.to_dict()['sync_deadlines']) == {'ep-1'}
+
+        await asyncio.gather(*scheduler._timers)
+
+        assert rollout.failed == {'ep-1'}
+        assert rollout.wave_index == 1
+        assert promoted(scheduler) == ['ep-1', 'ep-2', 'ep-3']
+
+        # Deadlines of endpoints that got in sync are ignored
+        await report(scheduler, 'ep-2')
+        await asyncio.gather(*scheduler._timers)
+        assert rollout.failed == {'ep-1', 'ep-3'}
+        assert rollout.finished == {'ep-2'}
+        assert rollout.status == COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_skip_syncing_endpoints(self):
+        """Test that operators can stop waiting for stalled endpoints."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=2, wave_size=5, max_concurrent=1), count=3)
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        await scheduler.skip('pool-1')
+
+        assert rollout.failed == {'ep-1'}
+        assert promoted(scheduler) == ['ep-1', 'ep-2']
+
+        await scheduler.skip('pool-1')
+        assert rollout.status == RUNNING
+        assert rollout.wave_index == 1
+        assert promoted(scheduler) == ['ep-1', 'ep-2', 'ep-3']
+
+        await report(scheduler, 'ep-3')
+        assert rollout.status == COMPLETED
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_resume_waiting_rollout(self):
+        """Test starting the next wave without waiting for the wave delay."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=5, wave_delay=30), count=2)
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        await report(scheduler, 'ep-1')
+        assert rollout.status == WAITING
+
+        await scheduler.resume('pool-1')
+
+        assert rollout.status == RUNNING
+        assert promoted(scheduler) == ['ep-1', 'ep-2']
+        await scheduler.stop()
+
+
+
+class TestPromotionTargets:
+    """Test what endpoints compare themselves against during a rollout."""
+
+    @pytest.mark.asyncio
+    async def test_unpromoted_endpoints_keep_previous_target(self):
+        """Test that endpoints get the new target only once promoted."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=5), count=3)
+        pool = scheduler.pool_repo.get_by_id.return_value
+        pool.target_state_id = 'state-2'
+
+        await scheduler.start('pool-1', 'state-2', exclude=['ep-3'], previous_target_state_id='state-1')
+
+        assert [scheduler.target_for(endpoint_id, pool) for endpoint_id in ('ep-1', 'ep-2', 'ep-3')] == \
+            ['state-2', 'state-1', 'state-2']
+
+        # A newer target keeps ep-2 at the target it still has
+        pool.target_state_id = 'state-3'
+        await scheduler.start('pool-1', 'state-3', exclude=['ep-3'], previous_target_state_id='state-2')
+        assert [scheduler.target_for(endpoint_id, pool) for endpoint_id in ('ep-1', 'ep-2')] == \
+            ['state-3', 'state-1']
+
+        await report(scheduler, 'ep-1')
+        assert scheduler.target_for('ep-2', pool) == 'state-3'
+
+        pool.target_state_id = None
+        assert scheduler.target_for('ep-2', pool) is None
+
+    @pytest.mark.asyncio
+    async def test_report_before_promotion_ignored(self):
+        """Test that an in sync report from before an endpoint's promotion does not finish it."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=0, wave_size=0, max_concurrent=1), count=2)
+
+        rollout = await scheduler.start('pool-1', 'state-2')
+        # ep-1 finishing promotes ep-2 before ep-2's earlier report is processed
+        scheduler.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED,
+                                {'endpoint_id': 'ep-1', 'status': SyncStatus.IN_SYNC})
+        scheduler.handle_change(ChangeEvent.ENDPOINT_STATUS_CHANGED,
+                                {'endpoint_id': 'ep-2', 'status': SyncStatus.IN_SYNC})
+        await asyncio.gather(*scheduler._tasks)
+
+        assert promoted(scheduler) == ['ep-1', 'ep-2']
+        assert rollout.syncing == {'ep-2'}
+        assert rollout.status == RUNNING
+
+        await report(scheduler, 'ep-2')
+        assert rollout.status == COMPLETED
+
+
+class TestClientNotifications:
+    """Test telling connected clients about their new target."""
+
+    async def connect(self, manager, endpoint_id):
+        websocket = MagicMock()
+        websocket.accept = AsyncMock()
+        websocket.send_json = AsyncMock()
+        await manager.connect(websocket, endpoint_id, 'pool-1')
+        return websocket
+
+    @pytest.mark.asyncio
+    async def test_promoted_endpoints_notified(self):
+        """Test that pools with a rollout policy only notify promoted endpoints."""
+        scheduler = make_scheduler(RolloutPolicy(canary_size=1, wave_size=5), count=2)
+        manager = ConnectionManager()
+        manager.rollout_scheduler = scheduler
+        scheduler.add_promotion_listener(manager.endpoint_promoted)
+        ws_1 = await self.connect(manager, 'ep-1')
+        ws_2 = await self.connect(manager, 'ep-2')
+
+        manager.handle_change(ChangeEvent.POOL_UPDATED, {'pool_id': 'pool-1', 'target_state_id': 'state-2'})
+        await scheduler.start('pool-1', 'state-2')
+        await asyncio.gather(*manager._pending_sends)
+
+        assert [call.args[0]['target_state_id'] for call in ws_1.send_json.await_args_list] == ['state-2']
+        ws_2.send_json.assert_not_awaited()
+
+        await report(scheduler, 'ep-1')
+        await asyncio.gather(*manager._pending_sends)
+
+        message = ws_2.send_json.await_args.args[0]
+        assert (message['type'], message['pool_id'], message['target_state_id']) == \
+            ('target_state_changed', 'pool-1', 'state-2')
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_pool_without_rollout_notified_at_once(self):
+        """Test that pools without a rollout policy still notify every member."""
+        manager = ConnectionManager()
+        manager.rollout_scheduler = make_scheduler(None)
+        ws_1 = await self.connect(manager, 'ep-1')
+        ws_2 = await self.connect(manager, 'ep-2')
+
+        manager.handle_change(ChangeEvent.POOL_UPDATED, {'pool_id': 'pool-1', 'target_state_id': 'state-2'})
+        await asyncio.gather(*manager._pending_sends)
+
+        assert ws_1.send_json.await_args.args[0]['type'] == 'target_state_changed'
+        assert ws_2.send_json.await_args.args[0]['type'] == 'target_state_changed'
+
+
+@pytest.mark.asyncio
+async def test_pool_without_rollout_policy():
+    """Test that pools without a rollout policy promote every endpoint at once."""
+    scheduler = make_scheduler(None)
+    assert await scheduler.start('pool-1', 'state-2') is None
+
+    manager = PackagePoolManager(MagicMock(), rollout_scheduler=scheduler)
+    manager.pool_repo = AsyncMock()
+    manager.endpoint_repo = scheduler.endpoint_repo
+
+    assert await manager.set_target_state('pool-1', 'state-2')
+    manager.endpoint_repo.update_status_bulk.assert_awaited_once_with('pool-1', SyncStatus.BEHIND)
+
+
+def test_rollout_policy_serialization():
+    """Test that rollout settings round-trip and are omitted when unset."""
+    policy = SyncPolicy(rollout=RolloutPolicy(canary_endpoints=['ep-1'], wave_size=25, max_concurrent=5,
+                                              sync_timeout=600))
+
+    assert SyncPolicy.from_dict(policy.to_dict()) == policy
+    assert 'rollout' not in SyncPolicy().to_dict()
+    assert SyncPolicy.from_dict({'rollout': {'wave_size': 3}}).rollout == RolloutPolicy(wave_size=3)
+
+    with pytest.raises(ValueError):
+        RolloutPolicy(wave_size=-1)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local system state snapshot store.
+
+Tests snapshot round trips, keyframe/delta encoding, unique state IDs,
+retention and sharing the store between instances.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from client.state_store import KEYFRAME_INTERVAL, StateManager
+from shared.models import PackageSet, PackageState, SystemState
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def make_state(versions, endpoint_id='desk', offset=0):
+    """Create a SystemState from {name: version}."""
+    return SystemState(
+        endpoint_id=endpoint_id,
+        timestamp=BASE_TIME + timedelta(seconds=offset),
+        packages=[
+            PackageState(package_name=name, version=version, repository='core',
+                         installed_size=1024, dependencies=['glibc'] if name != 'glibc' else [])
+            for name, version in versions.items()
+        ],
+        pacman_version='6.1.0',
+        architecture='x86_64'
+    )
+
+
+def versions_of(state):
+    return {pkg.package_name: pkg.version for pkg in state.packages}
+
+
+def stored_rows(manager):
+    with sqlite3.connect(manager.db_path) as conn:
+        return conn.execute("SELECT id, base_id, expired FROM snapshots ORDER BY id").fetchall()
+
+
+@pytest.fixture
+def packages():
+    return {f'pkg{i}': '1.0-1' for i in range(40)}
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = StateManager(str(tmp_path), retention=None)
+    yield manager
+    manager.close()
+
+
+class TestSnapshots:
+    """Test saving and loading snapshots."""
+
+    def test_round_trip(self, manager, packages):
+        """Test that a saved state loads back unchanged."""
+        state = make_state(packages)
+        state_id = manager.save_state(state, is_target=True)
+
+        loaded = manager.load_state(state_id)
+        assert loaded.endpoint_id == 'desk'
+        assert loaded.timestamp == BASE_TIME
+        assert loaded.pacman_version == '6.1.0'
+        assert loaded.packages == state.packages
+
+    def test_same_second_snapshots_do_not_overwrite(self, manager, packages):
+        """Test that two snapshots taken in the same second are both kept."""
+        first = manager.save_state(make_state(packages))
+        changed = dict(packages, pkg0='2.0-1')
+        second = manager.save_state(make_state(changed))
+
+        assert first != second
+        assert versions_of(manager.load_state(first))['pkg0'] == '1.0-1'
+        assert versions_of(manager.load_state(second))['pkg0'] == '2.0-1'
+
+    def test_small_changes_stored_as_deltas(self, manager, packages):
+        """Test that snapshots close to the keyframe are stored as deltas."""
+        manager.save_state(make_state(packages))
+        changed = dict(packages, pkg1='1.1-1', newpkg='0.1-1')
+        del changed['pkg2']
+        state_id = manager.save_state(make_state(changed, offset=1))
+
+        rows = stored_rows(manager)
+        assert rows[0][1] is None
+        assert rows[1][1] == rows[0][0]
+        assert versions_of(manager.load_state(state_id)) == changed
+
+    def test_keyframe_kept_as_package_set(self, manager, packages):
+        """Test that the decoded keyframe is kept as a PackageSet and deltas are taken against it."""
+        manager.save_state(make_state(packages))
+        assert isinstance(manager._keyframe[1], PackageSet)
+
+        # A fresh instance decodes the stored keyframe, and PackageSet states are saved as is
+        reopened = StateManager(manager.storage_path, retention=None)
+        try:
+            state = make_state(dict(packages, pkg5='5.0-1'), offset=1)
+            state.packages = PackageSet.from_package_states(state.packages)
+            state_id = reopened.save_state(state)
+
+            assert isinstance(reopened._keyframe[1], PackageSet)
+            assert stored_rows(reopened)[1][1] == stored_rows(reopened)[0][0]
+            assert reopened.load_state(state_id).packages == state.packages.to_list()
+        finally:
+            reopened.close()
+
+    def test_large_changes_start_new_keyframe(self, manager, packages):
+        """Test that a mostly different package list is stored in full."""
+        manager.save_state(make_state(packages))
+        manager.save_state(make_state({name: '2.0-1' for name in packages}, offset=1))
+
+        assert [base_id for _, base_id, _ in stored_rows(manager)] == [None, None]
+
+    def test_keyframe_interval(self, manager, packages):
+        """Test that a keyframe is written after KEYFRAME_INTERVAL deltas."""
+        for i in range(KEYFRAME_INTERVAL + 2):
+            manager.save_state(make_state(dict(packages, pkg0=f'1.{i}-1'), offset=i))
+
+        keyframes = [row_id for row_id, base_id, _ in stored_rows(manager) if base_id is None]
+        assert len(keyframes) == 2
+
+    def test_missing_state(self, manager):
+        """Test loading an unknown state ID."""
+        assert manager.load_state('desk_0_1') is None
+        assert manager.get_previous_state('desk') is None
+
+    def test_shared_between_instances(self, tmp_path, packages):
+        """Test that snapshots saved by one client are visible to another."""
+        writer = StateManager(str(tmp_path))
+        reader = StateManager(str(tmp_path))
+        try:
+            writer.save_state(make_state(packages))
+            writer.save_state(make_state(dict(packages, pkg3='3.0-1'), offset=1))
+
+            assert versions_of(reader.get_previous_state('desk'))['pkg3'] == '3.0-1'
+        finally:
+            writer.close()
+            reader.close()
+
+
+class TestHistory:
+    """Test listing and retention."""
+
+    def test_list_states_newest_first(self, manager, packages):
+        """Test that listing returns metadata for the most recent snapshots."""
+        ids = [manager.save_state(make_state(packages, offset=i), is_target=(i == 2)) for i in range(3)]
+        manager.save_state(make_state(packages, endpoint_id='laptop'))
+
+        listed = manager.list_states('desk', limit=2)
+        assert [entry['state_id'] for entry in listed] == [ids[2], ids[1]]
+        assert listed[0]['is_target'] is True
+        assert listed[0]['package_count'] == len(packages)
+
+    def test_previous_state_is_most_recent(self, manager, packages):
+        """Test that the latest snapshot of the endpoint is returned."""
+        manager.save_state(make_state(packages))
+        manager.save_state(make_state(dict(packages, pkg0='0.9-1'), offset=1))
+        manager.save_state(make_state({'other': '1-1'}, endpoint_id='laptop'))
+
+        assert versions_of(manager.get_previous_state('desk'))['pkg0'] == '0.9-1'
+
+    def test_cleanup_keeps_keyframes_still_needed(self, manager, packages):
+        """Test that retention hides old snapshots but keeps their keyframe for kept deltas."""
+        ids = [manager.save_state(make_state(dict(packages, pkg0=f'1.{i}-1'), offset=i)) for i in range(5)]
+
+        manager.cleanup_old_states('desk', keep_count=2)
+
+        assert [entry['state_id'] for entry in manager.list_states('desk')] == [ids[4], ids[3]]
+        assert manager.load_state(ids[1]) is None
+        assert versions_of(manager.load_state(ids[3]))['pkg0'] == '1.3-1'
+        assert [(base_id, expired) for _, base_id, expired in stored_rows(manager)] == [
+            (None, 1), (1, 0), (1, 0)
+        ]
+
+    def test_retention_on_save(self, tmp_path, packages):
+        """Test that saving prunes beyond the configured retention."""
+        manager = StateManager(str(tmp_path), retention=3)
+        try:
+            for i in range(6):
+                manager.save_state(make_state({name: f'{i}.0-1' for name in packages}, offset=i))
+
+            assert len(manager.list_states('desk', limit=10)) == 3
+            assert len(stored_rows(manager)) == 3
+        finally:
+            manager.close()
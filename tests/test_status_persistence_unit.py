@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Unit tests for status persistence locking and lock-free reads.
+
+Tests the flock-based writer lock, cached reads of the atomically replaced
+status file and the mmap status record shared with other processes.
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from client.status_persistence import (
+    STATUS_RECORD, PersistedStatus, StatusPersistenceManager, _RECORD_SEQ, _RECORD_SEQ_OFFSET
+)
+from client.sync_status import SyncStatus
+
+
+@pytest.fixture
+def writer(tmp_path):
+    return StatusPersistenceManager(str(tmp_path))
+
+
+@pytest.fixture
+def reader(tmp_path):
+    return StatusPersistenceManager(str(tmp_path))
+
+
+class TestLocking:
+    """Test the writer lock."""
+
+    def test_lock_excludes_other_writers(self, writer, reader):
+        """Test that a second manager cannot write while the lock is held."""
+        assert writer._acquire_lock()
+        try:
+            assert reader._acquire_lock(timeout=0.05) is False
+        finally:
+            writer._release_lock()
+
+        assert reader._acquire_lock(timeout=0.05) is True
+        reader._release_lock()
+
+    def test_leftover_lock_file_does_not_block(self, writer, tmp_path):
+        """Test that a lock file left by an old or crashed client is ignored."""
+        (tmp_path / 'status.lock').write_text('999999')
+
+        assert writer.update_status(SyncStatus.BEHIND)
+
+    def test_reads_do_not_wait_for_writer(self, writer, reader):
+        """Test that loading status works while a writer holds the lock."""
+        writer.update_status(SyncStatus.AHEAD)
+
+        assert writer._acquire_lock()
+        try:
+            assert reader.load_status().status == SyncStatus.AHEAD
+        finally:
+            writer._release_lock()
+
+    def test_concurrent_updates_keep_all_fields(self, writer, reader):
+        """Test that read-modify-write updates from two managers do not clobber each other."""
+        def update_status(manager, count):
+            for i in range(count):
+                manager.update_status(SyncStatus.IN_SYNC, packages_count=i)
+
+        def update_operation(manager, count):
+            for i in range(count):
+                manager.update_operation_result('sync', True, f'run {i}')
+
+        threads = [
+            threading.Thread(target=update_status, args=(writer, 30)),
+            threading.Thread(target=update_operation, args=(reader, 30)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        final = StatusPersistenceManager(str(writer.status_file.parent)).load_status()
+        assert final.packages_count == 29
+        assert final.operation_result == 'SUCCESS: run 29'
+
+
+class TestReads:
+    """Test cached reads of the status file."""
+
+    def test_unchanged_file_is_served_from_cache(self, writer, reader, monkeypatch):
+        """Test that an unchanged status file is not parsed again."""
+        writer.update_status(SyncStatus.IN_SYNC, endpoint_name='desk')
+        first = reader.load_status()
+
+        monkeypatch.setattr('client.status_persistence.json.load', None)
+        second = reader.load_status()
+
+        assert second == first
+        assert second is not first
+
+    def test_other_process_updates_are_seen(self, writer, reader):
+        """Test that a replaced status file is reloaded."""
+        writer.update_status(SyncStatus.IN_SYNC)
+        assert reader.load_status().status == SyncStatus.IN_SYNC
+
+        writer.update_status(SyncStatus.BEHIND)
+        assert reader.load_status().status == SyncStatus.BEHIND
+
+    def test_missing_file(self, reader):
+        """Test loading before any status was saved."""
+        assert reader.load_status() is None
+
+
+class TestStatusRecord:
+    """Test the mmap status record."""
+
+    def test_record_follows_saves(self, writer, reader):
+        """Test that the record reflects the latest saved status."""
+        writer.save_status(PersistedStatus(
+            status=SyncStatus.BEHIND,
+            last_updated=datetime(2024, 5, 1, 12, 0, 0),
+            is_authenticated=True,
+            packages_count=812
+        ))
+
+        record = reader.load_status_record()
+        assert record.status == SyncStatus.BEHIND
+        assert record.last_updated == datetime(2024, 5, 1, 12, 0, 0)
+        assert record.is_authenticated is True
+        assert record.packages_count == 812
+
+        writer.update_status(SyncStatus.IN_SYNC, packages_count=None)
+        record = reader.load_status_record()
+        assert record.status == SyncStatus.IN_SYNC
+        assert record.packages_count is None
+
+    def test_cleared_status_has_no_record(self, writer, reader):
+        """Test that clearing the status also clears the record."""
+        writer.update_status(SyncStatus.AHEAD)
+        writer.clear_status()
+
+        assert reader.load_status_record() is None
+
+    def test_write_in_progress_is_not_returned(self, writer, reader, tmp_path):
+        """Test that a record with an odd sequence number is never read."""
+        writer.update_status(SyncStatus.AHEAD)
+        record_file = tmp_path / 'status.rec'
+        data = bytearray(record_file.read_bytes())
+        seq = _RECORD_SEQ.unpack_from(data, _RECORD_SEQ_OFFSET)[0]
+        _RECORD_SEQ.pack_into(data, _RECORD_SEQ_OFFSET, seq + 1)
+        record_file.write_bytes(bytes(data))
+
+        assert reader.load_status_record() is None
+
+        # The next writer recovers from the interrupted update
+        writer.update_status(SyncStatus.BEHIND)
+        assert reader.load_status_record().status == SyncStatus.BEHIND
+        assert len(record_file.read_bytes()) == STATUS_RECORD.size
+
+    def test_record_disabled(self, tmp_path):
+        """Test that no record is kept when disabled."""
+        manager = StatusPersistenceManager(str(tmp_path), use_status_record=False)
+        manager.update_status(SyncStatus.IN_SYNC)
+
+        assert not (tmp_path / 'status.rec').exists()
+        assert manager.load_status_record() is None
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local status socket and the CLI status shim.
+
+Tests the query protocol, response caching keyed on the status file,
+stale socket handling, refusing shared socket directories and the shim's
+fallback behaviour.
+"""
+
+import json
+import sys
+import pytest
+from unittest.mock import MagicMock, patch
+
+from client import status_cli
+from client.status_socket import StatusSocketServer, build_status_handlers, get_socket_path, query_status
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return tmp_path / 'run' / 'status.sock'
+
+
+class TestStatusSocket:
+    """Test serving and querying status over the socket."""
+
+    def test_query_round_trip(self, socket_path):
+        """Test that a command is answered with its handler's response."""
+        handlers = {'waybar': lambda: {'text': '✓', 'alt': 'in_sync'}}
+
+        with StatusSocketServer(handlers, path=socket_path):
+            assert query_status('waybar', socket_path) == {'text': '✓', 'alt': 'in_sync'}
+            assert query_status('ping', socket_path) == {'pong': True}
+            assert 'error' in query_status('unknown', socket_path)
+
+        assert not socket_path.exists()
+
+    def test_no_daemon(self, socket_path):
+        """Test that querying without a running client returns None."""
+        assert query_status('status', socket_path) is None
+
+    def test_responses_cached_until_status_file_replaced(self, socket_path, tmp_path):
+        """Test that the handler only runs again after the status file changes."""
+        status_file = tmp_path / 'status.json'
+        status_file.write_text('{"status": "in_sync"}')
+        handler = MagicMock(return_value={'status': 'in_sync'})
+        server = StatusSocketServer({'status': handler}, path=socket_path, status_file=status_file)
+
+        server.respond('status')
+        server.respond('status')
+        assert handler.call_count == 1
+
+        replacement = tmp_path / 'status.tmp'
+        replacement.write_text('{"status": "behind"}')
+        replacement.replace(status_file)
+        server.respond('status')
+        assert handler.call_count == 2
+
+    def test_stale_socket_replaced(self, socket_path):
+        """Test that a socket left by a crashed client does not block startup."""
+        first = StatusSocketServer({}, path=socket_path)
+        assert first.start()
+        first._server.shutdown()
+        first._server.server_close()  # crash: socket file stays behind
+
+        second = StatusSocketServer({}, path=socket_path)
+        try:
+            assert second.start()
+            assert query_status('ping', socket_path) == {'pong': True}
+        finally:
+            second.stop()
+
+    def test_second_server_refused(self, socket_path):
+        """Test that a second client does not steal a live socket."""
+        with StatusSocketServer({}, path=socket_path):
+            assert StatusSocketServer({}, path=socket_path).start() is False
+            assert query_status('ping', socket_path) == {'pong': True}
+
+    def test_shared_directory_refused(self, tmp_path):
+        """Test that the socket is not served from a directory other users can reach."""
+        shared = tmp_path / 'shared'
+        shared.mkdir(mode=0o755)
+        shared.chmod(0o755)
+        assert StatusSocketServer({}, path=shared / 'status.sock').start() is False
+
+        private = tmp_path / 'private'
+        private.mkdir(mode=0o700)
+        (tmp_path / 'link').symlink_to(private)
+        assert StatusSocketServer({}, path=tmp_path / 'link' / 'status.sock').start() is False
+        assert not (private / 'status.sock').exists()
+
+    def test_no_runtime_directory(self, monkeypatch):
+        """Test that there is no socket without XDG_RUNTIME_DIR."""
+        monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+
+        assert get_socket_path() is None
+        assert StatusSocketServer({}).start() is False
+        assert query_status('ping') is None
+
+    def test_status_handler_without_status(self):
+        """Test the status handler before any status was persisted."""
+        status_manager = MagicMock()
+        status_manager.get_status_summary.return_value = {'status': 'unknown', 'last_updated': None}
+
+        handlers = build_status_handlers(status_manager, MagicMock())
+
+        assert handlers['status']() == {'available': False}
+
+
+class TestStatusCli:
+    """Test the minimal-import status shim."""
+
+    def test_waybar_json_from_daemon(self, capsys):
+        """Test that --json prints the daemon's WayBar output."""
+        with patch.object(status_cli, 'query_status', return_value={'text': '↓', 'alt': 'behind'}) as query:
+            assert status_cli.main(['--json']) == 0
+
+        query.assert_called_once_with('waybar')
+        assert json.loads(capsys.readouterr().out) == {'text': '↓', 'alt': 'behind'}
+
+    def test_text_status_from_daemon(self, capsys):
+        """Test the human-readable output and stale marker."""
+        summary = {'available': True, 'is_fresh': False, 'status': 'ahead'}
+        with patch.object(status_cli, 'query_status', return_value=summary):
+            assert status_cli.main([]) == 0
+
+        assert capsys.readouterr().out.strip() == 'Status: AHEAD (stale)'
+
+    def test_no_status_available(self, capsys):
+        """Test the exit code when the client has no status yet."""
+        with patch.object(status_cli, 'query_status', return_value={'available': False}):
+            assert status_cli.main(['--quiet']) == status_cli.EXIT_NO_STATUS
+
+        assert capsys.readouterr().out == ''
+
+    def test_falls_back_without_daemon(self, monkeypatch):
+        """Test that the full client is used when no client is running."""
+        monkeypatch.setattr(sys, 'argv', ['status_cli.py'])
+        with patch.object(status_cli, 'query_status', return_value=None), \
+                patch('client.main.main', return_value=8) as client_main:
+            assert status_cli.main(['--json']) == 8
+
+        client_main.assert_called_once()
+        assert sys.argv[1:] == ['--status', '--json']
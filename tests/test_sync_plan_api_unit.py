@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Unit tests for server-side sync planning.
+
+Tests the pure Python version comparison, state comparison, the decoded
+state cache, latest state lookups, endpoint and pool plan previews and their
+authentication.
+"""
+
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from server.api.package_sync import get_endpoint_sync_plan
+from server.core.sync_coordinator import StateManager, SyncCoordinator
+from server.database.connection import DatabaseManager
+from server.database.orm import EndpointRepository, PoolRepository, ValidationError
+from server.database.schema import create_tables
+from shared.models import Endpoint, PackagePool, PackageState, SystemState
+from shared.versions import compare_states, parse_evr, vercmp
+
+
+def state(endpoint_id, packages):
+    """Build a state from {name: (version, size, [dependencies])}."""
+    return SystemState(
+        endpoint_id=endpoint_id, timestamp=datetime.now(), pacman_version='6.1.0', architecture='x86_64',
+        packages=[PackageState(package_name=name, version=version, repository='core', installed_size=size,
+                               dependencies=list(dependencies))
+                  for name, (version, size, dependencies) in packages.items()]
+    )
+
+
+class TestVercmp:
+    """Test version comparison against pacman's vercmp results."""
+
+    @pytest.mark.parametrize('version1, version2, expected', [
+        ('1.0', '1.0', 0),
+        ('1.0', '1.1', -1),
+        ('1.10', '1.9', 1),
+        ('1.001', '1.1', 0),
+        ('1.0a', '1.0', -1),
+        ('1.0', '1.0.1', -1),
+        ('1.0alpha', '1.0beta', -1),
+        ('1.0rc1', '1.0', -1),
+        ('1.0.a', '1.0.1', -1),
+        ('1..0', '1.0', 1),
+        ('1.0-1', '1.0-2', -1),
+        ('1.0', '1.0-5', 0),
+        ('1:1.0', '2.0', 1),
+        ('0:1.0', '1.0', 0),
+        ('2024a-1', '2024b-1', -1),
+    ])
+    def test_vercmp(self, version1, version2, expected):
+        assert vercmp(version1, version2) == expected
+        assert vercmp(version2, version1) == -expected
+
+    def test_parse_evr(self):
+        assert parse_evr('1:2.3-4') == ('1', '2.3', '4')
+        assert parse_evr('2.3') == ('0', '2.3', None)
+        assert parse_evr('2.3-rc1-2') == ('0', '2.3-rc1', '2')
+
+
+def test_compare_states():
+    """Test comparing states without pacman."""
+    current = state('ep-1', {'a': ('1.10-1', 1, []), 'b': ('2.0-1', 1, []), 'c': ('1.0', 1, []), 'd': ('1', 1, [])})
+    target = state('ep-1', {'a': ('1.9-1', 1, []), 'b': ('2.0-2', 1, []), 'c': ('1.0', 1, []), 'e': ('1', 1, [])})
+
+    assert compare_states(current, target) == {
+        'a': 'newer', 'b': 'older', 'c': 'same', 'd': 'extra', 'e': 'missing'
+    }
+
+
+@pytest.mark.asyncio
+async def test_decoded_states_are_cached():
+    """Test that repeated lookups of a state decode it once."""
+    manager = StateManager(MagicMock(), max_cached_states=1)
+    manager.state_repo = AsyncMock()
+    manager.state_repo.get_state.side_effect = lambda state_id: state(state_id, {})
+
+    first = await manager.get_state('state-1')
+    assert await manager.get_state('state-1') is first
+    assert manager.state_repo.get_state.await_count == 1
+
+    await manager.get_state('state-2')
+    await manager.get_state('state-1')
+    assert manager.state_repo.get_state.await_count == 3
+
+
+async def pool_coordinator(tmp_path):
+    """Coordinator on a database with a four-endpoint pool and its states."""
+    db_manager = DatabaseManager("internal")
+    db_manager.database_url = str(tmp_path / "plans.db")
+    await create_tables(db_manager)
+
+    with patch('server.database.orm.get_change_notifier'):
+        pool = await PoolRepository(db_manager).create(PackagePool(id='pool-1', name='desktops', description=''))
+        endpoints = EndpointRepository(db_manager)
+        for index in range(1, 5):
+            await endpoints.create(Endpoint(f'ep-{index}', f'desk{index}', f'host{index}'))
+            await endpoints.assign_to_pool(f'ep-{index}', pool.id)
+
+        coordinator = SyncCoordinator(db_manager)
+        target = state('ep-1', {
+            'tool': ('2.0-1', 500, ['libfoo>=1.0']), 'libfoo': ('1.0-1', 200, []), 'bash': ('5.2-1', 50, [])
+        })
+        target_id = await coordinator.state_manager.save_state('ep-1', target)
+        await coordinator.state_manager.set_target_state(pool.id, target_id)
+
+        # An older state of ep-2 must not be used
+        await coordinator.state_manager.save_state('ep-2', target)
+        outdated = state('ep-2', {
+            'tool': ('1.0-1', 400, ['python-six']), 'libfoo': ('2.0-1', 300, []),
+            'bash': ('5.2-1', 50, []), 'python-six': ('1.16-1', 10, [])
+        })
+        await coordinator.state_manager.save_state('ep-2', outdated)
+        await coordinator.state_manager.save_state('ep-3', outdated)
+
+    return coordinator
+
+
+class TestPlans:
+    """Test endpoint and pool plan previews on a real database."""
+
+    @pytest.mark.asyncio
+    async def test_latest_state_ids(self, tmp_path):
+        """Test looking up the newest state of several endpoints at once."""
+        coordinator = await pool_coordinator(tmp_path)
+
+        state_ids = await coordinator.state_manager.get_latest_state_ids(['ep-1', 'ep-2', 'ep-3', 'ep-4'])
+
+        assert sorted(state_ids) == ['ep-1', 'ep-2', 'ep-3']
+        assert len(set(state_ids.values())) == 3
+
+    @pytest.mark.asyncio
+    async def test_endpoint_plan(self, tmp_path):
+        """Test the full plan of one endpoint."""
+        coordinator = await pool_coordinator(tmp_path)
+
+        plan = await coordinator.plan_endpoint_sync('ep-2')
+
+        assert plan['status'] == 'changes'
+        assert plan['operation_counts'] == {'install': 0, 'upgrade': 1, 'downgrade': 1, 'remove': 1}
+        assert plan['download_size'] == 700
+        assert [(t['kind'], [op['package_name'] for op in t['operations']]) for t in plan['transactions']] == [
+            ('downgrade', ['libfoo']), ('install', ['tool']), ('remove', ['python-six'])
+        ]
+        assert plan['transactions'][1]['operations'][0]['target_version'] == '2.0-1'
+
+    @pytest.mark.asyncio
+    async def test_pool_plan(self, tmp_path):
+        """Test previewing a whole pool, sharing plans between identical endpoints."""
+        coordinator = await pool_coordinator(tmp_path)
+
+        with patch.object(coordinator.planner, 'build', wraps=coordinator.planner.build) as build:
+            preview = await coordinator.plan_pool_sync('pool-1')
+
+        assert preview['total_endpoints'] == 4
+        assert preview['endpoints_in_sync'] == 1
+        assert preview['endpoints_with_changes'] == 2
+        assert preview['endpoints_without_state'] == 1
+        assert preview['distinct_plans'] == 2
+        assert preview['total_download_size'] == 1400
+        assert all('transactions' not in plan for plan in preview['endpoints'])
+        # ep-2 and ep-3 report the same packages
+        assert build.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_pool_without_target(self, tmp_path):
+        """Test that pools without a target state cannot be planned."""
+        coordinator = await pool_coordinator(tmp_path)
+
+        with patch('server.database.orm.get_change_notifier'):
+            await PoolRepository(coordinator.db_manager).create(PackagePool(id='pool-2', name='servers', description=''))
+
+        with pytest.raises(ValidationError):
+            await coordinator.plan_pool_sync('pool-2')
+
+
+class TestEndpointPlanRoute:
+    """Test authorization of the endpoint plan route."""
+
+    @pytest.mark.asyncio
+    async def test_own_plan(self):
+        """Test that an endpoint can preview its own plan."""
+        coordinator = AsyncMock()
+        coordinator.plan_endpoint_sync.return_value = {'status': 'in_sync'}
+
+        plan = await get_endpoint_sync_plan('ep-1', coordinator, Endpoint('ep-1', 'ep1', 'host1'))
+
+        assert plan == {'status': 'in_sync'}
+
+    @pytest.mark.asyncio
+    async def test_other_endpoint_plan_forbidden(self):
+        """Test that an endpoint cannot preview another endpoint's plan."""
+        coordinator = AsyncMock()
+
+        with pytest.raises(HTTPException) as error:
+            await get_endpoint_sync_plan('ep-2', coordinator, Endpoint('ep-1', 'ep1', 'host1'))
+
+        assert error.value.status_code == 403
+        coordinator.plan_endpoint_sync.assert_not_called()
+
+
+class TestPlanAuthentication:
+    """Test the shared admin and endpoint authentication of plan previews."""
+
+    def make_client(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from server.api.package_sync import router
+
+        async def authenticate_admin(credentials):
+            if credentials.credentials != 'admin-token':
+                raise HTTPException(status_code=403, detail="Admin privileges required")
+            return {'user_type': 'admin'}
+
+        async def authenticate_endpoint(request, credentials):
+            if credentials.credentials != 'endpoint-token':
+                raise HTTPException(status_code=401, detail="Authentication failed")
+            return Endpoint('ep-1', 'ep1', 'host1')
+
+        app = FastAPI()
+        app.include_router(router)
+        app.state.authenticate_admin = authenticate_admin
+        app.state.authenticate_endpoint = authenticate_endpoint
+        app.state.sync_coordinator = AsyncMock()
+        app.state.sync_coordinator.plan_endpoint_sync.return_value = {'status': 'behind'}
+        app.state.sync_coordinator.plan_pool_sync.return_value = {'pool_id': 'pool-1'}
+
+        self.endpoint_headers = {'Authorization': 'Bearer endpoint-token'}
+        self.admin_headers = {'Authorization': 'Bearer admin-token'}
+        return TestClient(app), app.state.sync_coordinator
+
+    def test_admin_previews_any_endpoint_and_pool(self):
+        """Test that operators can preview single endpoints and whole pools."""
+        client, coordinator = self.make_client()
+
+        assert client.get('/api/package-sync/endpoints/ep-2/plan', headers=self.admin_headers).json() == \
+            {'status': 'behind'}
+        response = client.get('/api/package-sync/pools/pool-1/plan?include_operations=true',
+                              headers=self.admin_headers)
+
+        assert response.json() == {'pool_id': 'pool-1'}
+        coordinator.plan_pool_sync.assert_awaited_once_with('pool-1', True)
+
+    def test_endpoint_token_limited_to_own_plan(self):
+        """Test that endpoint tokens only preview their own endpoint."""
+        client, coordinator = self.make_client()
+
+        assert client.get('/api/package-sync/endpoints/ep-1/plan', headers=self.endpoint_headers).status_code == 200
+        assert client.get('/api/package-sync/endpoints/ep-2/plan', headers=self.endpoint_headers).status_code == 403
+        assert client.get('/api/package-sync/pools/pool-1/plan?include_operations=true',
+                          headers=self.endpoint_headers).status_code == 403
+        coordinator.plan_pool_sync.assert_not_called()
+
+    def test_unauthenticated_rejected(self):
+        """Test that plans are not served without a valid token."""
+        client, coordinator = self.make_client()
+
+        assert client.get('/api/package-sync/pools/pool-1/plan').status_code in (401, 403)
+        assert client.get('/api/package-sync/pools/pool-1/plan',
+                          headers={'Authorization': 'Bearer forged'}).status_code == 401
+        coordinator.plan_pool_sync.assert_not_called()
+
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the dependency-ordered sync planner.
+
+Tests operation ordering across transactions, removal ordering, cycle
+reporting, plan caching and execution of planned transactions.
+"""
+
+import subprocess
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from client.package_operations import PackageSynchronizer
+from shared.models import PackageState, SystemState
+from shared.sync_planner import (
+    PackageOperation, SyncPlanner, order_operations, state_hash
+)
+
+
+def state(packages):
+    """Build a state from {name: (version, [dependencies])}."""
+    return SystemState(
+        endpoint_id='desk', timestamp=datetime.now(), pacman_version='6.1.0', architecture='x86_64',
+        packages=[PackageState(package_name=name, version=version, repository='core', installed_size=1,
+                               dependencies=list(dependencies))
+                  for name, (version, dependencies) in packages.items()]
+    )
+
+
+def kinds(transactions):
+    return [(transaction.kind, [op.package_name for op in transaction.operations]) for transaction in transactions]
+
+
+class TestOrdering:
+    """Test how operations are ordered into transactions."""
+
+    def test_default_kind_order_without_dependencies(self):
+        """Test grouping by kind, keeping the input order within a transaction."""
+        operations = [
+            PackageOperation('downgrade', 'zlib'),
+            PackageOperation('install', 'vim'),
+            PackageOperation('remove', 'old-tool'),
+            PackageOperation('upgrade', 'bash'),
+        ]
+
+        transactions, cycles, warnings = order_operations(operations)
+
+        assert kinds(transactions) == [
+            ('remove', ['old-tool']), ('install', ['vim', 'bash']), ('downgrade', ['zlib'])
+        ]
+        assert cycles == [] and warnings == []
+
+    def test_downgrade_needed_by_upgrade_runs_first(self):
+        """Test that a dependency's downgrade precedes the transaction that needs it."""
+        operations = [
+            PackageOperation('upgrade', 'python-foo'),
+            PackageOperation('install', 'vim'),
+            PackageOperation('downgrade', 'libfoo'),
+        ]
+
+        transactions, _, _ = order_operations(operations, target_dependencies={'python-foo': ['libfoo>=1.0']})
+
+        assert kinds(transactions) == [
+            ('downgrade', ['libfoo']), ('install', ['python-foo', 'vim'])
+        ]
+
+    def test_same_kind_dependencies_share_a_transaction(self):
+        """Test that dependencies between installs need no extra transaction."""
+        operations = [PackageOperation('install', 'app'), PackageOperation('upgrade', 'lib')]
+
+        transactions, _, _ = order_operations(operations, target_dependencies={'app': ['lib']})
+
+        assert kinds(transactions) == [('install', ['app', 'lib'])]
+
+    def test_removal_waits_for_dependent_upgrade(self):
+        """Test that a package is removed after its dependents stop needing it."""
+        operations = [PackageOperation('remove', 'python-six'), PackageOperation('upgrade', 'tool')]
+
+        transactions, _, warnings = order_operations(
+            operations,
+            current_dependencies={'tool': ['python-six'], 'python-six': []},
+            target_dependencies={'tool': []}
+        )
+
+        assert kinds(transactions) == [('install', ['tool']), ('remove', ['python-six'])]
+        assert warnings == []
+
+    def test_removal_breaking_unchanged_package_is_reported(self):
+        """Test the warning when an unchanged package depends on a removed one."""
+        operations = [PackageOperation('remove', 'libold')]
+
+        _, _, warnings = order_operations(operations, current_dependencies={'app': ['libold']})
+
+        assert warnings == ['Removing libold breaks unchanged packages depending on it: app']
+
+    def test_cycles_are_reported(self):
+        """Test cycle detection within and across operation types."""
+        operations = [
+            PackageOperation('upgrade', 'a'), PackageOperation('upgrade', 'b'),
+            PackageOperation('downgrade', 'c'), PackageOperation('install', 'd'),
+        ]
+
+        transactions, cycles, warnings = order_operations(
+            operations, target_dependencies={'a': ['b'], 'b': ['a'], 'c': ['d'], 'd': ['c']}
+        )
+
+        assert sorted(cycles) == [['a', 'b'], ['c', 'd']]
+        assert len(warnings) == 1 and 'c, d' in warnings[0]
+        assert sorted(op.package_name for t in transactions for op in t.operations) == ['a', 'b', 'c', 'd']
+
+
+class TestSyncPlanner:
+    """Test plan construction and caching."""
+
+    @pytest.fixture
+    def states(self):
+        current = state({'tool': ('1.0-1', ['python-six']), 'python-six': ('1.16-1', []), 'libfoo': ('2.0-1', [])})
+        target = state({'tool': ('2.0-1', ['libfoo']), 'libfoo': ('1.0-1', [])})
+        return current, target
+
+    @pytest.fixture
+    def compare(self):
+        return MagicMock(return_value={'tool': 'older', 'python-six': 'extra', 'libfoo': 'newer'})
+
+    def test_plan(self, states, compare):
+        """Test a plan built from a state comparison."""
+        plan = SyncPlanner(compare).plan(*states)
+
+        assert kinds(plan.transactions) == [
+            ('downgrade', ['libfoo']), ('install', ['tool']), ('remove', ['python-six'])
+        ]
+        assert [op.package_name for op in plan.operations] == ['libfoo', 'tool', 'python-six']
+        assert plan.operations[1].target_version == '2.0-1'
+
+    def test_plans_are_cached(self, states, compare):
+        """Test that repeated plans for the same states reuse the first one."""
+        planner = SyncPlanner(compare, max_cached_plans=1)
+
+        first = planner.plan(*states, target_state_id='state-1')
+        assert planner.plan(*states, target_state_id='state-1') is first
+        assert compare.call_count == 1
+
+        planner.plan(*states, target_state_id='state-2')
+        assert compare.call_count == 2
+        assert planner.cached_plans == 1
+        planner.plan(*states, target_state_id='state-1')
+        assert compare.call_count == 3
+
+    def test_state_hash_ignores_order(self):
+        """Test that the state hash depends on package versions only."""
+        assert state_hash(state({'a': ('1', []), 'b': ('2', [])})) == state_hash(state({'b': ('2', ['x']), 'a': ('1', [])}))
+        assert state_hash(state({'a': ('1', [])})) != state_hash(state({'a': ('2', [])}))
+
+
+def test_synchronizer_runs_planned_transactions(tmp_path):
+    """Test that sync_to_latest applies transactions in dependency order."""
+    current = state({'tool': ('1.0-1', []), 'libfoo': ('2.0-1', [])})
+    target = state({'tool': ('2.0-1', ['libfoo']), 'libfoo': ('1.0-1', [])})
+    (tmp_path / 'libfoo-1.0-1-x86_64.pkg.tar.zst').write_bytes(b'archive')
+
+    pacman = MagicMock()
+    pacman.config.cache_dir = str(tmp_path)
+    pacman.config.architecture = 'x86_64'
+    pacman.get_system_state.return_value = current
+    pacman.compare_package_states.return_value = {'tool': 'older', 'libfoo': 'newer'}
+    synchronizer = PackageSynchronizer(pacman)
+
+    def run(cmd, **kwargs):
+        return subprocess.CompletedProcess(cmd, 0, stdout='', stderr='')
+
+    with patch('client.package_operations.subprocess.run', side_effect=run) as runner:
+        result = synchronizer.sync_to_latest(target, target_state_id='state-1')
+
+    assert result.success
+    commands = [call.args[0][:2] for call in runner.call_args_list if call.args[0][1] != '-Sp']
+    assert commands == [['pacman', '-U'], ['pacman', '-S']]
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the compact submission wire formats.
+
+Tests encoding round trips, negotiation, decompression limits, the server
+decode paths for state and repository submissions and the client's
+fallback to plain JSON.
+"""
+
+import gzip
+import json
+import pytest
+import httpx
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from client.api_client import PacmanSyncAPIClient, UnsupportedMediaTypeError
+from server.api.endpoints import router as endpoints_router
+from server.api.states import router as states_router
+from shared.exceptions import PacmanSyncError
+from shared.models import Endpoint, PackageState, Repository, RepositoryPackage, SystemState
+from shared.wire_format import (
+    JSON_CONTENT_TYPE, COLUMNAR_JSON_CONTENT_TYPE, GZIP_ENCODING, IDENTITY_ENCODING,
+    WireFormatError, decode_body, encode_body, negotiate_format, repositories_to_columnar,
+    state_from_columnar, state_to_columnar
+)
+
+
+def make_state(count=200):
+    return SystemState(
+        endpoint_id="ep-1",
+        timestamp=datetime(2024, 1, 1, 12, 0),
+        packages=[
+            PackageState(f"pkg{i}", f"1.{i}-1", "extra" if i % 2 else "core", i * 100,
+                         dependencies=["glibc"] if i % 3 == 0 else [])
+            for i in range(count)
+        ],
+        pacman_version="6.1.0",
+        architecture="x86_64"
+    )
+
+
+def make_repositories():
+    packages = [RepositoryPackage(f"pkg{i}", f"2.{i}-1", "extra", "x86_64", f"Package {i}") for i in range(50)]
+    return [Repository("", "ep-1", "extra", "https://mirror.example/extra", packages, mirrors=[])]
+
+
+class TestCodec:
+    """Test encoding and decoding."""
+
+    def test_columnar_state_round_trip(self):
+        """Test that a state survives the columnar layout and compression."""
+        state = make_state()
+        body, headers = encode_body(state_to_columnar(state), COLUMNAR_JSON_CONTENT_TYPE, GZIP_ENCODING)
+
+        assert headers == {'Content-Type': COLUMNAR_JSON_CONTENT_TYPE, 'Content-Encoding': GZIP_ENCODING}
+        decoded, packages = state_from_columnar(decode_body(body, headers['Content-Type'], GZIP_ENCODING))
+        assert decoded == state
+        assert len(packages) == 200
+
+    def test_small_bodies_are_not_compressed(self):
+        """Test that compression is skipped for tiny payloads."""
+        body, headers = encode_body({'a': 1}, JSON_CONTENT_TYPE, GZIP_ENCODING)
+
+        assert body == b'{"a":1}'
+        assert 'Content-Encoding' not in headers
+
+    def test_decompression_limit(self):
+        """Test that oversized bodies are refused."""
+        body = gzip.compress(json.dumps({'data': 'x' * 10000}).encode())
+
+        with pytest.raises(WireFormatError, match="exceeds"):
+            decode_body(body, JSON_CONTENT_TYPE, GZIP_ENCODING, max_size=1000)
+
+    def test_mismatched_columns_are_rejected(self):
+        """Test validation of column lengths."""
+        payload = state_to_columnar(make_state(3))
+        payload['packages']['versions'].pop()
+
+        with pytest.raises(WireFormatError, match="same length"):
+            state_from_columnar(payload)
+
+    def test_negotiation(self):
+        """Test choosing a format from what the peer accepts."""
+        assert negotiate_format([COLUMNAR_JSON_CONTENT_TYPE, JSON_CONTENT_TYPE], [GZIP_ENCODING]) == (
+            COLUMNAR_JSON_CONTENT_TYPE, GZIP_ENCODING
+        )
+        # Servers that advertise nothing only get plain JSON
+        assert negotiate_format([], []) == (JSON_CONTENT_TYPE, IDENTITY_ENCODING)
+
+
+class TestServerDecoding:
+    """Test the state and repository submission endpoints."""
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI()
+        app.include_router(states_router, prefix="/api")
+        app.include_router(endpoints_router, prefix="/api")
+
+        @app.exception_handler(PacmanSyncError)
+        async def structured_error(request, exc):
+            return JSONResponse(status_code=exc.get_http_status_code(), content={'error': str(exc)})
+
+        async def authenticate(request, credentials):
+            return Endpoint("ep-1", "ep", "host", pool_id="pool-1")
+
+        app.state.authenticate_endpoint = authenticate
+        app.state.sync_coordinator = MagicMock()
+        app.state.sync_coordinator.state_manager.save_state = AsyncMock(return_value="state-1")
+        app.state.endpoint_manager = MagicMock()
+        app.state.endpoint_manager.update_repository_info = AsyncMock(return_value=True)
+        return app
+
+    async def post(self, app, path, body, headers):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, content=body, headers=headers)
+
+    @pytest.mark.asyncio
+    async def test_columnar_state_submission(self, app):
+        """Test the compressed columnar state path."""
+        state = make_state()
+        body, headers = encode_body(state_to_columnar(state), COLUMNAR_JSON_CONTENT_TYPE, GZIP_ENCODING)
+
+        response = await self.post(app, "/api/states/ep-1", body, headers)
+
+        assert response.status_code == 200
+        saved = app.state.sync_coordinator.state_manager.save_state.call_args[0][1]
+        assert saved == state
+
+    @pytest.mark.asyncio
+    async def test_json_state_submission_still_works(self, app):
+        """Test the plain JSON fallback, including validation errors."""
+        state = make_state(2)
+        data = {
+            'endpoint_id': 'ep-1', 'timestamp': state.timestamp.isoformat(),
+            'packages': [vars(pkg) for pkg in state.packages],
+            'pacman_version': '6.1.0', 'architecture': 'x86_64'
+        }
+
+        response = await self.post(app, "/api/states/ep-1", json.dumps(data), {'Content-Type': JSON_CONTENT_TYPE})
+        assert response.status_code == 200
+        assert app.state.sync_coordinator.state_manager.save_state.call_args[0][1] == state
+
+        del data['architecture']
+        response = await self.post(app, "/api/states/ep-1", json.dumps(data), {'Content-Type': JSON_CONTENT_TYPE})
+        assert response.status_code == 422
+        assert response.json()['detail'][0]['loc'] == ['body', 'architecture']
+
+    @pytest.mark.asyncio
+    async def test_unsupported_format_advertises_alternatives(self, app):
+        """Test the 415 response headers used for client negotiation."""
+        response = await self.post(app, "/api/states/ep-1", b"...", {
+            'Content-Type': COLUMNAR_JSON_CONTENT_TYPE, 'Content-Encoding': 'br'
+        })
+
+        assert response.status_code == 415
+        assert COLUMNAR_JSON_CONTENT_TYPE in response.headers['accept-post']
+        assert GZIP_ENCODING in response.headers['accept-encoding']
+
+    @pytest.mark.asyncio
+    async def test_malformed_body(self, app):
+        """Test that corrupt compressed bodies are a client error."""
+        response = await self.post(app, "/api/states/ep-1", b"not gzip", {
+            'Content-Type': COLUMNAR_JSON_CONTENT_TYPE, 'Content-Encoding': GZIP_ENCODING
+        })
+
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_columnar_repository_submission(self, app):
+        """Test the repository fast path and its column validation."""
+        repositories = make_repositories()
+        payload = repositories_to_columnar(repositories)
+        body, headers = encode_body(payload, COLUMNAR_JSON_CONTENT_TYPE, GZIP_ENCODING)
+
+        response = await self.post(app, "/api/endpoints/ep-1/repositories", body, headers)
+
+        assert response.status_code == 200
+        submitted = app.state.endpoint_manager.update_repository_info.call_args[0][1]
+        assert submitted[0].packages == repositories[0].packages
+        assert submitted[0].repo_url == "https://mirror.example/extra"
+
+        payload['repositories'][0]['packages']['names'][3] = "Bad Name"
+        body, headers = encode_body(payload, COLUMNAR_JSON_CONTENT_TYPE)
+        response = await self.post(app, "/api/endpoints/ep-1/repositories", body, headers)
+        assert response.status_code == 400
+
+
+class TestClientNegotiation:
+    """Test the client's submission format fallback."""
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_json_and_remembers(self):
+        """Test that a server rejecting compact bodies gets plain JSON."""
+        client = PacmanSyncAPIClient("http://test")
+        client._make_request = AsyncMock(side_effect=[
+            UnsupportedMediaTypeError("rejected", [], []),
+            {'state_id': 'state-1'},
+            {'state_id': 'state-2'}
+        ])
+
+        assert await client.submit_state("ep-1", make_state(5)) == 'state-1'
+        assert await client.submit_state("ep-1", make_state(5)) == 'state-2'
+
+        calls = client._make_request.call_args_list
+        assert calls[0].kwargs['body'] is not None
+        assert 'packages' in calls[1].kwargs['data']
+        assert 'body' not in calls[2].kwargs
+
+    @pytest.mark.asyncio
+    async def test_downgrades_to_advertised_format(self):
+        """Test using the best format listed in a 415 response."""
+        client = PacmanSyncAPIClient("http://test")
+        client._submission_format = (COLUMNAR_JSON_CONTENT_TYPE, IDENTITY_ENCODING)
+        client._make_request = AsyncMock(side_effect=[
+            UnsupportedMediaTypeError("rejected", [COLUMNAR_JSON_CONTENT_TYPE], [GZIP_ENCODING]),
+            {}
+        ])
+
+        assert await client.submit_repository_info("ep-1", make_repositories()) is True
+
+        retry = client._make_request.call_args_list[1].kwargs
+        assert retry['body_headers']['Content-Type'] == COLUMNAR_JSON_CONTENT_TYPE
+        assert client._submission_format == (COLUMNAR_JSON_CONTENT_TYPE, GZIP_ENCODING)
+
+    def test_json_only_mode(self):
+        """Test disabling compact formats."""
+        client = PacmanSyncAPIClient("http://test", wire_format="json")
+
+        assert client._submission_format == (JSON_CONTENT_TYPE, IDENTITY_ENCODING)